@@ -8,29 +8,30 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 
 from app.auth import get_current_user
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_supabase_client
+from app.services.subscription import invalideer_tier_cache
 
 router = APIRouter()
 
 
-def get_db():
+async def get_db():
     """Get Supabase client."""
-    return get_supabase_client()
+    return await get_async_supabase_client()
 
 
-def get_user_roles(db, user_id: str) -> list[str]:
+async def get_user_roles(db, user_id: str) -> list[str]:
     """Get all roles for a user."""
     try:
-        roles = db.table('user_roles').select('role').eq('user_id', user_id).execute()
+        roles = await db.table('user_roles').select('role').eq('user_id', user_id).execute()
         return [r['role'] for r in roles.data] if roles.data else []
     except:
         return []
 
 
-def get_user_domain(db, user_id: str) -> str | None:
+async def get_user_domain(db, user_id: str) -> str | None:
     """Get email domain for a user."""
     try:
-        profile = db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
+        profile = await db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
         return profile.data[0]['email_domain'] if profile.data else None
     except:
         return None
@@ -38,8 +39,8 @@ def get_user_domain(db, user_id: str) -> str | None:
 
 async def require_admin(user_id: str = Depends(get_current_user)) -> str:
     """Verify user is an admin."""
-    db = get_db()
-    roles = get_user_roles(db, user_id)
+    db = await get_db()
+    roles = await get_user_roles(db, user_id)
 
     if 'admin' not in roles:
         raise HTTPException(status_code=403, detail="Geen admin rechten")
@@ -49,9 +50,9 @@ async def require_admin(user_id: str = Depends(get_current_user)) -> str:
 
 async def require_admin_or_org_admin(user_id: str = Depends(get_current_user)) -> tuple[str, list[str], str | None]:
     """Verify user is admin or org_admin. Returns (user_id, roles, domain)."""
-    db = get_db()
-    roles = get_user_roles(db, user_id)
-    domain = get_user_domain(db, user_id)
+    db = await get_db()
+    roles = await get_user_roles(db, user_id)
+    domain = await get_user_domain(db, user_id)
 
     if 'admin' not in roles and 'org_admin' not in roles:
         raise HTTPException(status_code=403, detail="Geen beheerrechten")
@@ -69,22 +70,22 @@ class AdminStats(BaseModel):
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(admin_id: str = Depends(require_admin)):
     """Get overall system statistics."""
-    db = get_db()
+    db = await get_db()
 
     # Count users
-    users = db.table('user_profiles').select('id', count='exact').execute()
+    users = await db.table('user_profiles').select('id', count='exact').execute()
     total_users = users.count or 0
 
     # Count cases
-    cases = db.table('cases').select('id', count='exact').execute()
+    cases = await db.table('cases').select('id', count='exact').execute()
     total_cases = cases.count or 0
 
     # Count usage logs
     try:
-        calculations = db.table('usage_logs').select('id', count='exact').eq('action_type', 'calculation').execute()
+        calculations = await db.table('usage_logs').select('id', count='exact').eq('action_type', 'calculation').execute()
         total_calculations = calculations.count or 0
 
-        pdf_views = db.table('usage_logs').select('id', count='exact').eq('action_type', 'pdf_view').execute()
+        pdf_views = await db.table('usage_logs').select('id', count='exact').eq('action_type', 'pdf_view').execute()
         total_pdf_views = pdf_views.count or 0
     except:
         total_calculations = 0
@@ -116,18 +117,18 @@ class UserStats(BaseModel):
 async def list_users(auth_info: tuple = Depends(require_admin_or_org_admin)):
     """List users with their statistics. Admin sees all, org_admin sees own domain."""
     user_id, roles, domain = auth_info
-    db = get_db()
+    db = await get_db()
     is_admin = 'admin' in roles
 
     # Get user profiles (filtered by domain for org_admin)
     query = db.table('user_profiles').select('*')
     if not is_admin:
         query = query.eq('email_domain', domain)
-    profiles = query.order('created_at', desc=True).execute()
+    profiles = await query.order('created_at', desc=True).execute()
 
     # Get all usage counts in bulk
     try:
-        all_usage = db.table('usage_logs').select('user_id, action_type').execute()
+        all_usage = await db.table('usage_logs').select('user_id, action_type').execute()
         usage_by_user: dict[str, dict[str, int]] = {}
         for log in all_usage.data:
             uid = log.get('user_id')
@@ -142,7 +143,7 @@ async def list_users(auth_info: tuple = Depends(require_admin_or_org_admin)):
 
     # Get all roles in bulk
     try:
-        all_roles = db.table('user_roles').select('user_id, role').execute()
+        all_roles = await db.table('user_roles').select('user_id, role').execute()
         roles_by_user: dict[str, list[str]] = {}
         for r in all_roles.data:
             uid = r.get('user_id')
@@ -158,12 +159,12 @@ async def list_users(auth_info: tuple = Depends(require_admin_or_org_admin)):
         uid = profile['id']
 
         # Count cases owned by this user
-        cases = db.table('cases').select('id', count='exact').eq('user_id', uid).execute()
+        cases = await db.table('cases').select('id', count='exact').eq('user_id', uid).execute()
         cases_count = cases.count or 0
 
         # Count cases shared with this user
         try:
-            shares = db.table('case_shares').select('id', count='exact').eq('shared_with_user_id', uid).execute()
+            shares = await db.table('case_shares').select('id', count='exact').eq('shared_with_user_id', uid).execute()
             shared_with_count = shares.count or 0
         except:
             shared_with_count = 0
@@ -173,7 +174,7 @@ async def list_users(auth_info: tuple = Depends(require_admin_or_org_admin)):
 
         # Get last activity from usage_logs
         try:
-            last_log = db.table('usage_logs').select('created_at').eq('user_id', uid).order('created_at', desc=True).limit(1).execute()
+            last_log = await db.table('usage_logs').select('created_at').eq('user_id', uid).order('created_at', desc=True).limit(1).execute()
             last_activity = last_log.data[0]['created_at'] if last_log.data else None
         except:
             last_activity = None
@@ -198,9 +199,9 @@ async def list_users(auth_info: tuple = Depends(require_admin_or_org_admin)):
 @router.get("/check")
 async def check_admin(user_id: str = Depends(get_current_user)):
     """Check user's admin/org_admin status and roles."""
-    db = get_db()
-    roles = get_user_roles(db, user_id)
-    domain = get_user_domain(db, user_id)
+    db = await get_db()
+    roles = await get_user_roles(db, user_id)
+    domain = await get_user_domain(db, user_id)
 
     return {
         "is_admin": 'admin' in roles,
@@ -224,15 +225,15 @@ class AdminCase(BaseModel):
 @router.get("/cases", response_model=List[AdminCase])
 async def list_all_cases(admin_id: str = Depends(require_admin)):
     """List all cases with owner info."""
-    db = get_db()
+    db = await get_db()
 
-    cases = db.table('cases').select(
+    cases = await db.table('cases').select(
         '*, vorderingen(count), deelbetalingen(count)'
     ).order('created_at', desc=True).execute()
 
     # Get owner emails
     user_ids = list(set(c['user_id'] for c in cases.data))
-    users = db.table('user_profiles').select('id, email').in_('id', user_ids).execute()
+    users = await db.table('user_profiles').select('id, email').in_('id', user_ids).execute()
     users_map = {u['id']: u['email'] for u in users.data}
 
     result = []
@@ -267,13 +268,13 @@ class AdminUsageLog(BaseModel):
 @router.get("/usage-logs", response_model=List[AdminUsageLog])
 async def list_usage_logs(admin_id: str = Depends(require_admin)):
     """List all usage logs with user info."""
-    db = get_db()
+    db = await get_db()
 
-    logs = db.table('usage_logs').select('*').order('created_at', desc=True).limit(500).execute()
+    logs = await db.table('usage_logs').select('*').order('created_at', desc=True).limit(500).execute()
 
     # Get user emails and domains
     user_ids = list(set(l['user_id'] for l in logs.data if l.get('user_id')))
-    users = db.table('user_profiles').select('id, email, email_domain').in_('id', user_ids).execute() if user_ids else type('obj', (object,), {'data': []})()
+    users = await db.table('user_profiles').select('id, email, email_domain').in_('id', user_ids).execute() if user_ids else type('obj', (object,), {'data': []})()
     users_map = {u['id']: {'email': u['email'], 'domain': u.get('email_domain')} for u in users.data}
 
     result = []
@@ -295,10 +296,10 @@ async def list_usage_logs(admin_id: str = Depends(require_admin)):
 @router.post("/sync-profiles")
 async def sync_user_profiles(admin_id: str = Depends(require_admin)):
     """Sync user_profiles with auth.users - create missing profiles."""
-    db = get_db()
+    db = await get_db()
 
     # Get all existing profile IDs
-    profiles = db.table('user_profiles').select('id').execute()
+    profiles = await db.table('user_profiles').select('id').execute()
     profile_ids = {p['id'] for p in profiles.data}
 
     # We can't directly query auth.users from the API, but we can use the
@@ -332,16 +333,16 @@ class UserRole(BaseModel):
 async def get_user_roles_endpoint(user_id: str, auth_info: tuple = Depends(require_admin_or_org_admin)):
     """Get roles for a specific user."""
     current_user_id, roles, domain = auth_info
-    db = get_db()
+    db = await get_db()
     is_admin = 'admin' in roles
 
     # Check if org_admin has access to this user
     if not is_admin:
-        target_domain = get_user_domain(db, user_id)
+        target_domain = await get_user_domain(db, user_id)
         if target_domain != domain:
             raise HTTPException(status_code=403, detail="Geen toegang tot deze gebruiker")
 
-    user_roles = get_user_roles(db, user_id)
+    user_roles = await get_user_roles(db, user_id)
     return user_roles
 
 
@@ -349,11 +350,11 @@ async def get_user_roles_endpoint(user_id: str, auth_info: tuple = Depends(requi
 async def assign_role(user_id: str, assignment: RoleAssignment, auth_info: tuple = Depends(require_admin_or_org_admin)):
     """Assign a role to a user."""
     current_user_id, roles, domain = auth_info
-    db = get_db()
+    db = await get_db()
     is_admin = 'admin' in roles
 
     # Validate role assignment permissions
-    target_domain = get_user_domain(db, user_id)
+    target_domain = await get_user_domain(db, user_id)
 
     # Only admin can assign admin role
     if assignment.role == 'admin' and not is_admin:
@@ -365,12 +366,12 @@ async def assign_role(user_id: str, assignment: RoleAssignment, auth_info: tuple
             raise HTTPException(status_code=403, detail="Kan alleen rollen toekennen aan gebruikers in eigen domein")
 
     # Check if role already exists
-    existing = db.table('user_roles').select('id').eq('user_id', user_id).eq('role', assignment.role).execute()
+    existing = await db.table('user_roles').select('id').eq('user_id', user_id).eq('role', assignment.role).execute()
     if existing.data:
         return {"message": f"Gebruiker heeft al de rol '{assignment.role}'", "success": True}
 
     # Assign role
-    result = db.table('user_roles').insert({
+    result = await db.table('user_roles').insert({
         'user_id': user_id,
         'role': assignment.role,
         'granted_by': current_user_id
@@ -386,11 +387,11 @@ async def assign_role(user_id: str, assignment: RoleAssignment, auth_info: tuple
 async def remove_role(user_id: str, role: str, auth_info: tuple = Depends(require_admin_or_org_admin)):
     """Remove a role from a user."""
     current_user_id, roles, domain = auth_info
-    db = get_db()
+    db = await get_db()
     is_admin = 'admin' in roles
 
     # Validate role removal permissions
-    target_domain = get_user_domain(db, user_id)
+    target_domain = await get_user_domain(db, user_id)
 
     # Only admin can remove admin role
     if role == 'admin' and not is_admin:
@@ -402,12 +403,12 @@ async def remove_role(user_id: str, role: str, auth_info: tuple = Depends(requir
             raise HTTPException(status_code=403, detail="Kan alleen rollen verwijderen van gebruikers in eigen domein")
 
     # Prevent removing last role
-    current_roles = get_user_roles(db, user_id)
+    current_roles = await get_user_roles(db, user_id)
     if len(current_roles) <= 1 and role in current_roles:
         raise HTTPException(status_code=400, detail="Kan laatste rol niet verwijderen")
 
     # Remove role
-    result = db.table('user_roles').delete().eq('user_id', user_id).eq('role', role).execute()
+    result = await db.table('user_roles').delete().eq('user_id', user_id).eq('role', role).execute()
 
     return {"message": f"Rol '{role}' verwijderd", "success": True}
 
@@ -468,10 +469,10 @@ class DomainOverview(BaseModel):
 @router.get("/domains", response_model=DomainOverview)
 async def get_domain_stats(admin_id: str = Depends(require_admin)):
     """Get domain statistics overview (admin only)."""
-    db = get_db()
+    db = await get_db()
 
     # Get all user profiles with their domains
-    profiles = db.table('user_profiles').select('id, email_domain').execute()
+    profiles = await db.table('user_profiles').select('id, email_domain').execute()
 
     # Count users per domain
     domain_users: dict[str, list[str]] = {}
@@ -482,7 +483,7 @@ async def get_domain_stats(admin_id: str = Depends(require_admin)):
         domain_users[domain].append(p['id'])
 
     # Get all roles to check for org_admins
-    all_roles = db.table('user_roles').select('user_id, role').execute()
+    all_roles = await db.table('user_roles').select('user_id, role').execute()
     org_admins_by_domain: dict[str, bool] = {}
     for r in all_roles.data:
         if r['role'] == 'org_admin':
@@ -493,7 +494,7 @@ async def get_domain_stats(admin_id: str = Depends(require_admin)):
                     break
 
     # Get cases count per user
-    cases = db.table('cases').select('user_id').execute()
+    cases = await db.table('cases').select('user_id').execute()
     cases_by_user: dict[str, int] = {}
     for c in cases.data:
         uid = c['user_id']
@@ -501,7 +502,7 @@ async def get_domain_stats(admin_id: str = Depends(require_admin)):
 
     # Get usage logs
     try:
-        usage = db.table('usage_logs').select('user_id, action_type').execute()
+        usage = await db.table('usage_logs').select('user_id, action_type').execute()
         calcs_by_user: dict[str, int] = {}
         pdfs_by_user: dict[str, int] = {}
         for u in usage.data:
@@ -587,20 +588,20 @@ class ViewAsUserResponse(BaseModel):
 @router.get("/view-as-user/{user_id}", response_model=ViewAsUserResponse)
 async def view_as_user(user_id: str, admin_id: str = Depends(require_admin)):
     """Get full view of a user's data (admin only). Used to see what a user sees."""
-    db = get_db()
+    db = await get_db()
 
     # Get user profile
-    profile = db.table('user_profiles').select('*').eq('id', user_id).execute()
+    profile = await db.table('user_profiles').select('*').eq('id', user_id).execute()
     if not profile.data:
         raise HTTPException(status_code=404, detail="Gebruiker niet gevonden")
 
     user_data = profile.data[0]
 
     # Get user roles
-    roles = get_user_roles(db, user_id)
+    roles = await get_user_roles(db, user_id)
 
     # Get user's cases with counts
-    cases = db.table('cases').select(
+    cases = await db.table('cases').select(
         '*, vorderingen(count), deelbetalingen(count)'
     ).eq('user_id', user_id).order('updated_at', desc=True).execute()
 
@@ -623,8 +624,8 @@ async def view_as_user(user_id: str, admin_id: str = Depends(require_admin)):
 
     # Get user stats
     try:
-        calcs = db.table('usage_logs').select('id', count='exact').eq('user_id', user_id).eq('action_type', 'calculation').execute()
-        pdfs = db.table('usage_logs').select('id', count='exact').eq('user_id', user_id).eq('action_type', 'pdf_view').execute()
+        calcs = await db.table('usage_logs').select('id', count='exact').eq('user_id', user_id).eq('action_type', 'calculation').execute()
+        pdfs = await db.table('usage_logs').select('id', count='exact').eq('user_id', user_id).eq('action_type', 'pdf_view').execute()
         stats = {
             'calculations_count': calcs.count or 0,
             'pdf_views_count': pdfs.count or 0,
@@ -655,11 +656,11 @@ async def view_as_user(user_id: str, admin_id: str = Depends(require_admin)):
 async def transfer_case(case_id: str, auth_info: tuple = Depends(require_admin_or_org_admin)):
     """Transfer a case to the current user (org_admin takes over)."""
     current_user_id, roles, domain = auth_info
-    db = get_db()
+    db = await get_db()
     is_admin = 'admin' in roles
 
     # Get case info
-    case = db.table('cases').select('user_id').eq('id', case_id).execute()
+    case = await db.table('cases').select('user_id').eq('id', case_id).execute()
     if not case.data:
         raise HTTPException(status_code=404, detail="Zaak niet gevonden")
 
@@ -667,7 +668,7 @@ async def transfer_case(case_id: str, auth_info: tuple = Depends(require_admin_o
 
     # Check if org_admin has access to this case
     if not is_admin:
-        owner_domain = get_user_domain(db, original_owner_id)
+        owner_domain = await get_user_domain(db, original_owner_id)
         if owner_domain != domain:
             raise HTTPException(status_code=403, detail="Geen toegang tot deze zaak")
 
@@ -676,7 +677,7 @@ async def transfer_case(case_id: str, auth_info: tuple = Depends(require_admin_o
         return {"message": "U bent al eigenaar van deze zaak", "success": True}
 
     # Transfer case
-    result = db.table('cases').update({
+    result = await db.table('cases').update({
         'user_id': current_user_id
     }).eq('id', case_id).execute()
 
@@ -739,10 +740,10 @@ class SubscriptionStatsResponse(BaseModel):
 @router.get("/subscriptions/tiers", response_model=List[SubscriptionTierResponse])
 async def list_subscription_tiers(admin_id: str = Depends(require_admin)):
     """List all subscription tiers with their settings."""
-    db = get_db()
+    db = await get_db()
 
     try:
-        tiers = db.table('subscription_tiers').select('*').order('prijs_per_maand').execute()
+        tiers = await db.table('subscription_tiers').select('*').order('prijs_per_maand').execute()
         return [SubscriptionTierResponse(
             id=t['id'],
             naam=t['naam'],
@@ -766,7 +767,7 @@ async def update_subscription_tier(
     admin_id: str = Depends(require_admin),
 ):
     """Update a subscription tier's limits (admin only)."""
-    db = get_db()
+    db = await get_db()
 
     update_data = {}
     for field, value in update.model_dump(exclude_none=True).items():
@@ -778,9 +779,10 @@ async def update_subscription_tier(
     update_data['updated_at'] = 'now()'
 
     try:
-        result = db.table('subscription_tiers').update(update_data).eq('id', tier_id).execute()
+        result = await db.table('subscription_tiers').update(update_data).eq('id', tier_id).execute()
         if not result.data:
             raise HTTPException(status_code=404, detail="Tier niet gevonden")
+        invalideer_tier_cache()
         return {"message": f"Tier '{tier_id}' bijgewerkt", "success": True}
     except HTTPException:
         raise
@@ -791,27 +793,27 @@ async def update_subscription_tier(
 @router.get("/subscriptions/users", response_model=List[UserSubscriptionInfo])
 async def list_user_subscriptions(admin_id: str = Depends(require_admin)):
     """List all users with their subscription tier."""
-    db = get_db()
+    db = await get_db()
 
     try:
         # Get all user profiles
-        profiles = db.table('user_profiles').select('id, email, display_name').order('created_at', desc=True).execute()
+        profiles = await db.table('user_profiles').select('id, email, display_name').order('created_at', desc=True).execute()
 
         # Get all active subscriptions
-        subs = db.table('user_subscriptions').select('*').eq('status', 'active').execute()
+        subs = await db.table('user_subscriptions').select('*').eq('status', 'active').execute()
         subs_by_user = {}
         for s in subs.data:
             subs_by_user[s['user_id']] = s
 
         # Get tier names
-        tiers = db.table('subscription_tiers').select('id, naam').execute()
+        tiers = await db.table('subscription_tiers').select('id, naam').execute()
         tier_names = {t['id']: t['naam'] for t in tiers.data}
 
         # Get admin emails for "toegekend_door"
         admin_ids = list(set(s.get('toegekend_door') for s in subs.data if s.get('toegekend_door')))
         admin_emails = {}
         if admin_ids:
-            admins = db.table('user_profiles').select('id, email').in_('id', admin_ids).execute()
+            admins = await db.table('user_profiles').select('id, email').in_('id', admin_ids).execute()
             admin_emails = {a['id']: a['email'] for a in admins.data}
 
         result = []
@@ -840,28 +842,29 @@ async def assign_subscription(
     admin_id: str = Depends(require_admin),
 ):
     """Assign a subscription tier to a user (admin only)."""
-    db = get_db()
+    db = await get_db()
 
     try:
         # Verify tier exists
-        tier = db.table('subscription_tiers').select('id, naam').eq('id', assignment.tier_id).execute()
+        tier = await db.table('subscription_tiers').select('id, naam').eq('id', assignment.tier_id).execute()
         if not tier.data:
             raise HTTPException(status_code=404, detail="Tier niet gevonden")
 
         # Deactivate existing active subscriptions
-        db.table('user_subscriptions').update({
+        await db.table('user_subscriptions').update({
             'status': 'cancelled',
             'updated_at': 'now()'
         }).eq('user_id', assignment.user_id).eq('status', 'active').execute()
 
         # Create new subscription
-        db.table('user_subscriptions').insert({
+        await db.table('user_subscriptions').insert({
             'user_id': assignment.user_id,
             'tier_id': assignment.tier_id,
             'status': 'active',
             'toegekend_door': admin_id,
             'notitie': assignment.notitie,
         }).execute()
+        invalideer_tier_cache(assignment.user_id)
 
         tier_naam = tier.data[0]['naam']
         return {"message": f"Gebruiker is nu {tier_naam}", "success": True}
@@ -874,10 +877,10 @@ async def assign_subscription(
 @router.get("/subscriptions/stats", response_model=SubscriptionStatsResponse)
 async def get_subscription_stats(admin_id: str = Depends(require_admin)):
     """Get subscription statistics."""
-    db = get_db()
+    db = await get_db()
 
     try:
-        subs = db.table('user_subscriptions').select('tier_id').eq('status', 'active').execute()
+        subs = await db.table('user_subscriptions').select('tier_id').eq('status', 'active').execute()
 
         counts = {'free': 0, 'pro': 0, 'enterprise': 0}
         for s in subs.data:
@@ -886,7 +889,7 @@ async def get_subscription_stats(admin_id: str = Depends(require_admin)):
                 counts[tier] += 1
 
         # Count users without any subscription (they're free)
-        profiles = db.table('user_profiles').select('id', count='exact').execute()
+        profiles = await db.table('user_profiles').select('id', count='exact').execute()
         total_users = profiles.count or 0
         total_with_sub = len(subs.data)
         counts['free'] += max(0, total_users - total_with_sub)
@@ -921,13 +924,27 @@ class RenteTabelUpdate(BaseModel):
     percentage: float
 
 
-def _invalidate_rentetabel_cache():
-    """Invalideer de in-memory rentetabel cache na wijzigingen."""
+async def _invalidate_rentetabel_cache():
+    """Invalideer de in-memory rentetabel cache (en de berekeningen die erop steunen) na wijzigingen."""
     try:
         from app.services.rente_calculator import get_rentetabel_cache
+        from app.services.berekening_cache import get_berekening_cache, get_checkpoint_cache
+        from app.services.worker_pool import vernieuw_worker_pools
         get_rentetabel_cache().invalidate()
+        get_berekening_cache().clear()
+        get_checkpoint_cache().clear()
+        # Process workers (interactief en batch) hebben de oude tabel in hun
+        # eigen geheugen; zonder verse workers komt een oud resultaat onder de
+        # nieuwe versie in de cache
+        vernieuw_worker_pools()
     except Exception as e:
         logger.warning(f"Kon rentetabel cache niet invalideren: {e}")
+        return
+    # Direct opnieuw laden (buiten de event loop), zodat de volgende berekening niet op een koude cache wacht
+    try:
+        await get_rentetabel_cache().laad_async()
+    except Exception as e:
+        logger.warning(f"Rentetabel niet opnieuw geladen: {e}")
 
 
 import logging
@@ -939,9 +956,9 @@ logger = logging.getLogger(__name__)
 @router.get("/rentetabel/wettelijk", response_model=List[RenteTabelEntry])
 async def list_rentetabel_wettelijk(admin_id: str = Depends(require_admin)):
     """Lijst alle wettelijke rente tarieven."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_wettelijk').select('*').order('ingangsdatum', desc=True).execute()
+        result = await db.table('rentetabel_wettelijk').select('*').order('ingangsdatum', desc=True).execute()
         return [RenteTabelEntry(
             id=r['id'],
             ingangsdatum=r['ingangsdatum'],
@@ -956,15 +973,15 @@ async def list_rentetabel_wettelijk(admin_id: str = Depends(require_admin)):
 @router.post("/rentetabel/wettelijk", response_model=RenteTabelEntry)
 async def create_rentetabel_wettelijk(entry: RenteTabelCreate, admin_id: str = Depends(require_admin)):
     """Nieuw wettelijk rente tarief toevoegen."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_wettelijk').insert({
+        result = await db.table('rentetabel_wettelijk').insert({
             'ingangsdatum': entry.ingangsdatum,
             'percentage': entry.percentage,
         }).execute()
         if not result.data:
             raise HTTPException(status_code=500, detail="Kon tarief niet toevoegen")
-        _invalidate_rentetabel_cache()
+        await _invalidate_rentetabel_cache()
         r = result.data[0]
         return RenteTabelEntry(
             id=r['id'],
@@ -984,15 +1001,15 @@ async def create_rentetabel_wettelijk(entry: RenteTabelCreate, admin_id: str = D
 @router.put("/rentetabel/wettelijk/{entry_id}", response_model=RenteTabelEntry)
 async def update_rentetabel_wettelijk(entry_id: str, update: RenteTabelUpdate, admin_id: str = Depends(require_admin)):
     """Wettelijk rente tarief wijzigen."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_wettelijk').update({
+        result = await db.table('rentetabel_wettelijk').update({
             'percentage': update.percentage,
             'updated_at': 'now()',
         }).eq('id', entry_id).execute()
         if not result.data:
             raise HTTPException(status_code=404, detail="Tarief niet gevonden")
-        _invalidate_rentetabel_cache()
+        await _invalidate_rentetabel_cache()
         r = result.data[0]
         return RenteTabelEntry(
             id=r['id'],
@@ -1010,10 +1027,10 @@ async def update_rentetabel_wettelijk(entry_id: str, update: RenteTabelUpdate, a
 @router.delete("/rentetabel/wettelijk/{entry_id}")
 async def delete_rentetabel_wettelijk(entry_id: str, admin_id: str = Depends(require_admin)):
     """Wettelijk rente tarief verwijderen."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_wettelijk').delete().eq('id', entry_id).execute()
-        _invalidate_rentetabel_cache()
+        result = await db.table('rentetabel_wettelijk').delete().eq('id', entry_id).execute()
+        await _invalidate_rentetabel_cache()
         return {"message": "Tarief verwijderd", "success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Kon tarief niet verwijderen: {e}")
@@ -1024,9 +1041,9 @@ async def delete_rentetabel_wettelijk(entry_id: str, admin_id: str = Depends(req
 @router.get("/rentetabel/handels", response_model=List[RenteTabelEntry])
 async def list_rentetabel_handels(admin_id: str = Depends(require_admin)):
     """Lijst alle handelsrente tarieven."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_handels').select('*').order('ingangsdatum', desc=True).execute()
+        result = await db.table('rentetabel_handels').select('*').order('ingangsdatum', desc=True).execute()
         return [RenteTabelEntry(
             id=r['id'],
             ingangsdatum=r['ingangsdatum'],
@@ -1041,15 +1058,15 @@ async def list_rentetabel_handels(admin_id: str = Depends(require_admin)):
 @router.post("/rentetabel/handels", response_model=RenteTabelEntry)
 async def create_rentetabel_handels(entry: RenteTabelCreate, admin_id: str = Depends(require_admin)):
     """Nieuw handelsrente tarief toevoegen."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_handels').insert({
+        result = await db.table('rentetabel_handels').insert({
             'ingangsdatum': entry.ingangsdatum,
             'percentage': entry.percentage,
         }).execute()
         if not result.data:
             raise HTTPException(status_code=500, detail="Kon tarief niet toevoegen")
-        _invalidate_rentetabel_cache()
+        await _invalidate_rentetabel_cache()
         r = result.data[0]
         return RenteTabelEntry(
             id=r['id'],
@@ -1069,15 +1086,15 @@ async def create_rentetabel_handels(entry: RenteTabelCreate, admin_id: str = Dep
 @router.put("/rentetabel/handels/{entry_id}", response_model=RenteTabelEntry)
 async def update_rentetabel_handels(entry_id: str, update: RenteTabelUpdate, admin_id: str = Depends(require_admin)):
     """Handelsrente tarief wijzigen."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_handels').update({
+        result = await db.table('rentetabel_handels').update({
             'percentage': update.percentage,
             'updated_at': 'now()',
         }).eq('id', entry_id).execute()
         if not result.data:
             raise HTTPException(status_code=404, detail="Tarief niet gevonden")
-        _invalidate_rentetabel_cache()
+        await _invalidate_rentetabel_cache()
         r = result.data[0]
         return RenteTabelEntry(
             id=r['id'],
@@ -1095,10 +1112,39 @@ async def update_rentetabel_handels(entry_id: str, update: RenteTabelUpdate, adm
 @router.delete("/rentetabel/handels/{entry_id}")
 async def delete_rentetabel_handels(entry_id: str, admin_id: str = Depends(require_admin)):
     """Handelsrente tarief verwijderen."""
-    db = get_db()
+    db = await get_db()
     try:
-        result = db.table('rentetabel_handels').delete().eq('id', entry_id).execute()
-        _invalidate_rentetabel_cache()
+        result = await db.table('rentetabel_handels').delete().eq('id', entry_id).execute()
+        await _invalidate_rentetabel_cache()
         return {"message": "Tarief verwijderd", "success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Kon tarief niet verwijderen: {e}")
+
+
+# =============================================================================
+# Berekening cache (Admin only)
+# =============================================================================
+
+class BerekeningCacheStats(BaseModel):
+    hits: int
+    misses: int
+    items: int
+    max_items: int
+    periodes: int
+    max_periodes: int
+
+
+@router.get("/berekening-cache", response_model=BerekeningCacheStats)
+async def get_berekening_cache_stats(admin_id: str = Depends(require_admin)):
+    """Hit/miss tellers en vulling van de result cache voor berekeningen."""
+    from app.services.berekening_cache import get_berekening_cache
+    return BerekeningCacheStats(**get_berekening_cache().stats())
+
+
+@router.delete("/berekening-cache")
+async def clear_berekening_cache(admin_id: str = Depends(require_admin)):
+    """Leeg de result cache (en de checkpoints) voor berekeningen."""
+    from app.services.berekening_cache import get_berekening_cache, get_checkpoint_cache
+    get_berekening_cache().clear()
+    get_checkpoint_cache().clear()
+    return {"message": "Berekening cache geleegd", "success": True}
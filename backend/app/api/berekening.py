@@ -1,14 +1,22 @@
 """
 Berekening API routes
 """
+import asyncio
+import json
+import logging
+import time
 from decimal import Decimal
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
 from app.models.berekening import (
+    BatchBerekeningRequest,
     BerekeningRequest,
+    VorderingInput,
+    DeelbetalingInput,
     BerekeningResponse,
     VorderingResultaat,
     DeelbetalingResultaat,
@@ -18,13 +26,39 @@ from app.models.berekening import (
     Totalen,
 )
 from app.auth import get_current_user
+from app.models import JobAccepted
+from app.services.job_queue import bewaar_job_bestand, dien_job_in, registreer_job_soort, wil_async
 from app.services.rente_calculator import (
     RenteCalculator,
     Vordering as CalcVordering,
     Deelbetaling as CalcDeelbetaling,
+    get_rentetabel_cache,
 )
+from app.services.sweep_calculator import SweepRenteCalculator
+from app.services.worker_pool import run_in_worker, get_batch_pool, WorkerPoolVol, WorkerPoolTimeout
+from app.services.berekening_cache import get_berekening_cache, get_checkpoint_cache
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# engine → calculator class
+CALCULATORS = {
+    'standaard': RenteCalculator,
+    'sweep': SweepRenteCalculator,
+}
+
+
+async def draai_in_worker(func, *args, **kwargs):
+    """
+    Voer een CPU-zware functie uit in de worker pool (buiten de event loop).
+    Een volle pool geeft 503, een timeout 504; overige fouten gaan ongewijzigd door.
+    """
+    try:
+        return await run_in_worker(func, *args, **kwargs)
+    except WorkerPoolVol as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except WorkerPoolTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
 
 
 @router.post("/bereken", response_model=BerekeningResponse)
@@ -37,194 +71,422 @@ async def bereken_rente(request: BerekeningRequest):
     - Deelbetalingen met toerekening
     - Einddatum voor de berekening
     - Strategie (A = meest bezwarend, B = oudste eerst)
+    - Detail ('full' = inclusief renteperiodes, 'summary' = alleen bedragen)
 
     Returns een gedetailleerd resultaat met:
     - Resultaat per vordering (inclusief alle renteperiodes)
     - Verwerking van deelbetalingen
     - Totalen
     - Controleberekening
+
+    De berekening zelf draait in de worker pool; identieke requests (bij
+    dezelfde rentetabel) worden uit de result cache geserveerd.
+    """
+    return await bereken(request)
+
+
+async def bereken(request: BerekeningRequest, zaak: Optional[str] = None) -> BerekeningResponse:
+    """
+    Berekening via de result cache en de worker pool (ook voor opgeslagen zaken).
+
+    zaak: het id van de zaak, als sleutel voor de checkpoints (anders de kenmerken).
     """
     try:
-        # Convert input models to calculator objects
-        vorderingen = [
-            CalcVordering(
-                kenmerk=v.kenmerk,
-                oorspronkelijk_bedrag=v.bedrag,
-                startdatum=v.datum,
-                rentetype=v.rentetype,
-                item_type=v.item_type,
-                kosten=v.kosten,
-                kosten_rentedatum=v.kosten_rentedatum,
-                opslag=v.opslag or Decimal("0"),
-                opslag_ingangsdatum=v.opslag_ingangsdatum,
-                pauze_start=v.pauze_start,
-                pauze_eind=v.pauze_eind,
-                betaaltermijn_dagen=v.betaaltermijn_dagen,
-                bodemrente=v.bodemrente,
+        cache = get_berekening_cache()
+        sleutel = cache.sleutel(request, await get_rentetabel_cache().versie_async())
+        resultaat = cache.get(sleutel)
+        if resultaat is None:
+            resultaat = await draai_in_worker(voer_berekening_uit, request, zaak)
+            cache.put(sleutel, resultaat)
+        return resultaat
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def voer_berekening_uit(request: BerekeningRequest, zaak: Optional[str] = None) -> BerekeningResponse:
+    """
+    Synchrone renteberekening: request → calculator → response model.
+
+    Module-level zodat hij ook in een process pool kan draaien.
+    """
+    # Convert input models to calculator objects
+    vorderingen = [
+        CalcVordering(
+            kenmerk=v.kenmerk,
+            oorspronkelijk_bedrag=v.bedrag,
+            startdatum=v.datum,
+            rentetype=v.rentetype,
+            item_type=v.item_type,
+            kosten=v.kosten,
+            kosten_rentedatum=v.kosten_rentedatum,
+            opslag=v.opslag or Decimal("0"),
+            opslag_ingangsdatum=v.opslag_ingangsdatum,
+            pauze_start=v.pauze_start,
+            pauze_eind=v.pauze_eind,
+            betaaltermijn_dagen=v.betaaltermijn_dagen,
+            bodemrente=v.bodemrente,
+        )
+        for v in request.vorderingen
+    ]
+
+    deelbetalingen = [
+        CalcDeelbetaling(
+            kenmerk=d.kenmerk or f"BET-{i+1}",
+            bedrag=d.bedrag,
+            datum=d.datum,
+            aangewezen_vorderingen=d.aangewezen,
+        )
+        for i, d in enumerate(request.deelbetalingen)
+    ]
+
+    # Run calculation; hervat vanaf de vorige berekening van deze zaak indien mogelijk
+    checkpoints = get_checkpoint_cache()
+    checkpoint_key = checkpoints.sleutel(request, zaak)
+    calculator_cls = CALCULATORS[request.engine]
+    calculator = calculator_cls(vorderingen, deelbetalingen, request.einddatum,
+                                detail=request.detail, checkpoints=checkpoints.max_items > 0)
+    result = calculator.bereken(vorige=checkpoints.get(checkpoint_key))
+    checkpoints.put(checkpoint_key, calculator)
+
+    # Convert results to response model
+    vordering_resultaten = []
+    totaal_oorspronkelijk = Decimal("0")
+    totaal_kosten = Decimal("0")
+    totaal_rente = Decimal("0")
+    totaal_rente_kosten = Decimal("0")
+    totaal_afl_hs = Decimal("0")
+    totaal_afl_kst = Decimal("0")
+    totaal_afl_rnt = Decimal("0")
+    totaal_afl_rnt_kosten = Decimal("0")
+    totaal_openstaand = Decimal("0")
+
+    for v in result['vorderingen'].values():
+        periodes = [
+            Periode(
+                start=p['start'],
+                eind=p['eind'],
+                dagen=p['dagen'],
+                dagen_jaar=p.get('dagen_jaar', 365),
+                hoofdsom=p['hoofdsom'],
+                rente_pct=p['rente_pct'],
+                rente=p['rente'],
+                is_kapitalisatie=p.get('is_kapitalisatie', False),
+                is_pauze=p.get('is_pauze', False),
+                is_betaaltermijn=p.get('is_betaaltermijn', False),
             )
-            for v in request.vorderingen
+            for p in v.periodes
         ]
 
-        deelbetalingen = [
-            CalcDeelbetaling(
-                kenmerk=d.kenmerk or f"BET-{i+1}",
-                bedrag=d.bedrag,
-                datum=d.datum,
-                aangewezen_vorderingen=d.aangewezen,
+        # Periodes voor kosten
+        periodes_kosten = [
+            PeriodeKosten(
+                start=p['start'],
+                eind=p['eind'],
+                dagen=p['dagen'],
+                dagen_jaar=p.get('dagen_jaar', 365),
+                kosten=p['kosten'],
+                rente_pct=p['rente_pct'],
+                rente=p['rente'],
+                is_pauze=p.get('is_pauze', False),
             )
-            for i, d in enumerate(request.deelbetalingen)
+            for p in v.periodes_kosten
         ]
 
-        # Run calculation
-        calculator = RenteCalculator(vorderingen, deelbetalingen, request.einddatum)
-        result = calculator.bereken()
-
-        # Convert results to response model
-        vordering_resultaten = []
-        totaal_oorspronkelijk = Decimal("0")
-        totaal_kosten = Decimal("0")
-        totaal_rente = Decimal("0")
-        totaal_rente_kosten = Decimal("0")
-        totaal_afl_hs = Decimal("0")
-        totaal_afl_kst = Decimal("0")
-        totaal_afl_rnt = Decimal("0")
-        totaal_afl_rnt_kosten = Decimal("0")
-        totaal_openstaand = Decimal("0")
-
-        for v in result['vorderingen'].values():
-            periodes = [
-                Periode(
-                    start=p['start'],
-                    eind=p['eind'],
-                    dagen=p['dagen'],
-                    dagen_jaar=p.get('dagen_jaar', 365),
-                    hoofdsom=p['hoofdsom'],
-                    rente_pct=p['rente_pct'],
-                    rente=p['rente'],
-                    is_kapitalisatie=p.get('is_kapitalisatie', False),
-                    is_pauze=p.get('is_pauze', False),
-                    is_betaaltermijn=p.get('is_betaaltermijn', False),
+        # Bepaal of kosten een afwijkende rentedatum hebben
+        kosten_rentedatum = v.kosten_rentedatum if v.kosten > 0 and v.kosten_rentedatum != v.startdatum else None
+
+        vordering_resultaten.append(VorderingResultaat(
+            item_type=v.item_type,
+            kenmerk=v.kenmerk,
+            oorspronkelijk_bedrag=v.oorspronkelijk_bedrag,
+            kosten=v.kosten,
+            kosten_rentedatum=kosten_rentedatum,
+            totale_rente=v.totale_rente,
+            totale_rente_kosten=v.totale_rente_kosten,
+            afgelost_hoofdsom=v.afgelost_hoofdsom,
+            afgelost_kosten=v.afgelost_kosten,
+            afgelost_rente=v.afgelost_rente,
+            afgelost_rente_kosten=v.afgelost_rente_kosten,
+            openstaand=v.openstaand,
+            status="VOLDAAN" if v.voldaan else "OPEN",
+            voldaan_datum=v.voldaan_datum,
+            pauze_start=v.pauze_start,
+            pauze_eind=v.pauze_eind,
+            periodes=periodes,
+            periodes_kosten=periodes_kosten,
+        ))
+
+        totaal_oorspronkelijk += v.oorspronkelijk_bedrag
+        totaal_kosten += v.kosten
+        totaal_rente += v.totale_rente
+        totaal_rente_kosten += v.totale_rente_kosten
+        totaal_afl_hs += v.afgelost_hoofdsom
+        totaal_afl_kst += v.afgelost_kosten
+        totaal_afl_rnt += v.afgelost_rente
+        totaal_afl_rnt_kosten += v.afgelost_rente_kosten
+        totaal_openstaand += v.openstaand
+
+    # Deelbetaling results
+    deelbetaling_resultaten = [
+        DeelbetalingResultaat(
+            kenmerk=d.kenmerk,
+            bedrag=d.bedrag,
+            datum=d.datum,
+            verwerkt=d.verwerkt,
+            toerekeningen=[
+                Toerekening(
+                    vordering=t['vordering'],
+                    type=t['type'],
+                    bedrag=t['bedrag'],
                 )
-                for p in v.periodes
-            ]
-
-            # Periodes voor kosten
-            periodes_kosten = [
-                PeriodeKosten(
-                    start=p['start'],
-                    eind=p['eind'],
-                    dagen=p['dagen'],
-                    dagen_jaar=p.get('dagen_jaar', 365),
-                    kosten=p['kosten'],
-                    rente_pct=p['rente_pct'],
-                    rente=p['rente'],
-                    is_pauze=p.get('is_pauze', False),
-                )
-                for p in v.periodes_kosten
-            ]
-
-            # Bepaal of kosten een afwijkende rentedatum hebben
-            kosten_rentedatum = v.kosten_rentedatum if v.kosten > 0 and v.kosten_rentedatum != v.startdatum else None
-
-            vordering_resultaten.append(VorderingResultaat(
-                item_type=v.item_type,
-                kenmerk=v.kenmerk,
-                oorspronkelijk_bedrag=v.oorspronkelijk_bedrag,
-                kosten=v.kosten,
-                kosten_rentedatum=kosten_rentedatum,
-                totale_rente=v.totale_rente,
-                totale_rente_kosten=v.totale_rente_kosten,
-                afgelost_hoofdsom=v.afgelost_hoofdsom,
-                afgelost_kosten=v.afgelost_kosten,
-                afgelost_rente=v.afgelost_rente,
-                afgelost_rente_kosten=v.afgelost_rente_kosten,
-                openstaand=v.openstaand,
-                status="VOLDAAN" if v.voldaan else "OPEN",
-                voldaan_datum=v.voldaan_datum,
-                pauze_start=v.pauze_start,
-                pauze_eind=v.pauze_eind,
-                periodes=periodes,
-                periodes_kosten=periodes_kosten,
-            ))
-
-            totaal_oorspronkelijk += v.oorspronkelijk_bedrag
-            totaal_kosten += v.kosten
-            totaal_rente += v.totale_rente
-            totaal_rente_kosten += v.totale_rente_kosten
-            totaal_afl_hs += v.afgelost_hoofdsom
-            totaal_afl_kst += v.afgelost_kosten
-            totaal_afl_rnt += v.afgelost_rente
-            totaal_afl_rnt_kosten += v.afgelost_rente_kosten
-            totaal_openstaand += v.openstaand
-
-        # Deelbetaling results
-        deelbetaling_resultaten = [
-            DeelbetalingResultaat(
-                kenmerk=d.kenmerk,
-                bedrag=d.bedrag,
-                datum=d.datum,
-                verwerkt=d.verwerkt,
-                toerekeningen=[
-                    Toerekening(
-                        vordering=t['vordering'],
-                        type=t['type'],
-                        bedrag=t['bedrag'],
-                    )
-                    for t in d.toerekeningen
-                ],
+                for t in d.toerekeningen
+            ],
+        )
+        for d in result['deelbetalingen']
+    ]
+
+    # Totals
+    totalen = Totalen(
+        oorspronkelijk=totaal_oorspronkelijk,
+        kosten=totaal_kosten,
+        rente=totaal_rente,
+        rente_kosten=totaal_rente_kosten,
+        afgelost_hoofdsom=totaal_afl_hs,
+        afgelost_kosten=totaal_afl_kst,
+        afgelost_rente=totaal_afl_rnt,
+        afgelost_rente_kosten=totaal_afl_rnt_kosten,
+        openstaand=totaal_openstaand,
+    )
+
+    # Control calculation
+    # Use actual amounts applied (not just payment amounts, which may exceed debt)
+    totaal_afgelost = totaal_afl_hs + totaal_afl_kst + totaal_afl_rnt + totaal_afl_rnt_kosten
+    controle = totaal_oorspronkelijk + totaal_kosten + totaal_rente + totaal_rente_kosten - totaal_afgelost
+    controle_ok = abs(controle - totaal_openstaand) < Decimal("0.02")
+
+    return BerekeningResponse(
+        einddatum=request.einddatum,
+        strategie=request.strategie,
+        detail=request.detail,
+        vorderingen=vordering_resultaten,
+        deelbetalingen=deelbetaling_resultaten,
+        totalen=totalen,
+        controle_ok=controle_ok,
+    )
+
+
+def berekening_request_van_case(case: Dict, vorderingen: List[Dict], deelbetalingen: List[Dict],
+                                **opties) -> BerekeningRequest:
+    """
+    Bouw een BerekeningRequest uit de database rijen van een zaak.
+
+    vorderingen op volgorde, deelbetalingen op datum; opties (detail, engine)
+    gaan ongewijzigd naar het request.
+    """
+    return BerekeningRequest(
+        einddatum=case['einddatum'],
+        strategie=case['strategie'],
+        vorderingen=[
+            VorderingInput(
+                item_type=v.get('item_type') or 'vordering',
+                kenmerk=v['kenmerk'],
+                bedrag=v['bedrag'],
+                datum=v['datum'],
+                rentetype=v['rentetype'],
+                kosten=v.get('kosten') or Decimal("0"),
+                kosten_rentedatum=v.get('kosten_rentedatum'),
+                opslag=v.get('opslag'),
+                opslag_ingangsdatum=v.get('opslag_ingangsdatum'),
+                pauze_start=v.get('pauze_start'),
+                pauze_eind=v.get('pauze_eind'),
+                betaaltermijn_dagen=v.get('betaaltermijn_dagen') or 0,
+                bodemrente=v.get('bodemrente'),
+                kosten_categorie=v.get('kosten_categorie'),
             )
-            for d in result['deelbetalingen']
-        ]
+            for v in vorderingen
+        ],
+        deelbetalingen=[
+            DeelbetalingInput(
+                kenmerk=d.get('kenmerk'),
+                bedrag=d['bedrag'],
+                datum=d['datum'],
+                aangewezen=d.get('aangewezen') or [],
+            )
+            for d in deelbetalingen
+        ],
+        **opties,
+    )
 
-        # Totals
-        totalen = Totalen(
-            oorspronkelijk=totaal_oorspronkelijk,
-            kosten=totaal_kosten,
-            rente=totaal_rente,
-            rente_kosten=totaal_rente_kosten,
-            afgelost_hoofdsom=totaal_afl_hs,
-            afgelost_kosten=totaal_afl_kst,
-            afgelost_rente=totaal_afl_rnt,
-            afgelost_rente_kosten=totaal_afl_rnt_kosten,
-            openstaand=totaal_openstaand,
-        )
 
-        # Control calculation
-        # Use actual amounts applied (not just payment amounts, which may exceed debt)
-        totaal_afgelost = totaal_afl_hs + totaal_afl_kst + totaal_afl_rnt + totaal_afl_rnt_kosten
-        controle = totaal_oorspronkelijk + totaal_kosten + totaal_rente + totaal_rente_kosten - totaal_afgelost
-        controle_ok = abs(controle - totaal_openstaand) < Decimal("0.02")
-
-        return BerekeningResponse(
-            einddatum=request.einddatum,
-            strategie=request.strategie,
-            vorderingen=vordering_resultaten,
-            deelbetalingen=deelbetaling_resultaten,
-            totalen=totalen,
-            controle_ok=controle_ok,
-        )
+# Case ids per Supabase query (.in_ filter gaat via de URL)
+_BATCH_QUERY_IDS = 100
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
+async def _laad_batch_cases(db, user_id: str, case_ids: List[str], **opties) -> Dict[str, object]:
+    """
+    Laad zaken voor een batch in enkele bulk queries.
 
-@router.post("/bereken/pdf")
-async def bereken_rente_pdf(request: BerekeningRequest, user_id: str = Depends(get_current_user)):
+    Returns case_id → BerekeningRequest, of een foutmelding (str) als de zaak
+    niet bestaat, niet toegankelijk is of niet te berekenen valt. Toegang:
+    eigenaar, gedeeld met de gebruiker, of admin.
     """
-    Calculate and generate PDF directly (without saving a snapshot).
-    Free users get a watermarked PDF, Pro users get a clean one.
+    from app.services.permissions import is_admin
+    from app.services.schema_capabilities import schema_capabilities
+
+    uniek = list(dict.fromkeys(case_ids))
+    cases, vorderingen, deelbetalingen, gedeeld = {}, {}, {}, set()
+    user_is_admin = await is_admin(db, user_id)
+    sharing = not user_is_admin and schema_capabilities().sharing
+
+    for i in range(0, len(uniek), _BATCH_QUERY_IDS):
+        ids = uniek[i:i + _BATCH_QUERY_IDS]
+        for c in (await db.table('cases').select('*').in_('id', ids).execute()).data:
+            cases[c['id']] = c
+        for v in (await db.table('vorderingen').select('*').in_('case_id', ids).order('volgorde').execute()).data:
+            vorderingen.setdefault(v['case_id'], []).append(v)
+        for d in (await db.table('deelbetalingen').select('*').in_('case_id', ids).order('datum').execute()).data:
+            deelbetalingen.setdefault(d['case_id'], []).append(d)
+        if sharing:
+            try:
+                shares = await db.table('case_shares').select('case_id').in_('case_id', ids).eq(
+                    'shared_with_user_id', user_id
+                ).execute()
+                gedeeld.update(s['case_id'] for s in shares.data)
+            except Exception:
+                pass
+
+    requests: Dict[str, object] = {}
+    for case_id in uniek:
+        case = cases.get(case_id)
+        if case is None or not (user_is_admin or case['user_id'] == user_id or case_id in gedeeld):
+            requests[case_id] = "Case not found"
+        elif not vorderingen.get(case_id):
+            requests[case_id] = "Case has no vorderingen"
+        else:
+            try:
+                requests[case_id] = berekening_request_van_case(
+                    case, vorderingen[case_id], deelbetalingen.get(case_id, []), **opties
+                )
+            except Exception as e:
+                requests[case_id] = f"Ongeldige zaak: {e}"
+    return requests
+
+
+def voer_batch_item_uit(request: BerekeningRequest, zaak: Optional[str] = None) -> Dict:
     """
-    from app.services.pdf_generator import generate_pdf
-    from app.services.subscription import get_user_tier
-    from app.db.supabase import get_supabase_client
+    Eén zaak uit een batch: berekening als JSON-klare dict.
+
+    Draait in de batch pool; het resultaat gaat als dict terug, dat pickelt
+    goedkoper dan het response model en kan direct als NDJSON regel weg.
+    """
+    return voer_berekening_uit(request, zaak).model_dump(mode='json')
 
-    # Run calculation
-    result = await bereken_rente(request)
 
-    # Check tier for watermark
-    db = get_supabase_client()
-    tier = get_user_tier(user_id, db)
-    watermark = not tier.mag_pdf_schoon
+@router.post("/bereken/batch")
+async def bereken_batch(request: BatchBerekeningRequest, user_id: str = Depends(get_current_user)):
+    """
+    Bereken veel onafhankelijke zaken in één request (bijv. een hele debiteurenportefeuille).
+
+    Accepteert losse BerekeningRequests en/of case ids (eigen, gedeelde of,
+    voor admins, alle zaken). De zaken worden over de batch pool verdeeld; de
+    response is NDJSON met één regel per zaak zodra die klaar is:
+
+        {"index": 0, "case_id": null, "status": "ok", "resultaat": {...}}
+        {"index": 3, "case_id": "...", "status": "error", "fout": "Case not found"}
+
+    Een fout in één zaak stopt de batch niet. De laatste regel is een
+    samenvatting met aantallen, duur en doorvoer (zaken per seconde).
+    """
+    from app.config import get_settings
+    from app.db.supabase import get_async_supabase_client
+
+    aantal = len(request.requests) + len(request.case_ids)
+    max_items = get_settings().batch_max_items
+    if aantal == 0:
+        raise HTTPException(status_code=400, detail="Geen requests of case ids opgegeven")
+    if aantal > max_items:
+        raise HTTPException(status_code=400, detail=f"Maximaal {max_items} zaken per batch")
+
+    start = time.perf_counter()
+    # (index, case_id, request of foutmelding)
+    jobs: List[tuple] = [(i, None, r) for i, r in enumerate(request.requests)]
+    if request.case_ids:
+        geladen = await _laad_batch_cases(
+            await get_async_supabase_client(), user_id, request.case_ids,
+            detail=request.detail, engine=request.engine,
+        )
+        basis = len(request.requests)
+        jobs += [(basis + i, case_id, geladen[case_id]) for i, case_id in enumerate(request.case_ids)]
+
+    # Workers (bij fork) erven de rentetabel: één keer laden in plaats van per process
+    try:
+        await get_rentetabel_cache().laad_async()
+    except Exception as e:
+        logger.warning(f"Rentetabel niet vooraf geladen: {e}")
+
+    async def _bereken(index: int, case_id: Optional[str], item: BerekeningRequest, pool) -> Dict:
+        regel = {"index": index, "case_id": case_id}
+        try:
+            regel.update(status="ok", resultaat=await pool.run(voer_batch_item_uit, item, case_id))
+        except Exception as e:
+            regel.update(status="error", fout=str(e) or type(e).__name__)
+        return regel
+
+    async def _stream():
+        pool = get_batch_pool()
+        wachtend = iter(jobs)
+        lopend = set()
+        ok = fouten = 0
+        try:
+            while True:
+                # Pool bijvullen tot de wachtrij vol is; laadfouten gaan direct door
+                while len(lopend) < pool.max_wachtrij:
+                    job = next(wachtend, None)
+                    if job is None:
+                        break
+                    index, case_id, item = job
+                    if isinstance(item, str):
+                        fouten += 1
+                        yield json.dumps({"index": index, "case_id": case_id, "status": "error", "fout": item}) + "\n"
+                    else:
+                        lopend.add(asyncio.ensure_future(_bereken(index, case_id, item, pool)))
+                if not lopend:
+                    break
+                klaar, lopend = await asyncio.wait(lopend, return_when=asyncio.FIRST_COMPLETED)
+                for taak in klaar:
+                    regel = taak.result()
+                    if regel["status"] == "ok":
+                        ok += 1
+                    else:
+                        fouten += 1
+                    yield json.dumps(regel) + "\n"
+        finally:
+            # Client weg: nog lopende zaken niet afwachten
+            for taak in lopend:
+                taak.cancel()
+
+        duur = time.perf_counter() - start
+        samenvatting = {
+            "aantal": aantal,
+            "ok": ok,
+            "fouten": fouten,
+            "duur_s": round(duur, 3),
+            "per_seconde": round(aantal / duur, 1) if duur > 0 else None,
+        }
+        logger.info(f"Batch berekening: {aantal} zaken, {fouten} fouten, {duur:.1f}s")
+        yield json.dumps({"samenvatting": samenvatting}) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+async def _maak_pdf(request: BerekeningRequest, watermark: bool):
+    """Bereken en genereer de PDF; geeft (pdf_bytes, filename)."""
+    from app.services.pdf_generator import generate_pdf
+
+    # Run calculation (PDF heeft altijd de renteperiodes nodig)
+    result = await bereken_rente(request.model_copy(update={'detail': 'full'}))
 
     # Build invoer structure for PDF
     invoer = {
@@ -265,18 +527,45 @@ async def bereken_rente_pdf(request: BerekeningRequest, user_id: str = Depends(g
     now = datetime.now()
 
     try:
-        pdf_bytes = generate_pdf(
+        pdf_bytes = await draai_in_worker(
+            generate_pdf,
             invoer=invoer,
             resultaat=resultaat,
             snapshot_created=now,
             watermark=watermark,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"PDF generatie mislukt: {str(e)}")
 
-    filename = f"renteberekening_{now.strftime('%Y%m%d_%H%M')}.pdf"
+    return pdf_bytes, f"renteberekening_{now.strftime('%Y%m%d_%H%M')}.pdf"
+
+
+@router.post("/bereken/pdf", responses={202: {"model": JobAccepted}})
+async def bereken_rente_pdf(request: BerekeningRequest, http_request: Request,
+                            user_id: str = Depends(get_current_user)):
+    """
+    Calculate and generate PDF directly (without saving a snapshot).
+    Free users get a watermarked PDF, Pro users get a clean one.
+
+    Met 'Prefer: respond-async' als job: 202 met een job id, de PDF komt
+    via GET /api/jobs/{id}/bestand.
+    """
+    from app.services.subscription import get_user_tier
+    from app.db.supabase import get_async_supabase_client
+
+    # Check tier for watermark
+    db = await get_async_supabase_client()
+    tier = await get_user_tier(user_id, db)
+    watermark = not tier.mag_pdf_schoon
+
+    if wil_async(http_request):
+        return await dien_job_in('pdf', user_id, {'request': request.model_dump(mode='json'), 'watermark': watermark})
+
+    pdf_bytes, filename = await _maak_pdf(request, watermark)
 
     return Response(
         content=pdf_bytes,
@@ -287,6 +576,14 @@ async def bereken_rente_pdf(request: BerekeningRequest, user_id: str = Depends(g
     )
 
 
+async def _pdf_job(job_id: str, user_id: str, invoer: dict) -> dict:
+    pdf_bytes, filename = await _maak_pdf(BerekeningRequest(**invoer['request']), invoer['watermark'])
+    return await bewaar_job_bestand(job_id, pdf_bytes, filename, "application/pdf")
+
+
+registreer_job_soort('pdf', _pdf_job)
+
+
 class BikRequest(BaseModel):
     """Request for BIK calculation."""
     hoofdsom: Decimal
@@ -310,24 +607,15 @@ async def bereken_bik_endpoint(request: BikRequest):
     return BikResponse(hoofdsom=request.hoofdsom, bik=bik)
 
 
-@router.post("/bereken/excel")
-async def bereken_rente_excel(request: BerekeningRequest, user_id: str = Depends(get_current_user)):
-    """
-    Calculate and generate Excel directly.
-    Pro users only.
-    """
-    from app.services.excel_generator import generate_excel
-    from app.services.subscription import get_user_tier
-    from app.db.supabase import get_supabase_client
+_EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-    # Check Pro tier
-    db = get_supabase_client()
-    tier = get_user_tier(user_id, db)
-    if not tier.mag_pdf_schoon:
-        raise HTTPException(status_code=403, detail="Excel export is een Pro-functie")
 
-    # Run calculation
-    result = await bereken_rente(request)
+async def _maak_excel(request: BerekeningRequest):
+    """Bereken en genereer de Excel; geeft (excel_bytes, filename)."""
+    from app.services.excel_generator import generate_excel
+
+    # Run calculation (Excel heeft altijd de renteperiodes nodig)
+    result = await bereken_rente(request.model_copy(update={'detail': 'full'}))
 
     # Build invoer structure for Excel
     invoer = {
@@ -351,19 +639,54 @@ async def bereken_rente_excel(request: BerekeningRequest, user_id: str = Depends
     resultaat = result.model_dump(mode='json')
 
     try:
-        excel_bytes = generate_excel(invoer=invoer, resultaat=resultaat)
+        excel_bytes = await draai_in_worker(generate_excel, invoer=invoer, resultaat=resultaat)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Excel generatie mislukt: {str(e)}")
 
     now = datetime.now()
-    filename = f"renteberekening_{now.strftime('%Y%m%d_%H%M')}.xlsx"
+    return excel_bytes, f"renteberekening_{now.strftime('%Y%m%d_%H%M')}.xlsx"
+
+
+@router.post("/bereken/excel", responses={202: {"model": JobAccepted}})
+async def bereken_rente_excel(request: BerekeningRequest, http_request: Request,
+                              user_id: str = Depends(get_current_user)):
+    """
+    Calculate and generate Excel directly.
+    Pro users only.
+
+    Met 'Prefer: respond-async' als job: 202 met een job id, de Excel komt
+    via GET /api/jobs/{id}/bestand.
+    """
+    from app.services.subscription import get_user_tier
+    from app.db.supabase import get_async_supabase_client
+
+    # Check Pro tier
+    db = await get_async_supabase_client()
+    tier = await get_user_tier(user_id, db)
+    if not tier.mag_pdf_schoon:
+        raise HTTPException(status_code=403, detail="Excel export is een Pro-functie")
+
+    if wil_async(http_request):
+        return await dien_job_in('excel', user_id, {'request': request.model_dump(mode='json')})
+
+    excel_bytes, filename = await _maak_excel(request)
 
     return Response(
         content=excel_bytes,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        media_type=_EXCEL_MEDIA_TYPE,
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"'
         }
     )
+
+
+async def _excel_job(job_id: str, user_id: str, invoer: dict) -> dict:
+    excel_bytes, filename = await _maak_excel(BerekeningRequest(**invoer['request']))
+    return await bewaar_job_bestand(job_id, excel_bytes, filename, _EXCEL_MEDIA_TYPE)
+
+
+registreer_job_soort('excel', _excel_job)
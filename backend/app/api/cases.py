@@ -1,125 +1,181 @@
 """
 Cases API routes with Supabase integration
 """
+import asyncio
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, UploadFile, File
 
 from app.models import (
     CaseCreate, CaseResponse, CaseWithLines, CaseListResponse,
     VorderingCreate, VorderingResponse,
     DeelbetalingCreate, DeelbetalingResponse,
-    CaseShareInfo, ColleagueResponse, ColleagueWithPermission
+    CaseShareInfo, ColleagueResponse, ColleagueWithPermission,
+    CaseLinesImport, CaseLinesImportResponse,
+    BerekeningResponse,
 )
 from app.auth import get_current_user
-from app.db.supabase import get_supabase_client
+from app.config import get_settings
+from app.db.supabase import get_async_supabase_client
 from app.services.subscription import (
     get_user_tier, check_vordering_limit, check_deelbetaling_limit, check_feature
 )
+from app.services.schema_capabilities import schema_capabilities
+from app.services.request_context import query_budget
+from app.services.permissions import case_permissie, is_admin
+from app.services.regel_import import lees_regels, ImportFout
+from app.services.etag import case_etag, etag_matcht, maak_etag, niet_gewijzigd, zet_etag
+from app.services.case_berekening import bereken_case, laad_opgeslagen, ZaakZonderVorderingen
+from app.services.snapshot_opslag import ruim_blokken_op
 
 router = APIRouter()
 
 
-def get_db():
+async def get_db():
     """Get Supabase client."""
-    return get_supabase_client()
+    return await get_async_supabase_client()
 
 
-def is_admin(db, user_id: str) -> bool:
-    """Check if user has admin role."""
+async def can_edit_case(db, case_id: str, user_id: str) -> bool:
+    """Check if user can edit a case (owner or has edit permission)."""
+    return (await case_permissie(db, user_id, case_id=case_id)).kan_bewerken
+
+
+async def _of_none(coro):
+    """Await een optionele (sharing) query; None als die faalt."""
     try:
-        roles = db.table('user_roles').select('role').eq('user_id', user_id).execute()
-        return any(r['role'] == 'admin' for r in roles.data) if roles.data else False
-    except:
-        return False
+        return await coro
+    except Exception:
+        return None
 
 
-def can_edit_case(db, case_id: str, user_id: str) -> bool:
-    """Check if user can edit a case (owner or has edit permission)."""
-    # Check ownership
-    case = db.table('cases').select('user_id').eq('id', case_id).execute()
-    if case.data and case.data[0]['user_id'] == user_id:
-        return True
+async def _geen():
+    return None
 
-    # Check edit permission (only if sharing tables exist)
-    if _sharing_tables_exist(db):
-        try:
-            share = db.table('case_shares').select('permission').eq(
-                'case_id', case_id
-            ).eq('shared_with_user_id', user_id).eq('permission', 'edit').execute()
-            return bool(share.data)
-        except:
-            pass
 
-    return False
+async def _profielen(db, user_ids) -> dict:
+    """user_profiles (id, email, display_name) per id, in één query; leeg als dat faalt."""
+    if not user_ids:
+        return {}
+    users = await _of_none(
+        db.table('user_profiles').select('id, email, display_name').in_('id', list(user_ids)).execute()
+    )
+    return {u['id']: u for u in users.data} if users is not None else {}
 
 
-def _sharing_tables_exist(db) -> bool:
-    """Check if sharing feature tables exist and are accessible."""
-    try:
-        # Check both required tables
-        db.table('case_shares').select('id').limit(1).execute()
-        db.table('user_profiles').select('id').limit(1).execute()
-        return True
-    except:
-        return False
+def _tellingen(row: dict):
+    """Case data zonder de embedded counts, plus het aantal vorderingen en deelbetalingen."""
+    vord_count = row.get('vorderingen', [{}])[0].get('count', 0) if row.get('vorderingen') else 0
+    deel_count = row.get('deelbetalingen', [{}])[0].get('count', 0) if row.get('deelbetalingen') else 0
+    case_data = {k: v for k, v in row.items() if k not in ('vorderingen', 'deelbetalingen')}
+    return case_data, vord_count, deel_count
 
 
 @router.get("", response_model=List[CaseListResponse])
+@query_budget(max_queries=6, max_ms=500)
 async def list_cases(
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user),
     filter: Optional[str] = Query(None, description="Filter: 'own', 'shared', or None for all")
 ):
-    """List all cases for the current user (owned and shared) with counts and sharing info."""
-    db = get_db()
+    """
+    List all cases for the current user (owned and shared) with counts and sharing info.
+
+    Met If-None-Match eerst alleen de ETag (één query); bij een match 304.
+    Anders drie rondes: eigen zaken, mijn shares (en de ETag) tegelijk, dan
+    de shares van de eigen zaken en de gedeelde zaken tegelijk, dan alle
+    profielen in één query.
+    """
+    db = await get_db()
     result = []
 
+    conditioneel = 'if-none-match' in request.headers
+    etag = await case_etag(db, user_id, None, filter) if conditioneel else None
+    if etag_matcht(request, etag):
+        return niet_gewijzigd(etag)
+
     # Check if sharing feature is available
-    sharing_enabled = _sharing_tables_exist(db)
+    sharing_enabled = schema_capabilities().sharing
+    eigen = filter != 'shared'
+    gedeeld = filter != 'own' and sharing_enabled
 
-    # Get owned cases (unless filtering for shared only)
-    if filter != 'shared':
-        owned_response = db.table('cases').select(
+    # Ronde 1: owned cases en de shares met mij
+    owned_response, shared_response, etag_nu = await asyncio.gather(
+        db.table('cases').select(
+            '*, vorderingen(count), deelbetalingen(count)'
+        ).eq('user_id', user_id).order('created_at', desc=True).execute() if eigen else _geen(),
+        _of_none(db.table('case_shares').select(
+            'case_id, permission, shared_by_user_id'
+        ).eq('shared_with_user_id', user_id).execute()) if gedeeld else _geen(),
+        case_etag(db, user_id, None, filter) if not conditioneel else _geen(),
+    )
+    etag = etag or etag_nu
+    owned = owned_response.data if owned_response is not None else []
+    my_shares = shared_response.data if shared_response is not None else []
+
+    # Ronde 2: shares van de owned cases en de gedeelde cases zelf
+    owned_case_ids = [c['id'] for c in owned]
+    shared_case_ids = [s['case_id'] for s in my_shares]
+    owned_shares, cases_response = await asyncio.gather(
+        _of_none(db.table('case_shares').select('*').in_('case_id', owned_case_ids).execute())
+        if sharing_enabled and owned_case_ids else _geen(),
+        _of_none(db.table('cases').select(
             '*, vorderingen(count), deelbetalingen(count)'
-        ).eq('user_id', user_id).order('created_at', desc=True).execute()
-
-        # Get sharing info for owned cases (only if sharing is enabled)
-        shares_by_case = {}
-        if sharing_enabled:
-            owned_case_ids = [c['id'] for c in owned_response.data] if owned_response.data else []
-            if owned_case_ids:
-                try:
-                    shares = db.table('case_shares').select('*').in_('case_id', owned_case_ids).execute()
-                    if shares.data:
-                        # Get user details for shared_with users
-                        shared_user_ids = list(set(s['shared_with_user_id'] for s in shares.data))
-                        users = db.table('user_profiles').select('id, email, display_name').in_('id', shared_user_ids).execute()
-                        users_map = {u['id']: u for u in users.data}
-
-                        for share in shares.data:
-                            cid = share['case_id']
-                            if cid not in shares_by_case:
-                                shares_by_case[cid] = []
-                            user_data = users_map.get(share['shared_with_user_id'])
-                            if user_data:
-                                shares_by_case[cid].append(ColleagueWithPermission(
-                                    **user_data,
-                                    permission=share['permission']
-                                ))
-                except:
-                    pass  # Sharing not available
-
-        # Process owned cases
-        for row in owned_response.data:
-            vord_count = row.get('vorderingen', [{}])[0].get('count', 0) if row.get('vorderingen') else 0
-            deel_count = row.get('deelbetalingen', [{}])[0].get('count', 0) if row.get('deelbetalingen') else 0
-
-            case_data = {k: v for k, v in row.items() if k not in ('vorderingen', 'deelbetalingen')}
+        ).in_('id', shared_case_ids).order('created_at', desc=True).execute())
+        if shared_case_ids else _geen(),
+    )
+    owned_shares = owned_shares.data if owned_shares is not None else []
+
+    # Ronde 3: profielen van shared_with en shared_by users samen
+    users_map = await _profielen(db, {s['shared_with_user_id'] for s in owned_shares} |
+                                 {s['shared_by_user_id'] for s in my_shares})
+
+    # Sharing info for owned cases
+    shares_by_case = {}
+    for share in owned_shares:
+        cid = share['case_id']
+        if cid not in shares_by_case:
+            shares_by_case[cid] = []
+        user_data = users_map.get(share['shared_with_user_id'])
+        if user_data:
+            shares_by_case[cid].append(ColleagueWithPermission(
+                **user_data,
+                permission=share['permission']
+            ))
+
+    # Process owned cases
+    for row in owned:
+        case_data, vord_count, deel_count = _tellingen(row)
+
+        sharing_info = CaseShareInfo(
+            is_shared=row['id'] in shares_by_case,
+            is_owner=True,
+            shared_with=shares_by_case.get(row['id'], [])
+        )
+
+        result.append(CaseListResponse(
+            **case_data,
+            vorderingen_count=vord_count,
+            deelbetalingen_count=deel_count,
+            sharing=sharing_info
+        ))
+
+    # Process shared cases
+    if cases_response is not None:
+        shared_by_map = {s['case_id']: {'user_id': s['shared_by_user_id'], 'permission': s['permission']}
+                         for s in my_shares}
+
+        for row in cases_response.data:
+            case_data, vord_count, deel_count = _tellingen(row)
+            share_info = shared_by_map.get(row['id'], {})
+            shared_by_user = users_map.get(share_info.get('user_id'))
 
             sharing_info = CaseShareInfo(
-                is_shared=row['id'] in shares_by_case,
-                is_owner=True,
-                shared_with=shares_by_case.get(row['id'], [])
+                is_shared=True,
+                is_owner=False,
+                shared_by=ColleagueResponse(**shared_by_user) if shared_by_user else None,
+                my_permission=share_info.get('permission')
             )
 
             result.append(CaseListResponse(
@@ -129,62 +185,22 @@ async def list_cases(
                 sharing=sharing_info
             ))
 
-    # Get shared cases (unless filtering for own only) - only if sharing is enabled
-    if filter != 'own' and sharing_enabled:
-        try:
-            shared_response = db.table('case_shares').select(
-                'case_id, permission, shared_by_user_id'
-            ).eq('shared_with_user_id', user_id).execute()
-
-            if shared_response.data:
-                shared_case_ids = [s['case_id'] for s in shared_response.data]
-                shared_by_map = {s['case_id']: {'user_id': s['shared_by_user_id'], 'permission': s['permission']}
-                               for s in shared_response.data}
-
-                # Get the actual case data
-                cases_response = db.table('cases').select(
-                    '*, vorderingen(count), deelbetalingen(count)'
-                ).in_('id', shared_case_ids).order('created_at', desc=True).execute()
-
-                # Get shared_by user details
-                shared_by_user_ids = list(set(s['shared_by_user_id'] for s in shared_response.data))
-                shared_by_users = db.table('user_profiles').select('id, email, display_name').in_('id', shared_by_user_ids).execute()
-                shared_by_users_map = {u['id']: u for u in shared_by_users.data}
-
-                for row in cases_response.data:
-                    vord_count = row.get('vorderingen', [{}])[0].get('count', 0) if row.get('vorderingen') else 0
-                    deel_count = row.get('deelbetalingen', [{}])[0].get('count', 0) if row.get('deelbetalingen') else 0
-
-                    case_data = {k: v for k, v in row.items() if k not in ('vorderingen', 'deelbetalingen')}
-                    share_info = shared_by_map.get(row['id'], {})
-                    shared_by_user = shared_by_users_map.get(share_info.get('user_id'))
-
-                    sharing_info = CaseShareInfo(
-                        is_shared=True,
-                        is_owner=False,
-                        shared_by=ColleagueResponse(**shared_by_user) if shared_by_user else None,
-                        my_permission=share_info.get('permission')
-                    )
-
-                    result.append(CaseListResponse(
-                        **case_data,
-                        vorderingen_count=vord_count,
-                        deelbetalingen_count=deel_count,
-                        sharing=sharing_info
-                    ))
-        except:
-            pass  # Sharing not available
-
     # Sort by created_at descending
     result.sort(key=lambda x: x.created_at, reverse=True)
 
+    if etag is None:
+        # Zonder case_etag (migratie 015): ETag over de response zelf
+        etag = maak_etag('cases', user_id, filter, *(c.model_dump_json() for c in result))
+        if etag_matcht(request, etag):
+            return niet_gewijzigd(etag)
+    zet_etag(response, etag)
     return result
 
 
 @router.post("", response_model=CaseResponse)
 async def create_case(case: CaseCreate, user_id: str = Depends(get_current_user)):
     """Create a new case."""
-    db = get_db()
+    db = await get_db()
 
     # Note: free users can create cases for calculations,
     # but other features (sharing, snapshots) are gated separately.
@@ -198,7 +214,7 @@ async def create_case(case: CaseCreate, user_id: str = Depends(get_current_user)
         'default_betaaltermijn': case.default_betaaltermijn,
     }
 
-    response = db.table('cases').insert(case_data).execute()
+    response = await db.table('cases').insert(case_data).execute()
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create case")
@@ -207,34 +223,48 @@ async def create_case(case: CaseCreate, user_id: str = Depends(get_current_user)
 
 
 @router.get("/{case_id}", response_model=CaseWithLines)
-async def get_case(case_id: str, user_id: str = Depends(get_current_user)):
-    """Get a case with all vorderingen and deelbetalingen."""
-    db = get_db()
-
-    # Get case
-    case_response = db.table('cases').select('*').eq('id', case_id).execute()
+@query_budget(max_queries=7, max_ms=400)
+async def get_case(case_id: str, request: Request, response: Response,
+                   user_id: str = Depends(get_current_user)):
+    """
+    Get a case with all vorderingen and deelbetalingen.
+
+    Met If-None-Match wordt eerst alleen de ETag bepaald (één query) en bij
+    een match 304 teruggegeven. Anders worden case, rollen, shares,
+    vorderingen, deelbetalingen (en de ETag) tegelijk opgehaald; toegang wordt
+    daarna bepaald. Alleen de profielen (voor de sharing info) hangen daarvan af.
+    """
+    db = await get_db()
+    sharing_tables_exist = schema_capabilities().sharing
+
+    conditioneel = 'if-none-match' in request.headers
+    etag = await case_etag(db, user_id, case_id) if conditioneel else None
+    if etag_matcht(request, etag):
+        return niet_gewijzigd(etag)
+
+    case_response, user_is_admin, shares, vord_response, deel_response, etag_nu = await asyncio.gather(
+        db.table('cases').select('*').eq('id', case_id).execute(),
+        is_admin(db, user_id),
+        _of_none(db.table('case_shares').select('*').eq('case_id', case_id).execute())
+        if sharing_tables_exist else _geen(),
+        db.table('vorderingen').select('*').eq('case_id', case_id).order('volgorde').execute(),
+        db.table('deelbetalingen').select('*').eq('case_id', case_id).order('datum').execute(),
+        case_etag(db, user_id, case_id) if not conditioneel else _geen(),
+    )
+    etag = etag or etag_nu
 
     if not case_response.data:
         raise HTTPException(status_code=404, detail="Case not found")
 
     case = case_response.data[0]
     is_owner = case['user_id'] == user_id
-    user_is_admin = is_admin(db, user_id)
 
     # If not owner, check if shared with user or if user is admin
     sharing_info = None
-    sharing_tables_exist = _sharing_tables_exist(db)
 
     if user_is_admin and not is_owner:
         # Admin viewing someone else's case - read-only access
-        owner_id = case['user_id']
-        owner_info = None
-        try:
-            owner_response = db.table('user_profiles').select('id, email, display_name').eq('id', owner_id).execute()
-            if owner_response.data:
-                owner_info = owner_response.data[0]
-        except:
-            pass
+        owner_info = (await _profielen(db, [case['user_id']])).get(case['user_id'])
 
         sharing_info = CaseShareInfo(
             is_shared=True,
@@ -249,87 +279,87 @@ async def get_case(case_id: str, user_id: str = Depends(get_current_user)):
             is_owner=True,
             shared_with=[]
         )
-        if sharing_tables_exist:
-            try:
-                # Get sharing info for owner
-                shares = db.table('case_shares').select('*').eq('case_id', case_id).execute()
-                shared_with = []
-                if shares.data:
-                    shared_user_ids = [s['shared_with_user_id'] for s in shares.data]
-                    users = db.table('user_profiles').select('id, email, display_name').in_('id', shared_user_ids).execute()
-                    users_map = {u['id']: u for u in users.data}
-                    for s in shares.data:
-                        user_data = users_map.get(s['shared_with_user_id'])
-                        if user_data:
-                            shared_with.append(ColleagueWithPermission(
-                                **user_data,
-                                permission=s['permission']
-                            ))
-                sharing_info = CaseShareInfo(
-                    is_shared=len(shared_with) > 0,
-                    is_owner=True,
-                    shared_with=shared_with
-                )
-            except:
-                pass  # Use default sharing_info
+        if shares is not None and shares.data:
+            users_map = await _profielen(db, [s['shared_with_user_id'] for s in shares.data])
+            shared_with = [
+                ColleagueWithPermission(**users_map[s['shared_with_user_id']], permission=s['permission'])
+                for s in shares.data
+                if s['shared_with_user_id'] in users_map
+            ]
+            sharing_info = CaseShareInfo(
+                is_shared=len(shared_with) > 0,
+                is_owner=True,
+                shared_with=shared_with
+            )
     else:
-        # Not owner - check if shared (only if sharing tables exist)
-        if sharing_tables_exist:
-            try:
-                share = db.table('case_shares').select('*').eq(
-                    'case_id', case_id
-                ).eq('shared_with_user_id', user_id).execute()
-
-                if not share.data:
-                    raise HTTPException(status_code=404, detail="Case not found")
-
-                # Get shared_by user info separately
-                shared_by_user_id = share.data[0].get('shared_by_user_id')
-                shared_by_user = None
-                if shared_by_user_id:
-                    user_response = db.table('user_profiles').select('id, email, display_name').eq('id', shared_by_user_id).execute()
-                    if user_response.data:
-                        shared_by_user = user_response.data[0]
-
-                sharing_info = CaseShareInfo(
-                    is_shared=True,
-                    is_owner=False,
-                    shared_by=ColleagueResponse(**shared_by_user) if shared_by_user else None,
-                    my_permission=share.data[0]['permission']
-                )
-            except HTTPException:
-                raise  # Re-raise HTTP exceptions
-            except Exception as e:
-                # Sharing tables query failed - user can't access others' cases
-                print(f"Sharing query failed: {e}")  # Debug logging
-                raise HTTPException(status_code=404, detail="Case not found")
-        else:
-            # No sharing tables - user can't access others' cases
+        # Not owner - only if shared with user (sharing tables exist and the query succeeded)
+        my_share = next((s for s in shares.data if s['shared_with_user_id'] == user_id), None) if shares else None
+        if my_share is None:
             raise HTTPException(status_code=404, detail="Case not found")
 
-    # Get vorderingen
-    vord_response = db.table('vorderingen').select('*').eq('case_id', case_id).order('volgorde').execute()
-    vorderingen = [VorderingResponse(**v) for v in vord_response.data]
+        shared_by_user_id = my_share.get('shared_by_user_id')
+        shared_by_user = (await _profielen(db, [shared_by_user_id])).get(shared_by_user_id) if shared_by_user_id else None
 
-    # Get deelbetalingen
-    deel_response = db.table('deelbetalingen').select('*').eq('case_id', case_id).order('datum').execute()
+        sharing_info = CaseShareInfo(
+            is_shared=True,
+            is_owner=False,
+            shared_by=ColleagueResponse(**shared_by_user) if shared_by_user else None,
+            my_permission=my_share['permission']
+        )
+
+    vorderingen = [VorderingResponse(**v) for v in vord_response.data]
     deelbetalingen = [DeelbetalingResponse(**d) for d in deel_response.data]
 
-    return CaseWithLines(
+    resultaat = CaseWithLines(
         **case,
         vorderingen=vorderingen,
         deelbetalingen=deelbetalingen,
         sharing=sharing_info
     )
 
+    if etag is None:
+        # Zonder case_etag (migratie 015): ETag over de response zelf
+        etag = maak_etag('case', user_id, resultaat.model_dump_json())
+        if etag_matcht(request, etag):
+            return niet_gewijzigd(etag)
+    zet_etag(response, etag)
+    return resultaat
+
+
+@router.get("/{case_id}/bereken", response_model=BerekeningResponse)
+@query_budget(max_queries=6, max_ms=1000)
+async def bereken_case_route(case_id: str, user_id: str = Depends(get_current_user)):
+    """
+    Calculate a stored case server-side.
+
+    The result is stored per case revision; as long as the case and its lines
+    are unchanged it is served from storage without reloading or recalculating.
+    """
+    db = await get_db()
+
+    permissie, case_response, opgeslagen = await asyncio.gather(
+        case_permissie(db, user_id, case_id=case_id),
+        db.table('cases').select('*').eq('id', case_id).execute(),
+        laad_opgeslagen(db, case_id),
+    )
+    if not permissie.kan_lezen or not case_response.data:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    try:
+        berekening = await bereken_case(db, case_response.data[0], opgeslagen)
+    except ZaakZonderVorderingen as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return berekening.resultaat_json
+
 
 @router.put("/{case_id}", response_model=CaseResponse)
 async def update_case(case_id: str, case: CaseCreate, user_id: str = Depends(get_current_user)):
     """Update a case."""
-    db = get_db()
+    db = await get_db()
 
     # Verify edit permission (owner or edit share)
-    if not can_edit_case(db, case_id, user_id):
+    if not await can_edit_case(db, case_id, user_id):
         raise HTTPException(status_code=404, detail="Case not found")
 
     update_data = {
@@ -340,7 +370,7 @@ async def update_case(case_id: str, case: CaseCreate, user_id: str = Depends(get
         'default_betaaltermijn': case.default_betaaltermijn,
     }
 
-    response = db.table('cases').update(update_data).eq('id', case_id).execute()
+    response = await db.table('cases').update(update_data).eq('id', case_id).execute()
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to update case")
@@ -351,41 +381,30 @@ async def update_case(case_id: str, case: CaseCreate, user_id: str = Depends(get
 @router.delete("/{case_id}")
 async def delete_case(case_id: str, user_id: str = Depends(get_current_user)):
     """Delete a case and all its vorderingen and deelbetalingen."""
-    db = get_db()
+    db = await get_db()
 
-    # Verify ownership
-    existing = db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
+    # Verify ownership; tegelijk de blokken van de snapshots (die gaan mee met de cascade, hun blokken niet)
+    existing, snapshots = await asyncio.gather(
+        db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute(),
+        _of_none(db.table('snapshots').select('blokken:resultaat_json->blokken').eq('case_id', case_id).execute())
+        if schema_capabilities().snapshot_blokken else _geen(),
+    )
     if not existing.data:
         raise HTTPException(status_code=404, detail="Case not found")
 
-    # Delete case (cascades to vorderingen and deelbetalingen via FK)
-    db.table('cases').delete().eq('id', case_id).execute()
+    # Delete case (cascades to vorderingen, deelbetalingen and snapshots via FK)
+    await db.table('cases').delete().eq('id', case_id).execute()
+    if snapshots is not None:
+        await ruim_blokken_op(db, sorted({h for s in snapshots.data for h in s.get('blokken') or []}))
 
     return {"status": "deleted"}
 
 
 # Vorderingen routes
 
-@router.post("/{case_id}/vorderingen", response_model=VorderingResponse)
-async def create_vordering(case_id: str, vordering: VorderingCreate, user_id: str = Depends(get_current_user)):
-    """Add a vordering to a case."""
-    db = get_db()
-
-    # Verify case edit permission (owner or edit share)
-    if not can_edit_case(db, case_id, user_id):
-        raise HTTPException(status_code=404, detail="Case not found")
-
-    # Check vordering limit
-    limit_error = check_vordering_limit(user_id, case_id, db)
-    if limit_error:
-        raise HTTPException(status_code=403, detail=limit_error)
-
-    # Get current max volgorde
-    max_volgorde = db.table('vorderingen').select('volgorde').eq('case_id', case_id).order('volgorde', desc=True).limit(1).execute()
-    next_volgorde = (max_volgorde.data[0]['volgorde'] + 1) if max_volgorde.data else 0
-
-    v_data = {
-        'case_id': case_id,
+def _vordering_rij(vordering: VorderingCreate) -> dict:
+    """Database kolommen van een vordering (zonder case_id en volgorde)."""
+    return {
         'item_type': vordering.item_type or 'vordering',
         'kenmerk': vordering.kenmerk,
         'bedrag': float(vordering.bedrag),
@@ -400,17 +419,47 @@ async def create_vordering(case_id: str, vordering: VorderingCreate, user_id: st
         'betaaltermijn_dagen': vordering.betaaltermijn_dagen,
         'bodemrente': float(vordering.bodemrente) if vordering.bodemrente else None,
         'kosten_categorie': vordering.kosten_categorie,
-        'volgorde': next_volgorde,
     }
 
-    insert_response = db.table('vorderingen').insert(v_data).execute()
+
+def _deelbetaling_rij(deelbetaling: DeelbetalingCreate) -> dict:
+    """Database kolommen van een deelbetaling (zonder case_id en volgorde)."""
+    return {
+        'kenmerk': deelbetaling.kenmerk,
+        'bedrag': float(deelbetaling.bedrag),
+        'datum': str(deelbetaling.datum),
+        'aangewezen': deelbetaling.aangewezen or [],
+    }
+
+
+@router.post("/{case_id}/vorderingen", response_model=VorderingResponse)
+async def create_vordering(case_id: str, vordering: VorderingCreate, user_id: str = Depends(get_current_user)):
+    """Add a vordering to a case."""
+    db = await get_db()
+
+    # Verify case edit permission (owner or edit share)
+    if not await can_edit_case(db, case_id, user_id):
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    # Check vordering limit
+    limit_error = await check_vordering_limit(user_id, case_id, db)
+    if limit_error:
+        raise HTTPException(status_code=403, detail=limit_error)
+
+    # Get current max volgorde
+    max_volgorde = await db.table('vorderingen').select('volgorde').eq('case_id', case_id).order('volgorde', desc=True).limit(1).execute()
+    next_volgorde = (max_volgorde.data[0]['volgorde'] + 1) if max_volgorde.data else 0
+
+    v_data = {'case_id': case_id, **_vordering_rij(vordering), 'volgorde': next_volgorde}
+
+    insert_response = await db.table('vorderingen').insert(v_data).execute()
 
     if not insert_response.data:
         raise HTTPException(status_code=500, detail="Failed to create vordering")
 
     # Fetch the created record to ensure all columns are returned
     vordering_id = insert_response.data[0]['id']
-    response = db.table('vorderingen').select('*').eq('id', vordering_id).execute()
+    response = await db.table('vorderingen').select('*').eq('id', vordering_id).execute()
 
     return VorderingResponse(**response.data[0])
 
@@ -418,19 +467,19 @@ async def create_vordering(case_id: str, vordering: VorderingCreate, user_id: st
 @router.put("/vorderingen/{vordering_id}", response_model=VorderingResponse)
 async def update_vordering(vordering_id: str, vordering: VorderingCreate, user_id: str = Depends(get_current_user)):
     """Update a vordering."""
-    db = get_db()
+    db = await get_db()
 
     # Debug logging
     print(f"=== UPDATE VORDERING ===")
     print(f"Received item_type: {vordering.item_type}")
     print(f"Full vordering data: {vordering.model_dump()}")
 
-    # Get vordering and verify edit permission via case
-    v_response = db.table('vorderingen').select('case_id').eq('id', vordering_id).execute()
-    if not v_response.data:
+    # Verify edit permission via the case of the vordering (one lookup)
+    permissie = await case_permissie(db, user_id, vordering_id=vordering_id)
+    if permissie.case_id is None:
         raise HTTPException(status_code=404, detail="Vordering not found")
 
-    if not can_edit_case(db, v_response.data[0]['case_id'], user_id):
+    if not permissie.kan_bewerken:
         raise HTTPException(status_code=403, detail="Geen bewerkrechten")
 
     update_data = {
@@ -452,11 +501,11 @@ async def update_vordering(vordering_id: str, vordering: VorderingCreate, user_i
 
     print(f"Update data being sent to DB: {update_data}")
 
-    update_result = db.table('vorderingen').update(update_data).eq('id', vordering_id).execute()
+    update_result = await db.table('vorderingen').update(update_data).eq('id', vordering_id).execute()
     print(f"Update result: {update_result.data}")
 
     # Fetch the updated record to ensure all columns are returned
-    response = db.table('vorderingen').select('*').eq('id', vordering_id).execute()
+    response = await db.table('vorderingen').select('*').eq('id', vordering_id).execute()
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to update vordering")
@@ -467,17 +516,17 @@ async def update_vordering(vordering_id: str, vordering: VorderingCreate, user_i
 @router.delete("/vorderingen/{vordering_id}")
 async def delete_vordering(vordering_id: str, user_id: str = Depends(get_current_user)):
     """Delete a vordering."""
-    db = get_db()
+    db = await get_db()
 
-    # Get vordering and verify edit permission via case
-    v_response = db.table('vorderingen').select('case_id').eq('id', vordering_id).execute()
-    if not v_response.data:
+    # Verify edit permission via the case of the vordering (one lookup)
+    permissie = await case_permissie(db, user_id, vordering_id=vordering_id)
+    if permissie.case_id is None:
         raise HTTPException(status_code=404, detail="Vordering not found")
 
-    if not can_edit_case(db, v_response.data[0]['case_id'], user_id):
+    if not permissie.kan_bewerken:
         raise HTTPException(status_code=403, detail="Geen bewerkrechten")
 
-    db.table('vorderingen').delete().eq('id', vordering_id).execute()
+    await db.table('vorderingen').delete().eq('id', vordering_id).execute()
 
     return {"status": "deleted"}
 
@@ -487,31 +536,24 @@ async def delete_vordering(vordering_id: str, user_id: str = Depends(get_current
 @router.post("/{case_id}/deelbetalingen", response_model=DeelbetalingResponse)
 async def create_deelbetaling(case_id: str, deelbetaling: DeelbetalingCreate, user_id: str = Depends(get_current_user)):
     """Add a deelbetaling to a case."""
-    db = get_db()
+    db = await get_db()
 
     # Verify case edit permission (owner or edit share)
-    if not can_edit_case(db, case_id, user_id):
+    if not await can_edit_case(db, case_id, user_id):
         raise HTTPException(status_code=404, detail="Case not found")
 
     # Check deelbetaling limit
-    limit_error = check_deelbetaling_limit(user_id, case_id, db)
+    limit_error = await check_deelbetaling_limit(user_id, case_id, db)
     if limit_error:
         raise HTTPException(status_code=403, detail=limit_error)
 
     # Get current max volgorde
-    max_volgorde = db.table('deelbetalingen').select('volgorde').eq('case_id', case_id).order('volgorde', desc=True).limit(1).execute()
+    max_volgorde = await db.table('deelbetalingen').select('volgorde').eq('case_id', case_id).order('volgorde', desc=True).limit(1).execute()
     next_volgorde = (max_volgorde.data[0]['volgorde'] + 1) if max_volgorde.data else 0
 
-    d_data = {
-        'case_id': case_id,
-        'kenmerk': deelbetaling.kenmerk,
-        'bedrag': float(deelbetaling.bedrag),
-        'datum': str(deelbetaling.datum),
-        'aangewezen': deelbetaling.aangewezen or [],
-        'volgorde': next_volgorde,
-    }
+    d_data = {'case_id': case_id, **_deelbetaling_rij(deelbetaling), 'volgorde': next_volgorde}
 
-    response = db.table('deelbetalingen').insert(d_data).execute()
+    response = await db.table('deelbetalingen').insert(d_data).execute()
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create deelbetaling")
@@ -522,14 +564,14 @@ async def create_deelbetaling(case_id: str, deelbetaling: DeelbetalingCreate, us
 @router.put("/deelbetalingen/{deelbetaling_id}", response_model=DeelbetalingResponse)
 async def update_deelbetaling(deelbetaling_id: str, deelbetaling: DeelbetalingCreate, user_id: str = Depends(get_current_user)):
     """Update a deelbetaling."""
-    db = get_db()
+    db = await get_db()
 
-    # Get deelbetaling and verify edit permission via case
-    d_response = db.table('deelbetalingen').select('case_id').eq('id', deelbetaling_id).execute()
-    if not d_response.data:
+    # Verify edit permission via the case of the deelbetaling (one lookup)
+    permissie = await case_permissie(db, user_id, deelbetaling_id=deelbetaling_id)
+    if permissie.case_id is None:
         raise HTTPException(status_code=404, detail="Deelbetaling not found")
 
-    if not can_edit_case(db, d_response.data[0]['case_id'], user_id):
+    if not permissie.kan_bewerken:
         raise HTTPException(status_code=403, detail="Geen bewerkrechten")
 
     update_data = {
@@ -539,7 +581,7 @@ async def update_deelbetaling(deelbetaling_id: str, deelbetaling: DeelbetalingCr
         'aangewezen': deelbetaling.aangewezen or [],
     }
 
-    response = db.table('deelbetalingen').update(update_data).eq('id', deelbetaling_id).execute()
+    response = await db.table('deelbetalingen').update(update_data).eq('id', deelbetaling_id).execute()
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to update deelbetaling")
@@ -550,16 +592,120 @@ async def update_deelbetaling(deelbetaling_id: str, deelbetaling: DeelbetalingCr
 @router.delete("/deelbetalingen/{deelbetaling_id}")
 async def delete_deelbetaling(deelbetaling_id: str, user_id: str = Depends(get_current_user)):
     """Delete a deelbetaling."""
-    db = get_db()
+    db = await get_db()
 
-    # Get deelbetaling and verify edit permission via case
-    d_response = db.table('deelbetalingen').select('case_id').eq('id', deelbetaling_id).execute()
-    if not d_response.data:
+    # Verify edit permission via the case of the deelbetaling (one lookup)
+    permissie = await case_permissie(db, user_id, deelbetaling_id=deelbetaling_id)
+    if permissie.case_id is None:
         raise HTTPException(status_code=404, detail="Deelbetaling not found")
 
-    if not can_edit_case(db, d_response.data[0]['case_id'], user_id):
+    if not permissie.kan_bewerken:
         raise HTTPException(status_code=403, detail="Geen bewerkrechten")
 
-    db.table('deelbetalingen').delete().eq('id', deelbetaling_id).execute()
+    await db.table('deelbetalingen').delete().eq('id', deelbetaling_id).execute()
 
     return {"status": "deleted"}
+
+
+# Bulk import
+
+async def _volgende_volgorde(db, tabel: str, case_id: str) -> int:
+    max_volgorde = await db.table(tabel).select('volgorde').eq('case_id', case_id).order('volgorde', desc=True).limit(1).execute()
+    return (max_volgorde.data[0]['volgorde'] + 1) if max_volgorde.data else 0
+
+
+async def _insert_in_batches(db, tabel: str, rijen: List[dict], batch: int) -> List[dict]:
+    """Multi-row inserts van `batch` rijen; bij een fout worden eerdere batches teruggedraaid."""
+    aangemaakt: List[dict] = []
+    try:
+        for start in range(0, len(rijen), batch):
+            response = await db.table(tabel).insert(rijen[start:start + batch]).execute()
+            if len(response.data or []) != len(rijen[start:start + batch]):
+                raise RuntimeError(f"insert in {tabel} gaf {len(response.data or [])} rijen terug")
+            aangemaakt.extend(response.data)
+    except Exception:
+        if aangemaakt:
+            await db.table(tabel).delete().in_('id', [r['id'] for r in aangemaakt]).execute()
+        raise
+    return aangemaakt
+
+
+async def _importeer_regels(db, user_id: str, case_id: str,
+                            vorderingen: List[VorderingCreate],
+                            deelbetalingen: List[DeelbetalingCreate]) -> CaseLinesImportResponse:
+    """
+    Voeg vorderingen en deelbetalingen in één keer toe: rechten en limieten
+    één keer controleren, volgorde in het geheugen toekennen en per tabel
+    in multi-row inserts wegschrijven.
+    """
+    settings = get_settings()
+    if not vorderingen and not deelbetalingen:
+        raise HTTPException(status_code=400, detail="Geen regels om te importeren")
+    if len(vorderingen) + len(deelbetalingen) > settings.import_max_regels:
+        raise HTTPException(status_code=400, detail=f"Maximaal {settings.import_max_regels} regels per import")
+
+    # De tier tegelijk met de rechten: beide limietchecks lezen hem daarna uit de request memo
+    kan_bewerken, _ = await asyncio.gather(can_edit_case(db, case_id, user_id), get_user_tier(user_id, db))
+    if not kan_bewerken:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    limiet_vorderingen, limiet_deelbetalingen = await asyncio.gather(
+        check_vordering_limit(user_id, case_id, db, aantal=len(vorderingen)) if vorderingen else _geen(),
+        check_deelbetaling_limit(user_id, case_id, db, aantal=len(deelbetalingen)) if deelbetalingen else _geen(),
+    )
+    if limiet_vorderingen or limiet_deelbetalingen:
+        raise HTTPException(status_code=403, detail=limiet_vorderingen or limiet_deelbetalingen)
+
+    volgorde_v, volgorde_d = await asyncio.gather(
+        _volgende_volgorde(db, 'vorderingen', case_id) if vorderingen else _geen(),
+        _volgende_volgorde(db, 'deelbetalingen', case_id) if deelbetalingen else _geen(),
+    )
+    v_rijen = [{'case_id': case_id, **_vordering_rij(v), 'volgorde': volgorde_v + i}
+               for i, v in enumerate(vorderingen)]
+    d_rijen = [{'case_id': case_id, **_deelbetaling_rij(d), 'volgorde': volgorde_d + i}
+               for i, d in enumerate(deelbetalingen)]
+
+    try:
+        aangemaakt_v = await _insert_in_batches(db, 'vorderingen', v_rijen, settings.import_insert_batch)
+        try:
+            aangemaakt_d = await _insert_in_batches(db, 'deelbetalingen', d_rijen, settings.import_insert_batch)
+        except Exception:
+            if aangemaakt_v:
+                await db.table('vorderingen').delete().in_('id', [r['id'] for r in aangemaakt_v]).execute()
+            raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import mislukt: {e}")
+
+    return CaseLinesImportResponse(
+        vorderingen=[VorderingResponse(**r) for r in aangemaakt_v],
+        deelbetalingen=[DeelbetalingResponse(**r) for r in aangemaakt_d],
+    )
+
+
+@router.post("/{case_id}/import", response_model=CaseLinesImportResponse)
+@query_budget(max_queries=10, max_ms=2000)
+async def import_lines(case_id: str, regels: CaseLinesImport, user_id: str = Depends(get_current_user)):
+    """Bulk import of vorderingen and deelbetalingen (JSON)."""
+    db = await get_db()
+    return await _importeer_regels(db, user_id, case_id, regels.vorderingen, regels.deelbetalingen)
+
+
+@router.post("/{case_id}/import/bestand", response_model=CaseLinesImportResponse)
+@query_budget(max_queries=10, max_ms=3000)
+async def import_lines_file(case_id: str, bestand: UploadFile = File(...), user_id: str = Depends(get_current_user)):
+    """
+    Bulk import of vorderingen and deelbetalingen from CSV or Excel.
+
+    All rows are validated first; if any row is invalid nothing is imported
+    and the response (422) lists the errors per row.
+    """
+    inhoud = await bestand.read()
+    try:
+        vorderingen, deelbetalingen, fouten = lees_regels(inhoud, bestand.filename or "")
+    except ImportFout as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fouten:
+        raise HTTPException(status_code=422, detail=fouten)
+
+    db = await get_db()
+    return await _importeer_regels(db, user_id, case_id, vorderingen, deelbetalingen)
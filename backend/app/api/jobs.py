@@ -0,0 +1,61 @@
+"""
+Jobs API: status en resultaat van achtergrondjobs.
+
+Endpoints die werk als job aanbieden (met 'Prefer: respond-async') geven
+202 met een job id; hier wordt de status gepolld en het bestand van een
+klaar rapport gedownload.
+"""
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import FileResponse
+
+from app.models import JobResponse
+from app.auth import get_current_user
+from app.services.blob_store import get_blob_store
+from app.services.job_queue import get_job_queue
+
+router = APIRouter()
+
+
+async def _eigen_job(job_id: str, user_id: str) -> dict:
+    job = await get_job_queue().status(job_id)
+    if job is None or job['user_id'] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, response: Response, user_id: str = Depends(get_current_user)):
+    """Status van een job; bij een klaar rapport met de download URL."""
+    job = await _eigen_job(job_id, user_id)
+
+    resultaat = job['resultaat'] or {}
+    if job['status'] in ('wachtend', 'bezig'):
+        response.headers['Retry-After'] = '1'
+    response.headers['Cache-Control'] = 'no-store'
+
+    return JobResponse(
+        **{k: job[k] for k in ('id', 'soort', 'status', 'aangemaakt', 'gestart', 'klaar',
+                               'pogingen', 'fout', 'fout_status')},
+        resultaat=job['resultaat'],
+        bestand_url=f"/api/jobs/{job_id}/bestand" if resultaat.get('bestand') else None,
+    )
+
+
+@router.get("/{job_id}/bestand")
+async def get_job_bestand(job_id: str, user_id: str = Depends(get_current_user)):
+    """Download het bestand (PDF, Excel) van een klaar rapport."""
+    job = await _eigen_job(job_id, user_id)
+
+    resultaat = job['resultaat'] or {}
+    if job['status'] != 'klaar' or not resultaat.get('bestand'):
+        raise HTTPException(status_code=409, detail="Job heeft (nog) geen bestand")
+
+    headers = {"Content-Disposition": f'attachment; filename="{resultaat["filename"]}"'}
+    store = get_blob_store()
+    pad = store.lokaal_pad(resultaat['bestand'])
+    if pad is not None:
+        return FileResponse(pad, media_type=resultaat['media_type'], headers=headers)
+    inhoud = await store.lees(resultaat['bestand'])
+    if inhoud is None:
+        raise HTTPException(status_code=404, detail="Bestand niet gevonden")
+    return Response(content=inhoud, media_type=resultaat['media_type'], headers=headers)
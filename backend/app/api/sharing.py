@@ -9,15 +9,15 @@ from app.models import (
     CaseShareResponse, ColleagueCountResponse
 )
 from app.auth import get_current_user
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_supabase_client
 from app.services.subscription import check_feature
 
 router = APIRouter()
 
 
-def get_db():
+async def get_db():
     """Get Supabase client."""
-    return get_supabase_client()
+    return await get_async_supabase_client()
 
 
 @router.get("/colleagues", response_model=List[ColleagueResponse])
@@ -26,10 +26,10 @@ async def list_colleagues(user_id: str = Depends(get_current_user)):
     List colleagues (users with same email domain) excluding self.
     Returns empty list if no colleagues found.
     """
-    db = get_db()
+    db = await get_db()
 
     # Get current user's email domain
-    user_profile = db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
+    user_profile = await db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
 
     if not user_profile.data:
         return []
@@ -37,7 +37,7 @@ async def list_colleagues(user_id: str = Depends(get_current_user)):
     domain = user_profile.data[0]['email_domain']
 
     # Get all users with same domain except self
-    colleagues = db.table('user_profiles').select(
+    colleagues = await db.table('user_profiles').select(
         'id, email, display_name'
     ).eq('email_domain', domain).neq('id', user_id).order('display_name').execute()
 
@@ -47,16 +47,16 @@ async def list_colleagues(user_id: str = Depends(get_current_user)):
 @router.get("/colleagues/count", response_model=ColleagueCountResponse)
 async def get_colleague_count(user_id: str = Depends(get_current_user)):
     """Get count of available colleagues for sharing."""
-    db = get_db()
+    db = await get_db()
 
-    user_profile = db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
+    user_profile = await db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
 
     if not user_profile.data:
         return ColleagueCountResponse(count=0, domain=None)
 
     domain = user_profile.data[0]['email_domain']
 
-    count_result = db.table('user_profiles').select(
+    count_result = await db.table('user_profiles').select(
         'id', count='exact'
     ).eq('email_domain', domain).neq('id', user_id).execute()
 
@@ -70,21 +70,21 @@ async def share_case(
     user_id: str = Depends(get_current_user)
 ):
     """Share a case with a colleague."""
-    db = get_db()
+    db = await get_db()
 
     # Check sharing permission
-    error = check_feature(user_id, 'sharing', db)
+    error = await check_feature(user_id, 'sharing', db)
     if error:
         raise HTTPException(status_code=403, detail=error)
 
     # Verify case ownership
-    case = db.table('cases').select('id, user_id').eq('id', case_id).execute()
+    case = await db.table('cases').select('id, user_id').eq('id', case_id).execute()
     if not case.data or case.data[0]['user_id'] != user_id:
         raise HTTPException(status_code=404, detail="Case not found")
 
     # Verify target user is a colleague (same domain)
-    user_profile = db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
-    target_profile = db.table('user_profiles').select(
+    user_profile = await db.table('user_profiles').select('email_domain').eq('id', user_id).execute()
+    target_profile = await db.table('user_profiles').select(
         'id, email, display_name, email_domain'
     ).eq('id', share.shared_with_user_id).execute()
 
@@ -108,7 +108,7 @@ async def share_case(
         'permission': share.permission,
     }
 
-    response = db.table('case_shares').upsert(
+    response = await db.table('case_shares').upsert(
         share_data,
         on_conflict='case_id,shared_with_user_id'
     ).execute()
@@ -130,15 +130,15 @@ async def unshare_case(
     user_id: str = Depends(get_current_user)
 ):
     """Remove sharing for a specific user (owner only)."""
-    db = get_db()
+    db = await get_db()
 
     # Verify case ownership
-    case = db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
+    case = await db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
     if not case.data:
         raise HTTPException(status_code=404, detail="Case not found")
 
     # Delete share
-    db.table('case_shares').delete().eq('case_id', case_id).eq(
+    await db.table('case_shares').delete().eq('case_id', case_id).eq(
         'shared_with_user_id', shared_with_user_id
     ).execute()
 
@@ -151,10 +151,10 @@ async def leave_shared_case(
     user_id: str = Depends(get_current_user)
 ):
     """Leave a shared case (recipient removes themselves from share)."""
-    db = get_db()
+    db = await get_db()
 
     # Verify user is a recipient of this share (not the owner)
-    share = db.table('case_shares').select('id').eq('case_id', case_id).eq(
+    share = await db.table('case_shares').select('id').eq('case_id', case_id).eq(
         'shared_with_user_id', user_id
     ).execute()
 
@@ -162,7 +162,7 @@ async def leave_shared_case(
         raise HTTPException(status_code=404, detail="Share not found")
 
     # Delete the share
-    db.table('case_shares').delete().eq('case_id', case_id).eq(
+    await db.table('case_shares').delete().eq('case_id', case_id).eq(
         'shared_with_user_id', user_id
     ).execute()
 
@@ -175,22 +175,22 @@ async def get_case_shares(
     user_id: str = Depends(get_current_user)
 ):
     """Get all shares for a case (owner only)."""
-    db = get_db()
+    db = await get_db()
 
     # Verify case ownership
-    case = db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
+    case = await db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
     if not case.data:
         raise HTTPException(status_code=404, detail="Case not found")
 
     # Get shares with user details
-    shares = db.table('case_shares').select('*').eq('case_id', case_id).execute()
+    shares = await db.table('case_shares').select('*').eq('case_id', case_id).execute()
 
     if not shares.data:
         return []
 
     # Get user details for each share
     user_ids = [s['shared_with_user_id'] for s in shares.data]
-    users = db.table('user_profiles').select('id, email, display_name').in_('id', user_ids).execute()
+    users = await db.table('user_profiles').select('id, email, display_name').in_('id', user_ids).execute()
     users_map = {u['id']: u for u in users.data}
 
     results = []
@@ -212,17 +212,17 @@ async def update_share_permission(
     user_id: str = Depends(get_current_user)
 ):
     """Update sharing permission."""
-    db = get_db()
+    db = await get_db()
 
     if permission not in ('view', 'edit'):
         raise HTTPException(status_code=400, detail="Ongeldige permissie")
 
     # Verify case ownership
-    case = db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
+    case = await db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
     if not case.data:
         raise HTTPException(status_code=404, detail="Case not found")
 
-    response = db.table('case_shares').update({'permission': permission}).eq(
+    response = await db.table('case_shares').update({'permission': permission}).eq(
         'case_id', case_id
     ).eq('shared_with_user_id', shared_with_user_id).execute()
 
@@ -1,234 +1,311 @@
 """
 Snapshots API routes with Supabase integration
 """
-from typing import List
+import asyncio
+import base64
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+from uuid import UUID, uuid4
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import FileResponse, Response
 
-from app.models import SnapshotResponse
+from app.models import SnapshotResponse, SnapshotDiff, JobAccepted
 from app.auth import get_current_user
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_supabase_client
 from app.services.subscription import get_user_tier, check_feature
+from app.services.case_berekening import bereken_case, laad_opgeslagen, ZaakZonderVorderingen
+from app.services.etag import CACHE_CONTROL, etag_matcht, maak_etag, niet_gewijzigd
+from app.services.snapshot_pdf import pdf_sleutel, snapshot_pdf, verwijder_snapshot_pdfs
+from app.services.snapshot_opslag import bewaar_resultaat, laad_resultaat, ruim_blokken_op
+from app.services.snapshot_diff import diff_snapshots
+from app.services.job_queue import dien_job_in, registreer_job_soort, wil_async
 
 router = APIRouter()
 
 
-def get_db():
+async def get_db():
     """Get Supabase client."""
-    return get_supabase_client()
+    return await get_async_supabase_client()
 
 
-@router.get("/case/{case_id}", response_model=List[SnapshotResponse])
-async def list_snapshots(case_id: str, user_id: str = Depends(get_current_user)):
-    """List all snapshots for a case."""
-    db = get_db()
+# Kolommen van de snapshot lijst: nooit invoer_json / resultaat_json
+_LIJST_KOLOMMEN = 'id, created_at, einddatum, totaal_openstaand'
 
-    # Verify case ownership
-    case = db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute()
-    if not case.data:
-        raise HTTPException(status_code=404, detail="Case not found")
 
-    response = db.table('snapshots').select('*').eq('case_id', case_id).order('created_at', desc=True).execute()
+def _maak_cursor(snapshot: dict) -> str:
+    return base64.urlsafe_b64encode(f"{snapshot['created_at']}|{snapshot['id']}".encode()).decode()
+
 
-    return [SnapshotResponse(**s) for s in response.data]
+def _lees_cursor(cursor: str):
+    """(created_at, id) uit een cursor; 400 als hij niet te lezen is."""
+    try:
+        created_at, snapshot_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        UUID(snapshot_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ongeldige cursor")
+    return created_at, snapshot_id
 
 
-@router.post("/case/{case_id}", response_model=SnapshotResponse)
-async def create_snapshot(case_id: str, user_id: str = Depends(get_current_user)):
+@router.get("/case/{case_id}", response_model=List[SnapshotResponse])
+async def list_snapshots(
+    case_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Max snapshots per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    user_id: str = Depends(get_current_user),
+):
     """
-    Create a new snapshot for a case.
+    List the snapshots of a case, newest first.
 
-    This runs the calculation on the current case data and saves:
-    - The input (vorderingen + deelbetalingen)
-    - The calculation result
-    - Generated PDF (TODO)
+    Only the list columns are selected, never the invoer/resultaat blobs.
+    Paginated on (created_at, id); if there are more snapshots, the cursor
+    for the next page is in the X-Next-Cursor header.
     """
-    from app.api.berekening import bereken_rente
-    from app.models.berekening import BerekeningRequest, VorderingInput, DeelbetalingInput
+    db = await get_db()
+
+    query = db.table('snapshots').select(_LIJST_KOLOMMEN).eq('case_id', case_id)
+    if cursor:
+        created_at, snapshot_id = _lees_cursor(cursor)
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{snapshot_id})')
+
+    # Ownership check and the page at once; the page is discarded without access
+    case, page = await asyncio.gather(
+        db.table('cases').select('id').eq('id', case_id).eq('user_id', user_id).execute(),
+        query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute(),
+    )
+    if not case.data:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    snapshots = page.data
+    if len(snapshots) > limit:
+        snapshots = snapshots[:limit]
+        response.headers['X-Next-Cursor'] = _maak_cursor(snapshots[-1])
+
+    return [SnapshotResponse(**s) for s in snapshots]
 
-    db = get_db()
 
-    # Check snapshots permission
-    error = check_feature(user_id, 'snapshots', db)
+async def _zaak_voor_snapshot(db, case_id: str, user_id: str):
+    """De zaak (ownership check) en de opgeslagen berekening; 403 zonder snapshots feature."""
+    # Check snapshots permission, get case (ownership check) and stored calculation at once
+    error, case_response, opgeslagen = await asyncio.gather(
+        check_feature(user_id, 'snapshots', db),
+        db.table('cases').select('*').eq('id', case_id).eq('user_id', user_id).execute(),
+        laad_opgeslagen(db, case_id),
+    )
     if error:
         raise HTTPException(status_code=403, detail=error)
-
-    # Get case with ownership check
-    case_response = db.table('cases').select('*').eq('id', case_id).eq('user_id', user_id).execute()
     if not case_response.data:
         raise HTTPException(status_code=404, detail="Case not found")
+    return case_response.data[0], opgeslagen
 
-    case = case_response.data[0]
-
-    # Get vorderingen
-    vord_response = db.table('vorderingen').select('*').eq('case_id', case_id).order('volgorde').execute()
-    vorderingen = vord_response.data
-
-    if not vorderingen:
-        raise HTTPException(status_code=400, detail="Case has no vorderingen")
-
-    # Get deelbetalingen
-    deel_response = db.table('deelbetalingen').select('*').eq('case_id', case_id).order('datum').execute()
-    deelbetalingen = deel_response.data
-
-    # Build calculation request
-    berekening_request = BerekeningRequest(
-        einddatum=case['einddatum'],
-        strategie=case['strategie'],
-        vorderingen=[
-            VorderingInput(
-                kenmerk=v['kenmerk'],
-                bedrag=v['bedrag'],
-                datum=v['datum'],
-                rentetype=v['rentetype'],
-                kosten=v['kosten'],
-                opslag=v.get('opslag'),
-                opslag_ingangsdatum=v.get('opslag_ingangsdatum'),
-            )
-            for v in vorderingen
-        ],
-        deelbetalingen=[
-            DeelbetalingInput(
-                kenmerk=d.get('kenmerk'),
-                bedrag=d['bedrag'],
-                datum=d['datum'],
-                aangewezen=d.get('aangewezen', []),
-            )
-            for d in deelbetalingen
-        ],
-    )
-
-    # Run calculation
-    result = await bereken_rente(berekening_request)
-
-    # Serialize for storage
-    invoer_json = {
-        'case': {
-            'naam': case['naam'],
-            'einddatum': str(case['einddatum']),
-            'strategie': case['strategie'],
-        },
-        'vorderingen': [
-            {
-                'kenmerk': v['kenmerk'],
-                'bedrag': str(v['bedrag']),
-                'datum': str(v['datum']),
-                'rentetype': v['rentetype'],
-                'kosten': str(v['kosten']),
-                'opslag': str(v['opslag']) if v.get('opslag') else None,
-                'opslag_ingangsdatum': str(v['opslag_ingangsdatum']) if v.get('opslag_ingangsdatum') else None,
-            }
-            for v in vorderingen
-        ],
-        'deelbetalingen': [
-            {
-                'kenmerk': d.get('kenmerk'),
-                'bedrag': str(d['bedrag']),
-                'datum': str(d['datum']),
-                'aangewezen': d.get('aangewezen', []),
-            }
-            for d in deelbetalingen
-        ],
-    }
 
-    # Convert result to dict
-    resultaat_json = result.model_dump(mode='json')
+async def _maak_snapshot(db, case: dict, opgeslagen, snapshot_id: str) -> dict:
+    """Bereken (of gebruik de opgeslagen berekening) en sla de snapshot op; geeft de rij."""
+    try:
+        berekening = await bereken_case(db, case, opgeslagen)
+    except ZaakZonderVorderingen as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     snapshot_data = {
-        'case_id': case_id,
+        'id': snapshot_id,
+        'case_id': case['id'],
         'einddatum': str(case['einddatum']),
-        'totaal_openstaand': float(result.totalen.openstaand),
-        'pdf_url': None,
-        'invoer_json': invoer_json,
-        'resultaat_json': resultaat_json,
+        'totaal_openstaand': float(berekening.resultaat_json['totalen']['openstaand']),
+        'pdf_url': f"/api/snapshots/{snapshot_id}/pdf",
+        'invoer_json': berekening.invoer_json,
+        # Manifest; de blokken zelf staan in snapshot_blokken
+        'resultaat_json': await bewaar_resultaat(db, berekening.resultaat_json),
     }
 
-    response = db.table('snapshots').insert(snapshot_data).execute()
+    response = await db.table('snapshots').insert(snapshot_data).execute()
 
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create snapshot")
 
-    return SnapshotResponse(**response.data[0])
+    return response.data[0]
+
+
+@router.post("/case/{case_id}", response_model=SnapshotResponse, responses={202: {"model": JobAccepted}})
+async def create_snapshot(case_id: str, request: Request, user_id: str = Depends(get_current_user)):
+    """
+    Create a new snapshot for a case.
+
+    This uses the calculation of the current case revision (stored, or
+    calculated now) and saves:
+    - The input (vorderingen + deelbetalingen)
+    - The calculation result
+
+    The PDF is not part of the snapshot row: pdf_url points to
+    GET /api/snapshots/{id}/pdf, which renders it once per variant (clean or
+    watermarked) on the first download and serves it from the blob store
+    afterwards.
+
+    With 'Prefer: respond-async' the permission check runs now and the
+    snapshot is made by a job: 202 with JobAccepted (job_id, status_url) and
+    a Location header. GET /api/jobs/{id} gives the snapshot once the job is
+    done.
+    """
+    db = await get_db()
+
+    case, opgeslagen = await _zaak_voor_snapshot(db, case_id, user_id)
+
+    # Eigen id, zodat pdf_url direct naar de (bij eerste download gerenderde) PDF kan wijzen
+    snapshot_id = str(uuid4())
+    if wil_async(request):
+        return await dien_job_in('snapshot', user_id, {'case_id': case_id, 'snapshot_id': snapshot_id})
+
+    return SnapshotResponse(**await _maak_snapshot(db, case, opgeslagen, snapshot_id))
+
+
+async def _snapshot_job(job_id: str, user_id: str, invoer: dict) -> dict:
+    """Job 'snapshot'; het snapshot id ligt vast, zodat een herhaalde poging geen tweede snapshot maakt."""
+    db = await get_db()
+
+    # Een eerdere poging kan de snapshot al opgeslagen hebben (crash net daarna)
+    bestaand = await db.table('snapshots').select(_LIJST_KOLOMMEN).eq('id', invoer['snapshot_id']).execute()
+    if bestaand.data:
+        rij = bestaand.data[0]
+    else:
+        case, opgeslagen = await _zaak_voor_snapshot(db, invoer['case_id'], user_id)
+        rij = await _maak_snapshot(db, case, opgeslagen, invoer['snapshot_id'])
+    return {'snapshot': SnapshotResponse(**rij).model_dump(mode='json')}
+
+
+registreer_job_soort('snapshot', _snapshot_job)
 
 
 @router.get("/{snapshot_id}", response_model=dict)
 async def get_snapshot(snapshot_id: str, user_id: str = Depends(get_current_user)):
     """Get full snapshot data including invoer and resultaat."""
-    db = get_db()
+    db = await get_db()
 
     # Get snapshot with case ownership check
-    response = db.table('snapshots').select('*, cases!inner(user_id)').eq('id', snapshot_id).execute()
+    response = await db.table('snapshots').select('*, cases!inner(user_id)').eq('id', snapshot_id).execute()
 
     if not response.data or response.data[0]['cases']['user_id'] != user_id:
         raise HTTPException(status_code=404, detail="Snapshot not found")
 
     snapshot = response.data[0]
 
+    try:
+        resultaat = await laad_resultaat(db, snapshot['resultaat_json'])
+    except LookupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
     return {
         'id': snapshot['id'],
         'created_at': snapshot['created_at'],
         'einddatum': snapshot['einddatum'],
         'totaal_openstaand': snapshot['totaal_openstaand'],
         'invoer': snapshot['invoer_json'],
-        'resultaat': snapshot['resultaat_json'],
+        'resultaat': resultaat,
     }
 
 
 @router.get("/{snapshot_id}/pdf")
-async def get_snapshot_pdf(snapshot_id: str, user_id: str = Depends(get_current_user)):
-    """Download snapshot as PDF."""
-    from app.services.pdf_generator import generate_pdf
-    from datetime import datetime
-
-    db = get_db()
+async def get_snapshot_pdf(snapshot_id: str, request: Request, user_id: str = Depends(get_current_user)):
+    """
+    Download snapshot as PDF.
 
-    # Get snapshot with case ownership check
-    response = db.table('snapshots').select('*, cases!inner(user_id)').eq('id', snapshot_id).execute()
+    De PDF wordt per variant (schoon / watermerk, volgens de huidige tier)
+    één keer gerenderd en daarna uit de blob store geserveerd.
+    """
+    db = await get_db()
+
+    # Snapshot (zonder de blobs) with case ownership check, and the tier for the watermark
+    response, tier = await asyncio.gather(
+        db.table('snapshots').select(
+            'id, created_at, naam:invoer_json->case->>naam, cases!inner(user_id)'
+        ).eq('id', snapshot_id).execute(),
+        get_user_tier(user_id, db),
+    )
 
     if not response.data or response.data[0]['cases']['user_id'] != user_id:
         raise HTTPException(status_code=404, detail="Snapshot not found")
 
     snapshot = response.data[0]
+    watermark = not tier.mag_pdf_schoon
+
+    etag = maak_etag('snapshot-pdf', pdf_sleutel(snapshot_id, watermark))
+    if etag_matcht(request, etag):
+        return niet_gewijzigd(etag)
 
     # Parse created_at for filename
     created_at = datetime.fromisoformat(snapshot['created_at'].replace('Z', '+00:00'))
 
-    # Check tier for watermark
-    tier = get_user_tier(user_id, db)
-    watermark = not tier.mag_pdf_schoon
+    try:
+        pad, pdf_bytes = await snapshot_pdf(db, snapshot_id, created_at, watermark)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
 
-    # Generate PDF
-    pdf_bytes = generate_pdf(
-        invoer=snapshot['invoer_json'],
-        resultaat=snapshot['resultaat_json'],
-        snapshot_created=created_at,
-        watermark=watermark,
-    )
+    naam = (snapshot.get('naam') or 'snapshot').replace(' ', '_')
+    filename = f"renteberekening_{naam}_{created_at.strftime('%Y%m%d_%H%M')}.pdf"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+    if pad is not None:
+        # Lokaal bewaard: in blokken streamen (met Content-Length)
+        return FileResponse(pad, media_type="application/pdf", headers=headers)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
-    filename = f"renteberekening_{snapshot['invoer_json']['case']['naam'].replace(' ', '_')}_{created_at.strftime('%Y%m%d_%H%M')}.pdf"
 
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+@router.get("/{snapshot_id}/diff/{ander_id}", response_model=SnapshotDiff)
+async def diff_snapshot(snapshot_id: str, ander_id: str, user_id: str = Depends(get_current_user)):
+    """
+    Verschillen tussen twee snapshots van dezelfde zaak (a = snapshot_id,
+    b = ander_id), zonder opnieuw te rekenen: alleen gewijzigde totalen,
+    vorderingen (met periodes) en deelbetalingen (met toerekeningen).
+    """
+    db = await get_db()
+
+    # Beide snapshots in één query, with case ownership check
+    response = await db.table('snapshots').select(
+        'id, case_id, created_at, einddatum, resultaat_json, cases!inner(user_id)'
+    ).in_('id', [snapshot_id, ander_id]).execute()
+
+    snapshots = {s['id']: s for s in response.data if s['cases']['user_id'] == user_id}
+    if snapshot_id not in snapshots or ander_id not in snapshots:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+    a, b = snapshots[snapshot_id], snapshots[ander_id]
+    if a['case_id'] != b['case_id']:
+        raise HTTPException(status_code=400, detail="Snapshots horen niet bij dezelfde zaak")
+
+    try:
+        verschillen = await diff_snapshots(db, a['resultaat_json'], b['resultaat_json'])
+    except LookupError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return SnapshotDiff(
+        a={'id': a['id'], 'created_at': a['created_at'], 'einddatum': a['einddatum']},
+        b={'id': b['id'], 'created_at': b['created_at'], 'einddatum': b['einddatum']},
+        **verschillen,
     )
 
 
 @router.delete("/{snapshot_id}")
 async def delete_snapshot(snapshot_id: str, user_id: str = Depends(get_current_user)):
     """Delete a snapshot."""
-    db = get_db()
+    db = await get_db()
 
     # Get snapshot with case ownership check
-    response = db.table('snapshots').select('*, cases!inner(user_id)').eq('id', snapshot_id).execute()
+    # (blokken: de hashes uit het manifest; NULL bij een snapshot als gewone JSON)
+    response = await db.table('snapshots').select(
+        'id, blokken:resultaat_json->blokken, cases!inner(user_id)'
+    ).eq('id', snapshot_id).execute()
 
     if not response.data or response.data[0]['cases']['user_id'] != user_id:
         raise HTTPException(status_code=404, detail="Snapshot not found")
 
-    db.table('snapshots').delete().eq('id', snapshot_id).execute()
+    await db.table('snapshots').delete().eq('id', snapshot_id).execute()
+    await asyncio.gather(
+        verwijder_snapshot_pdfs(snapshot_id),
+        ruim_blokken_op(db, response.data[0].get('blokken')),
+    )
 
     return {"status": "deleted"}
@@ -8,7 +8,7 @@ from typing import Optional, List
 from datetime import datetime
 
 from app.auth import get_current_user
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_supabase_client
 
 router = APIRouter(prefix="/api/usage", tags=["usage"])
 
@@ -41,7 +41,7 @@ async def log_usage(log: UsageLogCreate, user_id: str = Depends(get_current_user
     if log.action_type not in ['calculation', 'pdf_view']:
         raise HTTPException(status_code=400, detail="Invalid action_type. Must be 'calculation' or 'pdf_view'")
 
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
 
     data = {
         "user_id": user_id,
@@ -53,7 +53,7 @@ async def log_usage(log: UsageLogCreate, user_id: str = Depends(get_current_user
     if log.case_name:
         data["case_name"] = log.case_name
 
-    result = supabase.table("usage_logs").insert(data).execute()
+    result = await supabase.table("usage_logs").insert(data).execute()
 
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to log usage")
@@ -64,10 +64,10 @@ async def log_usage(log: UsageLogCreate, user_id: str = Depends(get_current_user
 @router.get("/stats", response_model=UsageStats)
 async def get_usage_stats(user_id: str = Depends(get_current_user)):
     """Get usage statistics for the current user."""
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
 
     # Get all logs for user
-    result = supabase.table("usage_logs").select("*").eq("user_id", user_id).execute()
+    result = await supabase.table("usage_logs").select("*").eq("user_id", user_id).execute()
 
     logs = result.data or []
 
@@ -92,13 +92,13 @@ async def get_usage_logs(
     user_id: str = Depends(get_current_user)
 ):
     """Get usage logs for the current user."""
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
 
     query = supabase.table("usage_logs").select("*").eq("user_id", user_id)
 
     if action_type:
         query = query.eq("action_type", action_type)
 
-    result = query.order("created_at", desc=True).limit(limit).execute()
+    result = await query.order("created_at", desc=True).limit(limit).execute()
 
     return result.data or []
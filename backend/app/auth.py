@@ -2,36 +2,68 @@
 Authentication middleware for Supabase JWT verification
 """
 import logging
-from typing import Optional
+import time
+from typing import Dict, Optional
 from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.db.supabase import get_supabase_client
+from app.db.supabase import get_async_supabase_client
+from app.services.jwt_verifier import get_jwt_verifier
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer(auto_error=False)
 
 
-def ensure_user_profile(user_id: str, email: str) -> None:
+# user_id → tijdstip tot wanneer de bootstrap niet opnieuw hoeft (per process)
+_bootstrapped: Dict[str, float] = {}
+_BOOTSTRAPPED_MAX = 10_000
+
+
+async def ensure_user_profile(user_id: str, email: str) -> None:
     """
-    Ensure user has a profile and default role. Idempotent.
+    Ensure user has a profile, default role and subscription. Idempotent.
 
     This is the "lazy initialization" pattern - guarantees user data exists
     regardless of whether database triggers fired correctly.
 
-    Called on every authenticated request (fast path if already exists).
+    Called on every authenticated request. After the first success for a
+    user nothing is queried until USER_BOOTSTRAP_TTL expires; the bootstrap
+    itself is one RPC (ensure_user_bootstrap, migration 012), with the
+    per-table checks as fallback when that function does not exist yet.
     """
-    db = get_supabase_client()
+    from app.config import get_settings
+
+    nu = time.monotonic()
+    if _bootstrapped.get(user_id, 0) > nu:
+        return
+
+    db = await get_async_supabase_client()
+    try:
+        await db.rpc('ensure_user_bootstrap', {'p_user_id': user_id, 'p_email': email}).execute()
+    except Exception as e:
+        logger.debug(f"ensure_user_bootstrap niet beschikbaar, per tabel: {e}")
+        await _ensure_user_profile_per_tabel(db, user_id, email)
+
+    if len(_bootstrapped) >= _BOOTSTRAPPED_MAX:
+        # Verlopen entries opruimen; is alles nog geldig, dan opnieuw beginnen
+        for verlopen in [u for u, tot in _bootstrapped.items() if tot <= nu]:
+            del _bootstrapped[verlopen]
+        if len(_bootstrapped) >= _BOOTSTRAPPED_MAX:
+            _bootstrapped.clear()
+    _bootstrapped[user_id] = nu + get_settings().user_bootstrap_ttl
+
 
+async def _ensure_user_profile_per_tabel(db, user_id: str, email: str) -> None:
+    """Bootstrap zonder RPC: per tabel controleren en zo nodig aanmaken."""
     # Check if profile exists (fast path)
-    profile = db.table('user_profiles').select('id').eq('id', user_id).execute()
+    profile = await db.table('user_profiles').select('id').eq('id', user_id).execute()
 
     if not profile.data:
         # Create profile
         display_name = email.split('@')[0] if email else None
         try:
-            db.table('user_profiles').insert({
+            await db.table('user_profiles').insert({
                 'id': user_id,
                 'email': email,
                 'display_name': display_name
@@ -43,12 +75,12 @@ def ensure_user_profile(user_id: str, email: str) -> None:
                 logger.warning(f"Failed to create user_profile for {email}: {e}")
 
     # Check if user has any role (fast path)
-    roles = db.table('user_roles').select('id').eq('user_id', user_id).execute()
+    roles = await db.table('user_roles').select('id').eq('user_id', user_id).execute()
 
     if not roles.data:
         # Assign default 'user' role
         try:
-            db.table('user_roles').insert({
+            await db.table('user_roles').insert({
                 'user_id': user_id,
                 'role': 'user'
             }).execute()
@@ -60,9 +92,9 @@ def ensure_user_profile(user_id: str, email: str) -> None:
 
     # Ensure user has a subscription (free tier by default)
     try:
-        subs = db.table('user_subscriptions').select('id').eq('user_id', user_id).execute()
+        subs = await db.table('user_subscriptions').select('id').eq('user_id', user_id).execute()
         if not subs.data:
-            db.table('user_subscriptions').insert({
+            await db.table('user_subscriptions').insert({
                 'user_id': user_id,
                 'tier_id': 'free',
                 'status': 'active'
@@ -81,6 +113,8 @@ async def get_current_user(
     """
     Verify JWT token and return user_id.
 
+    The token is verified in-process (see services.jwt_verifier); only when
+    that is not possible does it fall back to supabase.auth.get_user.
     Also ensures user profile and default role exist (lazy initialization).
 
     For development: if no token provided and debug mode, return demo-user.
@@ -97,19 +131,24 @@ async def get_current_user(
     token = credentials.credentials
 
     try:
-        supabase = get_supabase_client()
-        # Verify the JWT with Supabase
-        user_response = supabase.auth.get_user(token)
+        # Verify the JWT locally (signature, exp, audience); None = niet lokaal te verifiëren
+        gebruiker = await get_jwt_verifier().verifieer_async(token)
+        if gebruiker is not None:
+            user_id, email = gebruiker
+        else:
+            # Fallback: verify the JWT with Supabase
+            supabase = await get_async_supabase_client()
+            user_response = await supabase.auth.get_user(token)
 
-        if user_response.user is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
+            if user_response.user is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
 
-        user_id = str(user_response.user.id)
-        email = user_response.user.email
+            user_id = str(user_response.user.id)
+            email = user_response.user.email
 
         # Ensure profile and role exist (idempotent, fast if already exists)
         if email:
-            ensure_user_profile(user_id, email)
+            await ensure_user_profile(user_id, email)
 
         return user_id
 
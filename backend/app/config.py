@@ -13,6 +13,16 @@ class Settings(BaseSettings):
     supabase_key: str = ""  # Fallback for single key setup
     supabase_anon_key: str = ""
     supabase_service_role_key: str = ""
+    supabase_pool_size: int = 20  # Gelijktijdige HTTP verbindingen van de async client
+    supabase_timeout: float = 30.0  # Seconden per database request
+
+    # Lokale JWT verificatie (zonder round-trip naar de auth server)
+    supabase_jwt_secret: str = ""  # HS256 projecten (Settings → API → JWT secret)
+    jwt_jwks: bool = True  # Asymmetrische tokens via de JWKS endpoint van het project
+    jwt_audience: str = "authenticated"
+    jwt_cache_ttl: float = 300.0  # Seconden dat een geverifieerd token gecached blijft
+    jwt_jwks_ttl: float = 3600.0  # Seconden dat de JWKS sleutels gecached blijven
+    user_bootstrap_ttl: float = 3600.0  # Seconden tot profiel/rol/abonnement opnieuw gecontroleerd worden
 
     # App
     app_name: str = "Rentetool"
@@ -24,6 +34,50 @@ class Settings(BaseSettings):
         "https://rentetool.vercel.app",
     ]
 
+    # Worker pool voor CPU-zware berekeningen en rapportgeneratie
+    worker_pool_type: str = "thread"  # 'thread' of 'process'
+    worker_pool_size: int = 2
+    worker_queue_max: int = 16  # Max lopende + wachtende jobs, daarna 503
+    worker_job_timeout: float = 60.0  # Seconden per job, daarna 504
+
+    # Batch berekeningen (/api/bereken/batch), eigen pool naast de worker pool
+    batch_pool_type: str = "process"  # 'thread' of 'process'
+    batch_pool_size: int = 0  # 0 = aantal CPU's
+    batch_max_items: int = 10_000  # Max zaken per batch request
+
+    # Bulk import van vorderingen/deelbetalingen (/api/cases/{id}/import)
+    import_max_regels: int = 5_000  # Max regels per import
+    import_insert_batch: int = 500  # Rijen per multi-row insert
+
+    # Blob store voor snapshot PDF's: 'local' (map op schijf) of 'supabase' (Storage bucket)
+    blob_store: str = "local"
+    blob_store_pad: str = "data/blobs"
+    blob_store_bucket: str = "snapshots"
+    # Ongebruikte snapshot blokken (migratie 016) elke N seconden opruimen (0 = uit)
+    snapshot_blokken_opruimen: float = 3600.0
+
+    # Job queue (snapshots, PDF/Excel rapporten met 'Prefer: respond-async'), persistent in SQLite
+    job_queue_pad: str = "data/jobs.sqlite3"
+    job_queue_gelijktijdig: int = 2  # Jobs tegelijk (per proces)
+    job_queue_max_wachtend: int = 100  # Daarna 503
+    job_max_pogingen: int = 3  # Pogingen na een crash/herstart, daarna 'mislukt'
+    job_heartbeat: float = 10.0  # Seconden; zonder heartbeat na 3x dit is een job onderbroken
+    job_bewaar: float = 86_400.0  # Seconden dat afgeronde jobs (en hun bestanden) bewaard blijven
+
+    # Optioneel schema (sharing, subscriptions): bij start gedetecteerd, daarna elke N seconden (0 = niet verversen)
+    schema_capabilities_refresh: float = 300.0
+
+    # Subscription tiers: user → tier kort cachen, de tiers tabel langer (admin wijzigingen invalideren direct)
+    tier_cache_ttl: float = 60.0
+    tiers_cache_ttl: float = 300.0
+
+    # Result cache voor berekeningen (LRU)
+    berekening_cache_items: int = 256
+    berekening_cache_periodes: int = 200_000  # Max totaal aantal periodes in de cache
+    # Laatste berekening per zaak, voor incrementeel herberekenen (0 = uit)
+    berekening_checkpoint_items: int = 32
+    berekening_checkpoint_gewicht: int = 200_000  # Max totaal periodes, events en checkpoint-staten
+
     @property
     def effective_service_key(self) -> str:
         """Get service role key, falling back to general key."""
@@ -1,10 +1,23 @@
 """
 Supabase client setup
+
+- get_async_supabase_client(): de client voor routers (async def handlers).
+  Eén gedeelde instantie met één gepoolde HTTP client, zodat DB round-trips
+  van gelijktijdige requests overlappen in plaats van de event loop te
+  blokkeren.
+- get_supabase_client(): synchrone client voor code buiten de event loop
+  (worker threads/processes, achtergrondtaken via asyncio.to_thread).
 """
+import asyncio
 from functools import lru_cache
-from supabase import create_client, Client
+from typing import Optional
+
+import httpx
+from supabase import create_client, Client, acreate_client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions
 
 from app.config import get_settings
+from app.services.request_context import tel_query
 
 
 @lru_cache()
@@ -24,3 +37,44 @@ def get_supabase_anon_client() -> Client:
         settings.supabase_url,
         settings.effective_anon_key
     )
+
+
+_async_client: Optional[AsyncClient] = None
+_async_http: Optional[httpx.AsyncClient] = None
+_async_lock = asyncio.Lock()
+
+
+async def _tel_request(request: httpx.Request):
+    tel_query()
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """Get the shared async Supabase client with service role key (pooled HTTP connections)."""
+    global _async_client, _async_http
+    if _async_client is None:
+        async with _async_lock:
+            if _async_client is None:
+                settings = get_settings()
+                _async_http = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.supabase_pool_size,
+                        max_keepalive_connections=settings.supabase_pool_size,
+                    ),
+                    timeout=settings.supabase_timeout,
+                    event_hooks={'request': [_tel_request]},  # Query budget per request
+                )
+                _async_client = await acreate_client(
+                    settings.supabase_url,
+                    settings.effective_service_key,
+                    options=AsyncClientOptions(httpx_client=_async_http),
+                )
+    return _async_client
+
+
+async def close_async_supabase_client():
+    """Sluit de gedeelde async client en zijn verbindingen (bij afsluiten van de applicatie)."""
+    global _async_client, _async_http
+    if _async_http is not None:
+        await _async_http.aclose()
+    _async_client = None
+    _async_http = None
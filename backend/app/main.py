@@ -1,18 +1,53 @@
 """
 Rentetool API - Main FastAPI Application
 """
-from fastapi import FastAPI
+import json
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
-from app.api import cases, berekening, snapshots, usage, sharing, admin, subscriptions
+from app.api import cases, berekening, snapshots, usage, sharing, admin, subscriptions, jobs
+from app.services.worker_pool import shutdown_worker_pool
+from app.services.job_queue import get_job_queue
+from app.services.request_context import RequestContextMiddleware
+from app.services.schema_capabilities import get_capability_registry
+from app.services.snapshot_opslag import get_blokken_opruimer
+from app.services.rente_calculator import get_rentetabel_cache
+from app.services.etag import maak_etag, etag_matcht, niet_gewijzigd, zet_etag
+from app.db.supabase import close_async_supabase_client
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks."""
+    capabilities = get_capability_registry()
+    await capabilities.start()
+    # Rentetabel vooraf laden, zodat geen request (of geforkte worker) erop wacht
+    try:
+        await get_rentetabel_cache().laad_async()
+    except Exception as e:
+        logger.warning(f"Rentetabel niet vooraf geladen: {e}")
+    await get_job_queue().start()
+    get_blokken_opruimer().start()
+    yield
+    get_blokken_opruimer().stop()
+    await get_job_queue().stop()
+    capabilities.stop()
+    shutdown_worker_pool()
+    await close_async_supabase_client()
+
+
 app = FastAPI(
     title="Rentetool API",
     description="Nederlandse wettelijke rente calculator conform Burgerlijk Wetboek",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware - allow Vercel preview URLs
@@ -25,12 +60,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Location", "Retry-After"],  # Paginering (snapshots), jobs
 )
 
+# Request-scoped memo (tier, rechten) per request
+app.add_middleware(RequestContextMiddleware)
+
 # Include routers
 app.include_router(cases.router, prefix="/api/cases", tags=["cases"])
 app.include_router(berekening.router, prefix="/api", tags=["berekening"])
 app.include_router(snapshots.router, prefix="/api/snapshots", tags=["snapshots"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 app.include_router(usage.router)
 app.include_router(sharing.router, prefix="/api/sharing", tags=["sharing"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
@@ -43,16 +83,38 @@ async def root():
     return {"status": "ok", "app": settings.app_name}
 
 
+# Geserialiseerde rentetabel per versie (alleen de laatste)
+_rentetabel_json: dict = {}
+
+
 @app.get("/api/rentetabel")
-async def get_rentetabel_endpoint():
-    """Get the current interest rate table."""
+async def get_rentetabel_endpoint(request: Request):
+    """
+    Get the current interest rate table.
+
+    ETag = versie van de RenteTabelCache; de JSON wordt per versie één keer
+    opgebouwd.
+    """
     from app.services.rente_calculator import get_rentetabel
 
-    return [
-        {
-            "datum": str(datum),
-            "wettelijk": float(wet),
-            "handels": float(handel)
-        }
-        for datum, wet, handel in get_rentetabel()
-    ]
+    versie = await get_rentetabel_cache().versie_async()
+    etag = maak_etag('rentetabel', versie)
+    if etag_matcht(request, etag):
+        return niet_gewijzigd(etag, 'public, no-cache')
+
+    inhoud = _rentetabel_json.get(versie)
+    if inhoud is None:
+        inhoud = json.dumps([
+            {
+                "datum": str(datum),
+                "wettelijk": float(wet),
+                "handels": float(handel)
+            }
+            for datum, wet, handel in get_rentetabel()
+        ]).encode()
+        _rentetabel_json.clear()
+        _rentetabel_json[versie] = inhoud
+
+    response = Response(content=inhoud, media_type="application/json")
+    zet_etag(response, etag, 'public, no-cache')
+    return response
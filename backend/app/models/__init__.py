@@ -3,13 +3,17 @@ Pydantic models for API requests and responses
 """
 from .vordering import Vordering, VorderingCreate, VorderingResponse
 from .deelbetaling import Deelbetaling, DeelbetalingCreate, DeelbetalingResponse
-from .case import Case, CaseCreate, CaseResponse, CaseWithLines, CaseListResponse
-from .berekening import BerekeningRequest, BerekeningResponse, VorderingResultaat, Periode, Toerekening
-from .snapshot import Snapshot, SnapshotCreate, SnapshotResponse
+from .case import (
+    Case, CaseCreate, CaseResponse, CaseWithLines, CaseListResponse,
+    CaseLinesImport, CaseLinesImportResponse,
+)
+from .berekening import BerekeningRequest, BerekeningResponse, VorderingResultaat, Periode, Toerekening, BatchBerekeningRequest
+from .snapshot import Snapshot, SnapshotCreate, SnapshotResponse, SnapshotDiff
 from .sharing import (
     ColleagueResponse, ColleagueWithPermission, CaseShareCreate,
     CaseShareResponse, CaseShareInfo, ColleagueCountResponse
 )
+from .job import JobAccepted, JobResponse
 from .subscription import (
     SubscriptionTier, SubscriptionTierUpdate, UserSubscription,
     UserSubscriptionCreate, UserTierResponse
@@ -19,10 +23,13 @@ __all__ = [
     "Vordering", "VorderingCreate", "VorderingResponse",
     "Deelbetaling", "DeelbetalingCreate", "DeelbetalingResponse",
     "Case", "CaseCreate", "CaseResponse", "CaseWithLines", "CaseListResponse",
+    "CaseLinesImport", "CaseLinesImportResponse",
     "BerekeningRequest", "BerekeningResponse", "VorderingResultaat", "Periode", "Toerekening",
-    "Snapshot", "SnapshotCreate", "SnapshotResponse",
+    "BatchBerekeningRequest",
+    "Snapshot", "SnapshotCreate", "SnapshotResponse", "SnapshotDiff",
     "ColleagueResponse", "ColleagueWithPermission", "CaseShareCreate",
     "CaseShareResponse", "CaseShareInfo", "ColleagueCountResponse",
+    "JobAccepted", "JobResponse",
     "SubscriptionTier", "SubscriptionTierUpdate", "UserSubscription",
     "UserSubscriptionCreate", "UserTierResponse",
 ]
@@ -43,6 +43,10 @@ class BerekeningRequest(BaseModel):
     strategie: str = Field(default="A", pattern="^[AB]$")
     vorderingen: List[VorderingInput]
     deelbetalingen: List[DeelbetalingInput] = Field(default_factory=list)
+    # 'summary': alleen totalen en openstaand per vordering, zonder renteperiodes
+    detail: Literal['full', 'summary'] = 'full'
+    # Rekenengine: 'standaard' (per vordering) of 'sweep' (één tijdlijn voor de hele zaak), zelfde uitkomst
+    engine: Literal['standaard', 'sweep'] = 'standaard'
 
 
 class Periode(BaseModel):
@@ -126,7 +130,23 @@ class BerekeningResponse(BaseModel):
     """Response model for calculation."""
     einddatum: date
     strategie: str
+    detail: Literal['full', 'summary'] = 'full'
     vorderingen: List[VorderingResultaat]
     deelbetalingen: List[DeelbetalingResultaat]
     totalen: Totalen
     controle_ok: bool
+
+
+class BatchBerekeningRequest(BaseModel):
+    """
+    Request model for a batch of independent calculations.
+
+    Losse requests en/of case ids (uit Supabase geladen); de resultaten komen
+    als NDJSON terug, in volgorde van gereedkomen. 'index' in een resultaatregel
+    telt eerst de requests en daarna de case ids.
+    """
+    requests: List[BerekeningRequest] = Field(default_factory=list)
+    case_ids: List[str] = Field(default_factory=list)
+    # Opties voor de case ids (losse requests hebben hun eigen)
+    detail: Literal['full', 'summary'] = 'summary'
+    engine: Literal['standaard', 'sweep'] = 'standaard'
@@ -6,8 +6,8 @@ from datetime import date, datetime
 from typing import Optional, List, Any
 from pydantic import BaseModel, Field
 
-from .vordering import VorderingResponse
-from .deelbetaling import DeelbetalingResponse
+from .vordering import VorderingCreate, VorderingResponse
+from .deelbetaling import DeelbetalingCreate, DeelbetalingResponse
 
 
 class CaseBase(BaseModel):
@@ -57,3 +57,15 @@ class CaseListResponse(CaseResponse):
     vorderingen_count: int = 0
     deelbetalingen_count: int = 0
     sharing: Optional[Any] = None  # CaseShareInfo, avoid circular import
+
+
+class CaseLinesImport(BaseModel):
+    """Bulk import of vorderingen and deelbetalingen into a case."""
+    vorderingen: List[VorderingCreate] = []
+    deelbetalingen: List[DeelbetalingCreate] = []
+
+
+class CaseLinesImportResponse(BaseModel):
+    """All rows created by a bulk import, in volgorde."""
+    vorderingen: List[VorderingResponse] = []
+    deelbetalingen: List[DeelbetalingResponse] = []
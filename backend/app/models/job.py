@@ -0,0 +1,28 @@
+"""
+Job models (achtergrondjobs: snapshots, PDF/Excel rapporten)
+"""
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+from pydantic import BaseModel
+
+
+class JobAccepted(BaseModel):
+    """202 antwoord van een endpoint dat een job heeft ingediend."""
+    job_id: str
+    status: Literal['wachtend']
+    status_url: str
+
+
+class JobResponse(BaseModel):
+    """Status van een job (GET /api/jobs/{id})."""
+    id: str
+    soort: str
+    status: Literal['wachtend', 'bezig', 'klaar', 'mislukt']
+    aangemaakt: datetime
+    gestart: Optional[datetime] = None
+    klaar: Optional[datetime] = None
+    pogingen: int = 0
+    fout: Optional[str] = None
+    fout_status: Optional[int] = None  # HTTP status die het synchrone endpoint gegeven zou hebben
+    resultaat: Optional[Dict[str, Any]] = None
+    bestand_url: Optional[str] = None  # Bij een klaar rapport (PDF, Excel)
@@ -3,7 +3,7 @@ Snapshot models
 """
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional, Any
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -41,3 +41,64 @@ class SnapshotResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# --- Diff tussen twee snapshots ---
+
+VerschilStatus = Literal['toegevoegd', 'verwijderd', 'gewijzigd']
+
+
+class VeldVerschil(BaseModel):
+    """Waarde in snapshot a en b; verschil (b - a) bij bedragen en aantallen."""
+    a: Any = None
+    b: Any = None
+    verschil: Optional[Decimal] = None
+
+
+class PeriodeVerschil(BaseModel):
+    """Renteperiode, uitgelijnd op start en eind."""
+    start: date
+    eind: date
+    status: VerschilStatus
+    velden: Dict[str, VeldVerschil] = {}
+
+
+class VorderingVerschil(BaseModel):
+    """Gewijzigde vordering, uitgelijnd op kenmerk (periodes alleen bij 'gewijzigd')."""
+    kenmerk: str
+    status: VerschilStatus
+    velden: Dict[str, VeldVerschil] = {}
+    periodes: List[PeriodeVerschil] = []
+    periodes_kosten: List[PeriodeVerschil] = []
+
+
+class ToerekeningVerschil(BaseModel):
+    """Toerekening van een deelbetaling aan een vordering (per type)."""
+    vordering: str
+    type: str
+    bedrag: VeldVerschil
+
+
+class DeelbetalingVerschil(BaseModel):
+    """Gewijzigde deelbetaling, uitgelijnd op kenmerk en datum."""
+    kenmerk: Optional[str]
+    datum: date
+    status: VerschilStatus
+    velden: Dict[str, VeldVerschil] = {}
+    toerekeningen: List[ToerekeningVerschil] = []
+
+
+class SnapshotDiffKant(BaseModel):
+    id: str
+    created_at: datetime
+    einddatum: date
+
+
+class SnapshotDiff(BaseModel):
+    """Verschillen tussen snapshot a en b van dezelfde zaak; alleen wat gewijzigd is."""
+    a: SnapshotDiffKant
+    b: SnapshotDiffKant
+    totalen: Dict[str, VeldVerschil] = {}
+    vorderingen: List[VorderingVerschil] = []
+    deelbetalingen: List[DeelbetalingVerschil] = []
+    ongewijzigde_vorderingen: int = 0
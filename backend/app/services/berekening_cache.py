@@ -0,0 +1,184 @@
+"""
+Result cache voor renteberekeningen.
+
+Een berekening is een pure functie van het (genormaliseerde) request en de
+rentetabellen. De cache key is daarom een hash van het canonieke request plus
+de versie van de RenteTabelCache; een gewijzigde rentetabel geeft vanzelf
+nieuwe keys en wordt daarnaast expliciet geleegd via het admin panel.
+
+Daarnaast bewaart de CheckpointCache de laatste berekening (met checkpoints)
+per zaak, zodat een gewijzigde betaling vanaf het laatste ongeraakte
+checkpoint herberekend kan worden in plaats van vanaf de eerste vordering.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BerekeningCache:
+    """LRU cache met een limiet op het aantal entries en op het totaal aantal periodes."""
+
+    def __init__(self, max_items: int = 256, max_periodes: int = 200_000):
+        self.max_items = max_items
+        self.max_periodes = max_periodes
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (resultaat, gewicht)
+        self._gewicht = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def sleutel(request, versie: str) -> str:
+        """Canonieke hash van een BerekeningRequest + rentetabel versie (RenteTabelCache.versie_async)."""
+        canoniek = json.dumps(
+            request.model_dump(mode='json'),
+            sort_keys=True,
+            separators=(',', ':'),
+        )
+        return hashlib.sha256(f"{versie}:{canoniek}".encode()).hexdigest()
+
+    @staticmethod
+    def _gewicht_van(resultaat) -> int:
+        """Gewicht van een resultaat: 1 + aantal periodes (de grootste component)."""
+        return 1 + sum(len(v.periodes) + len(v.periodes_kosten) for v in resultaat.vorderingen)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: str, resultaat) -> None:
+        gewicht = self._gewicht_van(resultaat)
+        if gewicht > self.max_periodes:
+            return  # Te groot om zinvol te cachen
+        with self._lock:
+            if key in self._items:
+                self._gewicht -= self._items.pop(key)[1]
+            self._items[key] = (resultaat, gewicht)
+            self._gewicht += gewicht
+            while len(self._items) > self.max_items or self._gewicht > self.max_periodes:
+                _, (_, oud_gewicht) = self._items.popitem(last=False)
+                self._gewicht -= oud_gewicht
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._gewicht = 0
+        logger.info("Berekening cache geleegd")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'items': len(self._items),
+                'max_items': self.max_items,
+                'periodes': self._gewicht,
+                'max_periodes': self.max_periodes,
+            }
+
+
+class CheckpointCache:
+    """
+    LRU van afgeronde RenteCalculators, per zaak.
+
+    Met een zaak-id (opgeslagen zaken) is dat de sleutel. Een los request
+    heeft er geen; de zaak wordt dan herkend aan de kenmerken van de
+    vorderingen (plus detail-niveau en engine). Een nieuwe of hernoemde
+    vordering geeft dus een volledige herberekening; gewijzigde bedragen, data
+    en betalingen niet. De calculator bepaalt zelf hoeveel hij kan overnemen.
+
+    Begrensd op aantal zaken en, net als BerekeningCache, op gewicht: periodes,
+    events en checkpoint-staten van alle calculators samen.
+    """
+
+    def __init__(self, max_items: int = 32, max_gewicht: int = 200_000):
+        self.max_items = max_items
+        self.max_gewicht = max_gewicht
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (calculator, gewicht)
+        self._gewicht = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sleutel(request, zaak: Optional[str] = None) -> str:
+        if zaak is not None:
+            canoniek = json.dumps(['zaak', zaak, request.detail, request.engine], separators=(',', ':'))
+        else:
+            kenmerken = sorted(v.kenmerk for v in request.vorderingen)
+            canoniek = json.dumps([request.detail, request.engine, kenmerken], separators=(',', ':'))
+        return hashlib.sha256(canoniek.encode()).hexdigest()
+
+    @staticmethod
+    def _gewicht_van(calculator) -> int:
+        """Gewicht van een calculator: periodes, events en checkpoint-staten (de lijsten die meegroeien)."""
+        return (1 + len(calculator.events)
+                + sum(len(v.periodes) + len(v.periodes_kosten) + len(v.events) for v in calculator.vorderingen.values())
+                + sum(len(checkpoint) for checkpoint in calculator.checkpoints))
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key: str, calculator) -> None:
+        if self.max_items <= 0:
+            return
+        gewicht = self._gewicht_van(calculator)
+        with self._lock:
+            if key in self._items:
+                self._gewicht -= self._items.pop(key)[1]
+            if gewicht > self.max_gewicht:
+                return  # Te groot om te bewaren; een oude versie van deze zaak is hierboven al weg
+            self._items[key] = (calculator, gewicht)
+            self._gewicht += gewicht
+            while len(self._items) > self.max_items or self._gewicht > self.max_gewicht:
+                _, (_, oud_gewicht) = self._items.popitem(last=False)
+                self._gewicht -= oud_gewicht
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._gewicht = 0
+
+
+_cache: Optional[BerekeningCache] = None
+_checkpoints: Optional[CheckpointCache] = None
+
+
+def get_berekening_cache() -> BerekeningCache:
+    """Get the singleton result cache (configured from settings)."""
+    global _cache
+    if _cache is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _cache = BerekeningCache(
+            max_items=settings.berekening_cache_items,
+            max_periodes=settings.berekening_cache_periodes,
+        )
+    return _cache
+
+
+def get_checkpoint_cache() -> CheckpointCache:
+    """Get the singleton checkpoint cache (configured from settings)."""
+    global _checkpoints
+    if _checkpoints is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _checkpoints = CheckpointCache(
+            max_items=settings.berekening_checkpoint_items,
+            max_gewicht=settings.berekening_checkpoint_gewicht,
+        )
+    return _checkpoints
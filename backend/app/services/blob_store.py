@@ -0,0 +1,132 @@
+"""
+Blob store voor gegenereerde bestanden (snapshot PDF's).
+
+Pluggable via BLOB_STORE:
+- 'local' (default): bestanden onder BLOB_STORE_PAD op de lokale schijf.
+  Op een machine zonder persistente schijf gaan ze bij een herstart verloren;
+  ze worden dan bij de eerstvolgende download opnieuw gemaakt.
+- 'supabase': Supabase Storage, bucket BLOB_STORE_BUCKET (privé bucket,
+  gelezen en geschreven met de service role key).
+
+Sleutels zijn paden met '/' (bijv. 'snapshots/<id>/v1-schoon.pdf'). Een blob
+wordt nooit gewijzigd, alleen geschreven of verwijderd.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore(ABC):
+    """Interface van een blob store."""
+
+    @abstractmethod
+    async def lees(self, sleutel: str) -> Optional[bytes]:
+        """De inhoud van een blob, of None als die niet bestaat."""
+
+    @abstractmethod
+    async def schrijf(self, sleutel: str, inhoud: bytes, content_type: str = "application/octet-stream"):
+        """Schrijf een blob (een bestaande wordt overschreven)."""
+
+    @abstractmethod
+    async def verwijder(self, *sleutels: str):
+        """Verwijder blobs; een sleutel die niet bestaat is geen fout."""
+
+    def lokaal_pad(self, sleutel: str) -> Optional[Path]:
+        """Pad op de lokale schijf als de blob daar staat (om direct te streamen), anders None."""
+        return None
+
+
+class LokaleBlobStore(BlobStore):
+    """Blobs als bestanden onder een map; schrijven is atomair (tijdelijk bestand + rename)."""
+
+    def __init__(self, pad: str):
+        self.root = Path(pad).resolve()
+
+    def _pad(self, sleutel: str) -> Path:
+        pad = (self.root / sleutel).resolve()
+        if self.root not in pad.parents:
+            raise ValueError(f"Ongeldige blob sleutel: {sleutel}")
+        return pad
+
+    def lokaal_pad(self, sleutel: str) -> Optional[Path]:
+        pad = self._pad(sleutel)
+        return pad if pad.is_file() else None
+
+    async def lees(self, sleutel: str) -> Optional[bytes]:
+        pad = self.lokaal_pad(sleutel)
+        if pad is None:
+            return None
+        try:
+            return await asyncio.to_thread(pad.read_bytes)
+        except FileNotFoundError:
+            return None
+
+    def _schrijf(self, pad: Path, inhoud: bytes):
+        pad.parent.mkdir(parents=True, exist_ok=True)
+        fd, tijdelijk = tempfile.mkstemp(dir=pad.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(inhoud)
+            os.replace(tijdelijk, pad)
+        except BaseException:
+            Path(tijdelijk).unlink(missing_ok=True)
+            raise
+
+    async def schrijf(self, sleutel: str, inhoud: bytes, content_type: str = "application/octet-stream"):
+        await asyncio.to_thread(self._schrijf, self._pad(sleutel), inhoud)
+
+    async def verwijder(self, *sleutels: str):
+        for sleutel in sleutels:
+            self._pad(sleutel).unlink(missing_ok=True)
+
+
+class SupabaseBlobStore(BlobStore):
+    """Blobs in een (privé) Supabase Storage bucket."""
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    async def _bucket(self):
+        from app.db.supabase import get_async_supabase_client
+        return (await get_async_supabase_client()).storage.from_(self.bucket)
+
+    async def lees(self, sleutel: str) -> Optional[bytes]:
+        try:
+            return await (await self._bucket()).download(sleutel)
+        except Exception as e:
+            # Niet gevonden (of storage onbereikbaar): behandelen als afwezig
+            logger.debug(f"Blob {sleutel} niet gelezen: {e}")
+            return None
+
+    async def schrijf(self, sleutel: str, inhoud: bytes, content_type: str = "application/octet-stream"):
+        await (await self._bucket()).upload(
+            sleutel, inhoud, file_options={'content-type': content_type, 'upsert': 'true'}
+        )
+
+    async def verwijder(self, *sleutels: str):
+        if sleutels:
+            await (await self._bucket()).remove(list(sleutels))
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Get the singleton blob store (configured from settings)."""
+    global _store
+    if _store is None:
+        from app.config import get_settings
+        settings = get_settings()
+        if settings.blob_store == 'supabase':
+            _store = SupabaseBlobStore(settings.blob_store_bucket)
+        elif settings.blob_store == 'local':
+            _store = LokaleBlobStore(settings.blob_store_pad)
+        else:
+            raise ValueError(f"Onbekende BLOB_STORE: {settings.blob_store}")
+    return _store
@@ -0,0 +1,140 @@
+"""
+Berekening van een opgeslagen zaak, bewaard per revisie.
+
+De zaak wordt server-side geladen en berekend; de uitkomst gaat naar
+case_berekeningen (migratie 014) met de revisie van de zaak en de versie van
+de rentetabel. Zolang beide ongewijzigd zijn, wordt een volgende berekening
+(of snapshot) van die zaak uit de opgeslagen uitkomst geserveerd, zonder de
+regels opnieuw te laden of te rekenen.
+
+cases.revisie wordt in de database opgehoogd bij elke wijziging van de zaak
+of van een vordering / deelbetaling. De revisie wordt gelezen vóór de regels
+worden geladen: een wijziging daartussen geeft hooguit een uitkomst onder een
+verouderde revisie, die bij de volgende aanroep opnieuw wordt berekend.
+
+Zonder migratie 014 wordt er elke keer gerekend (de result cache van
+/api/bereken blijft wel gelden).
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.services.rente_calculator import get_rentetabel_cache
+from app.services.schema_capabilities import schema_capabilities
+
+logger = logging.getLogger(__name__)
+
+
+class ZaakZonderVorderingen(ValueError):
+    """De zaak heeft geen vorderingen; er valt niets te berekenen."""
+
+
+@dataclass
+class CaseBerekening:
+    """Invoer en uitkomst van de berekening van een zaak (JSON, zoals in een snapshot)."""
+    revisie: Optional[int]
+    invoer_json: Dict
+    resultaat_json: Dict
+    uit_opslag: bool = False
+
+
+def invoer_van_case(case: Dict, vorderingen: List[Dict], deelbetalingen: List[Dict]) -> Dict:
+    """De invoer van een berekening zoals die in een snapshot wordt bewaard."""
+    return {
+        'case': {
+            'naam': case['naam'],
+            'einddatum': str(case['einddatum']),
+            'strategie': case['strategie'],
+        },
+        'vorderingen': [
+            {
+                'kenmerk': v['kenmerk'],
+                'bedrag': str(v['bedrag']),
+                'datum': str(v['datum']),
+                'rentetype': v['rentetype'],
+                'kosten': str(v['kosten']),
+                'opslag': str(v['opslag']) if v.get('opslag') else None,
+                'opslag_ingangsdatum': str(v['opslag_ingangsdatum']) if v.get('opslag_ingangsdatum') else None,
+            }
+            for v in vorderingen
+        ],
+        'deelbetalingen': [
+            {
+                'kenmerk': d.get('kenmerk'),
+                'bedrag': str(d['bedrag']),
+                'datum': str(d['datum']),
+                'aangewezen': d.get('aangewezen', []),
+            }
+            for d in deelbetalingen
+        ],
+    }
+
+
+async def laad_opgeslagen(db, case_id: str) -> Optional[Dict]:
+    """De opgeslagen berekening van een zaak (rij uit case_berekeningen), of None."""
+    if not schema_capabilities().case_berekeningen:
+        return None
+    try:
+        rij = await db.table('case_berekeningen').select('*').eq('case_id', case_id).execute()
+    except Exception as e:
+        logger.warning(f"Opgeslagen berekening niet te lezen: {e}")
+        return None
+    return rij.data[0] if rij.data else None
+
+
+def _geldig(opgeslagen: Optional[Dict], case: Dict, versie: str) -> bool:
+    return (
+        opgeslagen is not None
+        and case.get('revisie') is not None
+        and opgeslagen['revisie'] == case['revisie']
+        and opgeslagen.get('rentetabel_versie') == versie
+    )
+
+
+async def bereken_case(db, case: Dict, opgeslagen: Optional[Dict]) -> CaseBerekening:
+    """
+    Bereken een zaak (case: de rij uit cases, inclusief revisie).
+
+    opgeslagen is de uitkomst van laad_opgeslagen(), die de aanroeper
+    tegelijk met de zaak ophaalt; hoort die bij de huidige revisie, dan wordt
+    hij direct teruggegeven. Raises ZaakZonderVorderingen als de zaak geen
+    vorderingen heeft.
+    """
+    from app.api.berekening import bereken, berekening_request_van_case
+
+    versie = await get_rentetabel_cache().versie_async()
+    if _geldig(opgeslagen, case, versie):
+        return CaseBerekening(opgeslagen['revisie'], opgeslagen['invoer_json'],
+                              opgeslagen['resultaat_json'], uit_opslag=True)
+
+    vord_response, deel_response = await asyncio.gather(
+        db.table('vorderingen').select('*').eq('case_id', case['id']).order('volgorde').execute(),
+        db.table('deelbetalingen').select('*').eq('case_id', case['id']).order('datum').execute(),
+    )
+    vorderingen, deelbetalingen = vord_response.data, deel_response.data
+    if not vorderingen:
+        raise ZaakZonderVorderingen("Case has no vorderingen")
+
+    resultaat = await bereken(berekening_request_van_case(case, vorderingen, deelbetalingen), zaak=case['id'])
+    berekening = CaseBerekening(
+        revisie=case.get('revisie'),
+        invoer_json=invoer_van_case(case, vorderingen, deelbetalingen),
+        resultaat_json=resultaat.model_dump(mode='json'),
+    )
+
+    if schema_capabilities().case_berekeningen and berekening.revisie is not None:
+        try:
+            await db.table('case_berekeningen').upsert({
+                'case_id': case['id'],
+                'revisie': berekening.revisie,
+                'rentetabel_versie': versie,
+                'invoer_json': berekening.invoer_json,
+                'resultaat_json': berekening.resultaat_json,
+                'totaal_openstaand': float(resultaat.totalen.openstaand),
+            }, on_conflict='case_id').execute()
+        except Exception as e:
+            # Opslaan is een optimalisatie; de berekening zelf is gelukt
+            logger.warning(f"Berekening van zaak {case['id']} niet opgeslagen: {e}")
+
+    return berekening
@@ -0,0 +1,83 @@
+"""
+Conditional GET: ETags en 304 Not Modified.
+
+De ETag van een endpoint is een hash over een versie-vingerafdruk van de
+data (updated_at / revisie van zaken, versie van de rentetabel). Als de
+client die versie al heeft (If-None-Match), geeft het endpoint 304 zonder de
+zware queries te doen en zonder de payload opnieuw op te bouwen.
+
+Voor zaken komt de vingerafdruk uit de RPC case_etag (migratie 015), één
+lichte query. Zonder die functie valt het endpoint terug op een ETag over de
+opgebouwde response: geen besparing op queries, wel op bandbreedte.
+"""
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Ophogen als de vorm van de responses wijzigt, zodat oude ETags niet meer matchen
+ETAG_VERSIE = "1"
+
+# Zonder migratie 015: de RPC niet bij elk request opnieuw proberen
+_RPC_OPNIEUW_NA = 300.0
+_rpc_ontbreekt_tot = 0.0
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def maak_etag(*delen) -> str:
+    """Sterke ETag over de delen (en ETAG_VERSIE)."""
+    inhoud = "|".join(str(deel) for deel in (ETAG_VERSIE, *delen))
+    return '"' + hashlib.sha256(inhoud.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matcht(request: Request, etag: Optional[str]) -> bool:
+    """Komt de ETag voor in If-None-Match van het request? (W/ prefix en * worden ondersteund)"""
+    if etag is None:
+        return False
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    kandidaten = {deel.strip().removeprefix('W/') for deel in header.split(',')}
+    return '*' in kandidaten or etag in kandidaten
+
+
+def niet_gewijzigd(etag: str, cache_control: str = CACHE_CONTROL) -> Response:
+    """304 response met de ETag."""
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+
+
+def zet_etag(response: Response, etag: str, cache_control: str = CACHE_CONTROL):
+    """ETag en Cache-Control op een 200 response."""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
+
+
+async def case_etag(db, user_id: str, case_id: Optional[str] = None, *extra) -> Optional[str]:
+    """
+    ETag voor een zaak (case_id) of de zakenlijst (case_id None) van user_id.
+
+    None als de RPC niet beschikbaar is, of (bij een zaak) als de zaak niet
+    bestaat of de gebruiker er geen toegang toe heeft; de aanroeper doet dan
+    het volledige endpoint.
+    """
+    global _rpc_ontbreekt_tot
+    if time.monotonic() < _rpc_ontbreekt_tot:
+        return None
+    try:
+        vingerafdruk = (await db.rpc('case_etag', {
+            'p_user_id': user_id,
+            'p_case_id': case_id,
+        }).execute()).data
+    except Exception as e:
+        if 'PGRST202' in str(e) or 'Could not find the function' in str(e):
+            _rpc_ontbreekt_tot = time.monotonic() + _RPC_OPNIEUW_NA
+        logger.debug(f"case_etag niet beschikbaar: {e}")
+        return None
+    if not vingerafdruk:
+        return None
+    return maak_etag('case' if case_id else 'cases', vingerafdruk, *extra)
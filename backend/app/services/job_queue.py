@@ -0,0 +1,349 @@
+"""
+Job queue voor langlopend werk (snapshots maken, PDF/Excel rapporten).
+
+Een endpoint dat het werk als job aanbiedt (request header
+'Prefer: respond-async') geeft direct 202 met een job id; de client pollt
+GET /api/jobs/{id} tot de job klaar of mislukt is.
+
+- In-process: een vast aantal worker taken (JOB_QUEUE_GELIJKTIJDIG) op de
+  event loop pakt jobs op; het CPU-werk zelf gaat zoals altijd via de
+  worker pool.
+- Persistent: jobs staan in een SQLite bestand (JOB_QUEUE_PAD). Een job
+  overleeft een herstart; meerdere processen (uvicorn workers) kunnen
+  hetzelfde bestand delen, een job wordt atomair door één worker geclaimd.
+- Crash recovery: een lopende job werkt elke JOB_HEARTBEAT seconden zijn
+  heartbeat bij. Een job die 'bezig' is zonder recente heartbeat (het
+  proces is gestopt of gecrasht) gaat terug naar 'wachtend', tot
+  JOB_MAX_POGINGEN keer; daarna 'mislukt'.
+- Een volle worker pool (503) is tijdelijk: de job gaat na een korte pauze
+  opnieuw in de wachtrij. Andere fouten zijn definitief (status 'mislukt',
+  met de melding en HTTP status).
+- Afgeronde jobs worden na JOB_BEWAAR seconden opgeruimd, met hun bestanden
+  in de blob store.
+
+Job soorten worden geregistreerd met registreer_job_soort(); een handler
+krijgt (job_id, user_id, invoer) en geeft een JSON-serialiseerbaar resultaat.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[str, str, Dict], Awaitable[Dict]]
+
+_SOORTEN: Dict[str, JobHandler] = {}
+
+# Na een volle worker pool: zo lang wachten voor de job opnieuw geprobeerd wordt
+_OPNIEUW_NA = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    soort TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,              -- wachtend, bezig, klaar, mislukt
+    invoer TEXT NOT NULL,              -- JSON
+    resultaat TEXT,                    -- JSON
+    fout TEXT,
+    fout_status INTEGER,               -- HTTP status van de fout
+    pogingen INTEGER NOT NULL DEFAULT 0,
+    aangemaakt REAL NOT NULL,
+    niet_voor REAL NOT NULL DEFAULT 0, -- Niet eerder oppakken (na een volle worker pool)
+    gestart REAL,
+    heartbeat REAL,
+    klaar REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_wachtend ON jobs (status, aangemaakt);
+"""
+
+
+class JobQueueVol(RuntimeError):
+    """Er staan al te veel jobs te wachten."""
+
+
+def registreer_job_soort(soort: str, handler: JobHandler):
+    """Registreer de handler van een job soort (bij het importeren van de API module)."""
+    _SOORTEN[soort] = handler
+
+
+class JobQueue:
+    """Persistente job queue (SQLite) met een begrensd aantal gelijktijdige jobs."""
+
+    def __init__(self, pad: str, gelijktijdig: int = 2, max_wachtend: int = 100, max_pogingen: int = 3,
+                 heartbeat: float = 10.0, bewaar: float = 86400.0, poll: float = 1.0):
+        self.pad = pad
+        self.gelijktijdig = max(1, gelijktijdig)
+        self.max_wachtend = max_wachtend
+        self.max_pogingen = max(1, max_pogingen)
+        self.heartbeat = heartbeat
+        self.bewaar = bewaar
+        self.poll = poll
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._werkers: List[asyncio.Task] = []
+        self._onderhoud: Optional[asyncio.Task] = None
+        self._nieuw = asyncio.Event()
+
+    # --- SQLite ---
+
+    def _verbinding(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.pad != ':memory:':
+                Path(self.pad).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.pad, check_same_thread=False, isolation_level=None, timeout=30.0)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def _sql(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._verbinding().execute(sql, params).fetchall()
+
+    async def _sql_async(self, sql: str, params=()) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(self._sql, sql, params)
+
+    # --- Jobs ---
+
+    async def dien_in(self, soort: str, user_id: str, invoer: Dict) -> str:
+        """Zet een job in de wachtrij en geef het job id. Raises JobQueueVol."""
+        if soort not in _SOORTEN:
+            raise ValueError(f"Onbekende job soort: {soort}")
+        wachtend = (await self._sql_async("SELECT COUNT(*) FROM jobs WHERE status = 'wachtend'"))[0][0]
+        if wachtend >= self.max_wachtend:
+            raise JobQueueVol("Te veel jobs in de wachtrij, probeer het over enkele ogenblikken opnieuw")
+        job_id = str(uuid.uuid4())
+        await self._sql_async(
+            "INSERT INTO jobs (id, soort, user_id, status, invoer, aangemaakt) VALUES (?, ?, ?, 'wachtend', ?, ?)",
+            (job_id, soort, user_id, json.dumps(invoer), time.time()),
+        )
+        self._nieuw.set()
+        return job_id
+
+    async def status(self, job_id: str) -> Optional[Dict]:
+        """De job als dict (resultaat als JSON gedecodeerd), of None."""
+        rijen = await self._sql_async("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rijen:
+            return None
+        job = dict(rijen[0])
+        job['invoer'] = json.loads(job['invoer'])
+        job['resultaat'] = json.loads(job['resultaat']) if job['resultaat'] else None
+        return job
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Pak atomair de oudste wachtende job (één statement, ook veilig tussen processen)."""
+        nu = time.time()
+        rijen = self._sql(
+            """
+            UPDATE jobs SET status = 'bezig', pogingen = pogingen + 1, gestart = ?, heartbeat = ?
+            WHERE id = (SELECT id FROM jobs WHERE status = 'wachtend' AND niet_voor <= ?
+                        ORDER BY aangemaakt LIMIT 1)
+              AND status = 'wachtend'
+            RETURNING id, soort, user_id, invoer, pogingen
+            """,
+            (nu, nu, nu),
+        )
+        return rijen[0] if rijen else None
+
+    def herstel(self) -> int:
+        """
+        Zet jobs die 'bezig' zijn zonder recente heartbeat (proces gestopt of
+        gecrasht) terug in de wachtrij, of op 'mislukt' na max_pogingen.
+        Geeft het aantal herstelde jobs.
+        """
+        grens = time.time() - 3 * self.heartbeat
+        rijen = self._sql(
+            """
+            UPDATE jobs SET
+                status = CASE WHEN pogingen >= ? THEN 'mislukt' ELSE 'wachtend' END,
+                fout = CASE WHEN pogingen >= ? THEN 'Job afgebroken (worker gestopt)' ELSE NULL END,
+                fout_status = CASE WHEN pogingen >= ? THEN 500 ELSE NULL END,
+                klaar = CASE WHEN pogingen >= ? THEN ? ELSE NULL END
+            WHERE status = 'bezig' AND heartbeat < ?
+            RETURNING id, status
+            """,
+            (self.max_pogingen, self.max_pogingen, self.max_pogingen, self.max_pogingen, time.time(), grens),
+        )
+        for rij in rijen:
+            logger.warning(f"Job {rij['id']} zonder heartbeat: {rij['status']}")
+        return len(rijen)
+
+    def _opruimen(self) -> List[str]:
+        """Verwijder afgeronde jobs ouder dan bewaar; geeft hun bestanden (blob sleutels)."""
+        rijen = self._sql(
+            "DELETE FROM jobs WHERE status IN ('klaar', 'mislukt') AND klaar < ? RETURNING resultaat",
+            (time.time() - self.bewaar,),
+        )
+        sleutels = []
+        for rij in rijen:
+            resultaat = json.loads(rij['resultaat']) if rij['resultaat'] else {}
+            if resultaat.get('bestand'):
+                sleutels.append(resultaat['bestand'])
+        return sleutels
+
+    def _afronden(self, job_id: str, status: str, resultaat: Optional[Dict] = None,
+                  fout: Optional[str] = None, fout_status: Optional[int] = None):
+        self._sql(
+            "UPDATE jobs SET status = ?, resultaat = ?, fout = ?, fout_status = ?, klaar = ? WHERE id = ?",
+            (status, json.dumps(resultaat) if resultaat is not None else None, fout, fout_status, time.time(), job_id),
+        )
+
+    def _terug_in_wachtrij(self, job_id: str, niet_voor: float = 0.0, poging_telt: bool = True):
+        self._sql(
+            "UPDATE jobs SET status = 'wachtend', niet_voor = ?, pogingen = pogingen - ? WHERE id = ?",
+            (niet_voor, 0 if poging_telt else 1, job_id),
+        )
+
+    # --- Workers ---
+
+    async def _houd_levend(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self._sql_async("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'bezig'",
+                                      (time.time(), job_id))
+            except Exception as e:
+                # Bijv. 'database is locked': de volgende heartbeat gewoon proberen; pas na
+                # 3x heartbeat zonder succes geldt de job als onderbroken
+                logger.warning(f"Heartbeat van job {job_id} mislukt: {e}")
+
+    async def _voer_uit(self, job: sqlite3.Row):
+        job_id = job['id']
+        handler = _SOORTEN.get(job['soort'])
+        if handler is None:
+            await asyncio.to_thread(self._afronden, job_id, 'mislukt',
+                                    fout=f"Onbekende job soort: {job['soort']}", fout_status=500)
+            return
+
+        levend = asyncio.create_task(self._houd_levend(job_id))
+        try:
+            resultaat = await handler(job_id, job['user_id'], json.loads(job['invoer']))
+        except asyncio.CancelledError:
+            # Afsluiten: de job later opnieuw, deze poging telt niet (synchroon: de loop stopt)
+            self._terug_in_wachtrij(job_id, poging_telt=False)
+            raise
+        except HTTPException as e:
+            if e.status_code == 503:
+                # Worker pool vol: tijdelijk, straks opnieuw
+                await asyncio.to_thread(self._terug_in_wachtrij, job_id, time.time() + _OPNIEUW_NA, False)
+            else:
+                await asyncio.to_thread(self._afronden, job_id, 'mislukt', fout=str(e.detail), fout_status=e.status_code)
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({job['soort']}) mislukt")
+            await asyncio.to_thread(self._afronden, job_id, 'mislukt', fout=str(e), fout_status=500)
+        else:
+            await asyncio.to_thread(self._afronden, job_id, 'klaar', resultaat)
+        finally:
+            levend.cancel()
+
+    async def _werker(self):
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                self._nieuw.clear()
+                try:
+                    # Wakker bij een nieuwe job, anders pollen (jobs van andere processen, niet_voor)
+                    await asyncio.wait_for(self._nieuw.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._voer_uit(job)
+
+    async def _onderhoud_lus(self):
+        from app.services.blob_store import get_blob_store
+
+        while True:
+            try:
+                await asyncio.to_thread(self.herstel)
+                sleutels = await asyncio.to_thread(self._opruimen)
+                if sleutels:
+                    await get_blob_store().verwijder(*sleutels)
+            except Exception as e:
+                logger.warning(f"Job queue onderhoud mislukt: {e}")
+            await asyncio.sleep(self.heartbeat)
+
+    async def start(self):
+        """Herstel onderbroken jobs en start de workers (aanroepen vanuit de lifespan)."""
+        if self._werkers:
+            return
+        aantal = await asyncio.to_thread(self.herstel)
+        if aantal:
+            logger.info(f"Job queue: {aantal} onderbroken jobs hersteld")
+        self._nieuw = asyncio.Event()
+        self._werkers = [asyncio.create_task(self._werker()) for _ in range(self.gelijktijdig)]
+        self._onderhoud = asyncio.create_task(self._onderhoud_lus())
+        logger.info(f"Job queue gestart: {self.pad}, {self.gelijktijdig} gelijktijdig")
+
+    async def stop(self):
+        """Stop de workers; lopende jobs gaan terug in de wachtrij."""
+        taken = [*self._werkers, *([self._onderhoud] if self._onderhoud else [])]
+        for taak in taken:
+            taak.cancel()
+        await asyncio.gather(*taken, return_exceptions=True)
+        self._werkers, self._onderhoud = [], None
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get the singleton job queue (configured from settings)."""
+    global _queue
+    if _queue is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _queue = JobQueue(
+            pad=settings.job_queue_pad,
+            gelijktijdig=settings.job_queue_gelijktijdig,
+            max_wachtend=settings.job_queue_max_wachtend,
+            max_pogingen=settings.job_max_pogingen,
+            heartbeat=settings.job_heartbeat,
+            bewaar=settings.job_bewaar,
+        )
+    return _queue
+
+
+async def dien_job_in(soort: str, user_id: str, invoer: Dict) -> JSONResponse:
+    """
+    Zet een job in de wachtrij voor een endpoint en geef het 202 antwoord
+    (JobAccepted, met Location naar de status). Een volle wachtrij geeft 503.
+    """
+    try:
+        job_id = await get_job_queue().dien_in(soort, user_id, invoer)
+    except JobQueueVol as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    status_url = f"/api/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={'job_id': job_id, 'status': 'wachtend', 'status_url': status_url},
+        headers={'Location': status_url},
+    )
+
+
+async def bewaar_job_bestand(job_id: str, inhoud: bytes, filename: str, media_type: str) -> Dict:
+    """Zet het bestand van een job (PDF, Excel) in de blob store; geeft het job resultaat."""
+    from app.services.blob_store import get_blob_store
+
+    sleutel = f"jobs/{job_id}/{filename}"
+    await get_blob_store().schrijf(sleutel, inhoud, content_type=media_type)
+    return {'bestand': sleutel, 'filename': filename, 'media_type': media_type}
+
+
+def wil_async(request) -> bool:
+    """Vraagt de client om een job in plaats van een direct antwoord? (Prefer: respond-async, RFC 7240)"""
+    prefer = request.headers.get('prefer', '')
+    return any(deel.strip().lower() == 'respond-async' for deel in prefer.split(','))
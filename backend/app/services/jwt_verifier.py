@@ -0,0 +1,163 @@
+"""
+Lokale verificatie van Supabase access tokens (JWT).
+
+In plaats van per request supabase.auth.get_user(token) (een round-trip naar
+de auth server) wordt het token in-process gecontroleerd:
+
+- HS256 tokens met het JWT secret van het project (SUPABASE_JWT_SECRET).
+- Asymmetrische tokens (RS256/ES256) met de publieke sleutels uit de JWKS
+  endpoint van het project; die sleutels worden gecached (JWT_JWKS_TTL).
+- Handtekening, exp en audience worden altijd gecontroleerd.
+
+Geverifieerde tokens staan kort in een TTL cache (token hash → user), zodat
+een herhaald token alleen een dict lookup kost. Kan een token niet lokaal
+worden geverifieerd (geen secret, JWKS onbereikbaar), dan geeft verifieer()
+None en valt de aanroeper terug op get_user.
+
+Het ophalen van de JWKS is een blocking HTTP request; vanuit async code
+daarom verifieer_async() gebruiken, die alles behalve een cache hit in een
+thread uitvoert.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+_ASYMMETRISCH = ('RS256', 'RS384', 'RS512', 'ES256', 'ES384', 'PS256')
+
+
+class TokenOngeldig(Exception):
+    """Het token is lokaal gecontroleerd en ongeldig (handtekening, exp, audience)."""
+
+
+class JwtVerifier:
+    """Verificatie van access tokens met gecachte sleutels en een TTL cache van uitkomsten."""
+
+    def __init__(self, secret: str = "", jwks_url: str = "", audience: str = "authenticated",
+                 cache_ttl: float = 300.0, cache_items: int = 4096, jwks_ttl: float = 3600.0):
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.audience = audience or None
+        self.cache_ttl = cache_ttl
+        self.cache_items = cache_items
+        self.jwks_ttl = jwks_ttl
+        self._jwks_client = None
+        self._cache: "OrderedDict[str, Tuple[float, str, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def beschikbaar(self) -> bool:
+        return bool(self.secret or self.jwks_url)
+
+    def _sleutel(self, token: str, header: dict):
+        alg = header.get('alg')
+        if alg == 'HS256':
+            return self.secret or None
+        if alg in _ASYMMETRISCH and self.jwks_url:
+            if self._jwks_client is None:
+                self._jwks_client = jwt.PyJWKClient(self.jwks_url, cache_keys=True, lifespan=self.jwks_ttl)
+            try:
+                return self._jwks_client.get_signing_key_from_jwt(token).key
+            except jwt.PyJWKClientError as e:
+                # JWKS onbereikbaar of onbekende kid: niet lokaal te beslissen
+                logger.warning(f"JWKS sleutel niet beschikbaar: {e}")
+                return None
+        return None
+
+    def _uit_cache(self, hash_: str, nu: float) -> Optional[Tuple[str, Optional[str]]]:
+        with self._lock:
+            hit = self._cache.get(hash_)
+            if hit is not None:
+                if hit[0] > nu:
+                    self._cache.move_to_end(hash_)
+                    return hit[1], hit[2]
+                del self._cache[hash_]
+        return None
+
+    async def verifieer_async(self, token: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        verifieer() zonder de event loop te blokkeren.
+
+        Een cache hit wordt direct beantwoord; anders draait de verificatie
+        (met eventueel het ophalen van de JWKS) in een thread.
+        """
+        if not self.beschikbaar:
+            return None
+        hit = self._uit_cache(hashlib.sha256(token.encode()).hexdigest(), time.time())
+        if hit is not None:
+            return hit
+        return await asyncio.to_thread(self.verifieer, token)
+
+    def verifieer(self, token: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Verifieer een access token.
+
+        Returns (user_id, email), of None als het token niet lokaal te
+        verifiëren is. Raises TokenOngeldig bij een ongeldig token.
+        """
+        if not self.beschikbaar:
+            return None
+
+        nu = time.time()
+        hash_ = hashlib.sha256(token.encode()).hexdigest()
+        hit = self._uit_cache(hash_, nu)
+        if hit is not None:
+            return hit
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise TokenOngeldig(str(e))
+        sleutel = self._sleutel(token, header)
+        if sleutel is None:
+            return None
+
+        try:
+            claims = jwt.decode(
+                token,
+                sleutel,
+                algorithms=[header['alg']],
+                audience=self.audience,
+                options={'require': ['exp', 'sub'], 'verify_aud': self.audience is not None},
+            )
+        except jwt.InvalidTokenError as e:
+            raise TokenOngeldig(str(e))
+
+        user_id, email = str(claims['sub']), claims.get('email')
+        geldig_tot = min(nu + self.cache_ttl, float(claims['exp']))
+        with self._lock:
+            self._cache[hash_] = (geldig_tot, user_id, email)
+            while len(self._cache) > self.cache_items:
+                self._cache.popitem(last=False)
+        return user_id, email
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_verifier: Optional[JwtVerifier] = None
+
+
+def get_jwt_verifier() -> JwtVerifier:
+    """Get the singleton verifier (configured from settings)."""
+    global _verifier
+    if _verifier is None:
+        from app.config import get_settings
+        settings = get_settings()
+        jwks_url = f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if settings.supabase_url else ""
+        _verifier = JwtVerifier(
+            secret=settings.supabase_jwt_secret,
+            jwks_url=jwks_url if settings.jwt_jwks else "",
+            audience=settings.jwt_audience,
+            cache_ttl=settings.jwt_cache_ttl,
+            jwks_ttl=settings.jwt_jwks_ttl,
+        )
+    return _verifier
@@ -0,0 +1,148 @@
+"""
+Kalenderkern voor de renteberekening, op proleptische ordinals (date.toordinal()).
+
+- Schrikkeldagen tellen over een periode in O(1), zonder per jaar een
+  date(jaar, 2, 29) te bouwen: de telling gaat via het "maartjaar" (jaren die
+  op 1 maart beginnen, zodat 29 februari de laatste dag van een jaar is).
+  Voor 1800-2400 is een bisect in een vaste tabel van 29 februari's in
+  CPython nog sneller; daarbuiten wordt de formule gebruikt.
+- Verjaardagen en kapitalisatiejaar-lengtes worden per startdatum één keer
+  uitgerekend (VerjaardagTabel) en daarna met bisect opgezocht.
+
+De functies in rente_calculator (verjaardag, dagen_in_jaar,
+dagen_in_kapitalisatiejaar) blijven de referentie-semantiek; deze module
+geeft dezelfde uitkomsten.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+from typing import List
+
+# Ordinal van 0000-03-01 (proleptisch): 306 dagen vóór 0001-01-01 (ordinal 1)
+_ORDINAL_MAART_0 = -305
+_DAGEN_PER_ERA = 146097  # 400 jaar
+
+
+def is_schrikkeljaar(jaar: int) -> bool:
+    return jaar % 4 == 0 and (jaar % 100 != 0 or jaar % 400 == 0)
+
+
+def _maartjaar(ordinal: int) -> int:
+    """Het jaar (beginnend op 1 maart) waarin een ordinal valt."""
+    n = ordinal - _ORDINAL_MAART_0
+    era = n // _DAGEN_PER_ERA
+    doe = n - era * _DAGEN_PER_ERA  # Dag binnen de era [0, 146096]
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365  # Jaar binnen de era [0, 399]
+    return era * 400 + yoe
+
+
+def schrikkeldagen_voor(ordinal: int) -> int:
+    """Aantal 29 februari's strikt vóór een ordinal (vanaf jaar 1)."""
+    # Alle 29 februari's t/m die van het lopende maartjaar liggen ervóór
+    jaar = _maartjaar(ordinal)
+    return jaar // 4 - jaar // 100 + jaar // 400
+
+
+_TABEL_VAN = date(1800, 1, 1).toordinal()
+_TABEL_TOT = date(2401, 1, 1).toordinal()
+_SCHRIKKELDAGEN = [date(jaar, 2, 29).toordinal() for jaar in range(1800, 2401) if is_schrikkeljaar(jaar)]
+
+
+def schrikkeldagen_tussen(start: int, eind: int) -> int:
+    """Aantal 29 februari's in [start, eind) (ordinals)."""
+    if _TABEL_VAN <= start and eind <= _TABEL_TOT:
+        return bisect_left(_SCHRIKKELDAGEN, eind) - bisect_left(_SCHRIKKELDAGEN, start)
+    return schrikkeldagen_voor(eind) - schrikkeldagen_voor(start)
+
+
+def heeft_schrikkeldag(start: int, eind: int) -> bool:
+    """Valt er een 29 februari in [start, eind)? (ordinals)"""
+    return schrikkeldagen_tussen(start, eind) > 0
+
+
+def dagen_in_jaar(start: int, eind: int) -> int:
+    """366 als er een 29 februari in [start, eind) valt, anders 365 (ordinals)."""
+    return 366 if schrikkeldagen_tussen(start, eind) > 0 else 365
+
+
+def verjaardag(start_datum: date, jaar: int) -> date:
+    """Verjaardag van start_datum in een jaar; 29 februari wordt 28 februari in een gewoon jaar."""
+    if start_datum.month == 2 and start_datum.day == 29 and not is_schrikkeljaar(jaar):
+        return date(jaar, 2, 28)
+    return date(jaar, start_datum.month, start_datum.day)
+
+
+class VerjaardagTabel:
+    """
+    Verjaardagen van één startdatum als gesorteerde ordinals (en data).
+
+    De tabel begint een jaar vóór de startdatum en groeit lui mee naar later.
+    Uitbreiden vervangt de lijsten in één toewijzing, zodat gelijktijdige
+    lezers (worker threads) altijd een consistente tabel zien.
+    """
+
+    def __init__(self, start_datum: date):
+        self.start_datum = start_datum
+        self.eerste_jaar = start_datum.year - 1
+        # (ordinals, data) samen, zodat ze altijd bij elkaar passen
+        self._tabel = ([], [])
+        self._uitbreiden(start_datum.year + 1)
+
+    def _uitbreiden(self, tot_jaar: int):
+        data: List[date] = list(self._tabel[1])
+        jaar = self.eerste_jaar + len(data)
+        while jaar <= tot_jaar:
+            data.append(verjaardag(self.start_datum, jaar))
+            jaar += 1
+        self._tabel = ([d.toordinal() for d in data], data)
+
+    def _dekken(self, ordinal: int):
+        """De tabel, met zeker een verjaardag ná ordinal."""
+        tabel = self._tabel
+        if tabel[0][-1] <= ordinal:
+            # Eén verjaardag per kalenderjaar: ruim genoeg bijmaken in één keer
+            self._uitbreiden(date.fromordinal(ordinal).year + 10)
+            tabel = self._tabel
+        return tabel
+
+    def datum(self, jaar: int) -> date:
+        """Verjaardag in een jaar (zoals verjaardag())."""
+        index = jaar - self.eerste_jaar
+        if index < 0:
+            return verjaardag(self.start_datum, jaar)
+        if index >= len(self._tabel[1]):
+            self._uitbreiden(jaar + 10)
+        return self._tabel[1][index]
+
+    def is_verjaardag(self, ordinal: int) -> bool:
+        ordinals = self._dekken(ordinal)[0]
+        return ordinals[bisect_left(ordinals, ordinal)] == ordinal
+
+    def tussen(self, van: int, tot: int) -> List[date]:
+        """Verjaardagen strikt tussen twee ordinals, als date."""
+        if tot <= van:
+            return []
+        ordinals, data = self._dekken(tot)
+        return data[bisect_right(ordinals, van):bisect_left(ordinals, tot)]
+
+    def kapitalisatiejaar_dagen(self, ordinal: int) -> int:
+        """
+        Lengte van het kapitalisatiejaar (verjaardag t/m volgende verjaardag)
+        waarin een dag valt; zie dagen_in_kapitalisatiejaar().
+        """
+        ordinals = self._dekken(ordinal)[0]
+        index = bisect_right(ordinals, ordinal) - 1
+        if index < 0:
+            # Vóór het begin van de tabel (komt in de berekening niet voor)
+            jaar = date.fromordinal(ordinal).year
+            begin = verjaardag(self.start_datum, jaar)
+            if begin.toordinal() > ordinal:
+                begin = verjaardag(self.start_datum, jaar - 1)
+            return (verjaardag(self.start_datum, begin.year + 1) - begin).days
+        return ordinals[index + 1] - ordinals[index]
+
+
+@lru_cache(maxsize=4096)
+def verjaardag_tabel(start_datum: date) -> VerjaardagTabel:
+    """Gedeelde verjaardagtabel per startdatum."""
+    return VerjaardagTabel(start_datum)
@@ -0,0 +1,121 @@
+"""
+Rechten van een gebruiker op een zaak.
+
+case_permissie() beantwoordt "welk recht heeft gebruiker U op zaak C, of op
+de zaak van vordering / deelbetaling X" in één database round-trip via de
+RPC case_permission (migratie 013). Zonder die functie wordt hetzelfde per
+tabel bepaald. Uitkomsten worden per request gememoïseerd, zodat herhaalde
+checks in één handler niets kosten; is_admin() deelt die memo.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from app.services.request_context import request_memo
+from app.services.schema_capabilities import schema_capabilities
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CasePermissie:
+    """Effectief recht op een zaak; case_id None = zaak (of regel) bestaat niet."""
+    case_id: Optional[str]
+    permissie: Optional[str]  # 'owner', 'edit', 'view' of None
+    is_admin: bool = False
+
+    @property
+    def kan_bewerken(self) -> bool:
+        return self.case_id is not None and self.permissie in ('owner', 'edit')
+
+    @property
+    def kan_lezen(self) -> bool:
+        return self.case_id is not None and (self.permissie is not None or self.is_admin)
+
+
+async def is_admin(db, user_id: str) -> bool:
+    """Check if user has admin role (memoized per request)."""
+    memo = request_memo('admin')
+    if memo is not None and user_id in memo:
+        return memo[user_id]
+    try:
+        roles = await db.table('user_roles').select('role').eq('user_id', user_id).execute()
+        admin = any(r['role'] == 'admin' for r in roles.data) if roles.data else False
+    except Exception:
+        return False
+    if memo is not None:
+        memo[user_id] = admin
+    return admin
+
+
+async def case_permissie(db, user_id: str, case_id: Optional[str] = None,
+                         vordering_id: Optional[str] = None,
+                         deelbetaling_id: Optional[str] = None) -> CasePermissie:
+    """Effectief recht van user_id op een zaak, of op de zaak van een vordering / deelbetaling."""
+    if case_id is not None:
+        sleutel = ('case', case_id)
+    elif vordering_id is not None:
+        sleutel = ('vordering', vordering_id)
+    elif deelbetaling_id is not None:
+        sleutel = ('deelbetaling', deelbetaling_id)
+    else:
+        raise ValueError("case_id, vordering_id of deelbetaling_id is verplicht")
+
+    memo = request_memo('permissie')
+    if memo is not None and (user_id, sleutel) in memo:
+        return memo[(user_id, sleutel)]
+
+    try:
+        rijen = (await db.rpc('case_permission', {
+            'p_user_id': user_id,
+            'p_case_id': case_id,
+            'p_vordering_id': vordering_id,
+            'p_deelbetaling_id': deelbetaling_id,
+        }).execute()).data
+        rij = rijen[0] if rijen else {}
+        permissie = CasePermissie(rij.get('case_id'), rij.get('permission'), bool(rij.get('is_admin')))
+    except Exception as e:
+        logger.debug(f"case_permission niet beschikbaar, per tabel: {e}")
+        permissie = await _case_permissie_per_tabel(db, user_id, case_id, vordering_id, deelbetaling_id)
+
+    if memo is not None:
+        memo[(user_id, sleutel)] = permissie
+        if permissie.case_id is not None:
+            memo[(user_id, ('case', permissie.case_id))] = permissie
+        request_memo('admin')[user_id] = permissie.is_admin
+    return permissie
+
+
+async def _case_permissie_per_tabel(db, user_id: str, case_id: Optional[str],
+                                    vordering_id: Optional[str],
+                                    deelbetaling_id: Optional[str]) -> CasePermissie:
+    """case_permissie() zonder RPC: zaak opzoeken, dan eigenaar, share en rol tegelijk."""
+    if case_id is None:
+        tabel, regel_id = ('vorderingen', vordering_id) if vordering_id is not None else ('deelbetalingen', deelbetaling_id)
+        regel = await db.table(tabel).select('case_id').eq('id', regel_id).execute()
+        if not regel.data:
+            return CasePermissie(None, None, await is_admin(db, user_id))
+        case_id = regel.data[0]['case_id']
+
+    async def _share():
+        if not schema_capabilities().sharing:
+            return None
+        try:
+            share = await db.table('case_shares').select('permission').eq(
+                'case_id', case_id
+            ).eq('shared_with_user_id', user_id).execute()
+            return share.data[0]['permission'] if share.data else None
+        except Exception:
+            return None
+
+    case, share, admin = await asyncio.gather(
+        db.table('cases').select('user_id').eq('id', case_id).execute(),
+        _share(),
+        is_admin(db, user_id),
+    )
+    if not case.data:
+        return CasePermissie(None, None, admin)
+    if case.data[0]['user_id'] == user_id:
+        return CasePermissie(case_id, 'owner', admin)
+    return CasePermissie(case_id, share, admin)
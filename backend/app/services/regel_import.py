@@ -0,0 +1,173 @@
+"""
+Inlezen van vorderingen en deelbetalingen uit CSV of Excel (bulk import).
+
+Eén regel per rij, met een kopregel. Kolomnamen volgen de velden van
+VorderingCreate / DeelbetalingCreate (kenmerk, bedrag, datum, rentetype,
+...), met een paar gangbare aliassen (factuurnummer, factuurdatum). De
+kolom 'soort' bepaalt het type regel: 'vordering', 'kosten' of
+'deelbetaling'; zonder die kolom is een rij met rentetype een vordering en
+een rij zonder een deelbetaling.
+
+Alle rijen worden vooraf gevalideerd; fouten worden per rij verzameld, zodat
+de gebruiker een heel bestand in één keer kan corrigeren.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.models import VorderingCreate, DeelbetalingCreate
+
+_ALIASSEN = {
+    'type': 'soort',
+    'item_type': 'soort',
+    'factuurnummer': 'kenmerk',
+    'factuur': 'kenmerk',
+    'referentie': 'kenmerk',
+    'hoofdsom': 'bedrag',
+    'factuurdatum': 'datum',
+    'vervaldatum': 'datum',
+    'betaaltermijn': 'betaaltermijn_dagen',
+    'categorie': 'kosten_categorie',
+}
+
+_DATUMVELDEN = {'datum', 'kosten_rentedatum', 'opslag_ingangsdatum', 'pauze_start', 'pauze_eind'}
+_BEDRAGVELDEN = {'bedrag', 'kosten', 'opslag', 'bodemrente'}
+_SOORTEN = {'vordering', 'kosten', 'deelbetaling'}
+_DUIZENDTALLEN = re.compile(r'-?[1-9]\d{0,2}(\.\d{3})+')
+
+
+class ImportFout(ValueError):
+    """Het bestand kan niet worden gelezen (formaat, kopregel)."""
+
+
+def _kolomnaam(kop: Any) -> str:
+    naam = re.sub(r'[\s\-]+', '_', str(kop or '').strip().lower())
+    return _ALIASSEN.get(naam, naam)
+
+
+def _bedrag(waarde: Any) -> Any:
+    """
+    Bedrag als Decimal; accepteert 1234.56, 1234,56, 1.234,56 en 1.234 (en €).
+
+    Een punt gevolgd door precies drie cijfers (zonder komma) is een
+    scheidingsteken voor duizendtallen, zoals in een Nederlands rekeningoverzicht.
+    """
+    if not isinstance(waarde, str):
+        return waarde
+    tekst = waarde.replace('€', '').replace(' ', '').strip()
+    if ',' in tekst or _DUIZENDTALLEN.fullmatch(tekst):
+        tekst = tekst.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(tekst)
+    except InvalidOperation:
+        return waarde  # Pydantic geeft de foutmelding
+
+
+def _datum(waarde: Any) -> Any:
+    """Datum; accepteert ISO (2024-01-31), 31-01-2024 en 31/01/2024."""
+    if isinstance(waarde, datetime):
+        return waarde.date()
+    if not isinstance(waarde, str):
+        return waarde
+    tekst = waarde.strip()
+    for formaat in ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(tekst, formaat).date()
+        except ValueError:
+            continue
+    return tekst
+
+
+def _veld(naam: str, waarde: Any) -> Any:
+    if naam in _DATUMVELDEN:
+        return _datum(waarde)
+    if naam in _BEDRAGVELDEN:
+        return _bedrag(waarde)
+    if naam in ('rentetype', 'betaaltermijn_dagen') and isinstance(waarde, float) and waarde.is_integer():
+        return int(waarde)
+    if naam == 'aangewezen' and isinstance(waarde, str):
+        return [k.strip() for k in re.split(r'[;,]', waarde) if k.strip()]
+    if naam == 'kenmerk' and isinstance(waarde, (int, float)):
+        return str(int(waarde)) if float(waarde).is_integer() else str(waarde)
+    return waarde
+
+
+def _rijen_csv(inhoud: bytes) -> List[List[Any]]:
+    tekst = inhoud.decode('utf-8-sig', errors='replace')
+    try:
+        dialect = csv.Sniffer().sniff(tekst[:4096], delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(tekst), dialect))
+
+
+def _rijen_xlsx(inhoud: bytes) -> List[List[Any]]:
+    from openpyxl import load_workbook
+    try:
+        wb = load_workbook(io.BytesIO(inhoud), read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFout(f"Excel bestand kan niet worden gelezen: {e}")
+    try:
+        return [list(rij) for rij in wb.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def lees_regels(inhoud: bytes, bestandsnaam: str = "") -> Tuple[
+        List[VorderingCreate], List[DeelbetalingCreate], List[str]]:
+    """
+    Lees en valideer een CSV- of Excel-bestand.
+
+    Returns (vorderingen, deelbetalingen, fouten); fouten zijn meldingen per
+    rij (rijnummers zoals in het bestand). Raises ImportFout als het bestand
+    als geheel niet te lezen is.
+    """
+    if bestandsnaam.lower().endswith(('.xlsx', '.xlsm')) or inhoud[:2] == b'PK':
+        rijen = _rijen_xlsx(inhoud)
+    else:
+        rijen = _rijen_csv(inhoud)
+    if not rijen:
+        raise ImportFout("Bestand is leeg")
+
+    kolommen = [_kolomnaam(kop) for kop in rijen[0]]
+    if 'bedrag' not in kolommen or 'datum' not in kolommen:
+        raise ImportFout("Kopregel mist de kolommen 'bedrag' en/of 'datum'")
+
+    vorderingen: List[VorderingCreate] = []
+    deelbetalingen: List[DeelbetalingCreate] = []
+    fouten: List[str] = []
+
+    for rijnummer, rij in enumerate(rijen[1:], start=2):
+        waarden: Dict[str, Any] = {}
+        for naam, waarde in zip(kolommen, rij):
+            if not naam or waarde is None or (isinstance(waarde, str) and not waarde.strip()):
+                continue
+            waarden[naam] = _veld(naam, waarde)
+        if not waarden:
+            continue  # Lege rij
+
+        soort = str(waarden.pop('soort', '')).strip().lower()
+        if not soort:
+            soort = 'vordering' if 'rentetype' in waarden else 'deelbetaling'
+        if soort not in _SOORTEN:
+            fouten.append(f"Rij {rijnummer}: onbekende soort '{soort}'")
+            continue
+
+        try:
+            if soort == 'deelbetaling':
+                deelbetalingen.append(DeelbetalingCreate(**waarden))
+            else:
+                vorderingen.append(VorderingCreate(item_type=soort, **waarden))
+        except ValidationError as e:
+            for fout in e.errors():
+                veld = '.'.join(str(deel) for deel in fout['loc'])
+                fouten.append(f"Rij {rijnummer}: {veld}: {fout['msg']}")
+        except TypeError as e:
+            fouten.append(f"Rij {rijnummer}: {e}")
+
+    return vorderingen, deelbetalingen, fouten
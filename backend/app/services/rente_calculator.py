@@ -9,11 +9,20 @@ Gebaseerd op de referentie-implementatie met correcties voor:
 3. Betalingstoerekening conform art. 6:43/6:44 BW
 """
 
+from bisect import bisect_left, bisect_right, insort
+from heapq import heappop, heappush
+from itertools import groupby
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import date, timedelta
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional
+import asyncio
+import hashlib
 import logging
+import threading
+
+from app.services import kalender
+from app.services.kalender import verjaardag_tabel
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +31,33 @@ logger = logging.getLogger(__name__)
 # RENTETABEL CACHE - Laden uit database
 # =============================================================================
 
+class RenteTijdlijn:
+    """Gecompileerde tijdlijn van één rentetype, oplopend gesorteerd.
+
+    Zoekt het geldende percentage en de eerstvolgende wijziging met bisect
+    in O(log n) in plaats van een lineaire scan over de tabel."""
+
+    def __init__(self, rijen: List):
+        # rijen: [(datum, percentage), ...] in willekeurige volgorde
+        oplopend = sorted(rijen)
+        self.data: List[date] = [d for d, _ in oplopend]
+        self.percentages: List[Decimal] = [p for _, p in oplopend]
+
+    def percentage_op(self, datum: date) -> Decimal:
+        """Percentage dat geldt op een datum (oudste entry als fallback)."""
+        i = bisect_right(self.data, datum) - 1
+        return self.percentages[i if i >= 0 else 0]
+
+    def volgende_wijziging(self, datum: date) -> Optional[date]:
+        """Eerste wijzigingsdatum strikt na datum, of None."""
+        i = bisect_right(self.data, datum)
+        return self.data[i] if i < len(self.data) else None
+
+    def wijzigingen_tussen(self, van: date, tot: date) -> List[date]:
+        """Wijzigingsdata strikt tussen van en tot."""
+        return self.data[bisect_right(self.data, van):bisect_left(self.data, tot)]
+
+
 class RenteTabelCache:
     """In-memory cache voor rentetabellen uit de database.
     Wettelijke en handelsrente worden volledig apart bewaard."""
@@ -29,9 +65,11 @@ class RenteTabelCache:
     def __init__(self):
         self._wettelijk: List = None  # [(datum, percentage), ...] nieuwste eerst
         self._handels: List = None    # [(datum, percentage), ...] nieuwste eerst
-        self._wijzigingsdata_wettelijk: List[date] = None
-        self._wijzigingsdata_handels: List[date] = None
+        self._tijdlijn_wettelijk: RenteTijdlijn = None
+        self._tijdlijn_handels: RenteTijdlijn = None
+        self._versie: str = None
         self._loaded = False
+        self._laad_lock = threading.Lock()
 
     def _load_from_db(self):
         """Laad rentetabellen uit de database."""
@@ -45,44 +83,65 @@ class RenteTabelCache:
             if not wettelijk.data or not handels.data:
                 raise RuntimeError("Rentetabellen zijn leeg in database. Vul de tabellen via het admin panel.")
 
-            # Bouw aparte tabellen (nieuwste eerst)
-            self._wettelijk = [
-                (date.fromisoformat(row['ingangsdatum']), Decimal(str(row['percentage'])))
-                for row in wettelijk.data
-            ]
-            self._handels = [
-                (date.fromisoformat(row['ingangsdatum']), Decimal(str(row['percentage'])))
-                for row in handels.data
-            ]
-
-            self._wijzigingsdata_wettelijk = sorted(d for d, _ in self._wettelijk)
-            self._wijzigingsdata_handels = sorted(d for d, _ in self._handels)
-
-            self._loaded = True
+            self._compileer(
+                [(date.fromisoformat(row['ingangsdatum']), Decimal(str(row['percentage']))) for row in wettelijk.data],
+                [(date.fromisoformat(row['ingangsdatum']), Decimal(str(row['percentage']))) for row in handels.data],
+            )
             logger.info(f"Rentetabel geladen uit database: {len(self._wettelijk)} wettelijk, {len(self._handels)} handels entries")
 
         except Exception as e:
             logger.error(f"Kan rentetabel niet laden uit database: {e}")
             raise RuntimeError(f"Kan rentetabel niet laden uit database: {e}")
 
+    def _compileer(self, wettelijk: List, handels: List):
+        """Bouw de tabellen (nieuwste eerst) en de doorzoekbare tijdlijnen per rentetype."""
+        self._wettelijk = sorted(wettelijk, reverse=True)
+        self._handels = sorted(handels, reverse=True)
+        self._tijdlijn_wettelijk = RenteTijdlijn(self._wettelijk)
+        self._tijdlijn_handels = RenteTijdlijn(self._handels)
+        # Inhoudshash: gelijk over processen en herstarts, wijzigt alleen als de tabellen wijzigen
+        inhoud = repr((self._wettelijk, self._handels)).encode()
+        self._versie = hashlib.sha256(inhoud).hexdigest()[:16]
+        self._loaded = True
+
     def _ensure_loaded(self):
         if not self._loaded:
-            self._load_from_db()
+            with self._laad_lock:
+                if not self._loaded:
+                    self._load_from_db()
+
+    async def laad_async(self):
+        """Laad de tabellen (indien nodig) buiten de event loop; de database client is synchroon."""
+        if not self._loaded:
+            await asyncio.to_thread(self._ensure_loaded)
+
+    @property
+    def versie(self) -> str:
+        """Versiestempel van de geladen rentetabellen (voor cache keys)."""
+        self._ensure_loaded()
+        return self._versie
+
+    async def versie_async(self) -> str:
+        """versie vanuit een async handler: een koude cache blokkeert de event loop niet."""
+        await self.laad_async()
+        return self.versie
+
+    def get_tijdlijn(self, is_handelsrente: bool) -> RenteTijdlijn:
+        """Haal de gecompileerde tijdlijn op voor het specifieke rentetype."""
+        self._ensure_loaded()
+        return self._tijdlijn_handels if is_handelsrente else self._tijdlijn_wettelijk
 
     def get_percentage(self, datum: date, is_handelsrente: bool) -> Decimal:
         """Haal het geldende rentepercentage op voor een datum."""
-        self._ensure_loaded()
-        tabel = self._handels if is_handelsrente else self._wettelijk
-        for rente_datum, pct in tabel:
-            if datum >= rente_datum:
-                return pct
-        # Fallback: oudste entry
-        return tabel[-1][1]
+        return self.get_tijdlijn(is_handelsrente).percentage_op(datum)
+
+    def get_volgende_wijziging(self, datum: date, is_handelsrente: bool) -> Optional[date]:
+        """Haal de eerste rentewijziging strikt na een datum op (None als er geen is)."""
+        return self.get_tijdlijn(is_handelsrente).volgende_wijziging(datum)
 
     def get_wijzigingsdata(self, is_handelsrente: bool) -> List[date]:
         """Haal wijzigingsdata op voor het specifieke rentetype."""
-        self._ensure_loaded()
-        return self._wijzigingsdata_handels if is_handelsrente else self._wijzigingsdata_wettelijk
+        return self.get_tijdlijn(is_handelsrente).data
 
     @property
     def rentetabel(self) -> List:
@@ -106,8 +165,9 @@ class RenteTabelCache:
         """Invalideer de cache zodat de volgende request opnieuw laadt."""
         self._wettelijk = None
         self._handels = None
-        self._wijzigingsdata_wettelijk = None
-        self._wijzigingsdata_handels = None
+        self._tijdlijn_wettelijk = None
+        self._tijdlijn_handels = None
+        self._versie = None
         self._loaded = False
         logger.info("Rentetabel cache geïnvalideerd")
 
@@ -133,6 +193,16 @@ def get_rente_wijzigingsdata(is_handelsrente: bool = False):
     return _cache.get_wijzigingsdata(is_handelsrente)
 
 
+def get_rente_wijzigingen_tussen(van: date, tot: date, is_handelsrente: bool = False) -> List[date]:
+    """Get de rentewijzigingsdata strikt tussen van en tot (bisect, O(log n))."""
+    return _cache.get_tijdlijn(is_handelsrente).wijzigingen_tussen(van, tot)
+
+
+def get_volgende_rentewijziging(datum: date, is_handelsrente: bool = False) -> Optional[date]:
+    """Get de eerste rentewijziging strikt na een datum, of None."""
+    return _cache.get_volgende_wijziging(datum, is_handelsrente)
+
+
 def get_rente_percentage(datum: date, is_handelsrente: bool, opslag: Decimal = Decimal("0")) -> Decimal:
     """Haal het geldende rentepercentage op voor een datum, inclusief eventuele opslag."""
     basis = _cache.get_percentage(datum, is_handelsrente)
@@ -265,29 +335,50 @@ class Deelbetaling:
     toerekeningen: List[Dict] = field(default_factory=list)
 
 
+# Veranderlijke staat van een vordering die in een checkpoint wordt vastgelegd.
+# Periodes/events zijn append-only: daarvan volstaat de lengte.
+_STAAT_VELDEN = (
+    'hoofdsom', 'openstaande_kosten', 'opgebouwde_rente', 'opgebouwde_rente_kosten',
+    'totale_rente', 'totale_rente_kosten', 'voldaan', 'voldaan_datum',
+    'afgelost_hoofdsom', 'afgelost_kosten', 'afgelost_rente', 'afgelost_rente_kosten',
+    'laatst_berekend_tot', 'laatst_berekend_tot_kosten',
+)
+
+
+def _sleutel_waarde(waarde):
+    """Decimal als string vergelijken: 100 en 100.00 geven andere output."""
+    return str(waarde) if isinstance(waarde, Decimal) else waarde
+
+
+def _vordering_invoer(v: Vordering) -> tuple:
+    """Invoer van een vordering (na __post_init__), om wijzigingen te herkennen."""
+    return tuple(_sleutel_waarde(x) for x in (
+        v.kenmerk, v.oorspronkelijk_bedrag, v.startdatum, v.factuurdatum, v.rentetype,
+        v.item_type, v.kosten, v.kosten_rentedatum, v.opslag, v.opslag_ingangsdatum,
+        v.pauze_start, v.pauze_eind, v.betaaltermijn_dagen, v.bodemrente,
+    ))
+
+
+def _betaling_invoer(b: Deelbetaling) -> tuple:
+    """Invoer van een deelbetaling, om wijzigingen te herkennen."""
+    return (b.kenmerk, str(b.bedrag), b.datum, tuple(b.aangewezen_vorderingen))
+
+
 # =============================================================================
 # HULPFUNCTIES
 # =============================================================================
 
+# De kalenderrekenkunde zelf staat in kalender.py (op ordinals); de functies
+# hieronder zijn de date-interface daarvan.
+
 def verjaardag(start_datum: date, jaar: int) -> date:
     """Bereken verjaardag in een specifiek jaar, handle 29 feb."""
-    try:
-        return date(jaar, start_datum.month, start_datum.day)
-    except ValueError:
-        return date(jaar, start_datum.month, 28)
+    return kalender.verjaardag(start_datum, jaar)
 
 
 def heeft_schrikkeldag(start: date, eind: date) -> bool:
     """Check of er een 29 februari in de periode [start, eind) valt."""
-    jaar_start = start.year
-    jaar_eind = eind.year
-    for jaar in range(jaar_start, jaar_eind + 1):
-        # Check of dit jaar een schrikkeljaar is
-        if jaar % 4 == 0 and (jaar % 100 != 0 or jaar % 400 == 0):
-            feb29 = date(jaar, 2, 29)
-            if start <= feb29 < eind:
-                return True
-    return False
+    return kalender.heeft_schrikkeldag(start.toordinal(), eind.toordinal())
 
 
 def dagen_in_jaar(start: date, eind: date) -> int:
@@ -308,22 +399,9 @@ def dagen_in_kapitalisatiejaar(vordering_startdatum: date, subperiode_start: dat
     - Kapitalisatiejaar 1: 2-2-2024 t/m 2-2-2025 = 366 dagen (29 feb zit erin)
     - Alle subperiodes in dat jaar delen door 366
     """
-    # Vind de start van het huidige kapitalisatiejaar
-    # (de meest recente verjaardag op of vóór subperiode_start)
-    jaar = subperiode_start.year
-    vj_dit_jaar = verjaardag(vordering_startdatum, jaar)
-
-    if vj_dit_jaar > subperiode_start:
-        # De verjaardag dit jaar is nog niet geweest, dus we zitten in het vorige kapitalisatiejaar
-        kap_jaar_start = verjaardag(vordering_startdatum, jaar - 1)
-    else:
-        kap_jaar_start = vj_dit_jaar
-
-    # Eind van het kapitalisatiejaar is de volgende verjaardag
-    kap_jaar_eind = verjaardag(vordering_startdatum, kap_jaar_start.year + 1)
-
-    # Bereken het aantal dagen in dit kapitalisatiejaar
-    return (kap_jaar_eind - kap_jaar_start).days
+    # Het kapitalisatiejaar begint op de meest recente verjaardag op of vóór
+    # subperiode_start en eindigt op de volgende verjaardag
+    return verjaardag_tabel(vordering_startdatum).kapitalisatiejaar_dagen(subperiode_start.toordinal())
 
 
 def bereken_rente(hoofdsom: Decimal, rente_pct: Decimal, dagen: int, dagen_jaar: int = 365) -> Decimal:
@@ -334,6 +412,113 @@ def bereken_rente(hoofdsom: Decimal, rente_pct: Decimal, dagen: int, dagen_jaar:
     return rente.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
+def evenredig_aandeel(te_verdelen: Decimal, openstaand: Decimal, totaal_openstaand: Decimal) -> Decimal:
+    """Evenredig deel van een betaling voor één vordering, afgerond op centen."""
+    aandeel = openstaand / totaal_openstaand
+    return (te_verdelen * aandeel).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+# =============================================================================
+# ACTIEVE VORDERINGEN INDEX
+# =============================================================================
+
+class ActieveVorderingenIndex:
+    """
+    Actieve (gestarte, niet-voldane) vorderingen op toerekeningsvolgorde.
+
+    Sleutel per vordering: (-rente%, startdatum, invoervolgorde), gelijk aan
+    de stabiele sort in verwerk_betaling. Een sleutel verandert alleen bij een
+    rentewijziging of de opslag-ingangsdatum; per vordering wordt bijgehouden
+    tot wanneer de sleutel geldig is, en alleen verlopen sleutels worden
+    opnieuw bepaald. Voldane vorderingen worden lui overgeslagen en periodiek
+    opgeruimd. Betalingen moeten op oplopende datum worden aangeboden.
+    """
+
+    # Vanaf dit aantal verlopen sleutels is opnieuw sorteren goedkoper dan insort
+    HERSORTEER_VANAF = 32
+
+    def __init__(self, vorderingen: List[Vordering]):
+        self._vorderingen = vorderingen
+        self._wachtend = sorted(range(len(vorderingen)), key=lambda i: (vorderingen[i].startdatum, i))
+        self._volgende = 0
+        self._gesorteerd: List[tuple] = []  # [(-pct, startdatum, i)]
+        self._sleutel: Dict[int, tuple] = {}
+        self._verloop: List[tuple] = []  # heap van (geldig_tot, i)
+        self._geldig_tot: Dict[int, date] = {}
+        self._opruimen = False
+
+    def _sleutel_voor(self, i: int, datum: date) -> tuple:
+        v = self._vorderingen[i]
+        grenzen = []
+        if v.rentetype != 5:
+            wijziging = get_volgende_rentewijziging(datum, v.is_handelsrente)
+            if wijziging is not None:
+                grenzen.append(wijziging)
+        if v.rentetype in (6, 7) and v.opslag_ingangsdatum > datum:
+            grenzen.append(v.opslag_ingangsdatum)
+        if grenzen:
+            geldig_tot = min(grenzen)
+            self._geldig_tot[i] = geldig_tot
+            heappush(self._verloop, (geldig_tot, i))
+        return (-v.get_rente_pct(datum), v.startdatum, i)
+
+    def bijwerken(self, datum: date):
+        """Breng de index naar `datum`: nieuw gestarte vorderingen en verlopen sleutels."""
+        nieuw = []
+        while (self._volgende < len(self._wachtend)
+               and self._vorderingen[self._wachtend[self._volgende]].startdatum <= datum):
+            i = self._wachtend[self._volgende]
+            self._volgende += 1
+            if not self._vorderingen[i].voldaan:
+                nieuw.append(i)
+
+        verlopen = set()
+        while self._verloop and self._verloop[0][0] <= datum:
+            geldig_tot, i = heappop(self._verloop)
+            if self._geldig_tot.get(i) == geldig_tot:
+                del self._geldig_tot[i]
+                verlopen.add(i)
+
+        if self._opruimen or len(verlopen) >= self.HERSORTEER_VANAF:
+            self._gesorteerd = [e for e in self._gesorteerd
+                                if e[2] not in verlopen and not self._vorderingen[e[2]].voldaan]
+            for i in verlopen:
+                self._sleutel.pop(i, None)
+                if not self._vorderingen[i].voldaan:
+                    nieuw.append(i)
+            for i in nieuw:
+                self._sleutel[i] = self._sleutel_voor(i, datum)
+                self._gesorteerd.append(self._sleutel[i])
+            self._gesorteerd.sort()
+            self._sleutel = {e[2]: e for e in self._gesorteerd}
+            self._opruimen = False
+            return
+
+        for i in verlopen:
+            oud = self._sleutel.pop(i, None)
+            if oud is not None:  # Anders al opgeruimd als voldaan
+                del self._gesorteerd[bisect_left(self._gesorteerd, oud)]
+            if not self._vorderingen[i].voldaan:
+                nieuw.append(i)
+        for i in nieuw:
+            self._sleutel[i] = self._sleutel_voor(i, datum)
+            insort(self._gesorteerd, self._sleutel[i])
+
+    def op_volgorde(self, uitsluiten=()):
+        """Actieve vorderingen op prioriteit, als (sleutel, vordering)."""
+        overgeslagen = 0
+        for sleutel in self._gesorteerd:
+            v = self._vorderingen[sleutel[2]]
+            if v.voldaan:
+                overgeslagen += 1
+                if overgeslagen * 2 > len(self._gesorteerd):
+                    self._opruimen = True
+                continue
+            if v.kenmerk in uitsluiten:
+                continue
+            yield sleutel, v
+
+
 # =============================================================================
 # RENTE CALCULATOR
 # =============================================================================
@@ -341,13 +526,36 @@ def bereken_rente(hoofdsom: Decimal, rente_pct: Decimal, dagen: int, dagen_jaar:
 class RenteCalculator:
     """Calculator for Dutch statutory interest."""
 
-    def __init__(self, vorderingen: List[Vordering], deelbetalingen: List[Deelbetaling], einddatum: date):
+    # Rekenkern: bedragen als Decimal. Zie scripts/centen_kernel.py voor de integer-variant.
+    kernel = 'decimal'
+    _rente = staticmethod(bereken_rente)
+    _aandeel = staticmethod(evenredig_aandeel)
+    _nul = Decimal("0")
+
+    def __init__(self, vorderingen: List[Vordering], deelbetalingen: List[Deelbetaling], einddatum: date,
+                 detail: str = 'full', checkpoints: bool = False):
         self.vorderingen = {v.kenmerk: v for v in vorderingen}
         self.deelbetalingen = sorted(deelbetalingen, key=lambda d: d.datum)
         # Einddatum is inclusief (t/m), dus +1 dag voor interne berekening (exclusief)
         self.einddatum = einddatum + timedelta(days=1)
         self.einddatum_display = einddatum  # Originele datum voor weergave
         self.events = []
+        # 'summary': alleen bedragen bijhouden, geen periodes/events opbouwen.
+        # De bedragen zijn identiek aan 'full', alleen de detail-logging vervalt.
+        self.detail = detail
+        self.met_periodes = detail != 'summary'
+        if not self.met_periodes:
+            for v in self.vorderingen.values():
+                v.periodes.clear()  # Betaaltermijn-periode uit __post_init__
+        # Checkpoints: checkpoints[i] bevat de staat van de vorderingen die door
+        # betaling i-1 geraakt zijn (delta); checkpoints[0] is de beginstaat.
+        # De staat vóór betaling i is dus checkpoints[0..i] samengevoegd.
+        self.bewaar_checkpoints = checkpoints
+        self.checkpoints: List[Dict[str, tuple]] = []
+        self.rentetabel_versie = _cache.versie if checkpoints else None
+        self.hervat_vanaf = 0  # Aantal betalingen overgenomen uit een vorige berekening
+        self._aangeraakt = set()
+        self._index: Optional[ActieveVorderingenIndex] = None  # Lui opgebouwd bij de eerste betaling
 
     def get_actieve_vorderingen(self, datum: date) -> List[Vordering]:
         """Haal alle actieve (niet-voldane) vorderingen op die al gestart zijn."""
@@ -368,20 +576,13 @@ class RenteCalculator:
         splitpunten = set()
 
         # Voeg rentewijzigingsdata toe (alleen voor het relevante rentetype)
-        for wijziging in get_rente_wijzigingsdata(vordering.is_handelsrente):
-            if van_datum < wijziging < tot_datum:
-                splitpunten.add(wijziging)
+        splitpunten.update(get_rente_wijzigingen_tussen(van_datum, tot_datum, vordering.is_handelsrente))
 
         # Voeg verjaardagen toe (voor samengestelde rente)
         if vordering.is_samengesteld:
-            jaar = van_datum.year - 1
-            while True:
-                jaar += 1
-                vj = verjaardag(vordering.startdatum, jaar)
-                if vj >= tot_datum:
-                    break
-                if vj > van_datum:
-                    splitpunten.add(vj)
+            splitpunten.update(verjaardag_tabel(vordering.startdatum).tussen(
+                van_datum.toordinal(), tot_datum.toordinal()
+            ))
 
         # Voeg pauze grenzen toe
         if vordering.pauze_start and van_datum < vordering.pauze_start < tot_datum:
@@ -391,6 +592,18 @@ class RenteCalculator:
 
         return sorted(splitpunten)
 
+    def get_splitpunten_kosten(self, vordering: Vordering, van_datum: date, tot_datum: date) -> List[date]:
+        """
+        Bepaal de splitpunten voor rente over kosten tussen twee data:
+        rentewijzigingsdata en pauze grenzen (geen kapitalisatie voor kosten).
+        """
+        splitpunten = set(get_rente_wijzigingen_tussen(van_datum, tot_datum, vordering.is_handelsrente))
+        if vordering.pauze_start and van_datum < vordering.pauze_start < tot_datum:
+            splitpunten.add(vordering.pauze_start)
+        if vordering.pauze_eind and van_datum < vordering.pauze_eind < tot_datum:
+            splitpunten.add(vordering.pauze_eind)
+        return sorted(splitpunten)
+
     def bereken_rente_kosten_tot_datum(self, vordering: Vordering, tot_datum: date):
         """
         Bereken rente over openstaande kosten tot een bepaalde datum.
@@ -407,62 +620,59 @@ class RenteCalculator:
             return
 
         # Haal splitpunten op (alleen rentewijzigingen + pauze grenzen, geen kapitalisatie voor kosten)
-        splitpunten = []
-        for wijziging in get_rente_wijzigingsdata(vordering.is_handelsrente):
-            if huidige_datum < wijziging < tot_datum:
-                splitpunten.append(wijziging)
-        # Add pause boundaries
-        if vordering.pauze_start and huidige_datum < vordering.pauze_start < tot_datum:
-            splitpunten.append(vordering.pauze_start)
-        if vordering.pauze_eind and huidige_datum < vordering.pauze_eind < tot_datum:
-            splitpunten.append(vordering.pauze_eind)
+        splitpunten = self.get_splitpunten_kosten(vordering, huidige_datum, tot_datum)
         splitpunten.append(tot_datum)
-        splitpunten = sorted(set(splitpunten))
+
+        # Dagen en schrikkeldagen op ordinals (kalender.py)
+        huidig_ordinal = huidige_datum.toordinal()
 
         for splitpunt in splitpunten:
             if huidige_datum >= splitpunt:
                 continue
+            splitpunt_ordinal = splitpunt.toordinal()
 
             # Check if this period is in a pause
             is_in_pauze = vordering.is_in_pauze(huidige_datum)
 
-            dagen = (splitpunt - huidige_datum).days
+            dagen = splitpunt_ordinal - huidig_ordinal
             rente_pct = vordering.get_rente_pct(huidige_datum)
 
-            jaar_dagen = dagen_in_jaar(huidige_datum, splitpunt)
+            jaar_dagen = kalender.dagen_in_jaar(huidig_ordinal, splitpunt_ordinal)
 
             if is_in_pauze:
                 # No interest during pause
-                rente = Decimal("0")
-                vordering.periodes_kosten.append({
-                    'start': huidige_datum,
-                    'eind': splitpunt,
-                    'dagen': dagen,
-                    'dagen_jaar': jaar_dagen,
-                    'kosten': vordering.openstaande_kosten,
-                    'rente_pct': Decimal("0"),
-                    'rente': Decimal("0"),
-                    'opgebouwd': vordering.opgebouwde_rente_kosten,
-                    'is_pauze': True
-                })
+                if self.met_periodes:
+                    vordering.periodes_kosten.append({
+                        'start': huidige_datum,
+                        'eind': splitpunt,
+                        'dagen': dagen,
+                        'dagen_jaar': jaar_dagen,
+                        'kosten': vordering.openstaande_kosten,
+                        'rente_pct': Decimal("0"),
+                        'rente': Decimal("0"),
+                        'opgebouwd': vordering.opgebouwde_rente_kosten,
+                        'is_pauze': True
+                    })
             else:
-                rente = bereken_rente(vordering.openstaande_kosten, rente_pct, dagen, jaar_dagen)
+                rente = self._rente(vordering.openstaande_kosten, rente_pct, dagen, jaar_dagen)
                 vordering.opgebouwde_rente_kosten += rente
                 vordering.totale_rente_kosten += rente
 
-                vordering.periodes_kosten.append({
-                    'start': huidige_datum,
-                    'eind': splitpunt,
-                    'dagen': dagen,
-                    'dagen_jaar': jaar_dagen,
-                    'kosten': vordering.openstaande_kosten,
-                    'rente_pct': rente_pct,
-                    'rente': rente,
-                    'opgebouwd': vordering.opgebouwde_rente_kosten,
-                    'is_pauze': False
-                })
+                if self.met_periodes:
+                    vordering.periodes_kosten.append({
+                        'start': huidige_datum,
+                        'eind': splitpunt,
+                        'dagen': dagen,
+                        'dagen_jaar': jaar_dagen,
+                        'kosten': vordering.openstaande_kosten,
+                        'rente_pct': rente_pct,
+                        'rente': rente,
+                        'opgebouwd': vordering.opgebouwde_rente_kosten,
+                        'is_pauze': False
+                    })
 
             huidige_datum = splitpunt
+            huidig_ordinal = splitpunt_ordinal
 
         vordering.laatst_berekend_tot_kosten = tot_datum
 
@@ -489,9 +699,14 @@ class RenteCalculator:
         splitpunten = self.get_splitpunten(vordering, huidige_datum, tot_datum)
         splitpunten.append(tot_datum)  # Voeg einddatum toe
 
+        # Dagen, verjaardagen en kapitalisatiejaren op ordinals (kalender.py)
+        verjaardagen = verjaardag_tabel(vordering.startdatum) if vordering.is_samengesteld else None
+        huidig_ordinal = huidige_datum.toordinal()
+
         for splitpunt in splitpunten:
             if huidige_datum >= splitpunt:
                 continue
+            splitpunt_ordinal = splitpunt.toordinal()
 
             # Check if this period starts in a pause
             is_in_pauze = vordering.is_in_pauze(huidige_datum)
@@ -507,82 +722,86 @@ class RenteCalculator:
             # Bepaal of dit een kapitalisatiemoment is (verjaardag)
             # Vergelijk met verjaardag() om 29 feb / 28 feb correct af te handelen
             is_verjaardag = (
-                vordering.is_samengesteld and
-                splitpunt == verjaardag(vordering.startdatum, splitpunt.year) and
+                verjaardagen is not None and
+                verjaardagen.is_verjaardag(splitpunt_ordinal) and
                 splitpunt < tot_datum and
                 not is_in_pauze  # No kapitalisatie during pause
             )
 
             # Calculate interest for this subperiod (only if not in pause)
-            dagen = (splitpunt - huidige_datum).days
+            dagen = splitpunt_ordinal - huidig_ordinal
             rente_pct = vordering.get_rente_pct(huidige_datum)
 
             # Samengestelde rente: dagen_jaar is gebaseerd op het kapitalisatiejaar
             # Enkelvoudige rente: dagen_jaar is gebaseerd op de subperiode zelf
-            if vordering.is_samengesteld:
-                jaar_dagen = dagen_in_kapitalisatiejaar(vordering.startdatum, huidige_datum)
+            if verjaardagen is not None:
+                jaar_dagen = verjaardagen.kapitalisatiejaar_dagen(huidig_ordinal)
             else:
-                jaar_dagen = dagen_in_jaar(huidige_datum, splitpunt)
+                jaar_dagen = kalender.dagen_in_jaar(huidig_ordinal, splitpunt_ordinal)
 
             if is_in_pauze:
                 # No interest during pause
-                rente = Decimal("0")
-                vordering.periodes.append({
-                    'start': huidige_datum,
-                    'eind': splitpunt,
-                    'dagen': dagen,
-                    'dagen_jaar': jaar_dagen,
-                    'hoofdsom': vordering.hoofdsom,
-                    'rente_pct': Decimal("0"),
-                    'rente': Decimal("0"),
-                    'opgebouwd': vordering.opgebouwde_rente,
-                    'is_kapitalisatie': False,
-                    'is_pauze': True
-                })
+                if self.met_periodes:
+                    vordering.periodes.append({
+                        'start': huidige_datum,
+                        'eind': splitpunt,
+                        'dagen': dagen,
+                        'dagen_jaar': jaar_dagen,
+                        'hoofdsom': vordering.hoofdsom,
+                        'rente_pct': Decimal("0"),
+                        'rente': Decimal("0"),
+                        'opgebouwd': vordering.opgebouwde_rente,
+                        'is_kapitalisatie': False,
+                        'is_pauze': True
+                    })
             else:
                 # Normal interest calculation
-                rente = bereken_rente(vordering.hoofdsom, rente_pct, dagen, jaar_dagen)
+                rente = self._rente(vordering.hoofdsom, rente_pct, dagen, jaar_dagen)
                 vordering.opgebouwde_rente += rente
                 vordering.totale_rente += rente
 
-                vordering.periodes.append({
-                    'start': huidige_datum,
-                    'eind': splitpunt,
-                    'dagen': dagen,
-                    'dagen_jaar': jaar_dagen,
-                    'hoofdsom': vordering.hoofdsom,
-                    'rente_pct': rente_pct,
-                    'rente': rente,
-                    'opgebouwd': vordering.opgebouwde_rente,
-                    'is_kapitalisatie': is_verjaardag,
-                    'is_pauze': False
-                })
+                if self.met_periodes:
+                    vordering.periodes.append({
+                        'start': huidige_datum,
+                        'eind': splitpunt,
+                        'dagen': dagen,
+                        'dagen_jaar': jaar_dagen,
+                        'hoofdsom': vordering.hoofdsom,
+                        'rente_pct': rente_pct,
+                        'rente': rente,
+                        'opgebouwd': vordering.opgebouwde_rente,
+                        'is_kapitalisatie': is_verjaardag,
+                        'is_pauze': False
+                    })
 
             # Kapitalisatie at pause start (before entering pause)
             if is_pauze_start and not is_in_pauze:
-                vordering.events.append({
-                    'type': 'kapitalisatie_pauze',
-                    'datum': splitpunt,
-                    'rente': vordering.opgebouwde_rente,
-                    'oude_hoofdsom': vordering.hoofdsom,
-                    'nieuwe_hoofdsom': vordering.hoofdsom + vordering.opgebouwde_rente
-                })
+                if self.met_periodes:
+                    vordering.events.append({
+                        'type': 'kapitalisatie_pauze',
+                        'datum': splitpunt,
+                        'rente': vordering.opgebouwde_rente,
+                        'oude_hoofdsom': vordering.hoofdsom,
+                        'nieuwe_hoofdsom': vordering.hoofdsom + vordering.opgebouwde_rente
+                    })
                 vordering.hoofdsom += vordering.opgebouwde_rente
-                vordering.opgebouwde_rente = Decimal("0")
+                vordering.opgebouwde_rente = self._nul
 
             # Kapitalisatie op verjaardag
             elif is_verjaardag:
-                vordering.events.append({
-                    'type': 'kapitalisatie',
-                    'datum': splitpunt,
-                    'rente': vordering.opgebouwde_rente,
-                    'oude_hoofdsom': vordering.hoofdsom,
-                    'nieuwe_hoofdsom': vordering.hoofdsom + vordering.opgebouwde_rente
-                })
+                if self.met_periodes:
+                    vordering.events.append({
+                        'type': 'kapitalisatie',
+                        'datum': splitpunt,
+                        'rente': vordering.opgebouwde_rente,
+                        'oude_hoofdsom': vordering.hoofdsom,
+                        'nieuwe_hoofdsom': vordering.hoofdsom + vordering.opgebouwde_rente
+                    })
                 vordering.hoofdsom += vordering.opgebouwde_rente
-                vordering.opgebouwde_rente = Decimal("0")
+                vordering.opgebouwde_rente = self._nul
 
             huidige_datum = splitpunt
+            huidig_ordinal = splitpunt_ordinal
 
         vordering.laatst_berekend_tot = tot_datum
 
@@ -612,8 +831,7 @@ class RenteCalculator:
                 continue
 
             # Bereken aandeel (proportioneel)
-            aandeel = openstaand / totaal_openstaand
-            aflossing = (te_verdelen * aandeel).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            aflossing = self._aandeel(te_verdelen, openstaand, totaal_openstaand)
 
             # Zorg dat we niet meer aflossen dan openstaand
             aflossing = min(aflossing, openstaand, restant)
@@ -637,6 +855,7 @@ class RenteCalculator:
     def _verwerk_vordering_groep(self, vorderingen: List[Vordering], restant: Decimal,
                                   datum: date, betaling: Deelbetaling) -> Decimal:
         """Verwerk een groep vorderingen met dezelfde prioriteit."""
+        self._aangeraakt.update(v.kenmerk for v in vorderingen)
         if len(vorderingen) == 1:
             # Enkele vordering: verwerk normaal
             vordering = vorderingen[0]
@@ -743,10 +962,11 @@ class RenteCalculator:
                 if not vordering.voldaan:
                     vordering.voldaan = True
                     vordering.voldaan_datum = datum
-                    vordering.events.append({
-                        'type': 'voldaan',
-                        'datum': datum
-                    })
+                    if self.met_periodes:
+                        vordering.events.append({
+                            'type': 'voldaan',
+                            'datum': datum
+                        })
 
         return restant
 
@@ -768,33 +988,52 @@ class RenteCalculator:
 
             # Daarna overige actieve vorderingen voor eventueel restant (overflow)
             verwerkte_kenmerken = set(betaling.aangewezen_vorderingen)
-            overige = [v for v in self.get_actieve_vorderingen(datum)
-                      if v.kenmerk not in verwerkte_kenmerken]
         else:
-            overige = self.get_actieve_vorderingen(datum)
+            verwerkte_kenmerken = set()
 
-        # Groepeer overige vorderingen op prioriteit (rente%, startdatum)
-        # en verwerk per groep (evenredig bij gelijke prioriteit)
-        from itertools import groupby
+        # Overige vorderingen op prioriteit (rente%, startdatum) uit de index,
+        # per groep verwerken (evenredig bij gelijke prioriteit)
+        if self._index is None:
+            self._index = ActieveVorderingenIndex(list(self.vorderingen.values()))
+        self._index.bijwerken(datum)
 
-        overige_gesorteerd = sorted(
-            overige,
-            key=lambda v: (-v.get_rente_pct(datum), v.startdatum)
-        )
-
-        for _, groep in groupby(overige_gesorteerd, key=lambda v: (v.get_rente_pct(datum), v.startdatum)):
+        for _, groep in groupby(self._index.op_volgorde(verwerkte_kenmerken), key=lambda e: e[0][:2]):
             if restant <= 0:
                 break
-            groep_list = list(groep)
+            groep_list = [v for _, v in groep]
             restant = self._verwerk_vordering_groep(groep_list, restant, datum, betaling)
 
         betaling.verwerkt = betaling.bedrag - restant
 
-    def bereken(self) -> Dict:
-        """Voer de volledige berekening uit."""
+    def _verwerk_betaling_met_checkpoint(self, betaling: Deelbetaling):
+        """Verwerk een betaling en leg (indien gevraagd) het checkpoint erna vast."""
+        self._aangeraakt.clear()
+        self.verwerk_betaling(betaling)
+        if self.bewaar_checkpoints:
+            self.checkpoints.append({
+                k: self._staat(self.vorderingen[k]) for k in self._aangeraakt
+            })
+
+    def _verwerk_betalingen(self, betalingen: List[Deelbetaling]):
+        """Verwerk (de resterende) betalingen chronologisch."""
+        for betaling in betalingen:
+            self._verwerk_betaling_met_checkpoint(betaling)
+
+    def bereken(self, vorige: Optional['RenteCalculator'] = None) -> Dict:
+        """
+        Voer de volledige berekening uit.
+
+        Met `vorige` (een eerdere berekening van dezelfde zaak, met checkpoints)
+        worden de betalingen vóór de eerste geraakte betaling overgenomen en
+        wordt vanaf dat checkpoint verder gerekend. Het resultaat is identiek
+        aan een volledige berekening.
+        """
+        start = self._hervat(vorige) if vorige is not None else 0
+        if self.bewaar_checkpoints and start == 0:
+            self.checkpoints = [{}]
+
         # Verwerk betalingen chronologisch
-        for betaling in self.deelbetalingen:
-            self.verwerk_betaling(betaling)
+        self._verwerk_betalingen(self.deelbetalingen[start:])
 
         # Bereken rente tot einddatum voor alle open vorderingen
         for vordering in self.vorderingen.values():
@@ -806,3 +1045,78 @@ class RenteCalculator:
             'deelbetalingen': self.deelbetalingen,
             'einddatum': self.einddatum_display  # Originele einddatum voor weergave
         }
+
+    # -------------------------------------------------------------------------
+    # Checkpoints / incrementeel herberekenen
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _staat(v: Vordering) -> tuple:
+        """Compacte staat van een vordering: velden + lengtes van de logs."""
+        return tuple(getattr(v, naam) for naam in _STAAT_VELDEN) + (
+            len(v.periodes), len(v.periodes_kosten), len(v.events)
+        )
+
+    @staticmethod
+    def _herstel(v: Vordering, bron: Vordering, staat: tuple):
+        """Zet vordering v terug naar een checkpoint-staat van bron (zelfde invoer)."""
+        for naam, waarde in zip(_STAAT_VELDEN, staat):
+            setattr(v, naam, waarde)
+        n_periodes, n_periodes_kosten, n_events = staat[len(_STAAT_VELDEN):]
+        v.periodes = bron.periodes[:n_periodes]
+        v.periodes_kosten = bron.periodes_kosten[:n_periodes_kosten]
+        v.events = bron.events[:n_events]
+
+    def _hervat(self, vorige: 'RenteCalculator') -> int:
+        """
+        Neem de staat over van een vorige berekening tot aan de eerste betaling
+        die door de wijziging geraakt kan worden. Geeft het aantal overgenomen
+        betalingen terug (0 = volledig opnieuw rekenen).
+
+        Een betaling is ongeraakt als zij en alle eerdere betalingen gelijk zijn
+        en zij vóór de startdatum van elke gewijzigde, nieuwe of verwijderde
+        vordering valt (eerder kan zo'n vordering niets ontvangen).
+        """
+        if (not self.bewaar_checkpoints or not vorige.bewaar_checkpoints
+                or type(vorige) is not type(self)
+                or vorige.kernel != self.kernel
+                or vorige.met_periodes != self.met_periodes
+                or vorige.rentetabel_versie != self.rentetabel_versie
+                or len(vorige.checkpoints) != len(vorige.deelbetalingen) + 1):
+            return 0
+
+        oud = {k: _vordering_invoer(v) for k, v in vorige.vorderingen.items()}
+        ongewijzigd = [k for k, v in self.vorderingen.items() if oud.get(k) == _vordering_invoer(v)]
+        ongewijzigd_set = set(ongewijzigd)
+        # Volgorde telt mee (evenredige verdeling binnen een groep)
+        if [k for k in vorige.vorderingen if k in ongewijzigd_set] != ongewijzigd:
+            return 0
+
+        startdata = [v.startdatum for k, v in self.vorderingen.items() if k not in ongewijzigd_set]
+        startdata += [v.startdatum for k, v in vorige.vorderingen.items() if k not in ongewijzigd_set]
+        grens = min(startdata, default=None)
+
+        aantal = 0
+        for oude_betaling, betaling in zip(vorige.deelbetalingen, self.deelbetalingen):
+            if grens is not None and betaling.datum >= grens:
+                break
+            if _betaling_invoer(oude_betaling) != _betaling_invoer(betaling):
+                break
+            aantal += 1
+        if aantal == 0:
+            return 0
+
+        staten: Dict[str, tuple] = {}
+        for delta in vorige.checkpoints[1:aantal + 1]:
+            staten.update(delta)
+        if not staten.keys() <= ongewijzigd_set:
+            return 0  # Kan niet voorkomen (zie grens), maar liever opnieuw rekenen
+
+        for kenmerk, staat in staten.items():
+            self._herstel(self.vorderingen[kenmerk], vorige.vorderingen[kenmerk], staat)
+        for oude_betaling, betaling in zip(vorige.deelbetalingen[:aantal], self.deelbetalingen):
+            betaling.verwerkt = oude_betaling.verwerkt
+            betaling.toerekeningen = list(oude_betaling.toerekeningen)
+        self.checkpoints = vorige.checkpoints[:aantal + 1]
+        self.hervat_vanaf = aantal
+        return aantal
@@ -0,0 +1,89 @@
+"""
+Request-scoped memo: per HTTP request een eigen dict per naam.
+
+Voor lookups die binnen één request meerdere keren met dezelfde uitkomst
+worden gedaan (tier van de gebruiker, rechten op een zaak). De middleware
+zet per request een nieuwe memo in een ContextVar; sync endpoints (in de
+threadpool) en taken die tijdens het request worden gestart zien dezelfde
+memo. Buiten een request (scripts, workers) geeft request_memo() None en
+wordt er niets gememoïseerd.
+
+Dezelfde memo telt de database requests (tel_query, aangeroepen vanuit de
+HTTP client van Supabase); query_budget() bewaakt per endpoint het aantal
+queries en de latency.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_memo: ContextVar[Optional[Dict[str, dict]]] = ContextVar('request_memo', default=None)
+
+
+def request_memo(naam: str) -> Optional[dict]:
+    """De memo-dict voor naam binnen het lopende request, of None buiten een request."""
+    memo = _memo.get()
+    if memo is None:
+        return None
+    return memo.setdefault(naam, {})
+
+
+def tel_query():
+    """Tel één database request voor het lopende request."""
+    teller = request_memo('db')
+    if teller is not None:
+        teller['queries'] = teller.get('queries', 0) + 1
+
+
+def aantal_queries() -> int:
+    """Aantal database requests tot nu toe in het lopende request (0 buiten een request)."""
+    teller = request_memo('db')
+    return teller.get('queries', 0) if teller is not None else 0
+
+
+def query_budget(max_queries: int, max_ms: float):
+    """
+    Decorator voor een async endpoint: waarschuw als het endpoint zelf (zonder
+    de auth dependency) meer queries doet of langer duurt dan het budget.
+
+    Alleen een waarschuwing in de log; tests/test_query_budget.py houdt de
+    endpoints binnen hun budget (max_queries / max_ms staan op de wrapper).
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            queries_voor = aantal_queries()
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                queries = aantal_queries() - queries_voor
+                ms = (time.perf_counter() - start) * 1000
+                if queries > max_queries or ms > max_ms:
+                    logger.warning(
+                        f"{func.__name__} buiten budget: {queries} queries (max {max_queries}), "
+                        f"{ms:.0f} ms (max {max_ms:g})"
+                    )
+        wrapper.max_queries = max_queries
+        wrapper.max_ms = max_ms
+        return wrapper
+    return decorator
+
+
+class RequestContextMiddleware:
+    """ASGI middleware die per HTTP request een lege memo zet."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        token = _memo.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _memo.reset(token)
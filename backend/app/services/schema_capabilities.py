@@ -0,0 +1,134 @@
+"""
+Capability registry voor het optionele database schema.
+
+Sharing (migratie 003), subscriptions (migratie 007), opgeslagen
+berekeningen per zaakrevisie (migratie 014) en gecodeerde snapshot
+resultaten (migratie 016) zijn optioneel: de
+API werkt ook als die tabellen (nog) niet bestaan. In plaats van per request
+met probe queries te controleren of ze er zijn, wordt dat bij het opstarten
+één keer gedetecteerd en daarna periodiek op de achtergrond ververst
+(SCHEMA_CAPABILITIES_REFRESH). Routers lezen de uitkomst uit het geheugen.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SchemaCapabilities:
+    """Welke optionele onderdelen van het schema beschikbaar zijn."""
+    sharing: bool = False  # case_shares + user_profiles
+    subscriptions: bool = False  # subscription_tiers + user_subscriptions
+    case_berekeningen: bool = False  # cases.revisie + case_berekeningen
+    snapshot_blokken: bool = False  # snapshot_blokken
+    gedetecteerd_op: float = 0.0
+
+
+# Foutcodes van PostgREST/Postgres voor een tabel of kolom die niet bestaat
+_ONTBREEKT = {
+    'PGRST205',  # Tabel niet in de schema cache
+    'PGRST204',  # Kolom niet in de schema cache
+    '42P01',  # undefined_table
+    '42703',  # undefined_column
+}
+
+
+def _tabellen_bestaan(db, *tabellen: str, kolommen: Optional[dict] = None, vorig: bool = False) -> bool:
+    """
+    Bestaan de tabellen (en per tabel de opgegeven kolommen, standaard 'id')?
+
+    Alleen een fout die zegt dat een tabel of kolom ontbreekt telt als 'nee'.
+    Bij elke andere fout (netwerk, timeout, overbelaste database) is er niets
+    vastgesteld en blijft de vorige uitkomst staan.
+    """
+    kolommen = kolommen or {}
+    try:
+        for tabel in tabellen:
+            db.table(tabel).select(kolommen.get(tabel, 'id')).limit(1).execute()
+        return True
+    except Exception as e:
+        if getattr(e, 'code', None) in _ONTBREEKT:
+            return False
+        logger.warning(f"Schema probe voor {', '.join(tabellen)} mislukt, vorige waarde ({vorig}) blijft: {e}")
+        return vorig
+
+
+def detecteer_capabilities(db, vorig: Optional[SchemaCapabilities] = None) -> SchemaCapabilities:
+    """Probe het schema (een paar lichte queries); bij een onduidelijke fout blijft de vorige waarde staan."""
+    vorig = vorig or SchemaCapabilities()
+    return SchemaCapabilities(
+        sharing=_tabellen_bestaan(db, 'case_shares', 'user_profiles', vorig=vorig.sharing),
+        subscriptions=_tabellen_bestaan(db, 'subscription_tiers', 'user_subscriptions', vorig=vorig.subscriptions),
+        case_berekeningen=_tabellen_bestaan(db, 'cases', 'case_berekeningen',
+                                            kolommen={'cases': 'revisie', 'case_berekeningen': 'case_id'},
+                                            vorig=vorig.case_berekeningen),
+        snapshot_blokken=_tabellen_bestaan(db, 'snapshot_blokken', kolommen={'snapshot_blokken': 'hash'},
+                                           vorig=vorig.snapshot_blokken),
+        gedetecteerd_op=time.time(),
+    )
+
+
+class CapabilityRegistry:
+    """Laatst gedetecteerde capabilities, met een achtergrondtaak die ze ververst."""
+
+    def __init__(self, interval: float = 300.0):
+        self.interval = interval
+        self._huidig: Optional[SchemaCapabilities] = None
+        self._taak: Optional[asyncio.Task] = None
+
+    def get(self) -> SchemaCapabilities:
+        if self._huidig is None:
+            # Nog niet gedetecteerd (bijv. buiten de app lifespan): nu synchroon
+            self.ververs()
+        return self._huidig
+
+    def ververs(self) -> SchemaCapabilities:
+        from app.db.supabase import get_supabase_client
+        vorig = self._huidig
+        nieuw = detecteer_capabilities(get_supabase_client(), vorig)
+        if vorig is None or (nieuw.sharing, nieuw.subscriptions, nieuw.case_berekeningen, nieuw.snapshot_blokken) != \
+                (vorig.sharing, vorig.subscriptions, vorig.case_berekeningen, vorig.snapshot_blokken):
+            logger.info(f"Schema capabilities: sharing={nieuw.sharing}, subscriptions={nieuw.subscriptions}, "
+                        f"case_berekeningen={nieuw.case_berekeningen}, snapshot_blokken={nieuw.snapshot_blokken}")
+        self._huidig = nieuw
+        return nieuw
+
+    async def _ververs_lus(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.ververs)
+            except Exception as e:
+                logger.warning(f"Schema capabilities verversen mislukt: {e}")
+
+    async def start(self):
+        """Detecteer nu en ververs daarna periodiek (aanroepen vanuit de lifespan)."""
+        await asyncio.to_thread(self.ververs)
+        if self.interval > 0 and self._taak is None:
+            self._taak = asyncio.create_task(self._ververs_lus())
+
+    def stop(self):
+        if self._taak is not None:
+            self._taak.cancel()
+            self._taak = None
+
+
+_registry: Optional[CapabilityRegistry] = None
+
+
+def get_capability_registry() -> CapabilityRegistry:
+    """Get the singleton registry (configured from settings)."""
+    global _registry
+    if _registry is None:
+        from app.config import get_settings
+        _registry = CapabilityRegistry(interval=get_settings().schema_capabilities_refresh)
+    return _registry
+
+
+def schema_capabilities() -> SchemaCapabilities:
+    """De huidige capabilities, uit het geheugen."""
+    return get_capability_registry().get()
@@ -0,0 +1,254 @@
+"""
+Verschillen tussen twee snapshots van een zaak, direct op resultaat_json.
+
+Er wordt niet opnieuw gerekend: de opgeslagen resultaten worden uitgelijnd en
+vergeleken.
+
+- Vorderingen op kenmerk.
+- Renteperiodes op (start, eind). Periodes staan chronologisch, dus dat is
+  één merge-walk.
+- Deelbetalingen op (kenmerk, datum), toerekeningen op (vordering, type).
+
+Alleen wat verschilt komt in de uitkomst.
+
+Bij gecodeerde snapshots (snapshot_opslag) worden vorderingen met hetzelfde
+blok in a en b overgeslagen zonder ze te laden, en worden de overige in
+batches geladen: lineair in het aantal vorderingen en periodes, met een
+begrensd aantal blokken tegelijk in het geheugen.
+"""
+import asyncio
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.models.snapshot import (
+    DeelbetalingVerschil,
+    PeriodeVerschil,
+    ToerekeningVerschil,
+    VeldVerschil,
+    VorderingVerschil,
+)
+from app.services.snapshot_opslag import is_gecodeerd, laad_blokken
+
+# Vorderingen per batch (per kant) die tegelijk geladen en vergeleken worden
+_DIFF_BATCH = 200
+
+
+def _getal(waarde: Any) -> Optional[Decimal]:
+    """Bedragen staan als string in resultaat_json; None als het geen getal is."""
+    if waarde is None or isinstance(waarde, bool):
+        return None
+    if isinstance(waarde, (int, float)):
+        return Decimal(str(waarde))
+    if isinstance(waarde, str):
+        try:
+            getal = Decimal(waarde)
+        except InvalidOperation:
+            return None
+        return getal if getal.is_finite() else None
+    return None
+
+
+def _velden(a: Optional[Dict], b: Optional[Dict], overslaan=()) -> Dict[str, VeldVerschil]:
+    """De scalaire velden die verschillen (lijsten worden apart vergeleken)."""
+    a, b = a or {}, b or {}
+    verschillen = {}
+    for veld in dict.fromkeys([*a, *b]):
+        if veld in overslaan:
+            continue
+        waarde_a, waarde_b = a.get(veld), b.get(veld)
+        if isinstance(waarde_a, (list, dict)) or isinstance(waarde_b, (list, dict)):
+            continue
+        getal_a, getal_b = _getal(waarde_a), _getal(waarde_b)
+        if getal_a is not None and getal_b is not None:
+            # Numeriek vergelijken: "100.0" en "100.00" zijn gelijk
+            if getal_a != getal_b:
+                verschillen[veld] = VeldVerschil(a=waarde_a, b=waarde_b, verschil=getal_b - getal_a)
+        elif waarde_a != waarde_b:
+            verschillen[veld] = VeldVerschil(a=waarde_a, b=waarde_b)
+    return verschillen
+
+
+def _uitlijnen(items_a: List, items_b: List, sleutel: Callable[[Any], Hashable]) -> List[Tuple[Any, Any]]:
+    """
+    Paren (a, b) op sleutel, in de volgorde van a en daarna de nieuwe uit b;
+    None aan de kant waar het item ontbreekt. Bij een dubbele sleutel wordt
+    het n-de voorkomen in a met het n-de in b gepaard.
+    """
+    def per_sleutel(items):
+        tellers: Dict[Hashable, int] = {}
+        uitkomst = {}
+        for item in items:
+            k = sleutel(item)
+            n = tellers.get(k, 0)
+            tellers[k] = n + 1
+            uitkomst[(k, n)] = item
+        return uitkomst
+
+    per_a, per_b = per_sleutel(items_a), per_sleutel(items_b)
+    return [(per_a.get(k), per_b.get(k)) for k in dict.fromkeys([*per_a, *per_b])]
+
+
+_PERIODE_SLEUTEL = ('start', 'eind')
+
+
+def _diff_periodes(periodes_a: List[Dict], periodes_b: List[Dict]) -> List[PeriodeVerschil]:
+    """Merge-walk over twee chronologische periodelijsten (ISO datums sorteren als strings)."""
+    verschillen = []
+    i = j = 0
+    while i < len(periodes_a) or j < len(periodes_b):
+        sleutel_a = (periodes_a[i]['start'], periodes_a[i]['eind']) if i < len(periodes_a) else None
+        sleutel_b = (periodes_b[j]['start'], periodes_b[j]['eind']) if j < len(periodes_b) else None
+        if sleutel_b is None or (sleutel_a is not None and sleutel_a < sleutel_b):
+            verschillen.append(PeriodeVerschil(start=sleutel_a[0], eind=sleutel_a[1], status='verwijderd',
+                                               velden=_velden(periodes_a[i], None, _PERIODE_SLEUTEL)))
+            i += 1
+        elif sleutel_a is None or sleutel_b < sleutel_a:
+            verschillen.append(PeriodeVerschil(start=sleutel_b[0], eind=sleutel_b[1], status='toegevoegd',
+                                               velden=_velden(None, periodes_b[j], _PERIODE_SLEUTEL)))
+            j += 1
+        else:
+            velden = {} if periodes_a[i] == periodes_b[j] else _velden(periodes_a[i], periodes_b[j], _PERIODE_SLEUTEL)
+            if velden:
+                verschillen.append(PeriodeVerschil(start=sleutel_a[0], eind=sleutel_a[1],
+                                                   status='gewijzigd', velden=velden))
+            i += 1
+            j += 1
+    return verschillen
+
+
+def diff_vordering(a: Optional[Dict], b: Optional[Dict]) -> Optional[VorderingVerschil]:
+    """Verschil van een vordering (None aan een kant: toegevoegd/verwijderd); None als gelijk."""
+    if a is None:
+        return VorderingVerschil(kenmerk=b['kenmerk'], status='toegevoegd', velden=_velden(None, b, ('kenmerk',)))
+    if b is None:
+        return VorderingVerschil(kenmerk=a['kenmerk'], status='verwijderd', velden=_velden(a, None, ('kenmerk',)))
+    if a == b:
+        return None
+    velden = _velden(a, b, ('kenmerk',))
+    periodes = _diff_periodes(a.get('periodes') or [], b.get('periodes') or [])
+    periodes_kosten = _diff_periodes(a.get('periodes_kosten') or [], b.get('periodes_kosten') or [])
+    if not (velden or periodes or periodes_kosten):
+        return None
+    return VorderingVerschil(kenmerk=a['kenmerk'], status='gewijzigd', velden=velden,
+                             periodes=periodes, periodes_kosten=periodes_kosten)
+
+
+def _toerekeningen(deelbetaling: Optional[Dict]) -> Dict[Tuple[str, str], Decimal]:
+    totaal: Dict[Tuple[str, str], Decimal] = {}
+    for t in (deelbetaling or {}).get('toerekeningen') or []:
+        sleutel = (t['vordering'], t['type'])
+        totaal[sleutel] = totaal.get(sleutel, Decimal('0')) + Decimal(str(t['bedrag']))
+    return totaal
+
+
+def diff_deelbetaling(a: Optional[Dict], b: Optional[Dict]) -> Optional[DeelbetalingVerschil]:
+    """Verschil van een deelbetaling, inclusief toerekeningen; None als gelijk."""
+    toerekeningen_a, toerekeningen_b = _toerekeningen(a), _toerekeningen(b)
+    toerekeningen = []
+    for sleutel in dict.fromkeys([*toerekeningen_a, *toerekeningen_b]):
+        bedrag_a, bedrag_b = toerekeningen_a.get(sleutel), toerekeningen_b.get(sleutel)
+        if bedrag_a != bedrag_b:
+            toerekeningen.append(ToerekeningVerschil(
+                vordering=sleutel[0], type=sleutel[1],
+                bedrag=VeldVerschil(
+                    a=None if bedrag_a is None else str(bedrag_a),
+                    b=None if bedrag_b is None else str(bedrag_b),
+                    verschil=(bedrag_b or Decimal('0')) - (bedrag_a or Decimal('0')),
+                ),
+            ))
+
+    velden = _velden(a, b, ('kenmerk', 'datum'))
+    if a is not None and b is not None and not (velden or toerekeningen):
+        return None
+    status = 'toegevoegd' if a is None else 'verwijderd' if b is None else 'gewijzigd'
+    basis = b if a is None else a
+    return DeelbetalingVerschil(kenmerk=basis.get('kenmerk'), datum=basis['datum'], status=status,
+                                velden=velden, toerekeningen=toerekeningen)
+
+
+class _Bron:
+    """De vorderingen van één snapshot: uit een manifest (per blok te laden) of uit gewone JSON."""
+
+    def __init__(self, db, resultaat_json: Dict):
+        self.db = db
+        self.json = resultaat_json
+        self.gecodeerd = is_gecodeerd(resultaat_json)
+
+    async def rest(self) -> Dict:
+        """Alles behalve de vorderingen (totalen, deelbetalingen)."""
+        if not self.gecodeerd:
+            return self.json
+        return (await laad_blokken(self.db, [self.json['rest']]))[self.json['rest']]
+
+    async def vorderingen(self) -> List[Tuple[str, Any]]:
+        """(kenmerk, sleutel) per vordering; de sleutel gaat naar laad()."""
+        if not self.gecodeerd:
+            return [(v['kenmerk'], i) for i, v in enumerate(self.json.get('vorderingen') or [])]
+        hashes = self.json['vorderingen']
+        kenmerken = self.json.get('kenmerken')
+        if kenmerken is None:
+            # Manifest zonder kenmerken: de blokken in batches laden om ze te lezen
+            kenmerken = []
+            for i in range(0, len(hashes), _DIFF_BATCH):
+                blokken = await laad_blokken(self.db, hashes[i:i + _DIFF_BATCH])
+                kenmerken.extend(blokken[h]['kenmerk'] for h in hashes[i:i + _DIFF_BATCH])
+        return list(zip(kenmerken, hashes))
+
+    async def laad(self, sleutels: List[Any]) -> Dict[Any, Dict]:
+        if not self.gecodeerd:
+            vorderingen = self.json['vorderingen']
+            return {i: vorderingen[i] for i in sleutels}
+        return await laad_blokken(self.db, sleutels)
+
+
+async def diff_snapshots(db, resultaat_a: Dict, resultaat_b: Dict) -> Dict[str, Any]:
+    """
+    Verschillen tussen twee resultaat_json's (gecodeerd of gewone JSON):
+    totalen, vorderingen, deelbetalingen en ongewijzigde_vorderingen (de
+    velden van SnapshotDiff zonder a en b). Raises LookupError als er
+    blokken ontbreken.
+    """
+    bron_a, bron_b = _Bron(db, resultaat_a), _Bron(db, resultaat_b)
+    beide_gecodeerd = bron_a.gecodeerd and bron_b.gecodeerd
+
+    # Totalen en deelbetalingen; een gelijk rest-blok is gelijke inhoud
+    totalen: Dict[str, VeldVerschil] = {}
+    deelbetalingen: List[DeelbetalingVerschil] = []
+    if not (beide_gecodeerd and resultaat_a['rest'] == resultaat_b['rest']):
+        rest_a, rest_b = await asyncio.gather(bron_a.rest(), bron_b.rest())
+        totalen = _velden(rest_a.get('totalen'), rest_b.get('totalen'))
+        for a, b in _uitlijnen(rest_a.get('deelbetalingen') or [], rest_b.get('deelbetalingen') or [],
+                               sleutel=lambda d: (d.get('kenmerk'), d['datum'])):
+            verschil = diff_deelbetaling(a, b)
+            if verschil is not None:
+                deelbetalingen.append(verschil)
+
+    lijst_a, lijst_b = await asyncio.gather(bron_a.vorderingen(), bron_b.vorderingen())
+    ongewijzigd = 0
+    te_vergelijken = []
+    for a, b in _uitlijnen(lijst_a, lijst_b, sleutel=lambda kv: kv[0]):
+        if beide_gecodeerd and a is not None and b is not None and a[1] == b[1]:
+            ongewijzigd += 1  # Zelfde blok
+        else:
+            te_vergelijken.append((a, b))
+
+    vorderingen: List[VorderingVerschil] = []
+    for i in range(0, len(te_vergelijken), _DIFF_BATCH):
+        batch = te_vergelijken[i:i + _DIFF_BATCH]
+        geladen_a, geladen_b = await asyncio.gather(
+            bron_a.laad([a[1] for a, _ in batch if a is not None]),
+            bron_b.laad([b[1] for _, b in batch if b is not None]),
+        )
+        for a, b in batch:
+            verschil = diff_vordering(geladen_a[a[1]] if a else None, geladen_b[b[1]] if b else None)
+            if verschil is None:
+                ongewijzigd += 1
+            else:
+                vorderingen.append(verschil)
+
+    return {
+        'totalen': totalen,
+        'vorderingen': vorderingen,
+        'deelbetalingen': deelbetalingen,
+        'ongewijzigde_vorderingen': ongewijzigd,
+    }
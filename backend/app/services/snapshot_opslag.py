@@ -0,0 +1,302 @@
+"""
+Compacte, gededupliceerde opslag van snapshot resultaten.
+
+Het resultaat van een snapshot (BerekeningResponse als JSON) wordt opgeknipt
+in blokken: één per vordering (inclusief de renteperiodes) en één voor de
+rest (deelbetalingen, totalen). Elk blok wordt:
+
+- kolomsgewijs gezet: een lijst van gelijkvormige dicts (periodes,
+  toerekeningen) wordt {"__kolommen__": {veld: [waarden...]}}, zodat veldnamen
+  één keer voorkomen en gelijksoortige waarden naast elkaar staan;
+- met zlib gecomprimeerd;
+- content-addressed opgeslagen in snapshot_blokken (migratie 016), met als
+  sleutel de sha256 van de ongecomprimeerde inhoud. Een vordering die in
+  opeenvolgende snapshots gelijk is blijft, wordt dus één keer bewaard.
+
+In snapshots.resultaat_json staat dan alleen een manifest met de hashes.
+Lezen decodeert transparant; snapshots van vóór deze codering (gewone JSON)
+worden ongewijzigd teruggegeven. Blokken veranderen nooit, dus gedecodeerde
+blokken worden in het geheugen gecached.
+
+Zonder migratie 016 wordt het resultaat als gewone JSON bewaard.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CODERING = 'blokken-v1'
+_KOLOMMEN = '__kolommen__'
+_CACHE_BLOKKEN = 512
+# Per query: hashes in de URL (in_) resp. rijen in de body (upsert)
+_LEES_PER_QUERY = 100
+_SCHRIJF_PER_QUERY = 500
+_SCALAIR = (str, int, float, bool, type(None))
+
+
+# --- Kolomsgewijs ---
+
+def _kolomsgewijs(waarde: Any) -> Any:
+    """Zet lijsten van dicts met dezelfde velden (recursief) om naar kolommen."""
+    if isinstance(waarde, dict):
+        return {k: v if isinstance(v, _SCALAIR) else _kolomsgewijs(v) for k, v in waarde.items()}
+    if isinstance(waarde, list):
+        if len(waarde) > 1 and all(isinstance(x, dict) for x in waarde):
+            velden = list(waarde[0])
+            # Zonder velden geen kolommen: [{}, {}] zou als [] terugkomen
+            if velden and all(list(x) == velden for x in waarde):
+                return {_KOLOMMEN: {veld: _kolomsgewijs([x[veld] for x in waarde]) for veld in velden}}
+        if all(isinstance(x, _SCALAIR) for x in waarde):
+            return waarde
+        return [_kolomsgewijs(x) for x in waarde]
+    return waarde
+
+
+def _rijsgewijs(waarde: Any) -> Any:
+    """Omgekeerde van _kolomsgewijs()."""
+    if isinstance(waarde, dict):
+        kolommen = waarde.get(_KOLOMMEN)
+        if kolommen is not None and len(waarde) == 1:
+            velden = list(kolommen)
+            return [dict(zip(velden, rij)) for rij in zip(*(_rijsgewijs(kolommen[veld]) for veld in velden))]
+        return {k: v if isinstance(v, _SCALAIR) else _rijsgewijs(v) for k, v in waarde.items()}
+    if isinstance(waarde, list):
+        if all(isinstance(x, _SCALAIR) for x in waarde):
+            return waarde
+        return [_rijsgewijs(x) for x in waarde]
+    return waarde
+
+
+# --- Blokken ---
+
+def _blok(deel: Any) -> Tuple[str, bytes]:
+    """(hash, gecomprimeerde inhoud) van een deel van het resultaat."""
+    ruw = json.dumps(_kolomsgewijs(deel), separators=(',', ':'), ensure_ascii=False).encode()
+    return hashlib.sha256(ruw).hexdigest(), zlib.compress(ruw, 9)
+
+
+def _uit_blok(inhoud: bytes) -> Any:
+    return _rijsgewijs(json.loads(zlib.decompress(inhoud)))
+
+
+def _uit_blokken(inhouden: Dict[str, bytes]) -> Dict[str, Any]:
+    return {hash_: _uit_blok(inhoud) for hash_, inhoud in inhouden.items()}
+
+
+def codeer_resultaat(resultaat: Dict) -> Tuple[Dict, Dict[str, bytes]]:
+    """
+    Codeer een resultaat (model_dump(mode='json') van een BerekeningResponse).
+
+    Returns (manifest, blokken): het manifest gaat in resultaat_json, de
+    blokken (hash → gecomprimeerde inhoud) in snapshot_blokken.
+    """
+    blokken: Dict[str, bytes] = {}
+    vorderingen: List[str] = []
+    for vordering in resultaat.get('vorderingen', []):
+        hash_, inhoud = _blok(vordering)
+        blokken[hash_] = inhoud
+        vorderingen.append(hash_)
+    # De rest houdt de plek van 'vorderingen' vast (None), zodat de volgorde van de velden blijft
+    rest_hash, rest = _blok({k: (None if k == 'vorderingen' else v) for k, v in resultaat.items()})
+    blokken[rest_hash] = rest
+
+    manifest = {
+        'codering': CODERING,
+        'rest': rest_hash,
+        'vorderingen': vorderingen,
+        # Per vordering het kenmerk, zodat een diff kan uitlijnen zonder blokken te laden
+        'kenmerken': [v.get('kenmerk') for v in resultaat.get('vorderingen', [])],
+        'blokken': list(blokken),  # Unieke hashes, voor het opruimen van blokken
+    }
+    return manifest, blokken
+
+
+def is_gecodeerd(resultaat_json: Optional[Dict]) -> bool:
+    return isinstance(resultaat_json, dict) and resultaat_json.get('codering') == CODERING
+
+
+def decodeer_resultaat(manifest: Dict, blokken: Dict[str, Any]) -> Dict:
+    """Het oorspronkelijke resultaat uit een manifest en de gedecodeerde blokken."""
+    resultaat = dict(blokken[manifest['rest']])
+    if 'vorderingen' in resultaat:
+        resultaat['vorderingen'] = [blokken[h] for h in manifest['vorderingen']]
+    return resultaat
+
+
+class _BlokCache:
+    """LRU cache van gedecodeerde blokken (blokken zijn onveranderlijk)."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, hash_: str):
+        with self._lock:
+            waarde = self._items.get(hash_)
+            if waarde is not None:
+                self._items.move_to_end(hash_)
+            return waarde
+
+    def put(self, hash_: str, waarde: Any):
+        with self._lock:
+            self._items[hash_] = waarde
+            self._items.move_to_end(hash_)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+_cache = _BlokCache(_CACHE_BLOKKEN)
+
+
+def _bytea(inhoud: bytes) -> str:
+    """bytea voor PostgREST (hex)."""
+    return '\\x' + inhoud.hex()
+
+
+def _van_bytea(waarde: str) -> bytes:
+    return bytes.fromhex(waarde[2:] if waarde.startswith('\\x') else waarde)
+
+
+# --- Database ---
+
+async def bewaar_resultaat(db, resultaat: Dict) -> Dict:
+    """
+    Bewaar de blokken van een resultaat en geef het manifest voor
+    resultaat_json. Zonder snapshot_blokken (migratie 016): het resultaat zelf.
+    """
+    from app.api.berekening import draai_in_worker
+    from app.services.schema_capabilities import schema_capabilities
+
+    if not schema_capabilities().snapshot_blokken:
+        return resultaat
+    # Coderen is CPU-werk (honderden ms bij duizenden vorderingen): buiten de event loop
+    manifest, blokken = await draai_in_worker(codeer_resultaat, resultaat)
+    # Multi-row upserts; een bestaand blok (zelfde hash = zelfde inhoud) wordt overschreven met
+    # een nieuwe laatst_gebruikt, zodat het opruimen het niet tegelijk weggooit
+    nu = datetime.now(timezone.utc).isoformat()
+    rijen = [{'hash': h, 'inhoud': _bytea(inhoud), 'grootte': len(inhoud), 'laatst_gebruikt': nu}
+             for h, inhoud in blokken.items()]
+    await asyncio.gather(*(
+        db.table('snapshot_blokken').upsert(rijen[i:i + _SCHRIJF_PER_QUERY], on_conflict='hash').execute()
+        for i in range(0, len(rijen), _SCHRIJF_PER_QUERY)
+    ))
+    return manifest
+
+
+async def laad_blokken(db, hashes: List[str]) -> Dict[str, Any]:
+    """
+    Gedecodeerde blokken (hash → inhoud), uit de cache of snapshot_blokken.
+    Raises LookupError als er blokken ontbreken.
+    """
+    from app.api.berekening import draai_in_worker
+
+    blokken = {}
+    ontbrekend = []
+    for hash_ in dict.fromkeys(hashes):
+        waarde = _cache.get(hash_)
+        if waarde is None:
+            ontbrekend.append(hash_)
+        else:
+            blokken[hash_] = waarde
+    if ontbrekend:
+        responses = await asyncio.gather(*(
+            db.table('snapshot_blokken').select('hash, inhoud').in_('hash', ontbrekend[i:i + _LEES_PER_QUERY]).execute()
+            for i in range(0, len(ontbrekend), _LEES_PER_QUERY)
+        ))
+        gelezen = await draai_in_worker(_uit_blokken, {
+            rij['hash']: _van_bytea(rij['inhoud']) for response in responses for rij in response.data
+        })
+        for hash_, waarde in gelezen.items():
+            _cache.put(hash_, waarde)
+            blokken[hash_] = waarde
+        if any(hash_ not in blokken for hash_ in ontbrekend):
+            raise LookupError("Snapshot blokken ontbreken")
+    return blokken
+
+
+async def laad_resultaat(db, resultaat_json: Dict) -> Dict:
+    """
+    Het volledige resultaat van een snapshot (decodeert gecodeerde snapshots).
+    Raises LookupError als er blokken ontbreken.
+    """
+    if not is_gecodeerd(resultaat_json):
+        return resultaat_json
+    return decodeer_resultaat(resultaat_json, await laad_blokken(db, resultaat_json['blokken']))
+
+
+async def ruim_blokken_op(db, hashes: Optional[List[str]]):
+    """
+    Verwijder blokken (manifest['blokken'] van een verwijderde snapshot) die
+    door geen andere snapshot meer gebruikt worden. Best effort.
+    """
+    if not hashes:
+        return
+    try:
+        await db.rpc('ruim_snapshot_blokken_op', {'p_hashes': hashes}).execute()
+    except Exception as e:
+        logger.warning(f"Snapshot blokken niet opgeruimd: {e}")
+
+
+async def ruim_alle_blokken_op(db) -> Optional[int]:
+    """
+    Verwijder alle blokken die door geen snapshot meer gebruikt worden. Vangt
+    op wat ruim_blokken_op laat staan: blokken van een snapshot die binnen
+    het uur na aanmaken verwijderd werd, van verwijderde zaken (cascade) en
+    van snapshots die halverwege het aanmaken mislukten. Geeft het aantal
+    verwijderde blokken, of None als het niet lukte.
+    """
+    try:
+        return (await db.rpc('ruim_snapshot_blokken_op', {'p_hashes': None}).execute()).data
+    except Exception as e:
+        logger.warning(f"Snapshot blokken niet opgeruimd: {e}")
+        return None
+
+
+class BlokkenOpruimer:
+    """Achtergrondtaak die periodiek ruim_alle_blokken_op draait."""
+
+    def __init__(self, interval: float = 3600.0):
+        self.interval = interval
+        self._taak: Optional[asyncio.Task] = None
+
+    async def _lus(self):
+        from app.db.supabase import get_async_supabase_client
+        from app.services.schema_capabilities import schema_capabilities
+
+        while True:
+            await asyncio.sleep(self.interval)
+            if not schema_capabilities().snapshot_blokken:
+                continue
+            aantal = await ruim_alle_blokken_op(await get_async_supabase_client())
+            if aantal:
+                logger.info(f"{aantal} ongebruikte snapshot blokken opgeruimd")
+
+    def start(self):
+        """Start de periodieke opruiming (aanroepen vanuit de lifespan; interval 0 = uit)."""
+        if self.interval > 0 and self._taak is None:
+            self._taak = asyncio.create_task(self._lus())
+
+    def stop(self):
+        if self._taak is not None:
+            self._taak.cancel()
+            self._taak = None
+
+
+_opruimer: Optional[BlokkenOpruimer] = None
+
+
+def get_blokken_opruimer() -> BlokkenOpruimer:
+    """Get the singleton opruimer (configured from settings)."""
+    global _opruimer
+    if _opruimer is None:
+        from app.config import get_settings
+        _opruimer = BlokkenOpruimer(interval=get_settings().snapshot_blokken_opruimen)
+    return _opruimer
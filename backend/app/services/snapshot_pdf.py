@@ -0,0 +1,94 @@
+"""
+Snapshot PDF's: één keer renderen, daarna uit de blob store serveren.
+
+Een snapshot verandert niet, dus de PDF ook niet. Per snapshot zijn er twee
+varianten (schoon en met watermerk); welke een download krijgt hangt af van
+de tier op het moment van downloaden. Een variant wordt bij de eerste
+download gerenderd (in de worker pool) en in de blob store gezet; gelijktijdige
+eerste downloads van dezelfde variant renderen één keer.
+
+PDF_VERSIE zit in de sleutel: ophogen bij een gewijzigde PDF layout, zodat
+bestaande snapshots opnieuw worden gerenderd.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+PDF_VERSIE = 1
+
+_render_locks: Dict[str, asyncio.Lock] = {}
+
+
+def pdf_sleutel(snapshot_id: str, watermark: bool) -> str:
+    variant = 'watermerk' if watermark else 'schoon'
+    return f"snapshots/{snapshot_id}/v{PDF_VERSIE}-{variant}.pdf"
+
+
+def pdf_sleutels(snapshot_id: str) -> List[str]:
+    """Beide varianten (voor verwijderen)."""
+    return [pdf_sleutel(snapshot_id, False), pdf_sleutel(snapshot_id, True)]
+
+
+async def snapshot_pdf(db, snapshot_id: str, created_at: datetime,
+                       watermark: bool) -> Tuple[Optional[Path], Optional[bytes]]:
+    """
+    De PDF van een snapshot: (pad, None) als hij lokaal op schijf staat,
+    anders (None, inhoud). Rendert en bewaart hem als hij er nog niet is.
+    """
+    from app.api.berekening import draai_in_worker
+    from app.services.pdf_generator import generate_pdf
+    from app.services.snapshot_opslag import laad_resultaat
+
+    store = get_blob_store()
+    sleutel = pdf_sleutel(snapshot_id, watermark)
+
+    pad = store.lokaal_pad(sleutel)
+    if pad is not None:
+        return pad, None
+    inhoud = await store.lees(sleutel)
+    if inhoud is not None:
+        return None, inhoud
+
+    lock = _render_locks.setdefault(sleutel, asyncio.Lock())
+    try:
+        async with lock:
+            # Een gelijktijdige download kan hem net gemaakt hebben
+            inhoud = await store.lees(sleutel)
+            if inhoud is not None:
+                return None, inhoud
+
+            snapshot = await db.table('snapshots').select('invoer_json, resultaat_json').eq('id', snapshot_id).execute()
+            if not snapshot.data:
+                raise LookupError(f"Snapshot {snapshot_id} niet gevonden")
+
+            inhoud = await draai_in_worker(
+                generate_pdf,
+                invoer=snapshot.data[0]['invoer_json'],
+                resultaat=await laad_resultaat(db, snapshot.data[0]['resultaat_json']),
+                snapshot_created=created_at,
+                watermark=watermark,
+            )
+            try:
+                await store.schrijf(sleutel, inhoud, content_type="application/pdf")
+            except Exception as e:
+                # Bewaren is een optimalisatie; de download gaat door
+                logger.warning(f"Snapshot PDF {sleutel} niet bewaard: {e}")
+            return None, inhoud
+    finally:
+        # Opruimen; een wachtende download met de oude lock leest daarna de blob
+        if not lock.locked():
+            _render_locks.pop(sleutel, None)
+
+
+async def verwijder_snapshot_pdfs(snapshot_id: str):
+    """Verwijder de bewaarde PDF's van een snapshot (best effort)."""
+    try:
+        await get_blob_store().verwijder(*pdf_sleutels(snapshot_id))
+    except Exception as e:
+        logger.warning(f"Snapshot PDF's van {snapshot_id} niet verwijderd: {e}")
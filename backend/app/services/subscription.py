@@ -2,9 +2,12 @@
 Subscription service - handles tier lookups and limit checks.
 """
 import logging
-from typing import Optional
+import time
+from typing import Dict, Optional, Tuple
 
 from app.models.subscription import SubscriptionTier, UserTierResponse
+from app.services.request_context import request_memo
+from app.services.schema_capabilities import schema_capabilities
 
 logger = logging.getLogger(__name__)
 
@@ -23,16 +26,85 @@ DEFAULT_FREE_TIER = SubscriptionTier(
 )
 
 
-def _subscription_tables_exist(db) -> bool:
-    """Check if subscription tables exist."""
+# Cross-request caches (per process): de tiers tabel in zijn geheel en user_id → tier_id.
+# Of de subscription tabellen bestaan komt uit de schema capabilities.
+# Binnen één request wordt de tier bovendien gememoïseerd (request_memo).
+_tiers: Optional[Tuple[float, Dict[str, SubscriptionTier]]] = None
+_tier_ids: Dict[str, Tuple[float, str]] = {}
+_TIER_IDS_MAX = 10_000
+
+DEMO_TIER = SubscriptionTier(
+    id='pro',
+    naam='Professional',
+    max_vorderingen=None,
+    max_deelbetalingen=None,
+    mag_opslaan=True,
+    mag_pdf_schoon=True,
+    mag_snapshots=True,
+    mag_sharing=True,
+    mag_pauze=True,
+)
+
+
+async def _get_tiers(db) -> Optional[Dict[str, SubscriptionTier]]:
+    """Alle tiers (gecached), of None als de subscription tabellen niet bestaan."""
+    global _tiers
+    if not schema_capabilities().subscriptions:
+        return None
+
+    nu = time.monotonic()
+    if _tiers is not None and _tiers[0] > nu:
+        return _tiers[1]
+
+    from app.config import get_settings
     try:
-        db.table('subscription_tiers').select('id').limit(1).execute()
-        return True
-    except:
-        return False
+        rijen = (await db.table('subscription_tiers').select('*').execute()).data
+    except Exception as e:
+        logger.warning(f"Failed to load subscription tiers: {e}")
+        return None
+    tiers = {r['id']: SubscriptionTier(**r) for r in rijen}
+    _tiers = (nu + get_settings().tiers_cache_ttl, tiers)
+    return tiers
+
+
+async def _get_tier_id(user_id: str, db) -> str:
+    """Tier id van het actieve abonnement van een gebruiker (kort gecached)."""
+    nu = time.monotonic()
+    hit = _tier_ids.get(user_id)
+    if hit is not None and hit[0] > nu:
+        return hit[1]
+
+    from app.config import get_settings
+    sub = await db.table('user_subscriptions').select(
+        'tier_id'
+    ).eq('user_id', user_id).eq('status', 'active').order(
+        'created_at', desc=True
+    ).limit(1).execute()
+    tier_id = sub.data[0]['tier_id'] if sub.data else 'free'
 
+    if len(_tier_ids) >= _TIER_IDS_MAX:
+        _tier_ids.clear()
+    _tier_ids[user_id] = (nu + get_settings().tier_cache_ttl, tier_id)
+    return tier_id
 
-def get_user_tier(user_id: str, db) -> SubscriptionTier:
+
+def invalideer_tier_cache(user_id: Optional[str] = None):
+    """
+    Vergeet gecachte tiers: van één gebruiker (na toekennen van een abonnement),
+    of alles inclusief de tiers tabel (na wijzigen van een tier).
+    """
+    global _tiers
+    if user_id is None:
+        _tiers = None
+        _tier_ids.clear()
+    else:
+        _tier_ids.pop(user_id, None)
+    memo = request_memo('tier')
+    if memo:
+        memo.clear()
+
+
+async def get_user_tier(user_id: str, db) -> SubscriptionTier:
     """
     Get the active subscription tier for a user.
 
@@ -40,53 +112,36 @@ def get_user_tier(user_id: str, db) -> SubscriptionTier:
     - No subscription exists
     - Subscription tables don't exist yet
     - Any error occurs
+
+    Gememoïseerd per request en kort gecached over requests heen
+    (TIER_CACHE_TTL); de tiers tabel wordt in zijn geheel gecached.
     """
     if user_id == "demo-user":
         # Demo user gets pro tier for development
-        return SubscriptionTier(
-            id='pro',
-            naam='Professional',
-            max_vorderingen=None,
-            max_deelbetalingen=None,
-            mag_opslaan=True,
-            mag_pdf_schoon=True,
-            mag_snapshots=True,
-            mag_sharing=True,
-            mag_pauze=True,
-        )
-
-    if not _subscription_tables_exist(db):
-        return DEFAULT_FREE_TIER
+        return DEMO_TIER
 
-    try:
-        # Get active subscription for user
-        sub = db.table('user_subscriptions').select(
-            'tier_id'
-        ).eq('user_id', user_id).eq('status', 'active').order(
-            'created_at', desc=True
-        ).limit(1).execute()
-
-        if sub.data:
-            tier_id = sub.data[0]['tier_id']
-        else:
-            tier_id = 'free'
-
-        # Get tier details
-        tier = db.table('subscription_tiers').select('*').eq('id', tier_id).execute()
-
-        if tier.data:
-            return SubscriptionTier(**tier.data[0])
+    memo = request_memo('tier')
+    if memo is not None and user_id in memo:
+        return memo[user_id]
 
+    tiers = await _get_tiers(db)
+    if tiers is None:
         return DEFAULT_FREE_TIER
 
+    try:
+        tier = tiers.get(await _get_tier_id(user_id, db), DEFAULT_FREE_TIER)
     except Exception as e:
         logger.warning(f"Failed to get user tier for {user_id}: {e}")
         return DEFAULT_FREE_TIER
 
+    if memo is not None:
+        memo[user_id] = tier
+    return tier
+
 
-def get_user_tier_response(user_id: str, db) -> UserTierResponse:
+async def get_user_tier_response(user_id: str, db) -> UserTierResponse:
     """Get user tier info formatted for frontend response."""
-    tier = get_user_tier(user_id, db)
+    tier = await get_user_tier(user_id, db)
     return UserTierResponse(
         tier_id=tier.id,
         naam=tier.naam,
@@ -100,54 +155,54 @@ def get_user_tier_response(user_id: str, db) -> UserTierResponse:
     )
 
 
-def check_vordering_limit(user_id: str, case_id: str, db) -> Optional[str]:
+async def check_vordering_limit(user_id: str, case_id: str, db, aantal: int = 1) -> Optional[str]:
     """
-    Check if user can add another vordering.
+    Check if user can add another vordering (or `aantal` at once).
     Returns error message if limit reached, None if OK.
     """
-    tier = get_user_tier(user_id, db)
+    tier = await get_user_tier(user_id, db)
 
     if tier.max_vorderingen is None:
         return None  # Unlimited
 
     # Count current vorderingen for this case
-    count = db.table('vorderingen').select('id', count='exact').eq('case_id', case_id).execute()
+    count = await db.table('vorderingen').select('id', count='exact').eq('case_id', case_id).execute()
     current = count.count or 0
 
-    if current >= tier.max_vorderingen:
+    if current + aantal > tier.max_vorderingen:
         return f"Je hebt het maximum van {tier.max_vorderingen} vorderingen bereikt. Upgrade naar Pro voor onbeperkt."
 
     return None
 
 
-def check_deelbetaling_limit(user_id: str, case_id: str, db) -> Optional[str]:
+async def check_deelbetaling_limit(user_id: str, case_id: str, db, aantal: int = 1) -> Optional[str]:
     """
-    Check if user can add another deelbetaling.
+    Check if user can add another deelbetaling (or `aantal` at once).
     Returns error message if limit reached, None if OK.
     """
-    tier = get_user_tier(user_id, db)
+    tier = await get_user_tier(user_id, db)
 
     if tier.max_deelbetalingen is None:
         return None  # Unlimited
 
     # Count current deelbetalingen for this case
-    count = db.table('deelbetalingen').select('id', count='exact').eq('case_id', case_id).execute()
+    count = await db.table('deelbetalingen').select('id', count='exact').eq('case_id', case_id).execute()
     current = count.count or 0
 
-    if current >= tier.max_deelbetalingen:
+    if current + aantal > tier.max_deelbetalingen:
         return f"Je hebt het maximum van {tier.max_deelbetalingen} deelbetaling(en) bereikt. Upgrade naar Pro voor onbeperkt."
 
     return None
 
 
-def check_feature(user_id: str, feature: str, db) -> Optional[str]:
+async def check_feature(user_id: str, feature: str, db) -> Optional[str]:
     """
     Check if user has access to a feature.
     Returns error message if not allowed, None if OK.
 
     Features: 'opslaan', 'pdf_schoon', 'snapshots', 'sharing'
     """
-    tier = get_user_tier(user_id, db)
+    tier = await get_user_tier(user_id, db)
 
     feature_map = {
         'opslaan': (tier.mag_opslaan, "Dossiers opslaan"),
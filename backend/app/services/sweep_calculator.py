@@ -0,0 +1,133 @@
+"""
+Sweep-line variant van de RenteCalculator.
+
+In plaats van per vordering bij elke aanroep van bereken_rente_tot_datum de
+splitpunten opnieuw te bepalen (rentewijzigingen, verjaardagen, pauze
+grenzen), loopt deze engine één keer door de tijd voor de hele zaak. Alle
+events (start vordering, betalingen, rentewijzigingen, verjaardagen en pauze
+grenzen) staan in één priority queue. Splitpunten worden per vordering
+gebufferd en pas verbruikt als de vordering wordt bijgewerkt: bij een
+betaling die haar raakt of aan het eind tot de einddatum.
+
+Toerekening, kapitalisatie en afronding zijn die van RenteCalculator; de
+uitkomst (periodes, events, toerekeningen) is identiek.
+"""
+from bisect import bisect_left
+from datetime import date
+from heapq import heapify, heappop, heappush
+from itertools import count
+from typing import Dict, List
+
+from app.services.rente_calculator import (
+    Deelbetaling,
+    RenteCalculator,
+    Vordering,
+    get_rentetabel_cache,
+)
+from app.services.kalender import verjaardag_tabel
+
+# Volgorde van events op dezelfde datum: eerst vorderingen aanmelden, dan
+# betalingen, dan splitpunten. Splitpunten liggen strikt binnen (van, tot):
+# een splitpunt op een betaaldatum telt niet voor de vorderingen die die
+# betaling raakt, maar wel voor de overige.
+_START, _BETALING, _RENTEWIJZIGING, _VERJAARDAG, _PAUZE = range(5)
+
+
+class SweepRenteCalculator(RenteCalculator):
+    """RenteCalculator met één event-gedreven tijdlijn voor alle vorderingen."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._splitpunten: Dict[str, List[date]] = {}
+        self._splitpunten_kosten: Dict[str, List[date]] = {}
+
+    def _verwerk_betalingen(self, betalingen: List[Deelbetaling]):
+        # Verder dan de laatste betaling of de einddatum wordt nooit gerekend
+        horizon = max([self.einddatum] + [b.datum for b in betalingen])
+        volgnr = count()
+
+        wachtrij = [(b.datum, _BETALING, next(volgnr), b) for b in betalingen]
+        for is_handelsrente in (False, True):
+            for wijziging in get_rentetabel_cache().get_tijdlijn(is_handelsrente).data:
+                if wijziging < horizon:
+                    wachtrij.append((wijziging, _RENTEWIJZIGING, next(volgnr), is_handelsrente))
+        for v in self.vorderingen.values():
+            if not v.voldaan:
+                # Vanaf de huidige staat, zodat ook een hervatte berekening klopt
+                aanmelden = min(v.laatst_berekend_tot, v.laatst_berekend_tot_kosten)
+                wachtrij.append((aanmelden, _START, next(volgnr), v))
+        heapify(wachtrij)
+
+        # Aangemelde vorderingen per rentetabel (voldane worden lui verwijderd)
+        aangemeld: Dict[bool, List[Vordering]] = {False: [], True: []}
+
+        while wachtrij:
+            datum, soort, _, item = heappop(wachtrij)
+
+            if soort == _BETALING:
+                self._verwerk_betaling_met_checkpoint(item)
+
+            elif soort == _START:
+                self._aanmelden(item, datum, horizon, wachtrij, volgnr)
+                aangemeld[item.is_handelsrente].append(item)
+
+            elif soort == _RENTEWIJZIGING:
+                actief = [v for v in aangemeld[item] if not v.voldaan]
+                aangemeld[item] = actief
+                for v in actief:
+                    self._noteer(v, datum, kosten=True)
+
+            elif soort == _VERJAARDAG:
+                v, jaar = item
+                if not v.voldaan:
+                    self._noteer(v, datum, kosten=False)
+                    volgende = verjaardag_tabel(v.startdatum).datum(jaar + 1)
+                    if volgende < horizon:
+                        heappush(wachtrij, (volgende, _VERJAARDAG, next(volgnr), (v, jaar + 1)))
+
+            elif soort == _PAUZE:
+                if not item.voldaan:
+                    self._noteer(item, datum, kosten=True)
+
+    def _aanmelden(self, v: Vordering, datum: date, horizon: date, wachtrij: list, volgnr):
+        """Start de splitpunt-buffers van een vordering en plan haar eigen events in."""
+        self._splitpunten[v.kenmerk] = []
+        self._splitpunten_kosten[v.kenmerk] = []
+
+        if v.is_samengesteld:
+            verjaardagen = verjaardag_tabel(v.startdatum)
+            jaar = datum.year
+            vj = verjaardagen.datum(jaar)
+            while vj <= datum:
+                jaar += 1
+                vj = verjaardagen.datum(jaar)
+            if vj < horizon:
+                heappush(wachtrij, (vj, _VERJAARDAG, next(volgnr), (v, jaar)))
+
+        for grens in (v.pauze_start, v.pauze_eind):
+            if grens and datum < grens < horizon:
+                heappush(wachtrij, (grens, _PAUZE, next(volgnr), v))
+
+    def _noteer(self, v: Vordering, datum: date, kosten: bool):
+        """Buffer een splitpunt (events komen op volgorde binnen, dus de buffer blijft gesorteerd)."""
+        buffer = self._splitpunten[v.kenmerk]
+        if not buffer or buffer[-1] != datum:
+            buffer.append(datum)
+        if kosten and v.openstaande_kosten > 0:
+            buffer = self._splitpunten_kosten[v.kenmerk]
+            if not buffer or buffer[-1] != datum:
+                buffer.append(datum)
+
+    @staticmethod
+    def _neem(buffer: List[date], van_datum: date, tot_datum: date) -> List[date]:
+        """Haal de splitpunten strikt binnen (van, tot) uit een buffer; alles vóór tot vervalt."""
+        eind = bisect_left(buffer, tot_datum)
+        splitpunten = [s for s in buffer[:eind] if s > van_datum]
+        del buffer[:eind]
+        return splitpunten
+
+    def get_splitpunten(self, vordering: Vordering, van_datum: date, tot_datum: date) -> List[date]:
+        return self._neem(self._splitpunten[vordering.kenmerk], van_datum, tot_datum)
+
+    def get_splitpunten_kosten(self, vordering: Vordering, van_datum: date, tot_datum: date) -> List[date]:
+        return self._neem(self._splitpunten_kosten[vordering.kenmerk], van_datum, tot_datum)
@@ -0,0 +1,188 @@
+"""
+Worker pool for CPU-bound work (renteberekening, PDF- en Excel-generatie).
+
+Draait zware jobs buiten de asyncio event loop, zodat lichte endpoints
+(/api/rentetabel, auth) responsief blijven terwijl een grote zaak rekent.
+
+- Type (thread/process), grootte, maximale wachtrij en timeout zijn
+  configureerbaar via de settings (WORKER_POOL_*).
+- De wachtrij is begrensd: bij een volle pool faalt een job direct met
+  WorkerPoolVol in plaats van onbeperkt op te stapelen.
+- Bij een process pool moeten functie en argumenten picklable zijn
+  (module-level functies, pydantic modellen, dicts).
+- Naast de algemene pool is er een aparte batch pool (BATCH_POOL_*) voor
+  /api/bereken/batch, zodat een nachtelijke portefeuilleberekening de
+  interactieve requests niet verdringt.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolVol(RuntimeError):
+    """De pool zit vol (lopende + wachtende jobs)."""
+
+
+class WorkerPoolTimeout(RuntimeError):
+    """Een job duurde langer dan de ingestelde timeout."""
+
+
+class WorkerPool:
+    """Begrensde executor-laag voor CPU-zware functies."""
+
+    def __init__(self, soort: str = "thread", grootte: int = 2, max_wachtrij: int = 16, timeout: float = 60.0):
+        if soort not in ("thread", "process"):
+            raise ValueError(f"Onbekend worker pool type: {soort}")
+        self.soort = soort
+        self.grootte = max(1, grootte)
+        self.max_wachtrij = max(1, max_wachtrij)
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._in_behandeling = 0  # Lopende + wachtende jobs (alleen op de event loop gemuteerd)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.soort == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.grootte)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.grootte, thread_name_prefix="rentetool-worker")
+            logger.info(f"Worker pool gestart: {self.soort} x{self.grootte}, wachtrij {self.max_wachtrij}, timeout {self.timeout}s")
+        return self._executor
+
+    @property
+    def in_behandeling(self) -> int:
+        return self._in_behandeling
+
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Voer func(*args, **kwargs) uit in de pool en wacht op het resultaat.
+
+        Raises WorkerPoolVol als de wachtrij vol is en WorkerPoolTimeout als
+        de job niet binnen de timeout klaar is. Exceptions uit func zelf
+        worden ongewijzigd doorgegeven.
+        """
+        if self._in_behandeling >= self.max_wachtrij:
+            raise WorkerPoolVol("Server is bezig, probeer het over enkele ogenblikken opnieuw")
+
+        loop = asyncio.get_running_loop()
+        self._in_behandeling += 1
+        cf = self.executor.submit(partial(func, *args, **kwargs))
+
+        # Het slot komt pas vrij als de job echt klaar is (ook na een timeout
+        # loopt een thread door); zo klopt de wachtrij met de werkelijke bezetting.
+        def _klaar(_):
+            try:
+                loop.call_soon_threadsafe(self._vrijgeven)
+            except RuntimeError:
+                pass  # Event loop al gesloten (shutdown)
+        cf.add_done_callback(_klaar)
+
+        limiet = timeout or self.timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(cf), limiet)
+        except asyncio.TimeoutError:
+            # Nog niet gestarte jobs worden hiermee uit de wachtrij gehaald
+            cf.cancel()
+            raise WorkerPoolTimeout(f"Berekening duurde langer dan {limiet:g} seconden")
+        except BrokenExecutor:
+            # Een worker process is gecrasht (bijv. geheugen); de volgende job start een nieuwe pool
+            logger.error(f"Worker pool ({self.soort}) defect, wordt opnieuw gestart")
+            self.shutdown()
+            raise
+
+    def _vrijgeven(self):
+        self._in_behandeling -= 1
+
+    def vernieuw(self):
+        """
+        Start nieuwe workers voor volgende jobs (alleen bij een process pool).
+
+        Workers in een eigen process hebben een eigen kopie van o.a. de
+        rentetabel cache; na een wijziging moeten volgende jobs in verse
+        processen draaien. Lopende en wachtende jobs maken hun werk af in de
+        oude executor, die daarna vanzelf stopt.
+        """
+        if self.soort == "process" and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=False)
+            self._executor = None
+            logger.info("Process pool vernieuwd")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool: Optional[WorkerPool] = None
+_batch_pool: Optional[WorkerPool] = None
+
+
+def get_worker_pool() -> WorkerPool:
+    """Get the singleton worker pool (configured from settings)."""
+    global _pool
+    if _pool is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _pool = WorkerPool(
+            soort=settings.worker_pool_type,
+            grootte=settings.worker_pool_size,
+            max_wachtrij=settings.worker_queue_max,
+            timeout=settings.worker_job_timeout,
+        )
+    return _pool
+
+
+async def run_in_worker(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Voer een CPU-zware functie uit in de singleton worker pool."""
+    return await get_worker_pool().run(func, *args, **kwargs)
+
+
+def get_batch_pool() -> WorkerPool:
+    """
+    Get the singleton batch pool (configured from settings).
+
+    De wachtrij is twee jobs per worker: de batch endpoint houdt zelf de rest
+    van de zaken vast en levert ze aan zodra er een slot vrijkomt.
+    """
+    global _batch_pool
+    if _batch_pool is None:
+        from app.config import get_settings
+        settings = get_settings()
+        grootte = settings.batch_pool_size or os.cpu_count() or 1
+        _batch_pool = WorkerPool(
+            soort=settings.batch_pool_type,
+            grootte=grootte,
+            max_wachtrij=2 * grootte,
+            timeout=settings.worker_job_timeout,
+        )
+    return _batch_pool
+
+
+def shutdown_batch_pool():
+    """Stop de batch pool; de volgende batch start een nieuwe (bijv. na een rentetabel wijziging)."""
+    global _batch_pool
+    if _batch_pool is not None:
+        _batch_pool.shutdown()
+        _batch_pool = None
+
+
+def vernieuw_worker_pools():
+    """Vernieuw de process workers van beide pools (bijv. na een rentetabel wijziging)."""
+    for pool in (_pool, _batch_pool):
+        if pool is not None:
+            pool.vernieuw()
+
+
+def shutdown_worker_pool():
+    """Stop de worker pools (bij afsluiten van de applicatie)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+    shutdown_batch_pool()
@@ -0,0 +1,132 @@
+"""
+Benchmark: engines (standaard/sweep) en rekenkernen (decimal/centen).
+
+Draait zonder database: de rentetabel wordt geladen uit docs/03_rentetabel.csv.
+Controleert per scenario ook dat alle varianten dezelfde uitkomst geven als de
+referentie (standaard + decimal). De centen-kern (scripts/centen_kernel.py)
+zit niet in de app: hij is hier end-to-end niet sneller dan decimal.
+
+Gebruik (vanuit backend/):
+    python -m scripts.benchmark_engines [--herhalingen 5]
+"""
+import argparse
+import csv
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from app.services.rente_calculator import (
+    Deelbetaling,
+    RenteCalculator,
+    Vordering,
+    get_rentetabel_cache,
+)
+from app.services.sweep_calculator import SweepRenteCalculator
+from scripts.centen_kernel import CentenRenteCalculator, CentenSweepRenteCalculator
+
+RENTETABEL_CSV = Path(__file__).resolve().parents[2] / "docs" / "03_rentetabel.csv"
+
+
+def laad_rentetabel():
+    with open(RENTETABEL_CSV, newline="") as f:
+        rijen = list(csv.DictReader(f))
+    wettelijk = [(date.fromisoformat(r["datum"]), Decimal(r["wettelijk"])) for r in rijen]
+    handels = [(date.fromisoformat(r["datum"]), Decimal(r["handels"])) for r in rijen]
+    get_rentetabel_cache()._compileer(wettelijk, handels)
+
+
+def scenario_lange_zaak():
+    """Eén vordering over 20 jaar met maandelijkse betalingen."""
+    vorderingen = [dict(kenmerk="V1", oorspronkelijk_bedrag=Decimal("250000.00"),
+                        startdatum=date(2005, 3, 15), rentetype=2, kosten=Decimal("1500.00"))]
+    betalingen = [dict(kenmerk=f"B{i}", bedrag=Decimal("900.00"),
+                       datum=date(2006, 1, 1) + timedelta(days=30 * i)) for i in range(220)]
+    return vorderingen, betalingen, date(2025, 12, 31)
+
+
+def scenario_bulk_debiteur():
+    """2000 facturen van één debiteur, 300 betalingen."""
+    vorderingen = [dict(kenmerk=f"F{i}", oorspronkelijk_bedrag=Decimal(200 + i % 50),
+                        startdatum=date(2015, 1, 1) + timedelta(days=i), rentetype=1 + i % 4)
+                   for i in range(2000)]
+    betalingen = [dict(kenmerk=f"B{j}", bedrag=Decimal("1500.00"),
+                       datum=date(2016, 1, 1) + timedelta(days=10 * j)) for j in range(300)]
+    return vorderingen, betalingen, date(2025, 1, 1)
+
+
+def scenario_veel_vorderingen():
+    """300 vorderingen met pauzes en opslag, zonder betalingen."""
+    vorderingen = []
+    for i in range(300):
+        start = date(2008, 1, 1) + timedelta(days=11 * i)
+        v = dict(kenmerk=f"V{i}", oorspronkelijk_bedrag=Decimal(1000 + i),
+                 startdatum=start, rentetype=1 + i % 7)
+        if v["rentetype"] in (5, 6, 7):
+            v["opslag"] = Decimal("0.02")
+        if i % 5 == 0:
+            v["pauze_start"] = start + timedelta(days=400)
+            v["pauze_eind"] = start + timedelta(days=700)
+        vorderingen.append(v)
+    return vorderingen, [], date(2025, 6, 30)
+
+
+VARIANTEN = {
+    "standaard": RenteCalculator,  # Referentie
+    "centen": CentenRenteCalculator,
+    "sweep": SweepRenteCalculator,
+    "sweep+centen": CentenSweepRenteCalculator,
+}
+
+SCENARIOS = {
+    "lange zaak": scenario_lange_zaak,
+    "bulk debiteur": scenario_bulk_debiteur,
+    "veel vorderingen": scenario_veel_vorderingen,
+}
+
+
+def draai(cls, scenario, detail):
+    vorderingen, betalingen, einddatum = scenario
+    calculator = cls(
+        [Vordering(**v) for v in vorderingen],
+        [Deelbetaling(**b) for b in betalingen],
+        einddatum,
+        detail=detail,
+    )
+    start = time.perf_counter()
+    result = calculator.bereken()
+    return time.perf_counter() - start, result
+
+
+def samenvatting(result):
+    return [(v.kenmerk, v.hoofdsom, v.totale_rente, v.totale_rente_kosten, len(v.periodes))
+            for v in result["vorderingen"].values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--herhalingen", type=int, default=5)
+    args = parser.parse_args()
+
+    laad_rentetabel()
+    print(f"{'scenario':<18} {'detail':<8}" + "".join(f" {naam:>16}" for naam in VARIANTEN))
+    for naam, maak in SCENARIOS.items():
+        scenario = maak()
+        for detail in ("full", "summary"):
+            tijden = {}
+            referentie = None
+            for variant, cls in VARIANTEN.items():
+                runs = [draai(cls, scenario, detail) for _ in range(args.herhalingen)]
+                tijden[variant] = min(t for t, _ in runs)
+                uitkomst = samenvatting(runs[0][1])
+                if referentie is None:
+                    referentie = uitkomst
+                elif uitkomst != referentie:
+                    raise SystemExit(f"Verschil met de referentie: {variant}, scenario '{naam}' ({detail})")
+            basis = tijden["standaard"]
+            print(f"{naam:<18} {detail:<8}" + "".join(
+                f" {t * 1000:>7.1f}ms {basis / t:>5.2f}x" for t in tijden.values()
+            ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: opslag van snapshot resultaten, gewone JSON tegen blokken-v1.
+
+Draait zonder database (rentetabel uit docs/03_rentetabel.csv, scenario's uit
+benchmark_engines). Per scenario: grootte en (de)codeertijd van het resultaat
+als JSON en als gecomprimeerde blokken, en hoeveel nieuwe blokken een volgende
+snapshot van dezelfde zaak kost. Controleert dat decoderen het oorspronkelijke
+resultaat teruggeeft.
+
+Gebruik (vanuit backend/):
+    python -m scripts.benchmark_snapshot_opslag [--herhalingen 5]
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.api.berekening import voer_berekening_uit
+from app.models import BerekeningRequest
+from app.services.snapshot_opslag import _uit_blok, codeer_resultaat, decodeer_resultaat
+from scripts.benchmark_engines import SCENARIOS, laad_rentetabel
+
+
+def resultaat_van(vorderingen, betalingen, einddatum):
+    request = BerekeningRequest(
+        einddatum=einddatum,
+        vorderingen=[dict(v, bedrag=v["oorspronkelijk_bedrag"], datum=v["startdatum"]) for v in vorderingen],
+        deelbetalingen=betalingen,
+    )
+    return voer_berekening_uit(request).model_dump(mode="json")
+
+
+def volgende_snapshots(vorderingen, betalingen, einddatum):
+    """Varianten van dezelfde zaak, zoals een volgende snapshot eruit kan zien."""
+    extra_vordering = dict(kenmerk="NIEUW", oorspronkelijk_bedrag=Decimal("750.00"),
+                           startdatum=einddatum - timedelta(days=60), rentetype=1)
+    extra_betaling = dict(kenmerk="NIEUW", bedrag=Decimal("100.00"), datum=einddatum - timedelta(days=5))
+    return {
+        "ongewijzigd": (vorderingen, betalingen, einddatum),
+        "+1 vordering": (vorderingen + [extra_vordering], betalingen, einddatum),
+        "+1 betaling": (vorderingen, betalingen + [extra_betaling], einddatum),
+        "einddatum +1 mnd": (vorderingen, betalingen, einddatum + timedelta(days=31)),
+    }
+
+
+def minimum(func, herhalingen):
+    tijden = []
+    for _ in range(herhalingen):
+        start = time.perf_counter()
+        uitkomst = func()
+        tijden.append(time.perf_counter() - start)
+    return min(tijden), uitkomst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--herhalingen", type=int, default=5)
+    args = parser.parse_args()
+
+    laad_rentetabel()
+    print(f"{'scenario':<18} {'json':>10} {'blokken':>10} {'factor':>7}"
+          f" {'dumps':>8} {'loads':>8} {'codeer':>8} {'decodeer':>9}")
+    volgende = []
+    for naam, maak in SCENARIOS.items():
+        vorderingen, betalingen, einddatum = maak()
+        resultaat = resultaat_van(vorderingen, betalingen, einddatum)
+
+        t_dumps, tekst = minimum(lambda: json.dumps(resultaat), args.herhalingen)
+        t_loads, _ = minimum(lambda: json.loads(tekst), args.herhalingen)
+        t_codeer, (manifest, blokken) = minimum(lambda: codeer_resultaat(resultaat), args.herhalingen)
+        t_decodeer, terug = minimum(
+            lambda: decodeer_resultaat(manifest, {h: _uit_blok(b) for h, b in blokken.items()}),
+            args.herhalingen,
+        )
+        if terug != resultaat:
+            raise SystemExit(f"Decoderen geeft een ander resultaat: scenario '{naam}'")
+
+        json_grootte = len(tekst.encode())
+        blok_grootte = sum(len(b) for b in blokken.values()) + len(json.dumps(manifest))
+        print(f"{naam:<18} {json_grootte / 1024:>8.0f}kB {blok_grootte / 1024:>8.0f}kB"
+              f" {json_grootte / blok_grootte:>6.1f}x {t_dumps * 1000:>6.1f}ms {t_loads * 1000:>6.1f}ms"
+              f" {t_codeer * 1000:>6.1f}ms {t_decodeer * 1000:>7.1f}ms")
+
+        for variant, invoer in volgende_snapshots(vorderingen, betalingen, einddatum).items():
+            _, nieuwe_blokken = codeer_resultaat(resultaat_van(*invoer))
+            nieuw = {h: b for h, b in nieuwe_blokken.items() if h not in blokken}
+            volgende.append((naam, variant, len(nieuw), len(nieuwe_blokken),
+                             sum(len(b) for b in nieuw.values())))
+
+    print(f"\nVolgende snapshot van dezelfde zaak (nieuw te bewaren blokken):")
+    print(f"{'scenario':<18} {'wijziging':<18} {'blokken':>14} {'grootte':>10}")
+    for naam, variant, aantal_nieuw, aantal, grootte in volgende:
+        print(f"{naam:<18} {variant:<18} {aantal_nieuw:>6} / {aantal:<5} {grootte / 1024:>8.1f}kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Integer-centen rekenkern voor de renteberekening (alleen voor de benchmark).
+
+Alle geldbedragen in de calculator-staat worden tijdens de berekening als
+gehele centen (int) bijgehouden, rentepercentages als exacte breuk
+(teller/noemer) en dagfracties als exacte rationale getallen. Afronden gebeurt
+met integer-deling die ROUND_HALF_UP op de cent nabootst.
+
+De Decimal-kern (RenteCalculator) blijft de referentie. Decimal rekent met 28
+significante cijfers; deze kern geeft dezelfde centen zolang de exacte teller
+onder EXACT_TOT blijft (de afrondingsfout van Decimal kan dan nooit een
+halve-cent grens passeren). Daarboven, en bij een exacte halve cent in de
+evenredige verdeling (waar Decimal het aandeel eerst afrondt), wordt voor die
+ene bewerking de Decimal-functie gebruikt. Invoer met fracties van centen
+wordt in zijn geheel met Decimal berekend.
+
+Na afloop worden alle bedragen (staat, periodes, events, toerekeningen) terug
+omgezet naar Decimal met twee decimalen; de uitkomst is per cent gelijk aan
+die van de Decimal-kern (tests/test_centen_kernel.py). Alleen de notatie kan
+verschillen: de Decimal-kern houdt de schaal van de invoer aan (5362.1).
+
+Geen onderdeel van de app: de rente zelf is sneller, maar end-to-end wint de
+kern niets (0.5-1x, zie scripts/benchmark_engines.py).
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.services.rente_calculator import (
+    RenteCalculator,
+    bereken_rente,
+    evenredig_aandeel,
+)
+from app.services.sweep_calculator import SweepRenteCalculator
+
+# Onder deze grens is de exacte integer-afronding gegarandeerd gelijk aan Decimal (prec 28)
+EXACT_TOT = 10 ** 26
+
+# Geldvelden van een Vordering die tijdens de berekening veranderen
+_GELD_VELDEN = (
+    'hoofdsom', 'openstaande_kosten', 'opgebouwde_rente', 'opgebouwde_rente_kosten',
+    'totale_rente', 'totale_rente_kosten',
+    'afgelost_hoofdsom', 'afgelost_kosten', 'afgelost_rente', 'afgelost_rente_kosten',
+)
+# Geldbedragen in periodes, events en toerekeningen
+_PERIODE_SLEUTELS = ('hoofdsom', 'rente', 'opgebouwd')
+_PERIODE_KOSTEN_SLEUTELS = ('kosten', 'rente', 'opgebouwd')
+_EVENT_SLEUTELS = ('rente', 'oude_hoofdsom', 'nieuwe_hoofdsom')
+_TOEREKENING_SLEUTELS = ('bedrag', 'opgebouwd_voor')
+
+_CENT = Decimal("0.01")
+
+
+def naar_centen(bedrag: Decimal) -> Optional[int]:
+    """Decimal bedrag → gehele centen, of None als het geen heel aantal centen is."""
+    centen = bedrag.scaleb(2)
+    if centen != centen.to_integral_value():
+        return None
+    return int(centen)
+
+
+def naar_euros(centen: int) -> Decimal:
+    """Gehele centen → Decimal met twee decimalen."""
+    return Decimal(centen) * _CENT
+
+
+@lru_cache(maxsize=1024)
+def _pct_breuk(rente_pct: Decimal) -> Tuple[int, int]:
+    """Rentepercentage als exacte breuk (teller, noemer)."""
+    teken, cijfers, exponent = rente_pct.as_tuple()
+    teller = int(''.join(map(str, cijfers)) or '0') * (-1 if teken else 1)
+    if exponent >= 0:
+        return teller * 10 ** exponent, 1
+    return teller, 10 ** -exponent
+
+
+def bereken_rente_centen(hoofdsom: int, rente_pct: Decimal, dagen: int, dagen_jaar: int = 365) -> int:
+    """bereken_rente() in centen: hoofdsom * pct * dagen / dagen_jaar, ROUND_HALF_UP."""
+    if dagen <= 0 or hoofdsom <= 0:
+        return 0
+    teller, noemer = _pct_breuk(rente_pct)
+    n = hoofdsom * teller * dagen
+    d = noemer * dagen_jaar
+    if not 0 <= n < EXACT_TOT:
+        return naar_centen(bereken_rente(naar_euros(hoofdsom), rente_pct, dagen, dagen_jaar))
+    return (2 * n + d) // (2 * d)
+
+
+def evenredig_aandeel_centen(te_verdelen: int, openstaand: int, totaal_openstaand: int) -> int:
+    """evenredig_aandeel() in centen: te_verdelen * openstaand / totaal, ROUND_HALF_UP."""
+    n = te_verdelen * openstaand
+    if n >= EXACT_TOT or (2 * n) % totaal_openstaand == 0 and (2 * n // totaal_openstaand) % 2 == 1:
+        # Exact een halve cent: Decimal rondt eerst het aandeel af, dat bepaalt de richting
+        return naar_centen(evenredig_aandeel(
+            naar_euros(te_verdelen), naar_euros(openstaand), naar_euros(totaal_openstaand)
+        ))
+    return (2 * n + totaal_openstaand) // (2 * totaal_openstaand)
+
+
+def _regels_naar_euros(regels, sleutels):
+    for regel in regels:
+        for sleutel in sleutels:
+            waarde = regel.get(sleutel)
+            # Niet bool, niet al Decimal (overgenomen van een vorige berekening)
+            if type(waarde) is int:
+                regel[sleutel] = Decimal(waarde) * _CENT
+
+
+class CentenKernel:
+    """Mixin voor een RenteCalculator (of subclass) die in gehele centen rekent."""
+
+    kernel = 'centen'
+    _rente = staticmethod(bereken_rente_centen)
+    _aandeel = staticmethod(evenredig_aandeel_centen)
+    _nul = 0
+
+    def bereken(self, vorige=None) -> Dict:
+        self._bedragen = [b.bedrag for b in self.deelbetalingen]
+        if not self._naar_centen():
+            # Fracties van centen in de invoer: met de Decimal-kern rekenen
+            self.kernel = RenteCalculator.kernel
+            self._rente = bereken_rente
+            self._aandeel = evenredig_aandeel
+            self._nul = RenteCalculator._nul
+            return super().bereken(vorige)
+
+        result = super().bereken(vorige)
+        self._naar_euros()
+        return result
+
+    def _naar_centen(self) -> bool:
+        """Zet de staat om naar centen; False (en niets omgezet) als dat niet exact kan."""
+        vorderingen = [
+            {veld: naar_centen(getattr(v, veld)) for veld in _GELD_VELDEN}
+            for v in self.vorderingen.values()
+        ]
+        bedragen = [naar_centen(b.bedrag) for b in self.deelbetalingen]
+        if None in bedragen or any(None in c.values() for c in vorderingen):
+            return False
+
+        for v, centen in zip(self.vorderingen.values(), vorderingen):
+            for veld, waarde in centen.items():
+                setattr(v, veld, waarde)
+        for b, centen in zip(self.deelbetalingen, bedragen):
+            b.bedrag = centen
+        return True
+
+    def _hervat(self, vorige) -> int:
+        # Betalingen staan al in centen; vergelijk op de oorspronkelijke bedragen
+        centen = [b.bedrag for b in self.deelbetalingen]
+        for b, bedrag in zip(self.deelbetalingen, self._bedragen):
+            b.bedrag = bedrag
+        try:
+            return super()._hervat(vorige)
+        finally:
+            for b, bedrag in zip(self.deelbetalingen, centen):
+                b.bedrag = bedrag
+
+    def _naar_euros(self):
+        """Zet staat en detail-logging terug naar Decimal."""
+        for v in self.vorderingen.values():
+            for veld in _GELD_VELDEN:
+                setattr(v, veld, naar_euros(getattr(v, veld)))
+            _regels_naar_euros(v.periodes, _PERIODE_SLEUTELS)
+            _regels_naar_euros(v.periodes_kosten, _PERIODE_KOSTEN_SLEUTELS)
+            _regels_naar_euros(v.events, _EVENT_SLEUTELS)
+        for b, bedrag in zip(self.deelbetalingen, self._bedragen):
+            b.bedrag = bedrag
+            if type(b.verwerkt) is int:
+                b.verwerkt = naar_euros(b.verwerkt)
+            _regels_naar_euros(b.toerekeningen, _TOEREKENING_SLEUTELS)
+
+
+class CentenRenteCalculator(CentenKernel, RenteCalculator):
+    """RenteCalculator met de integer-centen kern."""
+
+
+class CentenSweepRenteCalculator(CentenKernel, SweepRenteCalculator):
+    """SweepRenteCalculator met de integer-centen kern."""
@@ -0,0 +1,43 @@
+"""
+Gedeelde fixtures voor de backend tests.
+
+De tests draaien zonder database: de rentetabel komt uit
+docs/03_rentetabel.csv (zoals bij de benchmark scripts) en Supabase wordt
+vervangen door een in-memory client (fake_supabase.FakeSupabase).
+"""
+import sys
+import time
+
+import pytest
+
+from scripts.benchmark_engines import laad_rentetabel
+from tests.fake_supabase import FakeSupabase
+
+
+@pytest.fixture(scope="session", autouse=True)
+def rentetabel():
+    laad_rentetabel()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """FakeSupabase als async client voor alle routers en services, met het volledige schema."""
+    import app.main  # noqa: F401  (alle routers geladen, zodat ze hieronder gepatcht worden)
+    from app.services.schema_capabilities import SchemaCapabilities, get_capability_registry
+    from app.services.subscription import invalideer_tier_cache
+
+    db = FakeSupabase()
+
+    async def client():
+        return db
+
+    for naam, module in list(sys.modules.items()):
+        if naam.startswith('app.') and getattr(module, 'get_async_supabase_client', None) is not None:
+            monkeypatch.setattr(module, 'get_async_supabase_client', client)
+    monkeypatch.setattr(get_capability_registry(), '_huidig', SchemaCapabilities(
+        sharing=True, subscriptions=True, case_berekeningen=True, snapshot_blokken=True,
+        gedetecteerd_op=time.time(),
+    ))
+    invalideer_tier_cache()
+    yield db
+    invalideer_tier_cache()
@@ -0,0 +1,153 @@
+"""
+In-memory stand-in voor de async Supabase client.
+
+Ondersteunt het deel van de PostgREST query builder dat de routers gebruiken
+(select/eq/neq/in_/lt/order/limit, insert/upsert/update/delete, count) en
+RPC's als Python functies. Elke execute() telt als één database request,
+net als de event hook op de echte HTTP client (request_context.tel_query),
+en kan een vaste latency simuleren.
+"""
+import asyncio
+import uuid
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+
+from app.services.request_context import tel_query
+
+
+class _Query:
+    def __init__(self, db: 'FakeSupabase', tabel: str):
+        self.db = db
+        self.tabel = tabel
+        self.filters: List[Callable[[dict], bool]] = []
+        self.actie = 'select'
+        self.payload = None
+        self.on_conflict = None
+        self.sortering = None
+        self.maximum = None
+        self.count = None
+
+    def select(self, *kolommen, count=None):
+        self.count = count
+        return self
+
+    def eq(self, kolom, waarde):
+        self.filters.append(lambda r: str(r.get(kolom)) == str(waarde))
+        return self
+
+    def neq(self, kolom, waarde):
+        self.filters.append(lambda r: str(r.get(kolom)) != str(waarde))
+        return self
+
+    def in_(self, kolom, waarden):
+        waarden = {str(w) for w in waarden}
+        self.filters.append(lambda r: str(r.get(kolom)) in waarden)
+        return self
+
+    def lt(self, kolom, waarde):
+        self.filters.append(lambda r: r.get(kolom) is not None and r.get(kolom) < waarde)
+        return self
+
+    def order(self, kolom, desc=False):
+        self.sortering = (kolom, desc)
+        return self
+
+    def limit(self, aantal):
+        self.maximum = aantal
+        return self
+
+    def insert(self, rijen):
+        self.actie, self.payload = 'insert', rijen
+        return self
+
+    def upsert(self, rijen, on_conflict=None, **_):
+        self.actie, self.payload, self.on_conflict = 'upsert', rijen, on_conflict
+        return self
+
+    def update(self, waarden):
+        self.actie, self.payload = 'update', waarden
+        return self
+
+    def delete(self):
+        self.actie = 'delete'
+        return self
+
+    async def execute(self):
+        await self.db._request(self.tabel, self.actie)
+        if self.tabel in self.db.ontbrekend:
+            raise APIError({'code': 'PGRST205', 'message': f"Could not find the table '{self.tabel}'",
+                            'hint': None, 'details': None})
+        rijen = self.db.tables.setdefault(self.tabel, [])
+
+        if self.actie in ('insert', 'upsert'):
+            nieuw = self.payload if isinstance(self.payload, list) else [self.payload]
+            uit = []
+            for rij in nieuw:
+                sleutel = self.on_conflict or 'id'
+                bestaand = next((r for r in rijen if sleutel in rij and r.get(sleutel) == rij[sleutel]), None)
+                if self.actie == 'upsert' and bestaand is not None:
+                    bestaand.update(rij)
+                    uit.append(dict(bestaand))
+                    continue
+                rij = {'id': str(uuid.uuid4()), 'created_at': '2026-01-01T00:00:00+00:00',
+                       'updated_at': '2026-01-01T00:00:00+00:00', **rij}
+                rijen.append(rij)
+                uit.append(dict(rij))
+            return SimpleNamespace(data=uit, count=None)
+
+        gevonden = [r for r in rijen if all(f(r) for f in self.filters)]
+        if self.actie == 'update':
+            for rij in gevonden:
+                rij.update(self.payload)
+            return SimpleNamespace(data=[dict(r) for r in gevonden], count=None)
+        if self.actie == 'delete':
+            self.db.tables[self.tabel] = [r for r in rijen if r not in gevonden]
+            return SimpleNamespace(data=[dict(r) for r in gevonden], count=None)
+
+        if self.sortering:
+            kolom, desc = self.sortering
+            gevonden.sort(key=lambda r: (r.get(kolom) is None, str(r.get(kolom))), reverse=desc)
+        aantal = len(gevonden)
+        if self.maximum is not None:
+            gevonden = gevonden[:self.maximum]
+        return SimpleNamespace(data=[dict(r) for r in gevonden], count=aantal if self.count else None)
+
+
+class _Rpc:
+    def __init__(self, db: 'FakeSupabase', naam: str, params: dict):
+        self.db = db
+        self.naam = naam
+        self.params = params
+
+    async def execute(self):
+        await self.db._request('rpc', self.naam)
+        functie = self.db.rpcs.get(self.naam)
+        if functie is None:
+            raise APIError({'code': 'PGRST202', 'message': f"Could not find the function public.{self.naam}",
+                            'hint': None, 'details': None})
+        return SimpleNamespace(data=functie(self.db, **self.params))
+
+
+class FakeSupabase:
+    """Async client met tabellen als lijsten van dicts."""
+
+    def __init__(self, tables: Optional[Dict[str, List[dict]]] = None, latency: float = 0.0):
+        self.tables: Dict[str, List[dict]] = tables or {}
+        self.rpcs: Dict[str, Callable] = {}
+        self.ontbrekend: set = set()
+        self.latency = latency
+        self.requests: List[tuple] = []  # (tabel of 'rpc', actie of functienaam)
+
+    async def _request(self, *wat):
+        tel_query()
+        self.requests.append(wat)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def table(self, tabel: str) -> _Query:
+        return _Query(self, tabel)
+
+    def rpc(self, naam: str, params: dict) -> _Rpc:
+        return _Rpc(self, naam, params)
@@ -0,0 +1,31 @@
+"""
+Blob store (blob_store): de interface en de lokale store.
+"""
+import pytest
+
+from app.services.blob_store import BlobStore, LokaleBlobStore
+
+
+def test_onvolledige_store_faalt_bij_aanmaken():
+    class ZonderVerwijder(BlobStore):
+        async def lees(self, sleutel):
+            return None
+
+        async def schrijf(self, sleutel, inhoud, content_type="application/octet-stream"):
+            pass
+
+    with pytest.raises(TypeError, match='verwijder'):
+        ZonderVerwijder()
+
+
+async def test_lokale_store(tmp_path):
+    store = LokaleBlobStore(str(tmp_path))
+    await store.schrijf('snapshots/s1/v1.pdf', b'%PDF')
+    assert await store.lees('snapshots/s1/v1.pdf') == b'%PDF'
+    assert store.lokaal_pad('snapshots/s1/v1.pdf') == tmp_path / 'snapshots/s1/v1.pdf'
+
+    await store.verwijder('snapshots/s1/v1.pdf', 'bestaat/niet.pdf')
+    assert await store.lees('snapshots/s1/v1.pdf') is None
+
+    with pytest.raises(ValueError):
+        await store.schrijf('../buiten.pdf', b'')
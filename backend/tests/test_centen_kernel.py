@@ -0,0 +1,145 @@
+"""
+Integer-centen rekenkern (scripts/centen_kernel.py) tegen de Decimal-kern.
+
+Property tests met hypothesis: de rekenfuncties geven per cent hetzelfde als
+hun Decimal-tegenhanger, en een complete berekening geeft hetzelfde
+resultaat (ook bij hervatten vanaf checkpoints). Bedragen worden als getal
+vergeleken: de Decimal-kern houdt de schaal van de invoer aan (5362.1), de
+centen-kern geeft altijd twee decimalen.
+"""
+import json
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from unittest import mock
+
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+from app.api import berekening
+from app.models import BerekeningRequest
+from app.services.berekening_cache import CheckpointCache
+from app.services.rente_calculator import bereken_rente, evenredig_aandeel
+from scripts.centen_kernel import (
+    CentenRenteCalculator,
+    CentenSweepRenteCalculator,
+    bereken_rente_centen,
+    evenredig_aandeel_centen,
+    naar_euros,
+)
+
+CENTEN_CALCULATORS = {
+    'standaard': CentenRenteCalculator,
+    'sweep': CentenSweepRenteCalculator,
+}
+
+centen = st.integers(min_value=0, max_value=10**11)
+percentages = st.decimals(min_value=Decimal("0"), max_value=Decimal("0.25"), places=4)
+datums = st.dates(min_value=date(2002, 1, 1), max_value=date(2026, 12, 31))
+
+
+def _bedragen(min_centen=1):
+    # Vooral hele centen; soms fracties van een cent (dan rekent de kern met Decimal)
+    return st.one_of(
+        st.integers(min_value=min_centen, max_value=10**8).map(lambda c: Decimal(c) / 100),
+        st.decimals(min_value=Decimal("0.01"), max_value=Decimal("100000"), places=3),
+    )
+
+
+@st.composite
+def vorderingen(draw, index):
+    start = draw(datums)
+    rentetype = draw(st.integers(min_value=1, max_value=7))
+    v = dict(kenmerk=f"V{index}", bedrag=draw(_bedragen()), datum=start, rentetype=rentetype,
+             item_type=draw(st.sampled_from(['vordering', 'kosten'])))
+    if draw(st.booleans()):
+        v['kosten'] = draw(_bedragen())
+        if draw(st.booleans()):
+            v['kosten_rentedatum'] = start + timedelta(days=draw(st.integers(-200, 400)))
+    if rentetype in (5, 6, 7):
+        v['opslag'] = draw(st.decimals(min_value=Decimal("0"), max_value=Decimal("0.08"), places=4))
+        if rentetype in (6, 7) and draw(st.booleans()):
+            v['opslag_ingangsdatum'] = start + timedelta(days=draw(st.integers(0, 900)))
+    if draw(st.integers(0, 4)) == 0:
+        pauze = start + timedelta(days=draw(st.integers(-30, 1500)))
+        v['pauze_start'], v['pauze_eind'] = pauze, pauze + timedelta(days=draw(st.integers(1, 800)))
+    if draw(st.integers(0, 3)) == 0:
+        v['betaaltermijn_dagen'] = draw(st.sampled_from([14, 30, 60]))
+    return v
+
+
+@st.composite
+def zaken(draw):
+    vs = [draw(vorderingen(i)) for i in range(draw(st.integers(1, 6)))]
+    if len(vs) > 1 and draw(st.booleans()):
+        # Zelfde rente en startdatum: evenredige verdeling (halve centen!)
+        vs[1] = dict(vs[0], kenmerk="V1", bedrag=draw(_bedragen()))
+    kenmerken = [v['kenmerk'] for v in vs]
+    betalingen = [
+        dict(kenmerk=f"B{j}", bedrag=draw(_bedragen()), datum=draw(datums),
+             aangewezen=draw(st.lists(st.sampled_from(kenmerken), max_size=2, unique=True)))
+        for j in range(draw(st.integers(0, 12)))
+    ]
+    return dict(vorderingen=vs, deelbetalingen=betalingen,
+                einddatum=draw(st.dates(min_value=date(2010, 1, 1), max_value=date(2027, 6, 30))))
+
+
+def _getal(waarde):
+    """Decimal strings als getal (5362.1 == 5362.10); andere waarden ongewijzigd."""
+    if isinstance(waarde, dict):
+        return {k: _getal(v) for k, v in waarde.items()}
+    if isinstance(waarde, list):
+        return [_getal(v) for v in waarde]
+    if isinstance(waarde, str):
+        try:
+            return Decimal(waarde)
+        except InvalidOperation:
+            return waarde
+    return waarde
+
+
+def _serialiseer(request: BerekeningRequest, calculators: dict, checkpoints: CheckpointCache):
+    with mock.patch.dict(berekening.CALCULATORS, calculators), \
+            mock.patch.object(berekening, 'get_checkpoint_cache', lambda: checkpoints):
+        return _getal(json.loads(berekening.voer_berekening_uit(request).model_dump_json()))
+
+
+@given(centen, percentages, st.integers(-5, 20000), st.sampled_from([365, 366]))
+def test_rente_per_cent_gelijk(hoofdsom, rente_pct, dagen, dagen_jaar):
+    assert naar_euros(bereken_rente_centen(hoofdsom, rente_pct, dagen, dagen_jaar)) == \
+        bereken_rente(naar_euros(hoofdsom), rente_pct, dagen, dagen_jaar)
+
+
+@given(centen, st.data())
+def test_evenredig_aandeel_per_cent_gelijk(te_verdelen, data):
+    totaal = data.draw(st.integers(min_value=1, max_value=10**11))
+    openstaand = data.draw(st.integers(min_value=0, max_value=totaal))
+    assert naar_euros(evenredig_aandeel_centen(te_verdelen, openstaand, totaal)) == \
+        evenredig_aandeel(naar_euros(te_verdelen), naar_euros(openstaand), naar_euros(totaal))
+
+
+@settings(max_examples=150, deadline=None, suppress_health_check=[HealthCheck.too_slow])
+@given(zaken(), st.sampled_from(['standaard', 'sweep']), st.sampled_from(['full', 'summary']))
+def test_berekening_gelijk(zaak, engine, detail):
+    request = BerekeningRequest(**zaak, engine=engine, detail=detail)
+    referentie = _serialiseer(request, {}, CheckpointCache(max_items=0))
+    assert _serialiseer(request, CENTEN_CALCULATORS, CheckpointCache(max_items=0)) == referentie
+
+
+@settings(max_examples=75, deadline=None, suppress_health_check=[HealthCheck.too_slow])
+@given(zaken(), st.data())
+def test_hervat_gelijk(zaak, data):
+    """Hervatten vanaf een vorige centen-berekening (na een gewijzigde betaling)."""
+    engine = data.draw(st.sampled_from(['standaard', 'sweep']))
+    detail = data.draw(st.sampled_from(['full', 'summary']))
+    checkpoints = CheckpointCache(max_items=1)
+    _serialiseer(BerekeningRequest(**zaak, engine=engine, detail=detail), CENTEN_CALCULATORS, checkpoints)
+
+    betalingen = zaak['deelbetalingen']
+    if betalingen:
+        index = data.draw(st.integers(0, len(betalingen) - 1))
+        betalingen[index] = dict(betalingen[index], bedrag=data.draw(_bedragen()))
+    else:
+        zaak['einddatum'] += timedelta(days=data.draw(st.integers(1, 400)))
+    request = BerekeningRequest(**zaak, engine=engine, detail=detail)
+
+    referentie = _serialiseer(request, {}, CheckpointCache(max_items=0))
+    assert _serialiseer(request, CENTEN_CALCULATORS, checkpoints) == referentie
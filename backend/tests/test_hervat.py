@@ -0,0 +1,143 @@
+"""
+Hervatten vanaf checkpoints (RenteCalculator._hervat).
+
+Differentiële test: willekeurige zaken krijgen een reeks willekeurige
+wijzigingen. Na elke wijziging moet de hervatte berekening (met de
+checkpoints van de vorige) exact hetzelfde geserialiseerde resultaat geven
+als een volledige herberekening.
+"""
+import copy
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.api import berekening
+from app.models import BerekeningRequest
+from app.services.berekening_cache import CheckpointCache
+
+ZAKEN = 30
+WIJZIGINGEN = 5
+
+
+def _datum(r: random.Random, van=date(2003, 1, 1), tot=date(2026, 6, 1)) -> date:
+    return van + timedelta(days=r.randrange((tot - van).days))
+
+
+def _bedrag(r: random.Random) -> Decimal:
+    return Decimal(r.randint(100, 10**6)) / 100
+
+
+def _betaling(r: random.Random, kenmerk: str, vorderingen: list) -> dict:
+    aangewezen = []
+    if r.random() < 0.3:
+        aangewezen = r.sample([v["kenmerk"] for v in vorderingen], k=r.randint(1, min(2, len(vorderingen))))
+    return dict(kenmerk=kenmerk, bedrag=_bedrag(r), datum=_datum(r, date(2004, 1, 1), date(2027, 1, 1)),
+                aangewezen=aangewezen)
+
+
+def willekeurige_zaak(r: random.Random) -> dict:
+    vorderingen = []
+    for i in range(r.randint(1, 6)):
+        start = r.choice([_datum(r), date(2004, 2, 29), date(2012, 2, 29)])
+        rentetype = r.randint(1, 7)
+        v = dict(kenmerk=f"V{i}", bedrag=_bedrag(r), datum=start, rentetype=rentetype,
+                 item_type=r.choice(["vordering", "kosten"]))
+        if r.random() < 0.3:
+            v["kosten"] = Decimal(r.randint(0, 50000)) / 100
+        if r.random() < 0.3:
+            v["kosten_rentedatum"] = start + timedelta(days=r.randint(-200, 400))
+        if rentetype in (5, 6, 7):
+            v["opslag"] = Decimal(r.randint(0, 800)) / 10000
+        if rentetype in (6, 7) and r.random() < 0.5:
+            v["opslag_ingangsdatum"] = start + timedelta(days=r.randint(0, 900))
+        if r.random() < 0.2:
+            pauze = start + timedelta(days=r.randint(-30, 1500))
+            v["pauze_start"], v["pauze_eind"] = pauze, pauze + timedelta(days=r.randint(1, 800))
+        if r.random() < 0.25:
+            v["betaaltermijn_dagen"] = r.choice([14, 30, 60])
+        vorderingen.append(v)
+    betalingen = [_betaling(r, f"B{j}", vorderingen) for j in range(r.randint(0, 20))]
+    return dict(vorderingen=vorderingen, deelbetalingen=betalingen,
+                einddatum=_datum(r, date(2010, 1, 1), date(2027, 6, 1)))
+
+
+def willekeurige_wijziging(zaak: dict, r: random.Random) -> dict:
+    """Eén bewerking zoals een gebruiker die doet: een betaling, vordering of de einddatum."""
+    zaak = copy.deepcopy(zaak)
+    vorderingen, betalingen = zaak["vorderingen"], zaak["deelbetalingen"]
+    keuze = r.randrange(7)
+    if keuze == 0 and betalingen:
+        b = r.choice(betalingen)
+        b["bedrag"] = max(Decimal("1.00"), b["bedrag"] + Decimal(r.randint(-5000, 5000)) / 100)
+    elif keuze == 1:
+        betalingen.append(_betaling(r, f"B{len(betalingen)}-{r.randrange(10**6)}", vorderingen))
+    elif keuze == 2 and betalingen:
+        betalingen.pop(r.randrange(len(betalingen)))
+    elif keuze == 3 and betalingen:
+        b = r.choice(betalingen)
+        b["datum"] += timedelta(days=r.randint(-400, 400))
+    elif keuze == 4:
+        r.choice(vorderingen)["bedrag"] = _bedrag(r)
+    elif keuze == 5:
+        r.choice(vorderingen)["datum"] = _datum(r)
+    else:
+        zaak["einddatum"] = _datum(r, date(2010, 1, 1), date(2027, 6, 1))
+    return zaak
+
+
+@pytest.mark.parametrize("engine", ["standaard", "sweep"])
+@pytest.mark.parametrize("detail", ["full", "summary"])
+def test_hervat_gelijk_aan_volledige_berekening(monkeypatch, detail, engine):
+    hervat = CheckpointCache(max_items=4)
+    volledig = CheckpointCache(max_items=0)  # Geen checkpoints: altijd vanaf het begin
+    hervattingen = 0
+
+    for seed in range(ZAKEN):
+        r = random.Random(f"{detail}-{engine}-{seed}")
+        zaak = willekeurige_zaak(r)
+        for stap in range(WIJZIGINGEN + 1):
+            if stap:
+                zaak = willekeurige_wijziging(zaak, r)
+            request = BerekeningRequest(**zaak, detail=detail, engine=engine)
+
+            monkeypatch.setattr(berekening, "get_checkpoint_cache", lambda: hervat)
+            resultaat = berekening.voer_berekening_uit(request)
+            calculator = hervat.get(hervat.sleutel(request))
+            hervattingen += calculator.hervat_vanaf > 0
+
+            monkeypatch.setattr(berekening, "get_checkpoint_cache", lambda: volledig)
+            referentie = berekening.voer_berekening_uit(request)
+
+            assert resultaat.model_dump_json() == referentie.model_dump_json(), (
+                f"seed {seed}, wijziging {stap}, hervat vanaf betaling {calculator.hervat_vanaf}"
+            )
+
+    # Anders test dit niets: een flink deel van de wijzigingen moet echt hervatten
+    assert hervattingen >= ZAKEN
+
+
+def test_checkpoints_per_zaak_en_begrensd(monkeypatch):
+    cache = CheckpointCache(max_items=8)
+    monkeypatch.setattr(berekening, "get_checkpoint_cache", lambda: cache)
+    r = random.Random("zaken")
+    zaak = willekeurige_zaak(r)
+    request = BerekeningRequest(**zaak)
+
+    # Twee zaken met dezelfde kenmerken (F1, 2024-001, ...) overschrijven elkaar niet
+    berekening.voer_berekening_uit(request, "zaak-1")
+    berekening.voer_berekening_uit(BerekeningRequest(**willekeurige_wijziging(zaak, r)), "zaak-2")
+    eerste, tweede = cache.get(cache.sleutel(request, "zaak-1")), cache.get(cache.sleutel(request, "zaak-2"))
+    assert eerste is not None and tweede is not None and eerste is not tweede
+    assert cache.get(cache.sleutel(request)) is None  # Los request: eigen sleutel
+
+    # Begrensd op gewicht: de oudste zaak gaat eruit, een te zware calculator wordt niet bewaard
+    gewicht = CheckpointCache._gewicht_van(eerste)
+    klein = CheckpointCache(max_items=8, max_gewicht=gewicht + CheckpointCache._gewicht_van(tweede) - 1)
+    klein.put("a", eerste)
+    klein.put("b", tweede)
+    assert klein.get("a") is None and klein.get("b") is tweede
+    te_klein = CheckpointCache(max_items=8, max_gewicht=gewicht - 1)
+    te_klein.put("a", eerste)
+    assert te_klein.get("a") is None and te_klein._gewicht == 0
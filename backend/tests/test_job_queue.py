@@ -0,0 +1,157 @@
+"""
+Job queue (job_queue): crash recovery, volle worker pool en herhaalde pogingen.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import job_queue as jq
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = jq.JobQueue(pad=str(tmp_path / 'jobs.sqlite3'), max_pogingen=2, heartbeat=0.01)
+    yield q
+    if q._db is not None:
+        q._db.close()
+
+
+@pytest.fixture
+def soort(monkeypatch):
+    """Een test job soort; de handler is per test te vervangen."""
+    handlers = {'handler': None}
+
+    async def handler(job_id, user_id, invoer):
+        return await handlers['handler'](job_id, user_id, invoer)
+
+    monkeypatch.setitem(jq._SOORTEN, 'test', handler)
+    return handlers
+
+
+def _verloop_heartbeat(queue, job_id):
+    queue._sql("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - 60, job_id))
+
+
+async def test_herstel_zet_job_zonder_heartbeat_terug(queue, soort):
+    job_id = await queue.dien_in('test', 'u1', {'x': 1})
+    assert queue._claim()['id'] == job_id
+
+    # Recente heartbeat: de job loopt nog
+    assert queue.herstel() == 0
+    assert (await queue.status(job_id))['status'] == 'bezig'
+
+    # Proces gestopt: terug in de wachtrij, opnieuw te claimen
+    _verloop_heartbeat(queue, job_id)
+    assert queue.herstel() == 1
+    job = await queue.status(job_id)
+    assert (job['status'], job['pogingen'], job['fout']) == ('wachtend', 1, None)
+    assert queue._claim()['pogingen'] == 2
+
+
+async def test_herstel_na_max_pogingen_mislukt(queue, soort):
+    job_id = await queue.dien_in('test', 'u1', {})
+    for _ in range(queue.max_pogingen):
+        assert queue._claim()['id'] == job_id
+        _verloop_heartbeat(queue, job_id)
+        queue.herstel()
+
+    job = await queue.status(job_id)
+    assert (job['status'], job['fout_status'], job['pogingen']) == ('mislukt', 500, queue.max_pogingen)
+    assert job['fout'] == 'Job afgebroken (worker gestopt)'
+    assert queue._claim() is None
+
+
+async def test_volle_worker_pool_telt_niet_als_poging(queue, soort):
+    async def vol(job_id, user_id, invoer):
+        raise HTTPException(status_code=503, detail="Server is busy")
+
+    soort['handler'] = vol
+    job_id = await queue.dien_in('test', 'u1', {})
+    voor = time.time()
+    await queue._voer_uit(queue._claim())
+
+    job = await queue.status(job_id)
+    assert (job['status'], job['pogingen'], job['fout']) == ('wachtend', 0, None)
+    assert job['niet_voor'] >= voor + jq._OPNIEUW_NA
+    # Pas na de pauze weer te claimen
+    assert queue._claim() is None
+
+
+async def test_andere_fout_is_definitief(queue, soort):
+    async def fout(job_id, user_id, invoer):
+        raise HTTPException(status_code=400, detail="Zaak zonder vorderingen")
+
+    soort['handler'] = fout
+    job_id = await queue.dien_in('test', 'u1', {})
+    await queue._voer_uit(queue._claim())
+
+    job = await queue.status(job_id)
+    assert (job['status'], job['fout'], job['fout_status']) == ('mislukt', "Zaak zonder vorderingen", 400)
+
+
+async def test_heartbeat_overleeft_een_mislukte_update(queue, soort, monkeypatch, caplog):
+    echte_sql_async = queue._sql_async
+    mislukt = []
+
+    async def sql_async(sql, params=()):
+        if sql.startswith("UPDATE jobs SET heartbeat") and not mislukt:
+            mislukt.append(sql)
+            raise sqlite3.OperationalError("database is locked")
+        return await echte_sql_async(sql, params)
+
+    async def traag(job_id, user_id, invoer):
+        await asyncio.sleep(0.1)
+        return {'ok': True}
+
+    monkeypatch.setattr(queue, '_sql_async', sql_async)
+    soort['handler'] = traag
+    job_id = await queue.dien_in('test', 'u1', {})
+    job = queue._claim()
+    gestart = (await queue.status(job_id))['heartbeat']
+    with caplog.at_level(logging.WARNING, logger=jq.__name__):
+        await queue._voer_uit(job)
+
+    assert mislukt and 'database is locked' in caplog.text
+    job = await queue.status(job_id)
+    assert job['status'] == 'klaar' and job['resultaat'] == {'ok': True}
+    # Na de mislukte update ging de heartbeat gewoon door
+    assert job['heartbeat'] > gestart
+
+
+async def test_snapshot_job_herhaalde_poging_maakt_geen_tweede_snapshot(fake_db, monkeypatch):
+    from app.api import snapshots
+
+    case = dict(id='c1', user_id='u1', einddatum='2026-01-01')
+    berekeningen = []
+
+    async def zaak_voor_snapshot(db, case_id, user_id):
+        return case, None
+
+    async def bereken_case(db, case, opgeslagen):
+        berekeningen.append(case['id'])
+        return SimpleNamespace(invoer_json={}, resultaat_json={'totalen': {'openstaand': '123.45'}})
+
+    async def bewaar_resultaat(db, resultaat):
+        return resultaat
+
+    monkeypatch.setattr(snapshots, '_zaak_voor_snapshot', zaak_voor_snapshot)
+    monkeypatch.setattr(snapshots, 'bereken_case', bereken_case)
+    monkeypatch.setattr(snapshots, 'bewaar_resultaat', bewaar_resultaat)
+    invoer = {'case_id': 'c1', 'snapshot_id': 's1'}
+
+    eerste = await snapshots._snapshot_job('j1', 'u1', invoer)
+    # De worker crashte na het opslaan: herstel zet de job terug, de volgende poging draait opnieuw
+    fake_db.requests.clear()
+    tweede = await snapshots._snapshot_job('j1', 'u1', json.loads(json.dumps(invoer)))
+
+    assert tweede == eerste
+    assert eerste['snapshot']['id'] == 's1'
+    assert [s['id'] for s in fake_db.tables['snapshots']] == ['s1']
+    assert berekeningen == ['c1']
+    assert fake_db.requests == [('snapshots', 'select')]
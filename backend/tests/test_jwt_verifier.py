@@ -0,0 +1,67 @@
+"""
+Lokale verificatie van access tokens (jwt_verifier).
+"""
+import threading
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.services.jwt_verifier import JwtVerifier, TokenOngeldig
+
+SECRET = "test-secret-" * 4
+
+
+def _token(claims=None, sleutel=SECRET, **kwargs):
+    inhoud = {'sub': 'user-1', 'email': 'a@example.nl', 'aud': 'authenticated', 'exp': time.time() + 60}
+    inhoud.update(claims or {})
+    return jwt.encode({k: v for k, v in inhoud.items() if v is not None}, sleutel, **kwargs)
+
+
+def test_hs256_geldig():
+    assert JwtVerifier(secret=SECRET).verifieer(_token()) == ('user-1', 'a@example.nl')
+
+
+@pytest.mark.parametrize("token", [
+    _token({'exp': time.time() - 1}),
+    _token({'aud': 'anders'}),
+    _token({'exp': None}),
+    _token(sleutel="ander-secret-" * 4),
+    "geen-jwt",
+])
+def test_ongeldig_token(token):
+    with pytest.raises(TokenOngeldig):
+        JwtVerifier(secret=SECRET).verifieer(token)
+
+
+def test_niet_lokaal_te_verifieren():
+    # Geen secret voor HS256: de aanroeper valt terug op get_user
+    assert JwtVerifier(jwks_url="https://example.invalid/jwks").verifieer(_token()) is None
+
+
+class _TrageJwks:
+    """PyJWKClient stand-in: het ophalen van de sleutels blokkeert."""
+
+    def __init__(self, publieke_sleutel):
+        self.publieke_sleutel = publieke_sleutel
+        self.threads = []
+
+    def get_signing_key_from_jwt(self, token):
+        self.threads.append(threading.get_ident())
+        time.sleep(0.05)
+        return type('Sleutel', (), {'key': self.publieke_sleutel})
+
+
+async def test_jwks_ophalen_buiten_de_event_loop():
+    prive = ec.generate_private_key(ec.SECP256R1())
+    verifier = JwtVerifier(jwks_url="https://example.invalid/jwks")
+    verifier._jwks_client = jwks = _TrageJwks(prive.public_key())
+    token = _token(sleutel=prive, algorithm='ES256', headers={'kid': 'k1'})
+
+    assert await verifier.verifieer_async(token) == ('user-1', 'a@example.nl')
+    assert jwks.threads and threading.get_ident() not in jwks.threads
+
+    # Tweede keer uit de cache, zonder de sleutels opnieuw op te halen
+    assert await verifier.verifieer_async(token) == ('user-1', 'a@example.nl')
+    assert len(jwks.threads) == 1
@@ -0,0 +1,166 @@
+"""
+Query budgets van de case endpoints (request_context.query_budget).
+
+De endpoints draaien via de ASGI app (met de request context middleware)
+tegen een FakeSupabase die elke database request telt. Per endpoint het
+zwaarste pad: het aantal requests moet binnen max_queries blijven, en met
+een latency van max_ms / max_queries per request (de grens waarbij een
+volledig sequentieel endpoint net te traag is) ook binnen max_ms.
+"""
+import logging
+
+import httpx
+import pytest
+
+from app.api import cases
+from app.auth import get_current_user
+from app.main import app
+
+EIGENAAR, COLLEGA, ADMIN = 'u-eigenaar', 'u-collega', 'u-admin'
+
+
+def _case_permission(db, p_user_id, p_case_id=None, p_vordering_id=None, p_deelbetaling_id=None):
+    case = next((c for c in db.tables['cases'] if c['id'] == p_case_id), None)
+    admin = any(r['user_id'] == p_user_id and r['role'] == 'admin' for r in db.tables['user_roles'])
+    if case is None:
+        return [{'case_id': None, 'permission': None, 'is_admin': admin}]
+    share = next((s['permission'] for s in db.tables['case_shares']
+                  if s['case_id'] == case['id'] and s['shared_with_user_id'] == p_user_id), None)
+    permissie = 'owner' if case['user_id'] == p_user_id else share
+    return [{'case_id': case['id'], 'permission': permissie, 'is_admin': admin}]
+
+
+def _case_etag(db, p_user_id, p_case_id=None):
+    return f"etag-{p_user_id}-{p_case_id}-{len(db.tables['vorderingen'])}"
+
+
+def _zaak(case_id, eigenaar):
+    return dict(id=case_id, user_id=eigenaar, naam=f"Zaak {case_id}", klant_referentie=None,
+                einddatum='2026-01-01', strategie='A', default_betaaltermijn=14, revisie=1,
+                created_at='2026-01-01T00:00:00+00:00', updated_at='2026-01-01T00:00:00+00:00')
+
+
+@pytest.fixture
+def zaken(fake_db):
+    vorderingen = [dict(id=f"v{i}", case_id='c1', volgorde=i, item_type='vordering', kenmerk=f"F{i}",
+                        bedrag=1000 + i, datum=f"2020-0{1 + i}-01", rentetype=1 + i % 2, kosten=0,
+                        betaaltermijn_dagen=0, created_at='2026-01-01T00:00:00+00:00')
+                   for i in range(3)]
+    deelbetalingen = [dict(id='d1', case_id='c1', volgorde=0, kenmerk='B1', bedrag=500, datum='2021-06-01',
+                           aangewezen=[], created_at='2026-01-01T00:00:00+00:00')]
+    fake_db.tables.update({
+        'cases': [_zaak('c1', EIGENAAR), _zaak('c2', COLLEGA)],
+        'vorderingen': vorderingen,
+        'deelbetalingen': deelbetalingen,
+        'case_shares': [
+            dict(id='s1', case_id='c1', shared_with_user_id=COLLEGA, shared_by_user_id=EIGENAAR, permission='edit'),
+            dict(id='s2', case_id='c2', shared_with_user_id=EIGENAAR, shared_by_user_id=COLLEGA, permission='view'),
+        ],
+        'user_profiles': [dict(id=u, email=f"{u}@example.nl", display_name=u) for u in (EIGENAAR, COLLEGA, ADMIN)],
+        'user_roles': [dict(user_id=ADMIN, role='admin')],
+        'subscription_tiers': [dict(id='free', naam='Free', max_vorderingen=500, max_deelbetalingen=500)],
+        'user_subscriptions': [],
+        'case_berekeningen': [],
+    })
+    fake_db.rpcs.update(case_permission=_case_permission, case_etag=_case_etag)
+    return fake_db
+
+
+@pytest.fixture
+async def client(zaken):
+    gebruiker = {'id': EIGENAAR}
+    app.dependency_overrides[get_current_user] = lambda: gebruiker['id']
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as c:
+        c.gebruiker = gebruiker
+        yield c
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+async def _binnen_budget(client, db, caplog, endpoint, methode, pad, gebruiker=EIGENAAR, **kwargs):
+    """Doe het request met latency op de budgetgrens; geeft de response."""
+    client.gebruiker['id'] = gebruiker
+    db.latency = endpoint.max_ms / endpoint.max_queries / 1000
+    db.requests.clear()
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger='app.services.request_context'):
+        response = await client.request(methode, pad, **kwargs)
+    assert response.status_code in (200, 304), response.text
+    assert len(db.requests) <= endpoint.max_queries, db.requests
+    assert 'buiten budget' not in caplog.text
+    return response
+
+
+@pytest.mark.parametrize('gebruiker, case_id', [
+    (EIGENAAR, 'c1'),  # Eigenaar van een gedeelde zaak: profielen van de collega's
+    (COLLEGA, 'c1'),  # Gedeeld met mij: profiel van de deler
+    (ADMIN, 'c1'),  # Admin: profiel van de eigenaar
+])
+async def test_get_case(client, zaken, caplog, gebruiker, case_id):
+    response = await _binnen_budget(client, zaken, caplog, cases.get_case, 'GET', f'/api/cases/{case_id}', gebruiker)
+    assert len(response.json()['vorderingen']) == 3
+
+    # Conditioneel: alleen de ETag
+    etag = response.headers['etag']
+    await _binnen_budget(client, zaken, caplog, cases.get_case, 'GET', f'/api/cases/{case_id}', gebruiker,
+                         headers={'If-None-Match': etag})
+    assert zaken.requests == [('rpc', 'case_etag')]
+
+
+@pytest.mark.parametrize('filter', [None, 'own', 'shared'])
+async def test_list_cases(client, zaken, caplog, filter):
+    params = {'filter': filter} if filter else {}
+    response = await _binnen_budget(client, zaken, caplog, cases.list_cases, 'GET', '/api/cases', params=params)
+    ids = {c['id'] for c in response.json()}
+    assert ids == {None: {'c1', 'c2'}, 'own': {'c1'}, 'shared': {'c2'}}[filter]
+
+    await _binnen_budget(client, zaken, caplog, cases.list_cases, 'GET', '/api/cases', params=params,
+                         headers={'If-None-Match': response.headers['etag']})
+
+
+async def test_bereken_case_route(client, zaken, caplog):
+    # Eerste keer: laden, rekenen en opslaan
+    response = await _binnen_budget(client, zaken, caplog, cases.bereken_case_route, 'GET', '/api/cases/c1/bereken')
+    assert len(response.json()['vorderingen']) == 3
+    assert len(zaken.tables['case_berekeningen']) == 1
+
+    # Zelfde revisie: uit de opslag
+    await _binnen_budget(client, zaken, caplog, cases.bereken_case_route, 'GET', '/api/cases/c1/bereken')
+    assert ('vorderingen', 'select') not in zaken.requests
+
+
+async def test_import_lines(client, zaken, caplog):
+    regels = {
+        'vorderingen': [dict(kenmerk=f"N{i}", bedrag='100.00', datum='2023-01-01', rentetype=1) for i in range(40)],
+        'deelbetalingen': [dict(kenmerk=f"NB{i}", bedrag='25.00', datum='2024-01-01') for i in range(40)],
+    }
+    response = await _binnen_budget(client, zaken, caplog, cases.import_lines, 'POST', '/api/cases/c1/import',
+                                    json=regels)
+    assert len(response.json()['vorderingen']) == 40
+    assert len(zaken.tables['vorderingen']) == 43
+
+
+async def test_import_lines_file(client, zaken, caplog):
+    csv = "soort;kenmerk;bedrag;datum;rentetype\n" + "".join(
+        f"vordering;N{i};100,00;01-01-2023;1\ndeelbetaling;NB{i};25,00;01-01-2024;\n" for i in range(40)
+    )
+    response = await _binnen_budget(client, zaken, caplog, cases.import_lines_file, 'POST',
+                                    '/api/cases/c1/import/bestand',
+                                    files={'bestand': ('regels.csv', csv.encode(), 'text/csv')})
+    assert len(response.json()['deelbetalingen']) == 40
+
+
+async def test_budget_overschrijding_wordt_gelogd(caplog):
+    from app.services.request_context import _memo, query_budget, tel_query
+
+    @query_budget(max_queries=1, max_ms=1000)
+    async def endpoint():
+        tel_query()
+        tel_query()
+
+    token = _memo.set({})
+    try:
+        with caplog.at_level(logging.WARNING, logger='app.services.request_context'):
+            await endpoint()
+    finally:
+        _memo.reset(token)
+    assert 'endpoint buiten budget: 2 queries (max 1)' in caplog.text
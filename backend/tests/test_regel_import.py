@@ -0,0 +1,79 @@
+"""
+Inlezen van vorderingen en deelbetalingen (regel_import).
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.services.regel_import import ImportFout, lees_regels
+
+
+def _csv(*regels: str) -> bytes:
+    return "\n".join(regels).encode() + b"\n"
+
+
+@pytest.mark.parametrize('bedrag, verwacht', [
+    ('€ 1.234', Decimal('1234')),
+    ('1.234,56', Decimal('1234.56')),
+    ('1.234.567', Decimal('1234567')),
+    ('1234.56', Decimal('1234.56')),
+    ('1234,56', Decimal('1234.56')),
+    ('0.125', Decimal('0.125')),  # Geen duizendtal: begint met 0
+    ('12.5', Decimal('12.5')),
+])
+def test_bedrag(bedrag, verwacht):
+    vorderingen, _, fouten = lees_regels(_csv("kenmerk;bedrag;datum;rentetype", f"F1;{bedrag};01-02-2024;1"))
+    assert fouten == []
+    assert vorderingen[0].bedrag == verwacht
+
+
+def test_aliassen_en_datums():
+    vorderingen, deelbetalingen, fouten = lees_regels(_csv(
+        "Factuurnummer;Hoofdsom;Factuurdatum;Rentetype;Betaaltermijn",
+        "2024-001;100,00;31-01-2024;2;30",
+        "2024-002;200,00;2024-02-29;2;",
+    ))
+    assert fouten == [] and deelbetalingen == []
+    assert [(v.kenmerk, v.bedrag, v.datum, v.betaaltermijn_dagen) for v in vorderingen] == [
+        ('2024-001', Decimal('100.00'), date(2024, 1, 31), 30),
+        ('2024-002', Decimal('200.00'), date(2024, 2, 29), 0),
+    ]
+
+
+def test_soort_uit_kolom_of_rentetype():
+    vorderingen, deelbetalingen, fouten = lees_regels(_csv(
+        "soort,kenmerk,bedrag,datum,rentetype,aangewezen",
+        "vordering,F1,100,01/01/2024,1,",
+        "kosten,BIK,40,01/01/2024,1,",
+        "deelbetaling,B1,50,01/03/2024,,F1;BIK",
+        ",F2,75,01/01/2024,2,",  # Met rentetype: vordering
+        ",B2,25,01/04/2024,,",  # Zonder: deelbetaling
+    ))
+    assert fouten == []
+    assert [(v.kenmerk, v.item_type) for v in vorderingen] == [('F1', 'vordering'), ('BIK', 'kosten'), ('F2', 'vordering')]
+    assert [(d.kenmerk, d.aangewezen) for d in deelbetalingen] == [('B1', ['F1', 'BIK']), ('B2', [])]
+
+
+def test_fouten_per_rij():
+    vorderingen, deelbetalingen, fouten = lees_regels(_csv(
+        "soort;kenmerk;bedrag;datum;rentetype",
+        "vordering;F1;100;01-01-2024;1",
+        "creditnota;C1;100;01-01-2024;1",
+        "vordering;F2;abc;01-01-2024;1",
+        ";;;;",
+        "vordering;F3;100;31-02-2024;9",
+        "deelbetaling;B1;-5;01-01-2024;",
+    ))
+    assert [v.kenmerk for v in vorderingen] == ['F1'] and deelbetalingen == []
+    assert fouten[0] == "Rij 3: onbekende soort 'creditnota'"
+    assert [f.split(':')[0] for f in fouten[1:]] == ['Rij 4', 'Rij 6', 'Rij 6', 'Rij 7']
+    assert any('bedrag' in f for f in fouten if f.startswith('Rij 4'))
+    assert {f.split(': ')[1] for f in fouten if f.startswith('Rij 6')} == {'datum', 'rentetype'}
+
+
+def test_onleesbaar_bestand():
+    with pytest.raises(ImportFout):
+        lees_regels(b"")
+    with pytest.raises(ImportFout):
+        lees_regels(_csv("kenmerk;omschrijving", "F1;iets"))
@@ -0,0 +1,48 @@
+"""
+Laden van de rentetabel (RenteTabelCache) vanuit async code.
+"""
+import asyncio
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+from app.services.rente_calculator import RenteTabelCache
+
+
+class _TrageCache(RenteTabelCache):
+    """Laadt uit een vaste tabel, met de latency van de (synchrone) database client."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def _load_from_db(self):
+        self.threads.append(threading.get_ident())
+        time.sleep(0.05)
+        self._compileer([(date(2024, 1, 1), Decimal("0.07"))], [(date(2024, 1, 1), Decimal("0.12"))])
+
+
+async def test_koude_cache_laadt_buiten_de_event_loop():
+    cache = _TrageCache()
+    tik = []
+
+    async def event_loop_draait():
+        while not cache._loaded:
+            tik.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    versies = await asyncio.gather(cache.versie_async(), cache.versie_async(), event_loop_draait())
+
+    assert versies[0] == versies[1] == cache.versie
+    # Eén keer geladen, in een thread; de event loop liep intussen door
+    assert len(cache.threads) == 1 and cache.threads[0] != threading.get_ident()
+    assert len(tik) > 3
+
+    # Warm: geen nieuwe lading
+    await cache.versie_async()
+    assert len(cache.threads) == 1
+
+    cache.invalidate()
+    await cache.laad_async()
+    assert len(cache.threads) == 2
@@ -0,0 +1,73 @@
+"""
+Detectie van het optionele schema (schema_capabilities).
+"""
+import logging
+
+import httpx
+from postgrest.exceptions import APIError
+
+from app.services import schema_capabilities as sc
+
+
+def _api_fout(code: str) -> APIError:
+    return APIError({'code': code, 'message': f"fout {code}", 'hint': None, 'details': None})
+
+
+class _ProbeDB:
+    """Synchrone client stand-in: per tabel een exception, of een lege rij."""
+
+    def __init__(self, fouten=None):
+        self.fouten = fouten or {}
+
+    def table(self, tabel):
+        db = self
+
+        class _Query:
+            def select(self, *_):
+                return self
+
+            def limit(self, *_):
+                return self
+
+            def execute(self):
+                if tabel in db.fouten:
+                    raise db.fouten[tabel]
+                return type('Resultaat', (), {'data': []})
+
+        return _Query()
+
+
+def test_ontbrekende_tabel_of_kolom():
+    for code in ('PGRST205', 'PGRST204', '42P01', '42703'):
+        db = _ProbeDB({'snapshot_blokken': _api_fout(code)})
+        assert sc._tabellen_bestaan(db, 'snapshot_blokken', vorig=True) is False
+
+
+def test_andere_fout_houdt_vorige_waarde(caplog):
+    for fout in (_api_fout('57014'), httpx.ConnectError("verbinding geweigerd"), TimeoutError()):
+        db = _ProbeDB({'case_shares': fout})
+        with caplog.at_level(logging.WARNING, logger=sc.__name__):
+            assert sc._tabellen_bestaan(db, 'case_shares', 'user_profiles', vorig=True) is True
+            assert sc._tabellen_bestaan(db, 'case_shares', 'user_profiles', vorig=False) is False
+    assert "case_shares" in caplog.text
+
+
+def test_registry_ververs_houdt_capabilities_bij_storing(monkeypatch):
+    db = _ProbeDB()
+    monkeypatch.setattr('app.db.supabase.get_supabase_client', lambda: db)
+    registry = sc.CapabilityRegistry(interval=0)
+
+    alles = registry.ververs()
+    assert (alles.sharing, alles.subscriptions, alles.case_berekeningen, alles.snapshot_blokken) == \
+        (True, True, True, True)
+
+    # Database even onbereikbaar: niets uitschakelen
+    db.fouten = {t: httpx.ReadTimeout("timeout") for t in ('case_shares', 'subscription_tiers', 'cases', 'snapshot_blokken')}
+    tijdens_storing = registry.ververs()
+    assert (tijdens_storing.sharing, tijdens_storing.subscriptions,
+            tijdens_storing.case_berekeningen, tijdens_storing.snapshot_blokken) == (True, True, True, True)
+
+    # Tabel echt weg: alleen die capability gaat uit
+    db.fouten = {'snapshot_blokken': _api_fout('PGRST205')}
+    daarna = registry.ververs()
+    assert (daarna.sharing, daarna.snapshot_blokken) == (True, False)
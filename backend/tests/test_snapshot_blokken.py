@@ -0,0 +1,54 @@
+"""
+Opruimen van snapshot blokken (snapshot_opslag, migratie 016).
+"""
+import asyncio
+
+import httpx
+
+from app.auth import get_current_user
+from app.main import app
+from app.services.snapshot_opslag import BlokkenOpruimer
+
+
+def _ruim_op(aanroepen):
+    def ruim_snapshot_blokken_op(db, p_hashes=None):
+        aanroepen.append(p_hashes)
+        return 0
+    return ruim_snapshot_blokken_op
+
+
+async def test_zaak_verwijderen_ruimt_blokken_van_snapshots_op(fake_db):
+    aanroepen = []
+    fake_db.rpcs['ruim_snapshot_blokken_op'] = _ruim_op(aanroepen)
+    fake_db.tables.update({
+        'cases': [dict(id='c1', user_id='u1'), dict(id='c2', user_id='u2')],
+        'snapshots': [dict(id='s1', case_id='c1', blokken=['a', 'b']),
+                      dict(id='s2', case_id='c1', blokken=['b', 'c']),
+                      dict(id='s3', case_id='c1', blokken=None)],  # Snapshot als gewone JSON
+    })
+    app.dependency_overrides[get_current_user] = lambda: 'u1'
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            assert (await client.delete('/api/cases/c2')).status_code == 404
+            assert aanroepen == []
+            assert (await client.delete('/api/cases/c1')).status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert aanroepen == [['a', 'b', 'c']]
+
+
+async def test_periodieke_volledige_sweep(fake_db):
+    aanroepen = []
+    fake_db.rpcs['ruim_snapshot_blokken_op'] = _ruim_op(aanroepen)
+    opruimer = BlokkenOpruimer(interval=0.01)
+    opruimer.start()
+    try:
+        await asyncio.sleep(0.05)
+    finally:
+        opruimer.stop()
+    assert aanroepen and all(hashes is None for hashes in aanroepen)
+
+    # Interval 0: uit
+    uit = BlokkenOpruimer(interval=0)
+    uit.start()
+    assert uit._taak is None
@@ -0,0 +1,138 @@
+"""
+Verschillen tussen twee snapshots (snapshot_diff).
+"""
+import random
+from decimal import Decimal
+
+from app.api import berekening
+from app.models import BerekeningRequest
+from app.services.snapshot_diff import _diff_periodes, diff_snapshots
+from app.services.snapshot_opslag import _bytea, codeer_resultaat
+from tests.test_hervat import willekeurige_wijziging, willekeurige_zaak
+
+
+def _periode(start, eind, hoofdsom, rente):
+    return dict(start=start, eind=eind, dagen=0, hoofdsom=hoofdsom, rente_pct='0.08', rente=rente)
+
+
+def _vordering(kenmerk, openstaand='1000.00', periodes=()):
+    return dict(kenmerk=kenmerk, oorspronkelijk_bedrag='1000.00', openstaand=openstaand,
+                periodes=list(periodes), periodes_kosten=[])
+
+
+def _betaling(kenmerk, datum, bedrag, *toerekeningen):
+    return dict(kenmerk=kenmerk, datum=datum, bedrag=bedrag, verwerkt=bedrag,
+                toerekeningen=[dict(vordering=v, type=t, bedrag=b) for v, t, b in toerekeningen])
+
+
+def _resultaat(vorderingen, deelbetalingen=(), **totalen):
+    return dict(vorderingen=list(vorderingen), deelbetalingen=list(deelbetalingen),
+                totalen=dict(dict(oorspronkelijk='3000.00', openstaand='3000.00'), **totalen))
+
+
+JAAR_2020 = _periode('2020-01-01', '2020-12-31', '1000.00', '80.00')
+JAAR_2021 = _periode('2021-01-01', '2021-12-31', '1000.00', '80.00')
+HALF_2021 = [_periode('2021-01-01', '2021-06-30', '1000.00', '40.00'),
+             _periode('2021-07-01', '2021-12-31', '500.00', '20.00')]
+
+
+def _statussen(periodes):
+    return [(str(p.start), str(p.eind), p.status) for p in periodes]
+
+
+def test_periodes_gesplitst_en_samengevoegd():
+    a, b = [JAAR_2020, JAAR_2021], [JAAR_2020, *HALF_2021]
+    assert _statussen(_diff_periodes(a, b)) == [
+        ('2021-01-01', '2021-06-30', 'toegevoegd'),
+        ('2021-01-01', '2021-12-31', 'verwijderd'),
+        ('2021-07-01', '2021-12-31', 'toegevoegd'),
+    ]
+    assert _statussen(_diff_periodes(b, a)) == [
+        ('2021-01-01', '2021-06-30', 'verwijderd'),
+        ('2021-01-01', '2021-12-31', 'toegevoegd'),
+        ('2021-07-01', '2021-12-31', 'verwijderd'),
+    ]
+
+    # Zelfde (start, eind), ander bedrag: gewijzigd, met alleen de velden die verschillen
+    gewijzigd = _diff_periodes([JAAR_2020], [dict(JAAR_2020, rente='80.5')])
+    assert _statussen(gewijzigd) == [('2020-01-01', '2020-12-31', 'gewijzigd')]
+    assert list(gewijzigd[0].velden) == ['rente'] and gewijzigd[0].velden['rente'].verschil == Decimal('0.50')
+    assert _diff_periodes([JAAR_2020], [dict(JAAR_2020, rente='80.0')]) == []
+
+
+async def test_vorderingen_op_kenmerk():
+    a = _resultaat([_vordering('F1', periodes=[JAAR_2020, JAAR_2021]), _vordering('F2'), _vordering('F3')])
+    b = _resultaat([_vordering('F1', '500.00', periodes=[JAAR_2020, *HALF_2021]), _vordering('F2'),
+                    _vordering('F3-nieuw'), _vordering('F4')])
+    diff = await diff_snapshots(None, a, b)
+
+    assert [(v.kenmerk, v.status) for v in diff['vorderingen']] == [
+        ('F1', 'gewijzigd'), ('F3', 'verwijderd'), ('F3-nieuw', 'toegevoegd'), ('F4', 'toegevoegd'),
+    ]
+    f1 = diff['vorderingen'][0]
+    assert list(f1.velden) == ['openstaand'] and f1.velden['openstaand'].verschil == Decimal('-500.00')
+    assert len(f1.periodes) == 3 and f1.periodes_kosten == []
+    # Alleen wat verschilt: F2 telt als ongewijzigd, de totalen zijn gelijk
+    assert diff['ongewijzigde_vorderingen'] == 1
+    assert diff['totalen'] == {} and diff['deelbetalingen'] == []
+
+
+async def test_deelbetalingen_op_kenmerk_en_datum():
+    a = _resultaat([], [
+        _betaling('B1', '2021-06-01', '500.00', ('F1', 'rente', '80.00'), ('F1', 'hoofdsom', '420.00')),
+        _betaling('B2', '2022-01-01', '100.00'),
+        _betaling(None, '2022-03-01', '50.00'),
+    ])
+    b = _resultaat([], [
+        _betaling('B1', '2021-06-01', '600.00', ('F1', 'rente', '80.00'), ('F1', 'hoofdsom', '520.00')),
+        _betaling('B2', '2022-02-01', '100.00'),  # Andere datum: een andere betaling
+        _betaling(None, '2022-03-01', '50.00'),
+    ], openstaand='2900.00')
+    diff = await diff_snapshots(None, a, b)
+
+    assert [(d.kenmerk, str(d.datum), d.status) for d in diff['deelbetalingen']] == [
+        ('B1', '2021-06-01', 'gewijzigd'), ('B2', '2022-01-01', 'verwijderd'), ('B2', '2022-02-01', 'toegevoegd'),
+    ]
+    b1 = diff['deelbetalingen'][0]
+    assert set(b1.velden) == {'bedrag', 'verwerkt'}
+    assert [(t.vordering, t.type, t.bedrag.verschil) for t in b1.toerekeningen] == [('F1', 'hoofdsom', Decimal('100.00'))]
+    assert list(diff['totalen']) == ['openstaand'] and diff['totalen']['openstaand'].verschil == Decimal('-100.00')
+
+
+def _berekening(zaak):
+    return berekening.voer_berekening_uit(BerekeningRequest(**zaak)).model_dump(mode='json')
+
+
+def _bewaar_gecodeerd(db, resultaat):
+    manifest, blokken = codeer_resultaat(resultaat)
+    db.tables.setdefault('snapshot_blokken', []).extend(
+        dict(hash=h, inhoud=_bytea(inhoud)) for h, inhoud in blokken.items()
+    )
+    return manifest
+
+
+def _als_dict(diff):
+    return {k: [v.model_dump() for v in w] if isinstance(w, list)
+            else {veld: v.model_dump() for veld, v in w.items()} if isinstance(w, dict) else w
+            for k, w in diff.items()}
+
+
+async def test_gewone_json_tegen_gecodeerd(fake_db):
+    """Een snapshot van vóór migratie 016 (gewone JSON) tegen een gecodeerde geeft dezelfde diff."""
+    for seed in range(5):
+        r = random.Random(seed)
+        zaak = willekeurige_zaak(r)
+        gewijzigd = willekeurige_wijziging(willekeurige_wijziging(zaak, r), r)
+        a, b = _berekening(zaak), _berekening(gewijzigd)
+        gecodeerd_a, gecodeerd_b = _bewaar_gecodeerd(fake_db, a), _bewaar_gecodeerd(fake_db, b)
+
+        referentie = _als_dict(await diff_snapshots(fake_db, a, b))
+        assert _als_dict(await diff_snapshots(fake_db, a, gecodeerd_b)) == referentie
+        assert _als_dict(await diff_snapshots(fake_db, gecodeerd_a, b)) == referentie
+        assert _als_dict(await diff_snapshots(fake_db, gecodeerd_a, gecodeerd_b)) == referentie
+        assert referentie['ongewijzigde_vorderingen'] + len(referentie['vorderingen']) >= len(a['vorderingen'])
+
+    # Zelfde snapshot: geen verschillen
+    zelfde = await diff_snapshots(fake_db, a, gecodeerd_a)
+    assert (zelfde['totalen'], zelfde['vorderingen'], zelfde['deelbetalingen']) == ({}, [], [])
+    assert zelfde['ongewijzigde_vorderingen'] == len(a['vorderingen'])
@@ -0,0 +1,70 @@
+"""
+Codering van snapshot resultaten (snapshot_opslag): blokken en kolommen.
+
+Een gecodeerd resultaat moet exact terugkomen; het is de vastgelegde
+berekening van een zaak.
+"""
+import json
+import random
+
+from hypothesis import given, settings, strategies as st
+
+from app.api import berekening
+from app.models import BerekeningRequest
+from app.services.snapshot_opslag import _uit_blokken, codeer_resultaat, decodeer_resultaat, is_gecodeerd
+from tests.test_hervat import willekeurige_zaak
+
+sleutels = st.text(max_size=6).filter(lambda k: k != '__kolommen__')
+scalairen = st.one_of(st.none(), st.booleans(), st.integers(), st.floats(allow_nan=False, allow_infinity=False),
+                      st.text(max_size=8))
+
+
+def _gelijkvormig(kinderen):
+    """Lijsten van dicts met dezelfde velden (ook lege dicts): de kandidaten voor kolommen."""
+    return st.lists(sleutels, max_size=3, unique=True).flatmap(
+        lambda velden: st.lists(st.fixed_dictionaries({veld: kinderen for veld in velden}), max_size=4)
+    )
+
+
+json_waarden = st.recursive(
+    scalairen,
+    lambda kinderen: st.one_of(
+        st.lists(kinderen, max_size=4),
+        st.dictionaries(sleutels, kinderen, max_size=4),
+        _gelijkvormig(kinderen),
+    ),
+    max_leaves=30,
+)
+resultaten = st.fixed_dictionaries(
+    {'vorderingen': st.lists(st.dictionaries(sleutels, json_waarden, max_size=4), max_size=4)},
+    optional={'totalen': json_waarden, 'deelbetalingen': json_waarden},
+)
+
+
+def _round_trip(resultaat):
+    manifest, blokken = codeer_resultaat(resultaat)
+    assert is_gecodeerd(manifest)
+    # Zoals opgeslagen: het manifest als JSON, de blokken gecomprimeerd
+    return decodeer_resultaat(json.loads(json.dumps(manifest)), _uit_blokken(blokken))
+
+
+@settings(max_examples=150, deadline=None)
+@given(resultaten)
+def test_round_trip(resultaat):
+    terug = _round_trip(resultaat)
+    assert terug == resultaat
+    assert json.dumps(terug) == json.dumps(resultaat)  # Ook de volgorde van de velden
+
+
+def test_lege_dicts():
+    for resultaat in ({'vorderingen': [], 'a': [{}, {}]}, {'vorderingen': [{'p': [{}, {}, {}]}, {'p': []}]}):
+        assert _round_trip(resultaat) == resultaat
+
+
+def test_berekening_response():
+    for seed in range(10):
+        zaak = willekeurige_zaak(random.Random(seed))
+        for detail in ('full', 'summary'):
+            resultaat = berekening.voer_berekening_uit(BerekeningRequest(**zaak, detail=detail)).model_dump(mode='json')
+            terug = _round_trip(resultaat)
+            assert json.dumps(terug) == json.dumps(resultaat)
@@ -44,7 +44,7 @@ import {
   createDeelbetaling,
   updateDeelbetaling,
   deleteDeelbetaling,
-  berekenRente,
+  berekenCase,
   berekenRentePdf,
   createSnapshot,
   getSnapshotPdf,
@@ -399,7 +399,7 @@ export default function CaseDetailPage() {
     setCalculating(true);
     setError(null);
     try {
-      const res = await berekenRente(caseData);
+      const res = await berekenCase(caseId);
       setResult(res);
       // Log usage
       logUsage({ action_type: 'calculation', case_id: caseId, case_name: caseData.naam });
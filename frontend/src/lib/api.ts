@@ -187,6 +187,11 @@ export async function berekenRente(
   });
 }
 
+// Server-side berekening van een opgeslagen zaak (uitkomst per revisie bewaard)
+export async function berekenCase(caseId: string): Promise<BerekeningResponse> {
+  return fetchApi<BerekeningResponse>(`/api/cases/${caseId}/bereken`);
+}
+
 // Snapshots API
 
 export async function getSnapshots(caseId: string): Promise<Snapshot[]> {
@@ -194,9 +199,13 @@ export async function getSnapshots(caseId: string): Promise<Snapshot[]> {
 }
 
 export async function createSnapshot(caseId: string): Promise<Snapshot> {
-  return fetchApi<Snapshot>(`/api/snapshots/case/${caseId}`, {
+  // Als job: de berekening van een grote zaak houdt geen request open
+  const accepted = await fetchApi<JobAccepted>(`/api/snapshots/case/${caseId}`, {
     method: 'POST',
+    headers: { Prefer: 'respond-async' },
   });
+  const job = await wachtOpJob(accepted.status_url);
+  return job.resultaat?.snapshot as Snapshot;
 }
 
 export async function getSnapshotPdf(snapshotId: string): Promise<Blob> {
@@ -224,6 +233,75 @@ export async function getSnapshotPdf(snapshotId: string): Promise<Blob> {
   return response.blob();
 }
 
+// Jobs API (langlopend werk: met 'Prefer: respond-async' geeft een endpoint 202 + job id)
+
+export interface JobAccepted {
+  job_id: string;
+  status: 'wachtend';
+  status_url: string;
+}
+
+export interface Job {
+  id: string;
+  soort: string;
+  status: 'wachtend' | 'bezig' | 'klaar' | 'mislukt';
+  fout: string | null;
+  fout_status: number | null;
+  resultaat: Record<string, unknown> | null;
+  bestand_url: string | null;
+}
+
+async function wachtOpJob(statusUrl: string): Promise<Job> {
+  // Pollen met oplopende pauze (250 ms tot 2 s)
+  let pauze = 250;
+  for (;;) {
+    const job = await fetchApi<Job>(statusUrl);
+    if (job.status === 'klaar') return job;
+    if (job.status === 'mislukt') {
+      throw new ApiError(job.fout_status || 500, job.fout || 'Job mislukt');
+    }
+    await new Promise((resolve) => setTimeout(resolve, pauze));
+    pauze = Math.min(pauze * 2, 2000);
+  }
+}
+
+async function rapportAlsJob(endpoint: string, body: unknown, foutmelding: string): Promise<Blob> {
+  const token = await getAuthToken();
+
+  const headers: Record<string, string> = {
+    'Content-Type': 'application/json',
+    Prefer: 'respond-async',
+  };
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`;
+  }
+
+  const response = await fetch(`${API_BASE}${endpoint}`, {
+    method: 'POST',
+    headers,
+    body: JSON.stringify(body),
+  });
+
+  if (!response.ok) {
+    if (response.status === 403) {
+      const error = await response.json().catch(() => ({ detail: foutmelding }));
+      throw new ApiError(403, error.detail || foutmelding);
+    }
+    throw new ApiError(response.status, foutmelding);
+  }
+
+  const accepted: JobAccepted = await response.json();
+  const job = await wachtOpJob(accepted.status_url);
+
+  const bestand = await fetch(`${API_BASE}${job.bestand_url}`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+  });
+  if (!bestand.ok) {
+    throw new ApiError(bestand.status, foutmelding);
+  }
+  return bestand.blob();
+}
+
 // Rentetabel API
 
 export interface RenteTabelEntry {
@@ -342,8 +420,6 @@ export async function getMyTier(): Promise<SubscriptionTier> {
 export async function berekenRentePdf(
   caseData: CaseWithLines
 ): Promise<Blob> {
-  const token = await getAuthToken();
-
   const request = {
     einddatum: caseData.einddatum,
     strategie: caseData.strategie,
@@ -371,24 +447,7 @@ export async function berekenRentePdf(
     })),
   };
 
-  const headers: Record<string, string> = {
-    'Content-Type': 'application/json',
-  };
-  if (token) {
-    headers['Authorization'] = `Bearer ${token}`;
-  }
-
-  const response = await fetch(`${API_BASE}/api/bereken/pdf`, {
-    method: 'POST',
-    headers,
-    body: JSON.stringify(request),
-  });
-
-  if (!response.ok) {
-    throw new ApiError(response.status, 'Failed to generate PDF');
-  }
-
-  return response.blob();
+  return rapportAlsJob('/api/bereken/pdf', request, 'Failed to generate PDF');
 }
 
 // Excel Export API
@@ -396,8 +455,6 @@ export async function berekenRentePdf(
 export async function berekenRenteExcel(
   caseData: CaseWithLines
 ): Promise<Blob> {
-  const token = await getAuthToken();
-
   const request = {
     einddatum: caseData.einddatum,
     strategie: caseData.strategie,
@@ -425,27 +482,7 @@ export async function berekenRenteExcel(
     })),
   };
 
-  const headers: Record<string, string> = {
-    'Content-Type': 'application/json',
-  };
-  if (token) {
-    headers['Authorization'] = `Bearer ${token}`;
-  }
-
-  const response = await fetch(`${API_BASE}/api/bereken/excel`, {
-    method: 'POST',
-    headers,
-    body: JSON.stringify(request),
-  });
-
-  if (!response.ok) {
-    if (response.status === 403) {
-      throw new ApiError(403, 'Excel export is een Pro-functie');
-    }
-    throw new ApiError(response.status, 'Failed to generate Excel');
-  }
-
-  return response.blob();
+  return rapportAlsJob('/api/bereken/excel', request, 'Failed to generate Excel');
 }
 
 // Admin API
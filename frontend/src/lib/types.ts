@@ -191,6 +191,7 @@ export interface Totalen {
 export interface BerekeningResponse {
   einddatum: string;
   strategie: string;
+  detail?: 'full' | 'summary';
   vorderingen: VorderingResultaat[];
   deelbetalingen: DeelbetalingResultaat[];
   totalen: Totalen;
@@ -0,0 +1,30 @@
+-- =============================================
+-- Migration 012: User bootstrap in één RPC
+-- =============================================
+-- Vervangt de drie SELECTs (+ eventuele INSERTs) van ensure_user_profile
+-- door één idempotente aanroep: profiel, standaard rol en free abonnement.
+
+CREATE OR REPLACE FUNCTION ensure_user_bootstrap(p_user_id UUID, p_email TEXT)
+RETURNS VOID AS $$
+BEGIN
+    -- Gelijktijdige eerste requests van dezelfde gebruiker na elkaar afhandelen
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_user_bootstrap:' || p_user_id::text));
+
+    INSERT INTO user_profiles (id, email, display_name)
+    VALUES (p_user_id, p_email, split_part(p_email, '@', 1))
+    ON CONFLICT (id) DO NOTHING;
+
+    -- Standaard rol alleen als de gebruiker nog geen enkele rol heeft
+    INSERT INTO user_roles (user_id, role)
+    SELECT p_user_id, 'user'
+    WHERE NOT EXISTS (SELECT 1 FROM user_roles WHERE user_id = p_user_id);
+
+    -- Free abonnement alleen als er nog geen abonnement is (ook geen verlopen)
+    INSERT INTO user_subscriptions (user_id, tier_id, status)
+    SELECT p_user_id, 'free', 'active'
+    WHERE NOT EXISTS (SELECT 1 FROM user_subscriptions WHERE user_id = p_user_id);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Alleen de backend (service role) roept dit aan
+REVOKE EXECUTE ON FUNCTION ensure_user_bootstrap(UUID, TEXT) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,38 @@
+-- =============================================
+-- Migration 013: Effectieve rechten op een zaak in één query
+-- =============================================
+-- Geeft voor gebruiker U de zaak (direct, of de zaak van een vordering of
+-- deelbetaling), het recht van U op die zaak en of U admin is.
+--   permission: 'owner', 'edit', 'view' of NULL (geen eigen recht)
+--   case_id NULL: zaak / vordering / deelbetaling bestaat niet
+
+CREATE OR REPLACE FUNCTION case_permission(
+    p_user_id UUID,
+    p_case_id UUID DEFAULT NULL,
+    p_vordering_id UUID DEFAULT NULL,
+    p_deelbetaling_id UUID DEFAULT NULL
+)
+RETURNS TABLE (case_id UUID, permission TEXT, is_admin BOOLEAN) AS $$
+    WITH doel AS (
+        SELECT COALESCE(
+            p_case_id,
+            (SELECT v.case_id FROM vorderingen v WHERE v.id = p_vordering_id),
+            (SELECT d.case_id FROM deelbetalingen d WHERE d.id = p_deelbetaling_id)
+        ) AS case_id
+    )
+    SELECT
+        c.id,
+        CASE
+            WHEN c.user_id = p_user_id THEN 'owner'
+            ELSE (
+                SELECT s.permission::TEXT FROM case_shares s
+                WHERE s.case_id = c.id AND s.shared_with_user_id = p_user_id
+            )
+        END,
+        EXISTS (SELECT 1 FROM user_roles r WHERE r.user_id = p_user_id AND r.role = 'admin')
+    FROM doel
+    LEFT JOIN cases c ON c.id = doel.case_id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Alleen de backend (service role) roept dit aan
+REVOKE EXECUTE ON FUNCTION case_permission(UUID, UUID, UUID, UUID) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,88 @@
+-- =============================================
+-- Migration 014: Revisie per zaak + opgeslagen berekening per revisie
+-- =============================================
+-- cases.revisie telt elke wijziging van een zaak. Wijzigingen van vorderingen
+-- en deelbetalingen raken ook de zaak (updated_at), zodat één BEFORE UPDATE
+-- trigger op cases alle mutaties dekt.
+--
+-- Dat raken gebeurt per statement in plaats van per rij (de triggers uit 001
+-- worden vervangen): een multi-row insert van een bulk import geeft één
+-- UPDATE en één revisie per zaak per batch, niet één per regel.
+--
+-- case_berekeningen bewaart per zaak de laatste berekening met de revisie (en
+-- rentetabel versie) waarvoor die geldt. Alleen de backend (service role)
+-- leest en schrijft deze tabel.
+
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS revisie BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_case_revisie()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.revisie = OLD.revisie + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bump_cases_revisie ON cases;
+CREATE TRIGGER bump_cases_revisie
+    BEFORE UPDATE ON cases
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_case_revisie();
+
+-- Zaken geraakt door een statement op vorderingen/deelbetalingen (transition tables)
+CREATE OR REPLACE FUNCTION raak_cases_per_statement()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE cases SET updated_at = NOW() WHERE id IN (SELECT case_id FROM nieuw);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE cases SET updated_at = NOW() WHERE id IN (SELECT case_id FROM oud);
+    ELSE
+        UPDATE cases SET updated_at = NOW()
+        WHERE id IN (SELECT case_id FROM nieuw UNION SELECT case_id FROM oud);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Een trigger met transition tables heeft één event, dus drie per tabel
+DROP TRIGGER IF EXISTS update_case_on_vordering_change ON vorderingen;
+DROP TRIGGER IF EXISTS raak_case_na_vordering_insert ON vorderingen;
+DROP TRIGGER IF EXISTS raak_case_na_vordering_update ON vorderingen;
+DROP TRIGGER IF EXISTS raak_case_na_vordering_delete ON vorderingen;
+CREATE TRIGGER raak_case_na_vordering_insert
+    AFTER INSERT ON vorderingen REFERENCING NEW TABLE AS nieuw
+    FOR EACH STATEMENT EXECUTE FUNCTION raak_cases_per_statement();
+CREATE TRIGGER raak_case_na_vordering_update
+    AFTER UPDATE ON vorderingen REFERENCING OLD TABLE AS oud NEW TABLE AS nieuw
+    FOR EACH STATEMENT EXECUTE FUNCTION raak_cases_per_statement();
+CREATE TRIGGER raak_case_na_vordering_delete
+    AFTER DELETE ON vorderingen REFERENCING OLD TABLE AS oud
+    FOR EACH STATEMENT EXECUTE FUNCTION raak_cases_per_statement();
+
+DROP TRIGGER IF EXISTS update_case_on_deelbetaling_change ON deelbetalingen;
+DROP TRIGGER IF EXISTS raak_case_na_deelbetaling_insert ON deelbetalingen;
+DROP TRIGGER IF EXISTS raak_case_na_deelbetaling_update ON deelbetalingen;
+DROP TRIGGER IF EXISTS raak_case_na_deelbetaling_delete ON deelbetalingen;
+CREATE TRIGGER raak_case_na_deelbetaling_insert
+    AFTER INSERT ON deelbetalingen REFERENCING NEW TABLE AS nieuw
+    FOR EACH STATEMENT EXECUTE FUNCTION raak_cases_per_statement();
+CREATE TRIGGER raak_case_na_deelbetaling_update
+    AFTER UPDATE ON deelbetalingen REFERENCING OLD TABLE AS oud NEW TABLE AS nieuw
+    FOR EACH STATEMENT EXECUTE FUNCTION raak_cases_per_statement();
+CREATE TRIGGER raak_case_na_deelbetaling_delete
+    AFTER DELETE ON deelbetalingen REFERENCING OLD TABLE AS oud
+    FOR EACH STATEMENT EXECUTE FUNCTION raak_cases_per_statement();
+
+CREATE TABLE IF NOT EXISTS case_berekeningen (
+    case_id UUID PRIMARY KEY REFERENCES cases(id) ON DELETE CASCADE,
+    revisie BIGINT NOT NULL,
+    rentetabel_versie TEXT,
+    invoer_json JSONB NOT NULL,
+    resultaat_json JSONB NOT NULL,
+    totaal_openstaand DECIMAL(15, 2),
+    berekend_op TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- RLS aan zonder policies: niet bereikbaar met de anon/authenticated key
+ALTER TABLE case_berekeningen ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,67 @@
+-- =============================================
+-- Migration 015: Versie-vingerafdruk voor conditional GET (ETag)
+-- =============================================
+-- case_etag(U, C) geeft een hash over alles waar GET /api/cases/{C} voor
+-- gebruiker U van afhangt: de zaak (updated_at, ook opgehoogd bij wijziging
+-- van vorderingen/deelbetalingen), de shares, de betrokken profielen en het
+-- recht van U. NULL als de zaak niet bestaat of U er geen toegang toe heeft.
+--
+-- case_etag(U) (zonder zaak) doet hetzelfde voor GET /api/cases: eigen
+-- zaken, de shares daarvan, en de zaken die met U gedeeld zijn.
+--
+-- Eén lichte query in plaats van de volledige endpoint queries; de backend
+-- geeft 304 als de hash gelijk is aan If-None-Match.
+
+CREATE OR REPLACE FUNCTION case_etag(p_user_id UUID, p_case_id UUID DEFAULT NULL)
+RETURNS TEXT AS $$
+DECLARE
+    v_admin BOOLEAN;
+    v_etag TEXT;
+BEGIN
+    v_admin := EXISTS (SELECT 1 FROM user_roles r WHERE r.user_id = p_user_id AND r.role = 'admin');
+
+    IF p_case_id IS NOT NULL THEN
+        SELECT md5(concat_ws('|',
+            p_user_id, v_admin, c.id, c.updated_at, c.user_id,
+            (SELECT p.updated_at FROM user_profiles p WHERE p.id = c.user_id),
+            (SELECT string_agg(
+                        concat_ws(':', s.shared_with_user_id, s.permission, s.shared_by_user_id, pw.updated_at, pb.updated_at),
+                        ',' ORDER BY s.shared_with_user_id)
+               FROM case_shares s
+               LEFT JOIN user_profiles pw ON pw.id = s.shared_with_user_id
+               LEFT JOIN user_profiles pb ON pb.id = s.shared_by_user_id
+              WHERE s.case_id = c.id)
+        ))
+        INTO v_etag
+        FROM cases c
+        WHERE c.id = p_case_id
+          AND (c.user_id = p_user_id
+               OR v_admin
+               OR EXISTS (SELECT 1 FROM case_shares s WHERE s.case_id = c.id AND s.shared_with_user_id = p_user_id));
+        RETURN v_etag;
+    END IF;
+
+    SELECT md5(concat_ws('|',
+        p_user_id,
+        (SELECT string_agg(concat_ws(':', c.id, c.updated_at), ',' ORDER BY c.id)
+           FROM cases c WHERE c.user_id = p_user_id),
+        (SELECT string_agg(concat_ws(':', s.case_id, s.shared_with_user_id, s.permission, p.updated_at),
+                           ',' ORDER BY s.case_id, s.shared_with_user_id)
+           FROM case_shares s
+           JOIN cases c ON c.id = s.case_id
+           LEFT JOIN user_profiles p ON p.id = s.shared_with_user_id
+          WHERE c.user_id = p_user_id),
+        (SELECT string_agg(concat_ws(':', s.case_id, s.permission, s.shared_by_user_id, c.updated_at, p.updated_at),
+                           ',' ORDER BY s.case_id)
+           FROM case_shares s
+           JOIN cases c ON c.id = s.case_id
+           LEFT JOIN user_profiles p ON p.id = s.shared_by_user_id
+          WHERE s.shared_with_user_id = p_user_id)
+    ))
+    INTO v_etag;
+    RETURN v_etag;
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Alleen de backend (service role) roept dit aan
+REVOKE EXECUTE ON FUNCTION case_etag(UUID, UUID) FROM PUBLIC, anon, authenticated;
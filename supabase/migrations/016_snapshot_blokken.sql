@@ -0,0 +1,48 @@
+-- =============================================
+-- Migration 016: Gecomprimeerde, gededupliceerde snapshot resultaten
+-- =============================================
+-- Het resultaat van een snapshot wordt opgeknipt in blokken (één per
+-- vordering, één voor de rest), kolomsgewijs gezet en met zlib
+-- gecomprimeerd (backend: app/services/snapshot_opslag.py). De blokken staan
+-- hier, met als sleutel de sha256 van hun inhoud; snapshots.resultaat_json
+-- bevat dan alleen een manifest met de hashes:
+--   {"codering": "blokken-v1", "rest": h, "vorderingen": [h, ...], "blokken": [h, ...]}
+-- Een vordering die gelijk blijft tussen opeenvolgende snapshots wordt dus
+-- één keer bewaard. Bestaande snapshots (gewone JSON) blijven leesbaar.
+
+CREATE TABLE IF NOT EXISTS snapshot_blokken (
+    hash TEXT PRIMARY KEY,
+    inhoud BYTEA NOT NULL,
+    grootte INTEGER NOT NULL,
+    laatst_gebruikt TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Al gecomprimeerd: niet nog eens door TOAST laten comprimeren
+ALTER TABLE snapshot_blokken ALTER COLUMN inhoud SET STORAGE EXTERNAL;
+
+-- Alleen de backend (service role) leest en schrijft blokken
+ALTER TABLE snapshot_blokken ENABLE ROW LEVEL SECURITY;
+
+-- Welke snapshots gebruiken een blok (voor het opruimen)
+CREATE INDEX IF NOT EXISTS idx_snapshots_blokken ON snapshots USING GIN ((resultaat_json->'blokken'));
+
+-- Verwijder blokken die door geen snapshot meer gebruikt worden: de blokken
+-- in p_hashes (na het verwijderen van een snapshot of zaak), of alle blokken
+-- als p_hashes NULL is (periodiek vanuit de backend, SNAPSHOT_BLOKKEN_OPRUIMEN).
+-- Een blok dat het afgelopen uur nog geschreven is blijft staan: een snapshot
+-- die het gebruikt kan op dat moment nog aangemaakt worden.
+-- Vaste search_path: een SECURITY DEFINER functie mag geen objecten uit het
+-- schema van de aanroeper oppikken.
+CREATE OR REPLACE FUNCTION ruim_snapshot_blokken_op(p_hashes TEXT[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+    WITH weg AS (
+        DELETE FROM snapshot_blokken b
+        WHERE (p_hashes IS NULL OR b.hash = ANY(p_hashes))
+          AND b.laatst_gebruikt < NOW() - INTERVAL '1 hour'
+          AND NOT EXISTS (SELECT 1 FROM snapshots s WHERE s.resultaat_json->'blokken' ? b.hash)
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM weg;
+$$ LANGUAGE sql SECURITY DEFINER SET search_path = public, pg_temp;
+
+REVOKE EXECUTE ON FUNCTION ruim_snapshot_blokken_op(TEXT[]) FROM PUBLIC, anon, authenticated;